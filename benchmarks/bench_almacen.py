@@ -0,0 +1,96 @@
+"""
+Benchmark del almacén binario de trayectos frente al log de texto
+
+Escribe los mismos registros con ServidorGPS.guardar_log (texto) y con
+AlmacenTrayectos, y luego los lee: el texto con leer_linea_log línea a
+línea y el almacén recorriendo los segmentos mapeados en memoria.
+
+Uso: python -m benchmarks.bench_almacen [n_registros]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import gps_protocolo
+from gps_almacen import AlmacenTrayectos, LectorTrayectos
+from gps_log import leer_linea_log
+from gps_servidor import ServidorGPS
+
+
+def _registros(n):
+    registros = []
+    for i in range(256):
+        trama = gps_protocolo.empaquetar_mensaje_gps(
+            id_dispositivo=i,
+            secuencia=i,
+            latitud=-173935000 + i,
+            longitud=-661570000 - i,
+            altitud=2558,
+            velocidad=450,
+            rumbo=1350,
+            bateria=85,
+            estado=0,
+        )
+        registros.append(gps_protocolo.desempaquetar_registro(trama)[0])
+    return [registros[i % 256] for i in range(n)]
+
+
+def _mostrar(nombre, n, duracion):
+    print(f"  {nombre:<28} {duracion * 1000:9.1f} ms  {n / duracion:12,.0f} registros/s")
+
+
+def _tam_directorio(directorio):
+    return sum(
+        os.path.getsize(os.path.join(directorio, nombre))
+        for nombre in os.listdir(directorio)
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) >= 2 else 200_000
+    registros = _registros(n)
+
+    print(f"\n=== {n} registros: log de texto vs. almacén binario ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_txt = os.path.join(directorio, "gps_log.txt")
+        with contextlib.redirect_stdout(io.StringIO()):
+            servidor = ServidorGPS(
+                log_path=ruta_txt, max_log_bytes=1 << 40, modo_salida="silencioso"
+            )
+        inicio = time.perf_counter()
+        for datos in registros:
+            servidor.guardar_log(datos)
+        servidor.cerrar_log()
+        _mostrar("escritura texto", n, time.perf_counter() - inicio)
+
+        ruta_bin = os.path.join(directorio, "trayectos")
+        almacen = AlmacenTrayectos(ruta_bin)
+        inicio = time.perf_counter()
+        for datos in registros:
+            almacen.agregar(datos)
+        almacen.cerrar()
+        _mostrar("escritura almacén", n, time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        with open(ruta_txt) as f:
+            leidos = sum(1 for linea in f if leer_linea_log(linea))
+        _mostrar("lectura texto", leidos, time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        with LectorTrayectos(ruta_bin) as lector:
+            leidos = sum(1 for _ in lector)
+        _mostrar("lectura almacén (mmap)", leidos, time.perf_counter() - inicio)
+
+        print(
+            f"\n  Bytes por registro: texto {os.path.getsize(ruta_txt) / n:.1f}, "
+            f"almacén {_tam_directorio(ruta_bin) / n:.1f}"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark de verificación de mensajes autenticados (FLAG_AUTENTICADO)
+
+Mide cuánto cuesta por mensaje comprobar el TAG de posiciones de 30 bytes
+de una flota de dispositivos, frente al CRC-16 que el servidor ya verifica:
+- el CRC solo (verificar_checksum)
+- el TAG con contexto por dispositivo precalculado (Autenticador, que copia
+  un contexto con la clave ya cargada), con BLAKE2s y con HMAC-SHA256
+- el TAG armando el contexto en cada mensaje (sin caché), como referencia
+- desempaquetar_registro completo con y sin autenticador
+y la tasa equivalente en mensajes por segundo de un solo núcleo.
+
+Uso: python -m benchmarks.bench_autenticacion [n_mensajes] [n_dispositivos]
+"""
+
+import hashlib
+import hmac
+import sys
+import time
+
+import gps_protocolo
+
+REPETICIONES = 5
+
+
+def _flota(autenticador, n_mensajes, n_dispositivos):
+    return [
+        autenticador.firmar(
+            gps_protocolo.empaquetar_mensaje_gps(
+                1 + indice % n_dispositivos,
+                indice // n_dispositivos,
+                -173935000 + indice,
+                -661570000 - indice,
+                2558,
+                450,
+                1350,
+                85,
+                0,
+            )
+        )
+        for indice in range(n_mensajes)
+    ]
+
+
+def _sin_cache(autenticador, n_dispositivos):
+    """Verificación que arma el contexto con la clave en cada mensaje"""
+    blake2s = autenticador.algoritmo == "blake2s"
+    tam_tag = gps_protocolo.TAM_TAG
+    # Las claves sí se guardan: solo se compara el costo del contexto
+    claves = {
+        id_disp: autenticador.clave_dispositivo(id_disp)
+        for id_disp in range(1, n_dispositivos + 1)
+    }
+
+    def verificar(mensaje):
+        clave = claves[(mensaje[2] << 8) | mensaje[3]]
+        if blake2s:
+            contexto = hashlib.blake2s(key=clave, digest_size=tam_tag)
+        else:
+            contexto = hmac.new(clave, digestmod=hashlib.sha256)
+        contexto.update(mensaje[:6])
+        contexto.update(b"\0\0")
+        contexto.update(mensaje[8:-tam_tag])
+        return hmac.compare_digest(contexto.digest()[:tam_tag], mensaje[-tam_tag:])
+
+    return verificar
+
+
+def _medir(funcion, mensajes):
+    """Mejor de REPETICIONES pasadas, en ns por mensaje (todas deben validar)"""
+    mejor = None
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter_ns()
+        validos = sum(1 for mensaje in mensajes if funcion(mensaje))
+        transcurrido = time.perf_counter_ns() - inicio
+        assert validos == len(mensajes), funcion
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor / len(mensajes)
+
+
+def main():
+    n_mensajes = int(sys.argv[1]) if len(sys.argv) >= 2 else 50_000
+    n_dispositivos = int(sys.argv[2]) if len(sys.argv) >= 3 else 1000
+
+    print(f"\n=== {n_mensajes} posiciones de {n_dispositivos} dispositivos ===")
+    print(f"  {'verificación':<36} {'ns/msg':>8} {'msg/s':>12}")
+    filas = []
+    for algoritmo in gps_protocolo.ALGORITMOS_TAG:
+        autenticador = gps_protocolo.Autenticador(algoritmo=algoritmo)
+        mensajes = _flota(autenticador, n_mensajes, n_dispositivos)
+        if not filas:
+            filas.append(("CRC-16", gps_protocolo.verificar_checksum, mensajes))
+        filas.append((f"TAG {algoritmo} precalculado", autenticador.verificar, mensajes))
+        filas.append(
+            (f"TAG {algoritmo} sin caché", _sin_cache(autenticador, n_dispositivos), mensajes)
+        )
+        if algoritmo == "blake2s":
+            filas.append(
+                ("desempaquetar_registro", lambda m: gps_protocolo.desempaquetar_registro(m)[0],
+                 mensajes)
+            )
+            filas.append(
+                ("desempaquetar_registro + TAG",
+                 lambda m, a=autenticador: gps_protocolo.desempaquetar_registro(
+                     m, autenticador=a)[0],
+                 mensajes)
+            )
+    for nombre, funcion, mensajes in filas:
+        ns = _medir(funcion, mensajes)
+        print(f"  {nombre:<36} {ns:8.0f} {1e9 / ns:12,.0f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
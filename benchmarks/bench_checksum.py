@@ -0,0 +1,53 @@
+"""
+Benchmark del CRC-16: versión bit a bit vs. tabla precalculada vs. lote
+
+Uso: python -m benchmarks.bench_checksum [n_tramas]
+"""
+
+import os
+import sys
+import time
+
+import gps_protocolo
+
+
+def _medir(nombre, funcion, n_tramas):
+    inicio = time.perf_counter()
+    funcion()
+    duracion = time.perf_counter() - inicio
+    tasa = n_tramas / duracion
+    print(f"  {nombre:<22} {duracion * 1000:9.1f} ms  {tasa:12,.0f} tramas/s")
+    return duracion
+
+
+def main():
+    n_tramas = int(sys.argv[1]) if len(sys.argv) >= 2 else 20_000
+    tramas = [os.urandom(gps_protocolo.TAM_MENSAJE_GPS) for _ in range(n_tramas)]
+    buffer = b"".join(tramas)
+
+    referencia = [gps_protocolo._calcular_checksum_bit_a_bit(t) for t in tramas]
+    assert [gps_protocolo.calcular_checksum(t) for t in tramas] == referencia
+    assert gps_protocolo.calcular_checksums_lote(buffer) == referencia
+
+    print(f"\n=== CRC-16 sobre {n_tramas} tramas de 30 bytes ===")
+    base = _medir(
+        "bit a bit",
+        lambda: [gps_protocolo._calcular_checksum_bit_a_bit(t) for t in tramas],
+        n_tramas,
+    )
+    tabla = _medir(
+        "tabla (por trama)",
+        lambda: [gps_protocolo.calcular_checksum(t) for t in tramas],
+        n_tramas,
+    )
+    lote = _medir(
+        "tabla (lote)",
+        lambda: gps_protocolo.calcular_checksums_lote(buffer),
+        n_tramas,
+    )
+    print(f"\n  Aceleración por trama: x{base / tabla:.1f}")
+    print(f"  Aceleración en lote:   x{base / lote:.1f}\n")
+
+
+if __name__ == "__main__":
+    main()
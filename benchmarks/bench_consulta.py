@@ -0,0 +1,105 @@
+"""
+Benchmark de consultas históricas sobre el almacén de trayectos
+
+Genera almacenes de tamaño creciente (una flota que reporta cada 30 s) y
+mide "dónde estuvo GPS #n durante una hora" con el índice por bloques y
+recorriendo todos los registros. Con el índice la latencia depende de la
+ventana consultada y se mantiene casi constante al crecer el almacén.
+
+Uso: python -m benchmarks.bench_consulta [max_registros]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import gps_protocolo
+from gps_almacen import AlmacenTrayectos, LectorTrayectos
+
+N_DISPOSITIVOS = 2000
+PERIODO_SEG = 30
+T0 = 1_700_000_000
+
+
+def _poblar(directorio, desde, hasta):
+    """Agrega los registros [desde, hasta) de la flota simulada"""
+    plantilla = gps_protocolo.desempaquetar_registro(
+        gps_protocolo.empaquetar_mensaje_gps(
+            id_dispositivo=0,
+            secuencia=0,
+            latitud=-173935000,
+            longitud=-661570000,
+            altitud=2558,
+            velocidad=450,
+            rumbo=1350,
+            bateria=85,
+            estado=0,
+        )
+    )[0]
+    almacen = AlmacenTrayectos(directorio, max_bytes_segmento=16 * 1024 * 1024)
+    por_segundo = N_DISPOSITIVOS / PERIODO_SEG
+    for i in range(desde, hasta):
+        ts = T0 + int(i / por_segundo)
+        almacen.agregar(
+            plantilla._replace(
+                id_dispositivo=i % N_DISPOSITIVOS,
+                secuencia=(i // N_DISPOSITIVOS) % gps_protocolo.MAX_SEQ,
+                timestamp=ts,
+            ),
+            llegada=ts + 1,
+        )
+    almacen.cerrar()
+    return T0 + int(hasta / por_segundo)
+
+
+def _medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        cantidad = sum(1 for _ in funcion())
+    return (time.perf_counter() - inicio) / repeticiones * 1000, cantidad
+
+
+def main():
+    max_registros = int(sys.argv[1]) if len(sys.argv) >= 2 else 2_000_000
+    tamanos = []
+    n = 500_000
+    while n <= max_registros:
+        tamanos.append(n)
+        n *= 2
+
+    print(f"\n=== Consulta de 1 hora de un dispositivo ({N_DISPOSITIVOS} en la flota) ===")
+    print(f"  {'registros':>10} {'MB':>7} {'índice':>10} {'recorrido':>11} {'resultados':>11}")
+    with tempfile.TemporaryDirectory() as directorio:
+        escritos = 0
+        for tamano in tamanos:
+            fin = _poblar(directorio, escritos, tamano)
+            escritos = tamano
+            mb = sum(
+                os.path.getsize(os.path.join(directorio, nombre))
+                for nombre in os.listdir(directorio)
+            ) / 1e6
+            # Última hora del almacén
+            desde, hasta = fin - 3600, fin
+            id_disp = 1234 % N_DISPOSITIVOS
+            with LectorTrayectos(directorio) as lector:
+                ms_indice, cantidad = _medir(
+                    lambda: lector.consultar(id_disp, desde, hasta), 5
+                )
+                ms_recorrido, _ = _medir(
+                    lambda: (
+                        r
+                        for r in lector
+                        if r.id_dispositivo == id_disp and desde <= r.timestamp <= hasta
+                    ),
+                    1,
+                )
+            print(
+                f"  {tamano:>10} {mb:7.1f} {ms_indice:8.1f}ms {ms_recorrido:9.1f}ms "
+                f"{cantidad:>11}"
+            )
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark de la codificación delta (TIPO_DELTA_GPS) a 1 Hz
+
+Simula una hora de posiciones por segundo de un DispositivoGPS estacionado,
+en ciudad y en carretera, y compara los bytes por posición del mensaje
+completo de 30 bytes con los de la codificación delta con un keyframe cada
+INTERVALO_KEYFRAME posiciones (la misma regla que usa el cliente con
+--delta). También se informan los bytes en el cable (más 28 de IPv4 + UDP)
+y el costo de decodificar cada posición en el servidor.
+
+Uso: python -m benchmarks.bench_delta [n_posiciones]
+"""
+
+import random
+import sys
+import time
+
+import gps_protocolo
+from gps_cliente import INTERVALO_KEYFRAME, DispositivoGPS
+
+CABECERAS_IP_UDP = 28
+MODOS = (("estacionado", 0.0), ("ciudad", 30.0), ("carretera", 80.0))
+
+
+def _recorrido(velocidad, n_posiciones, azar):
+    """Mensajes TIPO_DATOS_GPS de un vehículo que reporta cada segundo"""
+    random.seed(azar.random())  # simular_movimiento usa el módulo random
+    gps = DispositivoGPS(1, mostrar_cabecera=False)
+    gps.velocidad = velocidad
+    gps.en_movimiento = gps.ignicion = velocidad > 0
+    gps.rumbo = azar.uniform(0, 360)
+    inicio = int(time.time())
+    mensajes = []
+    for seq in range(1, n_posiciones + 1):
+        gps.simular_movimiento()
+        lat, lon = gps_protocolo.coordenadas_a_raw(gps.latitud, gps.longitud)
+        buffer = bytearray(gps_protocolo.TAM_MENSAJE_GPS)
+        gps_protocolo.empaquetar_mensaje_gps_en(
+            buffer,
+            0,
+            1,
+            seq,
+            lat,
+            lon,
+            gps.altitud,
+            int(gps.velocidad * 10),
+            int(gps.rumbo * 10),
+            int(gps.bateria),
+            0,
+            flags=gps.obtener_flags(),
+            timestamp=inicio + seq,
+        )
+        mensajes.append(bytes(buffer))
+    return mensajes
+
+
+def _codificar(mensajes):
+    """Delta sobre el anterior, salvo un keyframe cada INTERVALO_KEYFRAME"""
+    datagramas = []
+    for indice, mensaje in enumerate(mensajes):
+        if indice % INTERVALO_KEYFRAME == 0:
+            datagramas.append(mensaje)
+        else:
+            datagramas.append(gps_protocolo.comprimir_mensaje_gps(mensajes[indice - 1], mensaje))
+    return datagramas
+
+
+def _decodificar(datagramas):
+    """Decodifica como el servidor; retorna ns por posición"""
+    referencia = None
+    inicio = time.perf_counter_ns()
+    for datagrama in datagramas:
+        if datagrama[1] == gps_protocolo.TIPO_DELTA_GPS:
+            referencia, _ = gps_protocolo.desempaquetar_delta(datagrama, referencia)
+        else:
+            referencia, _ = gps_protocolo.desempaquetar_registro(datagrama)
+    return (time.perf_counter_ns() - inicio) / len(datagramas)
+
+
+def main():
+    n_posiciones = int(sys.argv[1]) if len(sys.argv) >= 2 else 3600
+    azar = random.Random(2024)
+
+    print(f"\n=== {n_posiciones} posiciones a 1 Hz, keyframe cada {INTERVALO_KEYFRAME} ===")
+    print(f"  {'':<12} {'bytes/pos':>18} {'en el cable':>18} {'decodificar':>22}")
+    for nombre, velocidad in MODOS:
+        mensajes = _recorrido(velocidad, n_posiciones, azar)
+        datagramas = _codificar(mensajes)
+        completo = sum(map(len, mensajes)) / n_posiciones
+        delta = sum(map(len, datagramas)) / n_posiciones
+        ahorro = 100.0 * (1 - delta / completo)
+        ahorro_cable = 100.0 * (
+            1 - (delta + CABECERAS_IP_UDP) / (completo + CABECERAS_IP_UDP)
+        )
+        print(
+            f"  {nombre:<12} {completo:5.1f} -> {delta:5.1f} ({ahorro:3.0f}%)"
+            f" {completo + CABECERAS_IP_UDP:5.1f} -> {delta + CABECERAS_IP_UDP:5.1f}"
+            f" ({ahorro_cable:3.0f}%)"
+            f" {_decodificar(mensajes):6.0f} -> {_decodificar(datagramas):6.0f} ns"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark de decodificación: diccionario vs. registro MensajeGPS
+
+Mide latencia por mensaje y memoria retenida por N mensajes decodificados.
+
+Uso: python -m benchmarks.bench_desempaquetar [n_mensajes]
+"""
+
+import sys
+import time
+import tracemalloc
+
+import gps_protocolo
+
+
+def _mensajes(n):
+    return [
+        gps_protocolo.empaquetar_mensaje_gps(
+            id_dispositivo=i % 5000,
+            secuencia=i % gps_protocolo.MAX_SEQ,
+            latitud=-173935000 + i,
+            longitud=-661570000 - i,
+            altitud=2558,
+            velocidad=450,
+            rumbo=1350,
+            bateria=85,
+            estado=0,
+        )
+        for i in range(n)
+    ]
+
+
+def _medir(nombre, decodificar, mensajes):
+    inicio = time.perf_counter()
+    for mensaje in mensajes:
+        decodificar(mensaje)
+    duracion = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    retenidos = [decodificar(mensaje)[0] for mensaje in mensajes]
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retenidos
+
+    n = len(mensajes)
+    print(
+        f"  {nombre:<24} {duracion / n * 1e6:6.2f} µs/msg  "
+        f"{memoria / n:7.1f} bytes/msg retenidos"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) >= 2 else 100_000
+    mensajes = _mensajes(n)
+    print(f"\n=== Decodificación de {n} mensajes GPS ===")
+    _medir("desempaquetar_mensaje", gps_protocolo.desempaquetar_mensaje, mensajes)
+    _medir("desempaquetar_registro", gps_protocolo.desempaquetar_registro, mensajes)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark de la tabla de dispositivos: dict por dispositivo vs __slots__
+
+Con los 65.536 IDs posibles registrados compara la memoria (tracemalloc)
+y el costo de la actualización que hace procesar_mensaje por cada
+posición (seq, mensajes, posición, velocidad, rumbo, batería, flags),
+frente a la tabla anterior de un dict de 9 claves por dispositivo.
+
+Uso: python -m benchmarks.bench_dispositivos [n_dispositivos]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from gps_dispositivos import CAPACIDAD_IDS, TablaDispositivos
+
+RONDAS = 5
+
+
+def _registrar_dict(dispositivos, id_dispositivo):
+    """registrar_dispositivo tal como era con un dict por dispositivo"""
+    if id_dispositivo not in dispositivos:
+        dispositivos[id_dispositivo] = {
+            "primera_conexion": time.time(),
+            "ultima_conexion": time.time(),
+            "ultima_seq": 0,
+            "mensajes_recibidos": 0,
+            "ultima_pos": None,
+            "ultima_velocidad": 0,
+            "ultimo_rumbo": 0,
+            "bateria": 100,
+            "flags": 0,
+        }
+    else:
+        dispositivos[id_dispositivo]["ultima_conexion"] = time.time()
+
+
+def _actualizar_dict(dispositivos, ids, seq):
+    for id_disp in ids:
+        _registrar_dict(dispositivos, id_disp)
+        dispositivos[id_disp]["ultima_seq"] = seq
+        dispositivos[id_disp]["mensajes_recibidos"] += 1
+        dispositivos[id_disp]["ultima_pos"] = (-17.3935 + id_disp * 1e-6, -66.157)
+        dispositivos[id_disp]["ultima_velocidad"] = 45.0
+        dispositivos[id_disp]["ultimo_rumbo"] = 135.0
+        dispositivos[id_disp]["bateria"] = 85
+        dispositivos[id_disp]["flags"] = 0
+
+
+def _actualizar_tabla(tabla, ids, seq):
+    for id_disp in ids:
+        estado, _ = tabla.registrar(id_disp, time.time())
+        estado.ultima_seq = seq
+        estado.mensajes_recibidos += 1
+        estado.ultima_pos = (-17.3935 + id_disp * 1e-6, -66.157)
+        estado.ultima_velocidad = 45.0
+        estado.ultimo_rumbo = 135.0
+        estado.bateria = 85
+        estado.flags = 0
+
+
+def _medir(crear, actualizar, ids):
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    estado = crear()
+    actualizar(estado, ids, 1)
+    memoria = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+
+    inicio = time.perf_counter()
+    for seq in range(2, 2 + RONDAS):
+        actualizar(estado, ids, seq)
+    duracion = time.perf_counter() - inicio
+    return memoria, duracion / (RONDAS * len(ids)) * 1e9
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) >= 2 else CAPACIDAD_IDS
+    ids = list(range(n))
+
+    print(f"\n=== Estado de {n} dispositivos ===")
+    print(f"  {'tabla':<22} {'memoria':>10} {'por disp.':>10} {'actualización':>14}")
+    for nombre, crear, actualizar in (
+        ("dict por dispositivo", dict, _actualizar_dict),
+        ("registros __slots__", TablaDispositivos, _actualizar_tabla),
+    ):
+        memoria, ns = _medir(crear, actualizar, ids)
+        print(
+            f"  {nombre:<22} {memoria / 1e6:8.1f}MB {memoria / n:8.0f} B "
+            f"{ns:10.0f} ns/msg"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    main()
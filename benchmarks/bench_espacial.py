@@ -0,0 +1,104 @@
+"""
+Benchmark del índice espacial frente a un recorrido de todos los dispositivos
+
+100k dispositivos repartidos en un área metropolitana (~55 x 55 km). Se
+miden consultas por radio (1 km), rectángulo (~2 x 2 km) y k vecinos
+(k=10), además del costo de actualizar posiciones.
+
+Uso: python -m benchmarks.bench_espacial [n_dispositivos]
+"""
+
+import random
+import sys
+import time
+
+from gps_espacial import IndiceEspacial, distancia_m
+
+CENTRO = (-17.3935, -66.157)
+N_CONSULTAS = 200
+
+
+def _bruto_radio(posiciones, lat, lon, radio_m):
+    resultado = []
+    for id_disp, (lat_d, lon_d) in posiciones.items():
+        distancia = distancia_m(lat, lon, lat_d, lon_d)
+        if distancia <= radio_m:
+            resultado.append((distancia, id_disp))
+    resultado.sort()
+    return resultado
+
+
+def _bruto_rectangulo(posiciones, lat_min, lon_min, lat_max, lon_max):
+    return [
+        id_disp
+        for id_disp, (lat, lon) in posiciones.items()
+        if lat_min <= lat <= lat_max and lon_min <= lon <= lon_max
+    ]
+
+
+def _bruto_cercanos(posiciones, lat, lon, k):
+    return sorted(
+        (distancia_m(lat, lon, lat_d, lon_d), id_disp)
+        for id_disp, (lat_d, lon_d) in posiciones.items()
+    )[:k]
+
+
+def _medir(nombre, consultas, funcion, repeticiones=N_CONSULTAS):
+    consultas = consultas[:repeticiones]
+    inicio = time.perf_counter()
+    for consulta in consultas:
+        funcion(*consulta)
+    return (time.perf_counter() - inicio) / len(consultas) * 1000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) >= 2 else 100_000
+    azar = random.Random(1)
+    posiciones = {
+        id_disp: (
+            CENTRO[0] + azar.uniform(-0.25, 0.25),
+            CENTRO[1] + azar.uniform(-0.25, 0.25),
+        )
+        for id_disp in range(n)
+    }
+
+    indice = IndiceEspacial()
+    inicio = time.perf_counter()
+    for id_disp, (lat, lon) in posiciones.items():
+        indice.actualizar(id_disp, lat, lon)
+    carga = time.perf_counter() - inicio
+    # Movimiento típico entre reportes: unos metros
+    inicio = time.perf_counter()
+    for id_disp, (lat, lon) in posiciones.items():
+        indice.actualizar(id_disp, lat + 0.0003, lon - 0.0002)
+    movimiento = time.perf_counter() - inicio
+    posiciones = {id_disp: indice.posicion(id_disp) for id_disp in posiciones}
+
+    puntos = [
+        (CENTRO[0] + azar.uniform(-0.2, 0.2), CENTRO[1] + azar.uniform(-0.2, 0.2))
+        for _ in range(N_CONSULTAS)
+    ]
+    radio = [(lat, lon, 1000) for lat, lon in puntos]
+    rectangulo = [(lat - 0.009, lon - 0.009, lat + 0.009, lon + 0.009) for lat, lon in puntos]
+    cercanos = [(lat, lon, 10) for lat, lon in puntos]
+
+    print(f"\n=== Índice espacial con {n} dispositivos ===")
+    print(f"  Carga inicial:   {carga / n * 1e6:6.2f} µs por dispositivo")
+    print(f"  Actualización:   {movimiento / n * 1e6:6.2f} µs por posición")
+    print(f"\n  {'consulta':<22} {'índice':>10} {'recorrido':>12}")
+    filas = (
+        ("radio 1 km", radio, indice.en_radio, _bruto_radio),
+        ("rectángulo ~2x2 km", rectangulo, indice.en_rectangulo, _bruto_rectangulo),
+        ("10 más cercanos", cercanos, indice.cercanos, _bruto_cercanos),
+    )
+    for nombre, consultas, con_indice, bruto in filas:
+        ms_indice = _medir(nombre, consultas, con_indice)
+        ms_bruto = _medir(
+            nombre, consultas, lambda *c: bruto(posiciones, *c), repeticiones=5
+        )
+        print(f"  {nombre:<22} {ms_indice:8.3f}ms {ms_bruto:10.1f}ms")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark de la vigilancia de inactividad: rueda de tiempo vs recorrido
+
+Flotas de tamaño creciente donde cada dispositivo reporta cada 30 s
+(alerta a los 60 s, expiración a los 300 s). Se simulan 10 minutos de ticks
+de 1 s y se mide el costo promedio por tick de VigilanciaInactividad.revisar
+frente a revisar ultima_conexion de todos los dispositivos en cada tick.
+
+Uso: python -m benchmarks.bench_expiracion
+"""
+
+import time
+
+from gps_dispositivos import TablaDispositivos
+from gps_expiracion import VigilanciaInactividad
+
+T0 = 1_700_000_000.0
+PERIODO_SEG = 30
+ALERTA_SEG = 60
+EXPIRAR_SEG = 300
+DURACION_SEG = 600
+
+
+def _recorrer(tabla, ahora):
+    """Alternativa ingenua: mirar todos los dispositivos en cada tick"""
+    alertas = []
+    for id_disp, estado in tabla.items():
+        silencio = ahora - estado.ultima_conexion
+        if silencio >= ALERTA_SEG:
+            alertas.append((id_disp, silencio))
+    return alertas
+
+
+def _simular(n, revisar):
+    tabla = TablaDispositivos()
+    vigilancia = VigilanciaInactividad(tabla, expirar_seg=EXPIRAR_SEG, alerta_seg=ALERTA_SEG)
+    for id_disp in range(n):
+        tabla.registrar(id_disp, T0)
+        vigilancia.vigilar(id_disp, T0)
+    # El 1% de la flota se calla para siempre
+    callados = set(range(0, n, 100))
+    total = 0.0
+    for segundo in range(1, DURACION_SEG + 1):
+        ahora = T0 + segundo
+        for id_disp in range(segundo % PERIODO_SEG, n, PERIODO_SEG):
+            if id_disp not in callados:
+                tabla.registrar(id_disp, ahora)
+        inicio = time.perf_counter()
+        if revisar == "rueda":
+            _, expirados = vigilancia.revisar(ahora)
+            for id_disp, _ in expirados:
+                tabla.eliminar(id_disp)
+        else:
+            _recorrer(tabla, ahora)
+        total += time.perf_counter() - inicio
+    return total / DURACION_SEG * 1000
+
+
+def main():
+    print("\n=== Costo por tick de la vigilancia de inactividad ===")
+    print(f"  {'dispositivos':>12} {'rueda':>10} {'recorrido':>11}")
+    for n in (1000, 10_000, 65_536):
+        ms_rueda = _simular(n, "rueda")
+        ms_recorrido = _simular(n, "recorrido")
+        print(f"  {n:>12} {ms_rueda:8.3f}ms {ms_recorrido:9.3f}ms")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark del log del servidor: escritura por registro vs. EscritorLog
+
+"Antes" reproduce el guardar_log original (exists/getsize para rotar,
+abrir en modo append y tres write por registro). "Después" usa
+ServidorGPS.guardar_log sobre EscritorLog con distintas políticas de fsync.
+
+Uso: python -m benchmarks.bench_log [n_registros]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import gps_protocolo
+from gps_servidor import ServidorGPS
+
+MAX_BYTES = 1_000_000
+
+
+def _guardar_log_clasico(log_path, datos):
+    """guardar_log + _rotar_log_si_es_necesario tal como estaban antes"""
+    if os.path.exists(log_path):
+        if os.path.getsize(log_path) >= MAX_BYTES:
+            destino = f"{log_path}.1"
+            if os.path.exists(destino):
+                os.remove(destino)
+            os.rename(log_path, destino)
+    lat, lon = gps_protocolo.convertir_coordenadas(datos.latitud, datos.longitud)
+    vel = datos.velocidad / 10.0
+    rumbo = datos.rumbo / 10.0
+    timestamp_str = datetime.fromtimestamp(datos.timestamp).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    with open(log_path, "a") as f:
+        f.write(f"{timestamp_str}|GPS{datos.id_dispositivo}|SEQ{datos.secuencia}|")
+        f.write(f"{lat:.7f}|{lon:.7f}|{datos.altitud}|")
+        f.write(f"{vel:.1f}|{rumbo:.1f}|{datos.bateria}|0x{datos.flags:02X}\n")
+
+
+def _registros(n):
+    registros = []
+    for i in range(256):
+        trama = gps_protocolo.empaquetar_mensaje_gps(
+            id_dispositivo=i,
+            secuencia=i,
+            latitud=-173935000 + i,
+            longitud=-661570000 - i,
+            altitud=2558,
+            velocidad=450,
+            rumbo=1350,
+            bateria=85,
+            estado=0,
+        )
+        registros.append(gps_protocolo.desempaquetar_registro(trama)[0])
+    return [registros[i % 256] for i in range(n)]
+
+
+def _mostrar(nombre, n, duracion):
+    print(f"  {nombre:<28} {duracion * 1000:9.1f} ms  {n / duracion:12,.0f} registros/s")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) >= 2 else 100_000
+    registros = _registros(n)
+
+    print(f"\n=== Log de {n} registros (rotación cada {MAX_BYTES} bytes) ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "clasico.txt")
+        inicio = time.perf_counter()
+        for datos in registros:
+            _guardar_log_clasico(ruta, datos)
+        _mostrar("antes (open por registro)", n, time.perf_counter() - inicio)
+
+        for fsync in ("nunca", "rotacion", "vaciado"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                servidor = ServidorGPS(
+                    log_path=os.path.join(directorio, f"{fsync}.txt"),
+                    max_log_bytes=MAX_BYTES,
+                    generaciones_log=3,
+                    fsync_log=fsync,
+                    modo_salida="silencioso",
+                )
+            inicio = time.perf_counter()
+            for datos in registros:
+                servidor.guardar_log(datos)
+            servidor.cerrar_log()
+            _mostrar(f"EscritorLog (fsync {fsync})", n, time.perf_counter() - inicio)
+    print()
+
+
+if __name__ == "__main__":
+    main()
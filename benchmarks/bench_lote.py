@@ -0,0 +1,70 @@
+"""
+Benchmark de decodificación en lote de capturas de tramas GPS de 30 bytes
+
+Compara desempaquetar_registro trama a trama con desempaquetar_lote en
+Python puro y, si está instalado, con NumPy.
+
+Uso: python -m benchmarks.bench_lote [n_tramas]
+"""
+
+import sys
+import time
+
+import gps_protocolo
+
+
+def _medir(nombre, funcion, n):
+    inicio = time.perf_counter()
+    funcion()
+    duracion = time.perf_counter() - inicio
+    print(f"  {nombre:<24} {duracion * 1000:9.1f} ms  {n / duracion:14,.0f} tramas/s")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) >= 2 else 200_000
+    plantilla = bytearray(gps_protocolo.TAM_MENSAJE_GPS * 256)
+    for i in range(256):
+        gps_protocolo.empaquetar_mensaje_gps_en(
+            plantilla,
+            i * gps_protocolo.TAM_MENSAJE_GPS,
+            id_dispositivo=i,
+            secuencia=i,
+            latitud=-173935000 + i,
+            longitud=-661570000 - i,
+            altitud=2558,
+            velocidad=450,
+            rumbo=1350,
+            bateria=85,
+            estado=0,
+        )
+    buffer = bytes(plantilla) * (n // 256)
+    n = len(buffer) // gps_protocolo.TAM_MENSAJE_GPS
+    vista = memoryview(buffer)
+
+    print(f"\n=== Decodificación de {n} tramas ===")
+    _medir(
+        "desempaquetar_registro",
+        lambda: [
+            gps_protocolo.desempaquetar_registro(vista[i : i + 30])
+            for i in range(0, len(buffer), 30)
+        ],
+        n,
+    )
+    _medir(
+        "lote (Python puro)",
+        lambda: gps_protocolo.desempaquetar_lote(buffer, usar_numpy=False),
+        n,
+    )
+    if gps_protocolo.np is not None:
+        _medir(
+            "lote (NumPy)",
+            lambda: gps_protocolo.desempaquetar_lote(buffer, usar_numpy=True),
+            n,
+        )
+    else:
+        print("  lote (NumPy)             no disponible (pip install numpy)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
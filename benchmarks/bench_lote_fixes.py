@@ -0,0 +1,130 @@
+"""
+Benchmark de posiciones atrasadas: un datagrama por posición vs TIPO_LOTE_GPS
+
+Cada dispositivo vacía un atraso de posiciones por loopback, una por
+datagrama o agrupadas en lotes de hasta MAX_FIXES_LOTE, contra un servidor
+en lotes con ACK (los dispositivos anuncian FLAG_ACK_SELECTIVO). El emisor
+no deja más de EN_VUELO datagramas sin respuesta, como un dispositivo con
+ventana.
+Se compara cuántas posiciones por segundo se confirman, cuántos datagramas
+hicieron falta y cuántos ACK respondió el servidor.
+
+Uso: python -m benchmarks.bench_lote_fixes [n_posiciones] [n_dispositivos]
+"""
+
+import contextlib
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+import gps_protocolo
+from gps_servidor import ServidorGPS
+
+LOTE_RECEPCION = 64
+EN_VUELO = 64  # Datagramas sin ACK que se permite el emisor
+
+
+def _atraso(id_dispositivo, n_posiciones):
+    """Mensajes TIPO_DATOS_GPS con secuencias 1..n_posiciones"""
+    return [
+        gps_protocolo.empaquetar_mensaje_gps(
+            id_dispositivo=id_dispositivo,
+            secuencia=seq,
+            latitud=-173935000 + seq,
+            longitud=-661570000,
+            altitud=2558,
+            velocidad=450,
+            rumbo=1350,
+            bateria=85,
+            estado=0,
+            flags=gps_protocolo.FLAG_ACK_SELECTIVO,
+        )
+        for seq in range(1, n_posiciones + 1)
+    ]
+
+
+def _emisor(puerto, n_posiciones, n_dispositivos, agrupar, resultado):
+    """
+    Envía el atraso de cada dispositivo, suelto o en lotes, con a lo sumo
+    EN_VUELO datagramas sin respuesta (cada datagrama recibe un ACK)
+    """
+    datagramas = []
+    for id_disp in range(1, n_dispositivos + 1):
+        mensajes = _atraso(id_disp, n_posiciones // n_dispositivos)
+        if agrupar:
+            mensajes = gps_protocolo.agrupar_mensajes_gps(
+                mensajes, flags=gps_protocolo.FLAG_ACK_SELECTIVO
+            )
+        datagramas.extend(mensajes)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(0.5)
+    destino = ("127.0.0.1", puerto)
+
+    inicio = time.perf_counter()
+    en_vuelo = 0
+    siguiente = 0
+    while siguiente < len(datagramas) or en_vuelo:
+        while siguiente < len(datagramas) and en_vuelo < EN_VUELO:
+            sock.sendto(datagramas[siguiente], destino)
+            siguiente += 1
+            en_vuelo += 1
+        try:
+            sock.recvfrom(64)
+            en_vuelo -= 1
+        except socket.timeout:
+            en_vuelo = 0  # Se perdió algo: no esperar esos ACK
+    resultado[0] = time.perf_counter() - inicio
+    resultado[1] = len(datagramas)
+    sock.close()
+
+
+def _medir(n_posiciones, n_dispositivos, agrupar):
+    servidor = ServidorGPS(
+        puerto=0,
+        enviar_ack=True,
+        log_path=None,
+        lote_recepcion=LOTE_RECEPCION,
+        modo_salida="silencioso",
+    )
+    hilo = threading.Thread(target=servidor.ejecutar, daemon=True)
+    hilo.start()
+    while servidor.socket is None:
+        time.sleep(0.01)
+    puerto = servidor.socket.getsockname()[1]
+
+    resultado = multiprocessing.Array("d", 2)
+    emisor = multiprocessing.Process(
+        target=_emisor, args=(puerto, n_posiciones, n_dispositivos, agrupar, resultado)
+    )
+    emisor.start()
+    emisor.join()
+    servidor.detener()
+    hilo.join()
+    duracion, datagramas = resultado
+    return servidor, int(datagramas), duracion
+
+
+def main():
+    n_posiciones = int(sys.argv[1]) if len(sys.argv) >= 2 else 60_000
+    n_dispositivos = int(sys.argv[2]) if len(sys.argv) >= 3 else 100
+
+    resultados = []
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        for nombre, agrupar in (("una por datagrama", False), ("TIPO_LOTE_GPS", True)):
+            resultados.append((nombre, *_medir(n_posiciones, n_dispositivos, agrupar)))
+
+    print(f"\n=== Atraso de {n_posiciones} posiciones de {n_dispositivos} dispositivos ===")
+    for nombre, servidor, datagramas, duracion in resultados:
+        print(
+            f"  {nombre:<18} {servidor.mensajes_recibidos / duracion:10,.0f} pos/s  "
+            f"procesadas {servidor.mensajes_recibidos}  datagramas {datagramas}  "
+            f"ACK {servidor.acks_enviados}"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark del bucle de recepción de ServidorGPS: simple vs. en lotes
+
+Un proceso emisor envía tramas GPS por loopback tan rápido como puede y se
+mide cuántos mensajes por segundo procesa el servidor en cada modo. La
+salida por paquete se desactiva (modo silencioso) para aislar el costo de
+recepción; al final se compara el modo en lotes con las métricas en vivo
+habilitadas, con los tiempos por etapa (--perfil-etapas) y con otros modos de salida (la consola apunta a /dev/null).
+
+Uso: python -m benchmarks.bench_recepcion [n_mensajes] [lote]
+"""
+
+import contextlib
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+import gps_protocolo
+from gps_salida import SALIDA_SILENCIOSA
+from gps_servidor import ServidorGPS
+
+N_DISPOSITIVOS = 1000
+
+
+def _emisor(puerto, n_mensajes, enviados):
+    """Envía n_mensajes tramas con secuencias crecientes por dispositivo"""
+    ahora = int(time.time())
+    buffer = bytearray(gps_protocolo.TAM_MENSAJE_GPS)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    destino = ("127.0.0.1", puerto)
+    for i in range(n_mensajes):
+        gps_protocolo.empaquetar_mensaje_gps_en(
+            buffer,
+            0,
+            id_dispositivo=i % N_DISPOSITIVOS,
+            secuencia=(i // N_DISPOSITIVOS + 1) % gps_protocolo.MAX_SEQ,
+            latitud=-173935000,
+            longitud=-661570000,
+            altitud=2558,
+            velocidad=450,
+            rumbo=1350,
+            bateria=85,
+            estado=0,
+            timestamp=ahora,
+        )
+        sock.sendto(buffer, destino)
+    enviados.value = n_mensajes
+    sock.close()
+
+
+def _medir(n_mensajes, lote, modo_salida=SALIDA_SILENCIOSA, **opciones):
+    servidor = ServidorGPS(
+        puerto=0,
+        enviar_ack=False,
+        log_path=None,
+        lote_recepcion=lote,
+        modo_salida=modo_salida,
+        **opciones,
+    )
+    hilo = threading.Thread(target=servidor.ejecutar, daemon=True)
+    hilo.start()
+    while servidor.socket is None:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    puerto = servidor.socket.getsockname()[1]
+
+    enviados = multiprocessing.Value("i", 0)
+    emisor = multiprocessing.Process(target=_emisor, args=(puerto, n_mensajes, enviados))
+    inicio = time.perf_counter()
+    emisor.start()
+    emisor.join()
+    # Dejar que el servidor drene lo que quede en el socket
+    anterior = -1
+    while servidor.mensajes_recibidos != anterior:
+        anterior = servidor.mensajes_recibidos
+        time.sleep(0.2)
+    duracion = time.perf_counter() - inicio - 0.2
+    servidor.detener()
+    hilo.join()
+    servidor.cerrar_log()
+    return servidor.mensajes_recibidos, enviados.value, duracion
+
+
+def main():
+    n_mensajes = int(sys.argv[1]) if len(sys.argv) >= 2 else 100_000
+    lote = int(sys.argv[2]) if len(sys.argv) >= 3 else 64
+
+    resultados = []
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        for nombre, tam_lote in (("simple (recvfrom)", 1), (f"lotes ({lote})", lote)):
+            resultados.append((nombre, *_medir(n_mensajes, tam_lote)))
+        resultados.append(
+            ("lotes + métricas", *_medir(n_mensajes, lote, puerto_metricas=0))
+        )
+        resultados.append(
+            ("lotes + perfil", *_medir(n_mensajes, lote, perfil_etapas=True))
+        )
+        for modo in ("muestreo", "json", "detallado"):
+            resultados.append((f"lotes + {modo}", *_medir(n_mensajes, lote, modo)))
+
+    print(f"\n=== Recepción de {n_mensajes} datagramas por loopback ===")
+    for nombre, procesados, enviados, duracion in resultados:
+        perdidos = enviados - procesados
+        print(
+            f"  {nombre:<20} {procesados / duracion:10,.0f} msg/s  "
+            f"procesados {procesados}/{enviados} (perdidos en socket: {perdidos})"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    main()
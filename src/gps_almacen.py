@@ -0,0 +1,754 @@
+"""
+Almacén binario de trayectos GPS (solo anexar)
+Redes de Computadoras - Práctica 3
+
+Alternativa compacta al log de texto: cada posición ocupa un registro fijo
+de 32 bytes con el payload crudo del protocolo (20 bytes, orden de red),
+el ID de dispositivo, la secuencia, los flags y la hora de llegada.
+
+Los registros se guardan en segmentos dentro de un directorio:
+
+    000001.seg  cabecera (32 bytes) + registros de 32 bytes
+    000001.idx  cabecera (16 bytes) + una entrada de 84 bytes por bloque de
+                64 registros (índice disperso, ver más abajo)
+
+Un segmento nunca se reescribe: al reabrir el almacén se empieza uno nuevo.
+La cantidad de registros se deduce del tamaño del archivo, por lo que un
+registro incompleto al final (corte de energía) simplemente se ignora. El
+lector mapea los segmentos en memoria (mmap) para recorrerlos sin copias.
+
+Índice por tiempo y dispositivo: cada entrada del .idx resume un bloque con
+su rango de llegada, su rango de timestamps y un filtro de Bloom de 512
+bits con los IDs de dispositivo presentes. La llegada acumulada no decrece,
+así que una consulta ubica por búsqueda binaria el primer bloque de la
+ventana y solo lee los bloques cuyo rango y filtro pueden coincidir: el
+costo depende del tamaño de la ventana consultada, no del total del log.
+
+El inicio se acota por llegada: una posición con timestamp >= desde llegó
+después de desde - holgura, donde la holgura es cuánto puede adelantarse el
+reloj del dispositivo (el servidor guarda su ventana temporal en la
+cabecera de cada segmento). Las posiciones atrasadas (lotes de la bandeja)
+llegan después de su timestamp y no necesitan margen. El final se acota por
+timestamp: un árbol de mínimos sobre el timestamp mínimo de cada bloque
+salta directo al siguiente bloque con alguno <= hasta, así que ni un lote
+atrasado al final del segmento obliga a recorrer lo que hay en el medio, y
+también sirve si las llegadas no están ordenadas (p. ej. logs convertidos).
+
+Uso:
+    python src/gps_almacen.py exportar <directorio> [salida.txt]
+    python src/gps_almacen.py convertir <directorio> <log.txt> [log.txt.1 ...]
+    python src/gps_almacen.py consultar <directorio> <id|*> [desde] [hasta] [--holgura SEG]
+    python src/gps_almacen.py reindexar <directorio>
+    python src/gps_almacen.py info <directorio>
+
+Las fechas de consultar usan el formato del log ("2024-05-01 10:00:00").
+"""
+
+import mmap
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from gps_log import (
+    FORMATO_FECHA_LOG,
+    formatear_fecha_log,
+    formatear_linea_log,
+    leer_linea_log,
+)
+
+MAGIA_SEGMENTO = b"GPST"
+MAGIA_INDICE = b"GPSI"
+VERSION_ALMACEN = 2  # 1: flags en un byte (se siguen leyendo)
+VERSION_INDICE = 2
+
+# Cabecera de segmento: magia, versión, tam_registro, registros_por_bloque,
+# creado (ms), holgura (s; 0 en segmentos anteriores = HOLGURA_CONSULTA)
+_CABECERA_SEGMENTO = struct.Struct("!4sBxHIQI8x")
+# Cabecera de índice: magia, versión, tam_entrada, registros_por_bloque
+_CABECERA_INDICE = struct.Struct("!4sBxHI4x")
+# Registro: id, secuencia, flags, llegada (s, ms) + payload del protocolo
+_REGISTRO = struct.Struct("!HHHIHiiHIHHBB")
+# Versión 1: flags en un byte más uno de relleno (mismo tamaño y posiciones)
+_REGISTRO_V1 = struct.Struct("!HHBxIHiiHIHHBB")
+_REGISTRO_POR_VERSION = {1: _REGISTRO_V1, VERSION_ALMACEN: _REGISTRO}
+# Entrada de índice: primer registro del bloque, llegada mínima, llegada
+# máxima acumulada (hasta este bloque inclusive), timestamp mínimo y máximo,
+# filtro de Bloom de dispositivos
+_ENTRADA_INDICE = struct.Struct("!IIIII64s")
+_LLEGADA_ACUMULADA = struct.Struct("!8xI")  # Campo usado en la búsqueda binaria
+_TIMESTAMP_MINIMO = struct.Struct("!12xI")
+# Solo ID y timestamp de un registro, para descartar sin decodificarlo entero
+_ID_Y_TIMESTAMP = struct.Struct("!H20xI6x")
+TAM_FILTRO = 64
+
+TAM_CABECERA_SEGMENTO = _CABECERA_SEGMENTO.size
+TAM_REGISTRO = _REGISTRO.size
+REGISTROS_POR_BLOQUE = 64
+# Adelanto máximo por defecto del timestamp del dispositivo sobre la llegada
+# al servidor al consultar por tiempo (el servidor descarta timestamps fuera
+# de su ventana)
+HOLGURA_CONSULTA = 300
+MAX_BYTES_SEGMENTO = 64 * 1024 * 1024
+REGISTROS_POR_ESCRITURA = 2048  # Buffer de escritura: 64 KB
+
+_CAMPOS_REGISTRO = (
+    "id_dispositivo",
+    "secuencia",
+    "flags",
+    "llegada_s",
+    "llegada_ms",
+    "latitud",
+    "longitud",
+    "altitud",
+    "timestamp",
+    "velocidad",
+    "rumbo",
+    "bateria",
+    "estado",
+)
+
+
+class RegistroTrayecto(namedtuple("RegistroTrayecto", _CAMPOS_REGISTRO)):
+    """Posición almacenada (mismos nombres de campo que MensajeGPS)"""
+
+    __slots__ = ()
+
+    @property
+    def llegada(self):
+        """Hora de llegada al servidor (segundos desde epoch, float)"""
+        return self.llegada_s + self.llegada_ms / 1000.0
+
+
+def _bits_dispositivo(id_dispositivo):
+    """Tres bits del filtro de Bloom (512 bits) para un ID de dispositivo"""
+    return (
+        (1 << (id_dispositivo & 0x1FF))
+        | (1 << ((id_dispositivo * 157 >> 4) & 0x1FF))
+        | (1 << ((id_dispositivo * 40503 >> 7) & 0x1FF))
+    )
+
+
+class _IndiceBloques:
+    """Acumula el resumen del bloque en curso y produce su entrada de índice"""
+
+    def __init__(self, registros_por_bloque):
+        self.registros_por_bloque = registros_por_bloque
+        self.registros = 0
+        self._llegada_acumulada = 0
+
+    def agregar(self, id_dispositivo, llegada, timestamp):
+        """Retorna la entrada empaquetada si este registro completó un bloque"""
+        if self.registros % self.registros_por_bloque == 0:
+            self._llegada_min = llegada
+            self._ts_min = self._ts_max = timestamp
+            self._filtro = 0
+        else:
+            if llegada < self._llegada_min:
+                self._llegada_min = llegada
+            if timestamp < self._ts_min:
+                self._ts_min = timestamp
+            elif timestamp > self._ts_max:
+                self._ts_max = timestamp
+        if llegada > self._llegada_acumulada:
+            self._llegada_acumulada = llegada
+        self._filtro |= _bits_dispositivo(id_dispositivo)
+        self.registros += 1
+
+        if self.registros % self.registros_por_bloque:
+            return None
+        return _ENTRADA_INDICE.pack(
+            self.registros - self.registros_por_bloque,
+            self._llegada_min,
+            self._llegada_acumulada,
+            self._ts_min,
+            self._ts_max,
+            self._filtro.to_bytes(TAM_FILTRO, "big"),
+        )
+
+
+def _cabecera_indice(registros_por_bloque):
+    return _CABECERA_INDICE.pack(
+        MAGIA_INDICE, VERSION_INDICE, _ENTRADA_INDICE.size, registros_por_bloque
+    )
+
+
+def _nombre_segmento(directorio, numero, extension):
+    return os.path.join(directorio, f"{numero:06d}.{extension}")
+
+
+def listar_segmentos(directorio):
+    """Números de segmento presentes en el directorio, en orden"""
+    if not os.path.isdir(directorio):
+        return []
+    numeros = []
+    for nombre in os.listdir(directorio):
+        raiz, extension = os.path.splitext(nombre)
+        if extension == ".seg" and raiz.isdigit():
+            numeros.append(int(raiz))
+    return sorted(numeros)
+
+
+class AlmacenTrayectos:
+    """
+    Escritor del almacén: anexa registros en bloque y rota de segmento al
+    alcanzar max_bytes_segmento. No es seguro entre hilos (igual que
+    EscritorLog, lo usa solo el hilo de recepción).
+
+    holgura: adelanto máximo (s) del timestamp de una posición sobre su
+    llegada; se guarda en cada segmento y acota el inicio de sus consultas.
+    """
+
+    def __init__(
+        self,
+        directorio,
+        max_bytes_segmento=MAX_BYTES_SEGMENTO,
+        registros_por_bloque=REGISTROS_POR_BLOQUE,
+        holgura=HOLGURA_CONSULTA,
+    ):
+        self.directorio = directorio
+        self.registros_por_bloque = registros_por_bloque
+        self.holgura = max(1, int(holgura))
+        bloques = (max_bytes_segmento - TAM_CABECERA_SEGMENTO) // (
+            TAM_REGISTRO * registros_por_bloque
+        )
+        self.max_registros_segmento = max(1, bloques) * registros_por_bloque
+
+        self._buffer = bytearray(TAM_REGISTRO * REGISTROS_POR_ESCRITURA)
+        self._en_buffer = 0
+        self._indice_pendiente = bytearray()
+        self._segmento = None  # Archivo .seg abierto
+        self._indice = None  # Archivo .idx abierto
+        self._bloques = None  # _IndiceBloques del segmento actual
+        self.numero_segmento = 0
+        self.registros_segmento = 0
+        self.registros = 0
+        self.segmentos_creados = 0
+
+    def _abrir_segmento(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        existentes = listar_segmentos(self.directorio)
+        self.numero_segmento = (existentes[-1] if existentes else 0) + 1
+        creado = int(time.time() * 1000)
+        self._segmento = open(
+            _nombre_segmento(self.directorio, self.numero_segmento, "seg"), "xb"
+        )
+        self._segmento.write(
+            _CABECERA_SEGMENTO.pack(
+                MAGIA_SEGMENTO,
+                VERSION_ALMACEN,
+                TAM_REGISTRO,
+                self.registros_por_bloque,
+                creado,
+                self.holgura,
+            )
+        )
+        self._indice = open(
+            _nombre_segmento(self.directorio, self.numero_segmento, "idx"), "xb"
+        )
+        self._indice.write(_cabecera_indice(self.registros_por_bloque))
+        self._bloques = _IndiceBloques(self.registros_por_bloque)
+        self.registros_segmento = 0
+        self.segmentos_creados += 1
+
+    def agregar(self, datos, llegada=None):
+        """
+        Anexa una posición (MensajeGPS o cualquier registro con sus campos)
+
+        llegada: hora de recepción (time.time() si no se indica)
+        """
+        if llegada is None:
+            llegada = time.time()
+        if self._segmento is None:
+            self._abrir_segmento()
+
+        segundos = int(llegada)
+        _REGISTRO.pack_into(
+            self._buffer,
+            self._en_buffer * TAM_REGISTRO,
+            datos.id_dispositivo,
+            datos.secuencia,
+            datos.flags,
+            segundos,
+            int((llegada - segundos) * 1000),
+            datos.latitud,
+            datos.longitud,
+            datos.altitud,
+            datos.timestamp,
+            datos.velocidad,
+            datos.rumbo,
+            datos.bateria,
+            datos.estado,
+        )
+        self._en_buffer += 1
+        self.registros_segmento += 1
+        self.registros += 1
+
+        entrada = self._bloques.agregar(datos.id_dispositivo, segundos, datos.timestamp)
+        if entrada is not None:
+            self._indice_pendiente += entrada
+        if self.registros_segmento >= self.max_registros_segmento:
+            self.vaciar()
+            self._cerrar_segmento()
+        elif self._en_buffer == REGISTROS_POR_ESCRITURA:
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribe los registros e índices acumulados"""
+        if self._segmento is None:
+            return
+        if self._en_buffer:
+            with memoryview(self._buffer) as vista:
+                self._segmento.write(vista[: self._en_buffer * TAM_REGISTRO])
+            self._segmento.flush()
+            self._en_buffer = 0
+        if self._indice_pendiente:
+            self._indice.write(self._indice_pendiente)
+            self._indice.flush()
+            del self._indice_pendiente[:]
+
+    def _cerrar_segmento(self):
+        # El último bloque incompleto no tiene entrada: el lector lo recorre
+        self._segmento.close()
+        self._indice.close()
+        self._segmento = self._indice = None
+
+    def cerrar(self):
+        """Escribe lo pendiente y cierra el segmento actual"""
+        if self._segmento is None:
+            return
+        try:
+            self.vaciar()
+        finally:
+            self._cerrar_segmento()
+
+
+class SegmentoTrayectos:
+    """Segmento mapeado en memoria (solo lectura), con su índice si existe"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            tam = os.fstat(f.fileno()).st_size
+            if tam < TAM_CABECERA_SEGMENTO:
+                raise ValueError(f"Segmento incompleto: {ruta}")
+            self._mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magia,
+            version,
+            tam_registro,
+            self.registros_por_bloque,
+            self.creado_ms,
+            holgura,
+        ) = _CABECERA_SEGMENTO.unpack_from(self._mapa)
+        self.holgura = holgura or HOLGURA_CONSULTA
+        self.bloques_visitados = 0  # Entradas del índice revisadas al consultar
+        if magia != MAGIA_SEGMENTO or tam_registro != TAM_REGISTRO:
+            self._mapa.close()
+            raise ValueError(f"No es un segmento de trayectos: {ruta}")
+        self._registro = _REGISTRO_POR_VERSION.get(version)
+        if self._registro is None:
+            self._mapa.close()
+            raise ValueError(f"Versión de segmento no soportada ({version}): {ruta}")
+        self.registros = (tam - TAM_CABECERA_SEGMENTO) // TAM_REGISTRO
+        self.vista = memoryview(self._mapa)[
+            TAM_CABECERA_SEGMENTO : TAM_CABECERA_SEGMENTO
+            + self.registros * TAM_REGISTRO
+        ]
+        self._abrir_indice()
+
+    def _abrir_indice(self):
+        """
+        Mapea el .idx. Un índice ausente, de otra versión o de otro tamaño
+        de bloque se ignora: el segmento se recorre completo.
+        """
+        self._mapa_indice = None
+        self.entradas = 0
+        self._arbol_minimos = None
+        try:
+            with open(self.ruta_indice, "rb") as f:
+                tam = os.fstat(f.fileno()).st_size
+                if tam < _CABECERA_INDICE.size:
+                    return
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return
+        magia, version, tam_entrada, por_bloque = _CABECERA_INDICE.unpack_from(mapa)
+        if (
+            magia != MAGIA_INDICE
+            or version != VERSION_INDICE
+            or tam_entrada != _ENTRADA_INDICE.size
+            or por_bloque != self.registros_por_bloque
+        ):
+            mapa.close()
+            return
+        self._mapa_indice = mapa
+        # Solo entradas completas y de bloques presentes en el segmento
+        self.entradas = min(
+            (tam - _CABECERA_INDICE.size) // _ENTRADA_INDICE.size,
+            self.registros // self.registros_por_bloque,
+        )
+
+    @property
+    def ruta_indice(self):
+        return os.path.splitext(self.ruta)[0] + ".idx"
+
+    def __len__(self):
+        return self.registros
+
+    def registros_en(self, inicio=0, fin=None):
+        """Itera RegistroTrayecto de los registros [inicio, fin)"""
+        if fin is None or fin > self.registros:
+            fin = self.registros
+        if inicio >= fin:
+            return
+        crear = RegistroTrayecto._make
+        tramo = self.vista[inicio * TAM_REGISTRO : fin * TAM_REGISTRO]
+        try:
+            for campos in self._registro.iter_unpack(tramo):
+                yield crear(campos)
+        finally:
+            tramo.release()  # Permite cerrar el mmap aunque no se agote
+
+    def entrada(self, i):
+        """
+        Entrada i del índice: (primer_registro, llegada_min,
+        llegada_acumulada, ts_min, ts_max, filtro)
+        """
+        return _ENTRADA_INDICE.unpack_from(
+            self._mapa_indice, _CABECERA_INDICE.size + i * _ENTRADA_INDICE.size
+        )
+
+    def leer_indice(self):
+        """Todas las entradas del índice (bloques completos)"""
+        return [self.entrada(i) for i in range(self.entradas)]
+
+    def _primer_bloque_desde(self, llegada):
+        """Primer bloque cuya llegada acumulada es >= llegada (bisección)"""
+        mapa = self._mapa_indice
+        bajo, alto = 0, self.entradas
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            (acumulada,) = _LLEGADA_ACUMULADA.unpack_from(
+                mapa, _CABECERA_INDICE.size + medio * _ENTRADA_INDICE.size
+            )
+            if acumulada < llegada:
+                bajo = medio + 1
+            else:
+                alto = medio
+        return bajo
+
+    def _construir_arbol_minimos(self):
+        """Árbol de mínimos (en un arreglo) del timestamp mínimo de cada bloque"""
+        hojas = 1
+        while hojas < self.entradas:
+            hojas *= 2
+        arbol = [0xFFFFFFFF] * (2 * hojas)
+        for i in range(self.entradas):
+            (arbol[hojas + i],) = _TIMESTAMP_MINIMO.unpack_from(
+                self._mapa_indice, _CABECERA_INDICE.size + i * _ENTRADA_INDICE.size
+            )
+        for nodo in range(hojas - 1, 0, -1):
+            arbol[nodo] = min(arbol[2 * nodo], arbol[2 * nodo + 1])
+        self._arbol_minimos = (arbol, hojas)
+
+    def siguiente_bloque_hasta(self, bloque, hasta):
+        """
+        Primer bloque indexado desde bloque con algún timestamp <= hasta
+        (self.entradas si no hay ninguno)
+        """
+        if bloque >= self.entradas:
+            return self.entradas
+        if self._arbol_minimos is None:
+            self._construir_arbol_minimos()
+        arbol, hojas = self._arbol_minimos
+        nodo = hojas + bloque
+        # Subir hasta un nodo con algún bloque que sirva a la derecha...
+        while arbol[nodo] > hasta:
+            while nodo & 1:  # Hijo derecho: ya se miró todo su padre
+                nodo >>= 1
+            if nodo == 0:
+                return self.entradas
+            nodo += 1
+        # ...y bajar por el hijo de la izquierda siempre que sirva
+        while nodo < hojas:
+            nodo *= 2
+            if arbol[nodo] > hasta:
+                nodo += 1
+        return min(nodo - hojas, self.entradas)
+
+    def consultar(self, id_dispositivo=None, desde=None, hasta=None, holgura=None):
+        """
+        Registros con id_dispositivo (None = todos) y timestamp en
+        [desde, hasta] (None = sin límite), en orden de escritura.
+        holgura (adelanto máximo del timestamp) None usa la del segmento.
+        """
+        if holgura is None:
+            holgura = self.holgura
+        desde_ts = 0 if desde is None else desde
+        hasta_ts = 0xFFFFFFFF if hasta is None else hasta
+        bits = None if id_dispositivo is None else _bits_dispositivo(id_dispositivo)
+        por_bloque = self.registros_por_bloque
+
+        vista = self.vista
+        registro = self._registro
+        crear = RegistroTrayecto._make
+
+        def _filtrar(inicio, fin):
+            if inicio >= fin:
+                return
+            tramo = vista[inicio * TAM_REGISTRO : fin * TAM_REGISTRO]
+            try:
+                for j, (id_disp, ts) in enumerate(_ID_Y_TIMESTAMP.iter_unpack(tramo)):
+                    if (
+                        id_dispositivo is None or id_disp == id_dispositivo
+                    ) and desde_ts <= ts <= hasta_ts:
+                        yield crear(registro.unpack_from(tramo, j * TAM_REGISTRO))
+            finally:
+                tramo.release()
+
+        bloque = 0 if desde is None else self._primer_bloque_desde(desde - holgura)
+        while bloque < self.entradas:
+            if hasta is not None:
+                # Saltar los bloques que solo tienen timestamps posteriores
+                bloque = self.siguiente_bloque_hasta(bloque, hasta)
+                if bloque >= self.entradas:
+                    break
+            self.bloques_visitados += 1
+            primero, _, _, ts_min, ts_max, filtro = self.entrada(bloque)
+            if (
+                ts_max >= desde_ts
+                and ts_min <= hasta_ts
+                and (bits is None or int.from_bytes(filtro, "big") & bits == bits)
+            ):
+                yield from _filtrar(primero, primero + por_bloque)
+            bloque += 1
+        # Cola sin indexar (último bloque incompleto)
+        yield from _filtrar(self.entradas * por_bloque, self.registros)
+
+    def cerrar(self):
+        self.vista.release()
+        self._mapa.close()
+        if self._mapa_indice is not None:
+            self._mapa_indice.close()
+            self._mapa_indice = None
+
+
+class LectorTrayectos:
+    """Recorre todos los segmentos de un directorio, en orden de escritura"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.segmentos = [
+            SegmentoTrayectos(_nombre_segmento(directorio, numero, "seg"))
+            for numero in listar_segmentos(directorio)
+        ]
+
+    def __len__(self):
+        return sum(len(segmento) for segmento in self.segmentos)
+
+    def __iter__(self):
+        for segmento in self.segmentos:
+            yield from segmento.registros_en()
+
+    def consultar(self, id_dispositivo=None, desde=None, hasta=None, holgura=None):
+        """
+        Posiciones de un dispositivo (o de todos) entre dos timestamps
+
+        desde/hasta: segundos desde epoch (inclusive), None = sin límite
+        holgura: adelanto máximo esperado del timestamp sobre la llegada
+        (None = el que guardó el servidor en cada segmento)
+
+        Los segmentos completamente fuera de la ventana se descartan con la
+        primera y la última entrada de su índice.
+        """
+        for segmento in self.segmentos:
+            n = segmento.entradas
+            margen = segmento.holgura if holgura is None else holgura
+            if n and n * segmento.registros_por_bloque == segmento.registros:
+                # Índice completo: acotar el segmento sin leer registros
+                if hasta is not None and segmento.siguiente_bloque_hasta(0, hasta) >= n:
+                    continue
+                if desde is not None and segmento.entrada(n - 1)[2] < desde - margen:
+                    continue
+            yield from segmento.consultar(id_dispositivo, desde, hasta, holgura)
+
+    def cerrar(self):
+        for segmento in self.segmentos:
+            segmento.cerrar()
+        self.segmentos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def reindexar(directorio):
+    """
+    Regenera el .idx de cada segmento a partir de sus registros (índices
+    faltantes, incompletos o de una versión anterior). Retorna la cantidad
+    de segmentos reindexados.
+    """
+    cantidad = 0
+    for numero in listar_segmentos(directorio):
+        ruta = _nombre_segmento(directorio, numero, "seg")
+        segmento = SegmentoTrayectos(ruta)
+        try:
+            bloques = _IndiceBloques(segmento.registros_por_bloque)
+            entradas = bytearray(_cabecera_indice(segmento.registros_por_bloque))
+            for registro in segmento.registros_en():
+                entrada = bloques.agregar(
+                    registro.id_dispositivo, registro.llegada_s, registro.timestamp
+                )
+                if entrada is not None:
+                    entradas += entrada
+            ruta_indice = segmento.ruta_indice
+        finally:
+            segmento.cerrar()
+        temporal = ruta_indice + ".tmp"
+        with open(temporal, "wb") as f:
+            f.write(entradas)
+        os.replace(temporal, ruta_indice)
+        cantidad += 1
+    return cantidad
+
+
+def exportar_texto(directorio, flujo):
+    """Escribe el almacén en el formato de gps_log.txt; retorna la cantidad"""
+    cantidad = 0
+    ts_anterior, fecha = None, ""
+    with LectorTrayectos(directorio) as lector:
+        for registro in lector:
+            if registro.timestamp != ts_anterior:
+                ts_anterior = registro.timestamp
+                fecha = formatear_fecha_log(ts_anterior)
+            flujo.write(formatear_linea_log(registro, fecha))
+            cantidad += 1
+    return cantidad
+
+
+class _PosicionTexto(namedtuple("_PosicionTexto", _CAMPOS_REGISTRO)):
+    __slots__ = ()
+
+
+def convertir_log_texto(rutas, directorio):
+    """
+    Importa logs de texto (gps_log.txt y rotados) a un almacén binario
+
+    El log de texto no guarda la hora de llegada ni el campo estado: se usa
+    el timestamp del dispositivo y estado 0. Las líneas inválidas se omiten.
+    Retorna (convertidas, omitidas).
+    """
+    almacen = AlmacenTrayectos(directorio)
+    convertidas = omitidas = 0
+    try:
+        for ruta in rutas:
+            with open(ruta) as f:
+                for linea in f:
+                    try:
+                        campos = leer_linea_log(linea)
+                    except ValueError:
+                        omitidas += 1
+                        continue
+                    campos.update(llegada_s=campos["timestamp"], llegada_ms=0, estado=0)
+                    almacen.agregar(
+                        _PosicionTexto(**campos), llegada=campos["timestamp"]
+                    )
+                    convertidas += 1
+    finally:
+        almacen.cerrar()
+    return convertidas, omitidas
+
+
+def _leer_fecha(texto):
+    """Fecha del log ("2024-05-01 10:00:00") o segundos desde epoch"""
+    if texto.isdigit():
+        return int(texto)
+    return int(datetime.strptime(texto, FORMATO_FECHA_LOG).timestamp())
+
+
+def main():
+    uso = (
+        "Uso: python src/gps_almacen.py exportar <directorio> [salida.txt]\n"
+        "     python src/gps_almacen.py convertir <directorio> <log.txt> [...]\n"
+        "     python src/gps_almacen.py consultar <directorio> <id|*> [desde] [hasta]"
+        " [--holgura SEG]\n"
+        "     python src/gps_almacen.py reindexar <directorio>\n"
+        "     python src/gps_almacen.py info <directorio>"
+    )
+    argv = list(sys.argv)
+    holgura = None
+    if "--holgura" in argv:
+        posicion = argv.index("--holgura")
+        try:
+            holgura = int(argv[posicion + 1])
+        except (IndexError, ValueError):
+            print("[✗] --holgura requiere segundos (entero)")
+            return
+        del argv[posicion : posicion + 2]
+    if len(argv) < 3:
+        print(uso)
+        return
+    comando, directorio = argv[1], argv[2]
+
+    if comando == "exportar":
+        if len(argv) >= 4:
+            with open(argv[3], "w") as salida:
+                cantidad = exportar_texto(directorio, salida)
+            print(f"[✓] {cantidad} registros exportados a {argv[3]}")
+        else:
+            exportar_texto(directorio, sys.stdout)
+    elif comando == "convertir":
+        if len(argv) < 4:
+            print(uso)
+            return
+        convertidas, omitidas = convertir_log_texto(argv[3:], directorio)
+        print(f"[✓] {convertidas} registros convertidos a {directorio}")
+        if omitidas:
+            print(f"[!] {omitidas} líneas inválidas omitidas")
+    elif comando == "consultar":
+        if len(argv) < 4:
+            print(uso)
+            return
+        try:
+            id_dispositivo = None if argv[3] == "*" else int(argv[3])
+            desde = _leer_fecha(argv[4]) if len(argv) >= 5 else None
+            hasta = _leer_fecha(argv[5]) if len(argv) >= 6 else None
+        except ValueError as e:
+            print(f"[✗] {e}")
+            print(uso)
+            return
+        inicio = time.perf_counter()
+        cantidad = 0
+        with LectorTrayectos(directorio) as lector:
+            for registro in lector.consultar(id_dispositivo, desde, hasta, holgura):
+                sys.stdout.write(
+                    formatear_linea_log(registro, formatear_fecha_log(registro.timestamp))
+                )
+                cantidad += 1
+        duracion = (time.perf_counter() - inicio) * 1000
+        print(f"[i] {cantidad} registros en {duracion:.1f} ms", file=sys.stderr)
+    elif comando == "reindexar":
+        cantidad = reindexar(directorio)
+        print(f"[✓] {cantidad} segmentos reindexados en {directorio}")
+    elif comando == "info":
+        with LectorTrayectos(directorio) as lector:
+            for segmento in lector.segmentos:
+                creado = formatear_fecha_log(segmento.creado_ms // 1000)
+                print(
+                    f"  {os.path.basename(segmento.ruta)}  creado {creado}  "
+                    f"{len(segmento):10d} registros  "
+                    f"{segmento.entradas:6d} bloques indexados  "
+                    f"holgura {segmento.holgura}s"
+                )
+            print(f"[i] Total: {len(lector)} registros en {len(lector.segmentos)} segmentos")
+    else:
+        print(uso)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,36 +4,217 @@ Redes de Computadoras - Práctica 3
 
 Este programa simula un dispositivo GPS que envía datos de posición
 al servidor central usando el protocolo UDP.
+
+Con --ventana N el dispositivo no espera cada ACK: hasta N mensajes quedan
+en vuelo, los ACK se asocian por secuencia a medida que llegan y los que
+no se confirman se retransmiten con espera exponencial y jitter. Los
+mensajes que exceden la ventana esperan en una bandeja acotada (si se
+llena se descarta el más viejo), así que al recuperar cobertura el
+dispositivo vacía su atraso tan rápido como lo permitan los ACK.
+Los mensajes llevan FLAG_ACK_SELECTIVO (el cliente entiende los dos tipos
+de ACK): un servidor con --coalescer-acks responde con un ACK selectivo
+cada tanto en lugar de uno por mensaje; sin --ventana ese ACK llega al
+vencer el intervalo de agrupamiento. Con --agrupar N, lo que la ventana deja salir de una vez
+(p. ej. el atraso al volver la cobertura) viaja en lotes TIPO_LOTE_GPS de
+hasta N posiciones por datagrama.
+
+Con --delta cada posición viaja como TIPO_DELTA_GPS (solo lo que cambió
+desde la anterior) y cada --keyframe posiciones, tras un ACK perdido o en
+cada reintento va el mensaje completo, para que el servidor se resincronice.
+
+Con --autenticar cada datagrama lleva un TAG (FLAG_AUTENTICADO) con la
+clave del dispositivo, y solo se aceptan ACK firmados por el servidor.
 """
 
 import socket
+import select
 import time
 import random
 import sys
 import argparse
+from collections import deque
 from gps_protocolo import (
+    ALGORITMOS_TAG,
+    CLAVE_SECRETA,
+    FLAG_ACK_SELECTIVO,
     FLAG_BATERIA_BAJA,
     FLAG_EN_MOVIMIENTO,
     FLAG_IGNICION_ON,
+    MAX_FIXES_LOTE,
     PUERTO_SERVIDOR,
+    TAM_MENSAJE_GPS,
     TIPO_ACK,
+    TIPO_ACK_SELECTIVO,
+    Autenticador,
+    agrupar_mensajes_gps,
+    comprimir_mensaje_gps,
     coordenadas_a_raw,
     desempaquetar_mensaje,
-    empaquetar_mensaje_gps,
+    empaquetar_mensaje_gps_en,
     empaquetar_heartbeat,
+    secuencia_confirmada,
     MAX_SEQ,
 )
 
+TAM_VENTANA_ENVIO = 16  # Mensajes en vuelo sin confirmar
+CAPACIDAD_BANDEJA = 1000  # Mensajes esperando lugar en la ventana
+TIMEOUT_ACK_INICIAL = 0.5  # Segundos hasta el primer reintento
+TIMEOUT_ACK_MAX = 8.0
+MAX_INTENTOS = 6  # Envíos por mensaje (el original + 5 reintentos)
+JITTER_REINTENTO = 0.5  # Hasta +50% al azar sobre cada espera
+INTERVALO_KEYFRAME = 30  # Con --delta, una posición completa cada tantas
+
+
+class VentanaEnvio:
+    """
+    Mensajes en vuelo de un dispositivo y su bandeja de salida
+
+    No hace E/S: a_transmitir(ahora) dice qué enviar (nuevos mientras haya
+    lugar y reintentos vencidos) y confirmar(seq) libera el lugar.
+    """
+
+    def __init__(
+        self,
+        tam=TAM_VENTANA_ENVIO,
+        capacidad_bandeja=CAPACIDAD_BANDEJA,
+        timeout_inicial=TIMEOUT_ACK_INICIAL,
+        timeout_max=TIMEOUT_ACK_MAX,
+        max_intentos=MAX_INTENTOS,
+        jitter=JITTER_REINTENTO,
+        azar=None,
+    ):
+        if tam < 1 or capacidad_bandeja < 1:
+            raise ValueError("tam y capacidad_bandeja deben ser mayores a 0")
+        self.tam = tam
+        self.capacidad_bandeja = capacidad_bandeja
+        self.timeout_inicial = timeout_inicial
+        self.timeout_max = timeout_max
+        self.max_intentos = max_intentos
+        self.jitter = jitter
+        self.azar = azar or random.Random()
+        self.bandeja = deque()  # (seq, mensaje) aún no enviados
+        self.en_vuelo = {}  # seq -> [mensaje, intentos, vence]
+
+        self.confirmados = 0
+        self.retransmitidos = 0
+        self.descartados = 0  # Bandeja llena: se pierde el más viejo
+        self.abandonados = 0  # Sin ACK tras max_intentos
+
+    def encolar(self, seq, mensaje):
+        if len(self.bandeja) >= self.capacidad_bandeja:
+            self.bandeja.popleft()
+            self.descartados += 1
+        self.bandeja.append((seq, mensaje))
+
+    def pendientes(self):
+        """Mensajes sin confirmar (en vuelo + en bandeja)"""
+        return len(self.en_vuelo) + len(self.bandeja)
+
+    def _vencimiento(self, ahora, intentos):
+        espera = min(self.timeout_max, self.timeout_inicial * 2 ** (intentos - 1))
+        return ahora + espera * (1.0 + self.azar.uniform(0.0, self.jitter))
+
+    def a_transmitir(self, ahora):
+        """
+        Retorna (envios, abandonados)
+
+        envios: lista de (seq, mensaje, intento) a enviar ahora, primero los
+        reintentos vencidos y luego nuevos de la bandeja mientras haya lugar.
+        abandonados: secuencias que agotaron max_intentos (salen de la ventana).
+        """
+        envios = []
+        abandonados = []
+        en_vuelo = self.en_vuelo
+        for seq in [seq for seq, entrada in en_vuelo.items() if entrada[2] <= ahora]:
+            entrada = en_vuelo[seq]
+            if entrada[1] >= self.max_intentos:
+                del en_vuelo[seq]
+                self.abandonados += 1
+                abandonados.append(seq)
+                continue
+            entrada[1] += 1
+            entrada[2] = self._vencimiento(ahora, entrada[1])
+            self.retransmitidos += 1
+            envios.append((seq, entrada[0], entrada[1]))
+
+        bandeja = self.bandeja
+        while bandeja and len(en_vuelo) < self.tam:
+            seq, mensaje = bandeja.popleft()
+            en_vuelo[seq] = [mensaje, 1, self._vencimiento(ahora, 1)]
+            envios.append((seq, mensaje, 1))
+        return envios, abandonados
+
+    def confirmar(self, seq):
+        """Marca seq como confirmada; False si no estaba en vuelo"""
+        if self.en_vuelo.pop(seq, None) is None:
+            return False
+        self.confirmados += 1
+        return True
+
+    def confirmar_selectivo(self, acumulado, seq_mas_alta, mapa_sack):
+        """Aplica un ACK selectivo; retorna las secuencias en vuelo que confirma"""
+        confirmadas = [
+            seq
+            for seq in self.en_vuelo
+            if secuencia_confirmada(seq, acumulado, seq_mas_alta, mapa_sack)
+        ]
+        for seq in confirmadas:
+            del self.en_vuelo[seq]
+        self.confirmados += len(confirmadas)
+        return confirmadas
+
+    def proximo_vencimiento(self):
+        """Instante del próximo reintento o None si no hay nada en vuelo"""
+        if not self.en_vuelo:
+            return None
+        return min(entrada[2] for entrada in self.en_vuelo.values())
+
 
 class DispositivoGPS:
     def __init__(
-        self, id_dispositivo, servidor_ip="127.0.0.1", servidor_puerto=PUERTO_SERVIDOR
+        self,
+        id_dispositivo,
+        servidor_ip="127.0.0.1",
+        servidor_puerto=PUERTO_SERVIDOR,
+        mostrar_cabecera=True,
+        ventana=None,
+        capacidad_bandeja=CAPACIDAD_BANDEJA,
+        agrupar=1,
+        delta=False,
+        intervalo_keyframe=INTERVALO_KEYFRAME,
+        autenticar=False,
+        clave_autenticacion=CLAVE_SECRETA,
+        clave_dispositivo=None,
+        algoritmo_tag="blake2s",
+        ack_selectivo=True,
     ):
         self.id_dispositivo = id_dispositivo
         self.servidor = (servidor_ip, servidor_puerto)
         self.secuencia = 0
         self.socket = None
 
+        # Envío con ventana deslizante (None = un mensaje y esperar su ACK)
+        self.ventana = VentanaEnvio(ventana, capacidad_bandeja) if ventana else None
+        self.sin_cobertura = False  # Simula falta de señal: solo se encola
+        # Anunciar FLAG_ACK_SELECTIVO (quien lea los ACK debe entender ambos tipos)
+        self.ack_selectivo = ack_selectivo
+        # Posiciones por datagrama al enviar varias juntas (1 = sin lotes)
+        self.agrupar = max(1, min(int(agrupar), MAX_FIXES_LOTE))
+        # Codificación delta: último mensaje completo enviado por primera vez
+        self.delta = delta
+        self.intervalo_keyframe = max(1, int(intervalo_keyframe))
+        self._referencia_delta = None
+        self._desde_keyframe = 0
+        # Se empaqueta siempre en el mismo buffer (ver construir_mensaje_en)
+        self._buffer = bytearray(TAM_MENSAJE_GPS)
+        # Autenticación: la clave propia o la derivada de la maestra y el ID
+        self.autenticador = None
+        if autenticar:
+            propias = {id_dispositivo: clave_dispositivo} if clave_dispositivo else None
+            self.autenticador = Autenticador(
+                clave_autenticacion, propias, algoritmo=algoritmo_tag
+            )
+
         # Estado del vehículo simulado
         self.latitud = -17.3935  # Cochabamba inicial
         self.longitud = -66.1570
@@ -44,18 +225,31 @@ class DispositivoGPS:
         self.en_movimiento = False
         self.ignicion = False
 
+        if not mostrar_cabecera:  # p. ej. miles de dispositivos en gps_flota
+            return
         print(f"\n{'='*60}")
         print(f"  DISPOSITIVO GPS #{self.id_dispositivo}")
         print(f"{'='*60}")
         print(f"  Servidor: {servidor_ip}:{servidor_puerto}")
         print(f"  Posición inicial: {self.latitud:.4f}°, {self.longitud:.4f}°")
+        if self.ventana is not None:
+            print(f"  Ventana de envío: {self.ventana.tam} mensajes en vuelo")
+            if self.agrupar > 1:
+                print(f"  Lotes de hasta {self.agrupar} posiciones por datagrama")
+        if self.delta:
+            print(f"  Codificación delta: keyframe cada {self.intervalo_keyframe} posiciones")
+        if self.autenticador is not None:
+            print(f"  Mensajes autenticados ({self.autenticador.algoritmo})")
         print(f"{'='*60}\n")
 
     def conectar(self):
         """Crea el socket UDP"""
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.socket.settimeout(3.0)  # Timeout de 3 segundos para ACK
+            if self.ventana is not None:
+                self.socket.setblocking(False)  # Los ACK se leen con select
+            else:
+                self.socket.settimeout(3.0)  # Timeout de 3 segundos para ACK
             print("[✓] Socket UDP creado exitosamente")
             return True
         except socket.error as e:
@@ -103,14 +297,25 @@ class DispositivoGPS:
         if self.ignicion:
             flags |= FLAG_IGNICION_ON
 
+        # Con o sin ventana se entienden los ACK selectivos
+        if self.ack_selectivo:
+            flags |= FLAG_ACK_SELECTIVO
+
         return flags
 
-    def enviar_datos(self):
-        """Envía datos GPS al servidor"""
-        if self.socket is None:
-            print("[✗] Error: socket no inicializado")
-            return False
+    def construir_mensaje(self):
+        """Avanza la secuencia y retorna la posición actual empaquetada (bytes)"""
+        # La copia es necesaria: la ventana y la referencia delta la guardan
+        self.construir_mensaje_en(self._buffer)
+        return bytes(self._buffer)
+
+    def construir_mensaje_en(self, buffer, offset=0):
+        """
+        Avanza la secuencia y empaqueta la posición en buffer[offset:]
 
+        Sin asignar memoria: quien envía muchos mensajes seguidos (la flota)
+        reutiliza un buffer. Retorna los bytes escritos.
+        """
         self.secuencia = (self.secuencia + 1) % MAX_SEQ
 
         # Convertir coordenadas a formato raw
@@ -121,8 +326,9 @@ class DispositivoGPS:
         rumbo_raw = int(self.rumbo * 10)
         flags = self.obtener_flags()
 
-        # Empaquetar mensaje
-        mensaje = empaquetar_mensaje_gps(
+        return empaquetar_mensaje_gps_en(
+            buffer,
+            offset,
             id_dispositivo=self.id_dispositivo,
             secuencia=self.secuencia,
             latitud=lat_raw,
@@ -135,19 +341,39 @@ class DispositivoGPS:
             flags=flags,
         )
 
+    def enviar_datos(self):
+        """Envía datos GPS al servidor"""
+        if self.socket is None:
+            print("[✗] Error: socket no inicializado")
+            return False
+
+        mensaje = self.construir_mensaje()
+
+        if self.ventana is not None:
+            self.ventana.encolar(self.secuencia, mensaje)
+            print(
+                f"[→] Mensaje #{self.secuencia} encolado "
+                f"(en vuelo: {len(self.ventana.en_vuelo)}, "
+                f"en bandeja: {len(self.ventana.bandeja)})"
+            )
+            self.bombear()
+            return True
+
         # Enviar por UDP
         try:
-            self.socket.sendto(mensaje, self.servidor)
-            print(f"[→] Mensaje #{self.secuencia} enviado ({len(mensaje)} bytes)")
+            datagrama = self._firmar(self._codificar(mensaje))
+            self.socket.sendto(datagrama, self.servidor)
+            print(f"[→] Mensaje #{self.secuencia} enviado ({len(datagrama)} bytes)")
             print(f"    Pos: {self.latitud:.6f}°, {self.longitud:.6f}°")
             print(
-                f"    Vel: {self.velocidad:.1f} km/h, Rumbo: {self.rumbo:.1f}°, Bat: {self.bateria:.0f}%"
+                f"    Vel: {self.velocidad:.1f} km/h, Rumbo: {self.rumbo:.1f}°, "
+                f"Bat: {self.bateria:.0f}%"
             )
 
             # Esperar ACK opcional
             try:
                 respuesta, addr = self.socket.recvfrom(1024)
-                datos_ack, error = desempaquetar_mensaje(respuesta)
+                datos_ack, error = desempaquetar_mensaje(respuesta, self.autenticador)
 
                 if datos_ack and datos_ack["tipo"] == TIPO_ACK:
                     if datos_ack["secuencia"] == self.secuencia:
@@ -156,9 +382,22 @@ class DispositivoGPS:
                         print(
                             f"[!] ACK recibido con secuencia incorrecta: {datos_ack['secuencia']}"
                         )
+                elif datos_ack and datos_ack.get("mapa_sack") is not None:
+                    # TIPO_ACK_SELECTIVO completo
+                    if secuencia_confirmada(
+                        self.secuencia,
+                        datos_ack["secuencia"],
+                        datos_ack["seq_mas_alta"],
+                        datos_ack["mapa_sack"],
+                    ):
+                        print(f"[←] ACK selectivo recibido para mensaje #{self.secuencia}")
+                    else:
+                        print(f"[!] ACK selectivo sin el mensaje #{self.secuencia}")
+                        self._referencia_delta = None  # El próximo va completo
 
             except socket.timeout:
                 print("[!] No se recibió ACK (timeout)")
+                self._referencia_delta = None  # El próximo va completo
 
             return True
 
@@ -166,6 +405,157 @@ class DispositivoGPS:
             print(f"[✗] Error al enviar: {e}")
             return False
 
+    def _codificar(self, mensaje, intento=1):
+        """
+        Con --delta, el mensaje como TIPO_DELTA_GPS sobre el anterior
+
+        Los reintentos, el primer mensaje, los que siguen a un ACK perdido y
+        uno de cada intervalo_keyframe van completos (keyframe).
+        """
+        if not self.delta or intento > 1:
+            return mensaje
+        referencia = self._referencia_delta
+        self._referencia_delta = mensaje
+        self._desde_keyframe += 1
+        if referencia is None or self._desde_keyframe >= self.intervalo_keyframe:
+            self._desde_keyframe = 0
+            return mensaje
+        return comprimir_mensaje_gps(referencia, mensaje)
+
+    def _firmar(self, datagrama):
+        """Con --autenticar, el datagrama con su TAG; si no, sin cambios"""
+        if self.autenticador is None:
+            return datagrama
+        return self.autenticador.firmar(datagrama)
+
+    def bombear(self, espera=0.0):
+        """
+        Envía lo que permita la ventana y atiende ACK y reintentos
+
+        Retorna tras `espera` segundos (0 = solo lo que ya está listo). Cada
+        ACK libera un lugar que se ocupa enseguida con el siguiente mensaje
+        de la bandeja.
+        """
+        ventana = self.ventana
+        limite = time.monotonic() + espera
+        while True:
+            ahora = time.monotonic()
+            restante = limite - ahora
+            if not self.sin_cobertura:
+                self._transmitir(ahora)
+                vence = ventana.proximo_vencimiento()
+                if vence is not None:
+                    restante = min(restante, vence - ahora)
+            listos, _, _ = select.select([self.socket], [], [], max(0.0, restante))
+            if listos:
+                self._leer_acks()
+            elif time.monotonic() >= limite:
+                return
+
+    def _transmitir(self, ahora):
+        envios, abandonados = self.ventana.a_transmitir(ahora)
+        for seq in abandonados:
+            print(
+                f"[✗] Mensaje #{seq} descartado: "
+                f"sin ACK tras {self.ventana.max_intentos} envíos"
+            )
+        if self.agrupar > 1 and len(envios) > 1:
+            self._transmitir_en_lotes(envios)
+            return
+        for seq, mensaje, intento in envios:
+            try:
+                datagrama = self._firmar(self._codificar(mensaje, intento))
+                self.socket.sendto(datagrama, self.servidor)
+            except OSError as e:
+                # Queda en vuelo: se reintenta cuando venza
+                print(f"[✗] Error al enviar #{seq}: {e}")
+                continue
+            if intento > 1:
+                print(f"[↻] Reintento de mensaje #{seq} (envío {intento})")
+
+    def _transmitir_en_lotes(self, envios):
+        """Envía varios mensajes como lotes TIPO_LOTE_GPS de hasta self.agrupar"""
+        if self.delta:
+            nuevos = [mensaje for _, mensaje, intento in envios if intento == 1]
+            if nuevos:  # El servidor toma la última posición del lote
+                self._referencia_delta = nuevos[-1]
+        lotes = agrupar_mensajes_gps(
+            [mensaje for _, mensaje, _ in envios],
+            flags=FLAG_ACK_SELECTIVO,
+            max_fixes=self.agrupar,
+            autenticador=self.autenticador,
+        )
+        enviados = 0
+        for lote in lotes:
+            try:
+                self.socket.sendto(lote, self.servidor)
+                enviados += 1
+            except OSError as e:
+                # Sus mensajes quedan en vuelo: se reintentan cuando venzan
+                print(f"[✗] Error al enviar lote: {e}")
+        reintentos = sum(1 for _, _, intento in envios if intento > 1)
+        print(
+            f"[→] {len(envios)} mensaje(s) en {enviados} lote(s)"
+            + (f", {reintentos} reintento(s)" if reintentos else "")
+        )
+
+    def _leer_acks(self):
+        while True:
+            try:
+                respuesta, _ = self.socket.recvfrom(1024)
+            except OSError:  # Sin más datagramas (o error ICMP en Windows)
+                return
+            datos_ack, _ = desempaquetar_mensaje(respuesta, self.autenticador)
+            if not datos_ack:
+                continue
+            if datos_ack["tipo"] == TIPO_ACK:
+                if self.ventana.confirmar(datos_ack["secuencia"]):
+                    print(f"[←] ACK recibido para mensaje #{datos_ack['secuencia']}")
+            elif datos_ack["tipo"] == TIPO_ACK_SELECTIVO and "mapa_sack" in datos_ack:
+                confirmadas = self.ventana.confirmar_selectivo(
+                    datos_ack["secuencia"], datos_ack["seq_mas_alta"], datos_ack["mapa_sack"]
+                )
+                if confirmadas:
+                    print(
+                        f"[←] ACK selectivo: {len(confirmadas)} mensaje(s) confirmado(s) "
+                        f"(más alta #{datos_ack['seq_mas_alta']})"
+                    )
+
+    def vaciar_bandeja(self, timeout=10.0):
+        """Espera (como máximo timeout) a que se confirme todo lo pendiente"""
+        limite = time.monotonic() + timeout
+        while self.ventana.pendientes():
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return False
+            self.bombear(min(0.1, restante))
+        return True
+
+    def esperar(self, segundos):
+        """Pausa entre envíos; con ventana sigue atendiendo ACK y reintentos"""
+        if self.ventana is None:
+            time.sleep(segundos)
+        else:
+            self.bombear(segundos)
+
+    def _cerrar(self):
+        """Intenta confirmar lo pendiente (con ventana) y cierra el socket"""
+        if self.socket is None:
+            print("[!] Socket no estaba inicializado\n")
+            return
+        ventana = self.ventana
+        if ventana is not None and ventana.pendientes() and not self.sin_cobertura:
+            print(f"[i] Esperando ACK de {ventana.pendientes()} mensaje(s) pendiente(s)...")
+            self.vaciar_bandeja(timeout=5.0)
+        if ventana is not None:
+            print(
+                f"[i] Confirmados: {ventana.confirmados}, reintentos: "
+                f"{ventana.retransmitidos}, sin ACK: {ventana.pendientes()}, "
+                f"abandonados: {ventana.abandonados}, descartados: {ventana.descartados}"
+            )
+        self.socket.close()
+        print("[✓] Socket cerrado\n")
+
     def enviar_heartbeat(self):
         """Envía un heartbeat al servidor"""
         if self.socket is None:
@@ -179,6 +569,7 @@ class DispositivoGPS:
             id_dispositivo=self.id_dispositivo,
             secuencia=self.secuencia,
             flags=flags,
+            autenticador=self.autenticador,
         )
 
         try:
@@ -224,16 +615,12 @@ class DispositivoGPS:
                 self.enviar_datos()
 
                 # Esperar antes del siguiente envío
-                time.sleep(intervalo)
+                self.esperar(intervalo)
 
         except KeyboardInterrupt:
             print("\n\n[■] Detenido por el usuario")
         finally:
-            if self.socket is not None:
-                self.socket.close()
-                print("[✓] Socket cerrado\n")
-            else:
-                print("[!] Socket no estaba inicializado\n")
+            self._cerrar()
 
     def ejecutar_heartbeat(self, intervalo=10, duracion=60):
         """
@@ -302,6 +689,60 @@ def main():
     parser.add_argument("--ip", dest="server_ip", type=str, default=None)
     parser.add_argument("--port", dest="server_port", type=int, default=None)
     parser.add_argument("--once", type=str, default="false")
+    parser.add_argument(
+        "--ventana",
+        type=int,
+        default=None,
+        help="mensajes en vuelo sin esperar cada ACK (con reintentos)",
+    )
+    parser.add_argument(
+        "--bandeja",
+        type=int,
+        default=CAPACIDAD_BANDEJA,
+        help="con --ventana, mensajes máximos esperando ser enviados",
+    )
+    parser.add_argument(
+        "--agrupar",
+        type=int,
+        default=1,
+        help=f"con --ventana, posiciones por datagrama al enviar varias (máx. {MAX_FIXES_LOTE})",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="enviar solo lo que cambió desde la posición anterior",
+    )
+    parser.add_argument(
+        "--keyframe",
+        type=int,
+        default=INTERVALO_KEYFRAME,
+        help="con --delta, posiciones entre mensajes completos",
+    )
+    parser.add_argument(
+        "--autenticar",
+        action="store_true",
+        help="firmar cada mensaje con un TAG y aceptar solo ACK firmados",
+    )
+    parser.add_argument(
+        "--clave",
+        dest="clave_autenticacion",
+        default=CLAVE_SECRETA,
+        help="con --autenticar, clave maestra de la que se deriva la del dispositivo",
+    )
+    parser.add_argument(
+        "--clave-dispositivo",
+        dest="clave_dispositivo",
+        default=None,
+        help="con --autenticar, clave propia del dispositivo (en vez de la derivada); "
+        'acepta la "hex:..." que muestra gps_servidor.py --exportar-clave',
+    )
+    parser.add_argument(
+        "--algoritmo-tag",
+        dest="algoritmo_tag",
+        choices=ALGORITMOS_TAG,
+        default="blake2s",
+        help="función del TAG de autenticación (por defecto: blake2s)",
+    )
 
     args, _ = parser.parse_known_args()
 
@@ -342,8 +783,40 @@ def main():
     if args.device_id is not None:
         id_dispositivo = args.device_id
 
+    if (args.ventana is not None and args.ventana < 1) or args.bandeja < 1:
+        print("[✗] --ventana y --bandeja deben ser mayores a 0.")
+        return
+    if not 1 <= args.agrupar <= MAX_FIXES_LOTE:
+        print(f"[✗] --agrupar debe estar entre 1 y {MAX_FIXES_LOTE}.")
+        return
+    if args.agrupar > 1 and args.ventana is None:
+        print("[✗] --agrupar requiere --ventana.")
+        return
+    if args.keyframe < 1:
+        print("[✗] --keyframe debe ser mayor a 0.")
+        return
+    if args.autenticar and args.clave_dispositivo is None:
+        # Derivar la clave exige tener la maestra, que sirve para cualquier ID
+        if args.clave_autenticacion == CLAVE_SECRETA:
+            print("[!] Se usa la clave maestra por defecto, que es pública en el código")
+        print("[!] Con la clave maestra se puede firmar como cualquier dispositivo;")
+        print("    use --clave-dispositivo con la de gps_servidor.py --exportar-clave ID")
+
     if args.mode:
-        gps = DispositivoGPS(id_dispositivo, servidor_ip, servidor_puerto)
+        gps = DispositivoGPS(
+            id_dispositivo,
+            servidor_ip,
+            servidor_puerto,
+            ventana=args.ventana,
+            capacidad_bandeja=args.bandeja,
+            agrupar=args.agrupar,
+            delta=args.delta,
+            intervalo_keyframe=args.keyframe,
+            autenticar=args.autenticar,
+            clave_autenticacion=args.clave_autenticacion,
+            clave_dispositivo=args.clave_dispositivo,
+            algoritmo_tag=args.algoritmo_tag,
+        )
         if args.lat is not None:
             gps.latitud = args.lat
         if args.lon is not None:
@@ -389,10 +862,9 @@ def main():
             return
 
         if once:
-            gps.conectar()
-            gps.enviar_datos()
-            if gps.socket is not None:
-                gps.socket.close()
+            if gps.conectar():
+                gps.enviar_datos()
+                gps._cerrar()
             return
         gps.ejecutar(intervalo=intervalo, duracion=duracion)
         return
@@ -406,7 +878,20 @@ def main():
             break
 
         # Crear dispositivo GPS
-        gps = DispositivoGPS(id_dispositivo, servidor_ip, servidor_puerto)
+        gps = DispositivoGPS(
+            id_dispositivo,
+            servidor_ip,
+            servidor_puerto,
+            ventana=args.ventana,
+            capacidad_bandeja=args.bandeja,
+            agrupar=args.agrupar,
+            delta=args.delta,
+            intervalo_keyframe=args.keyframe,
+            autenticar=args.autenticar,
+            clave_autenticacion=args.clave_autenticacion,
+            clave_dispositivo=args.clave_dispositivo,
+            algoritmo_tag=args.algoritmo_tag,
+        )
 
         if opcion == "1":
             # Vehículo estacionado
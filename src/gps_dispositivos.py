@@ -0,0 +1,271 @@
+"""
+Tabla de estado de los dispositivos GPS
+Redes de Computadoras - Práctica 3
+
+El ID de dispositivo es un campo de 16 bits, así que la tabla es una lista
+preasignada de 65.536 ranuras indexada por ID (sin hashing) y cada
+dispositivo registrado ocupa un registro EstadoDispositivo con __slots__
+en lugar de un dict de 9 claves. procesar_mensaje obtiene el registro una
+vez y actualiza sus atributos directamente.
+
+Para el resto del código (estadísticas, combinación de trabajadores,
+pruebas) la tabla y sus registros se leen como el dict de antes:
+
+    tabla[7]["ultima_seq"], tabla[7]["ultima_pos"], len(tabla), tabla.items()
+
+Secuencias: cada registro guarda una ventana de recepción de tam_ventana
+secuencias como bitmap en un int (bit i = llegó ultima_seq - i). Un paquete
+atrasado que cae dentro de la ventana y no había llegado se acepta (llenó un
+hueco: se descuenta de los perdidos y se cuenta como reordenado); si su bit
+ya estaba, es un duplicado exacto. Todo en O(1) por paquete y con aritmética
+módulo 2^16. La misma ventana arma el ACK selectivo (resumen_ack); su ACK
+acumulado solo avanza sobre secuencias recibidas, así que un hueco que sale
+de la ventana sin llegar no se confirma.
+
+Cada registro guarda además la última posición nueva del dispositivo
+(referencia), que es la base para decodificar su próximo TIPO_DELTA_GPS.
+"""
+
+from gps_protocolo import BITS_SACK, MAX_SEQ
+
+CAPACIDAD_IDS = 1 << 16  # id_dispositivo es de 16 bits
+BATERIA_INICIAL = 100
+
+TAM_VENTANA_SEQ = 256  # Secuencias recordadas por dispositivo
+MIN_VENTANA_SEQ = 64
+MAX_VENTANA_SEQ = 1024
+
+# Resultado de TablaDispositivos.registrar_secuencia
+SEQ_NUEVA = 0  # Más reciente que ultima_seq
+SEQ_TARDIA = 1  # Atrasada, llenó un hueco de la ventana
+SEQ_DUPLICADA = 2  # Ya recibida
+SEQ_ANTIGUA = 3  # Más vieja que la ventana: no se puede saber, se descarta
+
+_MASCARA_SACK = (1 << BITS_SACK) - 1
+# Un ACK acumulado trabado en un hueco perdido se resincroniza con la ventana
+# antes de quedar a media vuelta del espacio de secuencias (el dispositivo ya
+# abandonó ese mensaje hace mucho)
+DISTANCIA_RESINCRONIZAR = MAX_SEQ // 4
+
+# Campos de cada dispositivo (mismas claves que el dict anterior)
+CAMPOS_DISPOSITIVO = (
+    "primera_conexion",
+    "ultima_conexion",
+    "ultima_seq",
+    "mensajes_recibidos",
+    "ultima_pos",
+    "ultima_velocidad",
+    "ultimo_rumbo",
+    "bateria",
+    "flags",
+    "perdidos",
+    "reordenados",
+    "duplicados",
+)
+_CAMPOS = frozenset(CAMPOS_DISPOSITIVO)
+# Campos internos (no forman parte de la vista tipo dict)
+_INTERNOS = ("ventana", "acumulado", "referencia")
+
+
+class EstadoDispositivo:
+    """Estado de un dispositivo; admite registro.campo y registro["campo"]"""
+
+    __slots__ = CAMPOS_DISPOSITIVO + _INTERNOS
+
+    def __init__(self, ahora):
+        self.primera_conexion = ahora
+        self.ultima_conexion = ahora
+        self.ultima_seq = 0
+        self.mensajes_recibidos = 0
+        self.ultima_pos = None  # (lat, lon)
+        self.ultima_velocidad = 0
+        self.ultimo_rumbo = 0
+        self.bateria = BATERIA_INICIAL
+        self.flags = 0
+        self.perdidos = 0  # Secuencias saltadas que no llegaron (todavía)
+        self.reordenados = 0  # Llegaron tarde pero dentro de la ventana
+        self.duplicados = 0
+        self.ventana = 1  # Bitmap: la secuencia inicial 0 cuenta como vista
+        self.acumulado = 0  # Última seq con todas las anteriores recibidas
+        # Última posición (MensajeGPS) sobre la que se decodifica un TIPO_DELTA_GPS
+        self.referencia = None
+
+    # Acceso estilo dict, para el código que trataba el estado como dict
+
+    def __getitem__(self, campo):
+        if campo not in _CAMPOS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __setitem__(self, campo, valor):
+        if campo not in _CAMPOS:
+            raise KeyError(campo)
+        setattr(self, campo, valor)
+
+    def get(self, campo, defecto=None):
+        return getattr(self, campo) if campo in _CAMPOS else defecto
+
+    def keys(self):
+        return CAMPOS_DISPOSITIVO
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in CAMPOS_DISPOSITIVO}
+
+    def __getstate__(self):
+        return tuple(getattr(self, campo) for campo in self.__slots__)
+
+    def __setstate__(self, estado):
+        for campo, valor in zip(self.__slots__, estado):
+            setattr(self, campo, valor)
+
+    def __eq__(self, otro):
+        if isinstance(otro, EstadoDispositivo):
+            otro = otro.como_dict()
+        return self.como_dict() == otro
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"EstadoDispositivo({self.como_dict()!r})"
+
+
+class TablaDispositivos:
+    """{id_dispositivo: EstadoDispositivo} sobre una lista de 65.536 ranuras"""
+
+    def __init__(self, capacidad=CAPACIDAD_IDS, tam_ventana=TAM_VENTANA_SEQ):
+        if not MIN_VENTANA_SEQ <= tam_ventana <= MAX_VENTANA_SEQ:
+            raise ValueError(
+                f"tam_ventana debe estar entre {MIN_VENTANA_SEQ} y {MAX_VENTANA_SEQ}"
+            )
+        self.capacidad = capacidad
+        self.tam_ventana = tam_ventana
+        self._mascara = (1 << tam_ventana) - 1
+        self.registros = [None] * capacidad
+        self._activos = 0
+
+    def registrar(self, id_dispositivo, ahora):
+        """
+        Marca actividad del dispositivo en el instante ahora
+
+        Retorna (registro, es_nuevo); un dispositivo nuevo arranca con
+        seq 0, sin posición y batería 100.
+        """
+        registro = self.registros[id_dispositivo]
+        if registro is not None:
+            registro.ultima_conexion = ahora
+            return registro, False
+        registro = self.registros[id_dispositivo] = EstadoDispositivo(ahora)
+        # Lo anterior al primer mensaje no cuenta como hueco (ver resumen_ack)
+        registro.ventana = self._mascara
+        self._activos += 1
+        return registro, True
+
+    def registrar_secuencia(self, estado, seq):
+        """
+        Clasifica la secuencia seq recibida del dispositivo con estado
+
+        Retorna (resultado, n): resultado es SEQ_NUEVA, SEQ_TARDIA,
+        SEQ_DUPLICADA o SEQ_ANTIGUA; n es la cantidad de secuencias saltadas
+        (solo con SEQ_NUEVA). Actualiza ultima_seq, la ventana y los
+        contadores perdidos/reordenados/duplicados del dispositivo.
+        """
+        adelante = (seq - estado.ultima_seq) % MAX_SEQ
+        if 0 < adelante < MAX_SEQ // 2:
+            if (seq - estado.acumulado) % MAX_SEQ >= self.tam_ventana:
+                # Lo que sale de la ventana ya no se puede consultar después
+                self._avanzar_acumulado(estado)
+            if adelante < self.tam_ventana:
+                estado.ventana = ((estado.ventana << adelante) | 1) & self._mascara
+            else:
+                estado.ventana = 1
+            estado.ultima_seq = seq
+            estado.perdidos += adelante - 1
+            return SEQ_NUEVA, adelante - 1
+        atras = MAX_SEQ - adelante if adelante else 0
+        if atras >= self.tam_ventana:
+            estado.duplicados += 1
+            return SEQ_ANTIGUA, 0
+        bit = 1 << atras
+        if estado.ventana & bit:
+            estado.duplicados += 1
+            return SEQ_DUPLICADA, 0
+        estado.ventana |= bit
+        estado.perdidos -= 1
+        estado.reordenados += 1
+        return SEQ_TARDIA, 0
+
+    def _avanzar_acumulado(self, estado):
+        """
+        Avanza estado.acumulado hasta antes del primer hueco que le sigue
+
+        Si ese hueco ya salió de la ventana no llegó nunca: acumulado queda
+        trabado (el dispositivo lo cuenta como abandonado) hasta alejarse
+        DISTANCIA_RESINCRONIZAR secuencias.
+        """
+        distancia = (estado.ultima_seq - estado.acumulado) % MAX_SEQ
+        if distancia >= self.tam_ventana:
+            if distancia < DISTANCIA_RESINCRONIZAR:
+                return
+            distancia = self.tam_ventana
+        huecos = ~estado.ventana & ((1 << distancia) - 1)
+        estado.acumulado = (estado.ultima_seq - huecos.bit_length()) % MAX_SEQ
+
+    def resumen_ack(self, estado):
+        """
+        (acumulado, seq_mas_alta, mapa_sack) para un ACK selectivo
+
+        acumulado es la secuencia anterior al primer hueco (sin huecos,
+        ultima_seq): todo lo anterior llegó. El mapa son los BITS_SACK bits
+        más recientes de la ventana.
+        """
+        self._avanzar_acumulado(estado)
+        return estado.acumulado, estado.ultima_seq, estado.ventana & _MASCARA_SACK
+
+    def eliminar(self, id_dispositivo):
+        """Olvida el dispositivo; retorna su último estado o None"""
+        registro = self.registros[id_dispositivo]
+        if registro is not None:
+            self.registros[id_dispositivo] = None
+            self._activos -= 1
+        return registro
+
+    def como_dict(self):
+        """Copia {id_dispositivo: {campo: valor}} de los dispositivos registrados"""
+        return {id_disp: registro.como_dict() for id_disp, registro in self.items()}
+
+    # Interfaz de dict
+
+    def __len__(self):
+        return self._activos
+
+    def __contains__(self, id_dispositivo):
+        return self.get(id_dispositivo) is not None
+
+    def get(self, id_dispositivo, defecto=None):
+        if isinstance(id_dispositivo, int) and 0 <= id_dispositivo < self.capacidad:
+            registro = self.registros[id_dispositivo]
+            if registro is not None:
+                return registro
+        return defecto
+
+    def __getitem__(self, id_dispositivo):
+        registro = self.get(id_dispositivo)
+        if registro is None:
+            raise KeyError(id_dispositivo)
+        return registro
+
+    def items(self):
+        """(id, registro) de los dispositivos registrados, por ID ascendente"""
+        return (
+            (id_disp, registro)
+            for id_disp, registro in enumerate(self.registros)
+            if registro is not None
+        )
+
+    def keys(self):
+        return (id_disp for id_disp, _ in self.items())
+
+    def values(self):
+        return (registro for registro in self.registros if registro is not None)
+
+    __iter__ = keys
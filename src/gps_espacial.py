@@ -0,0 +1,215 @@
+"""
+Índice espacial de las últimas posiciones de los dispositivos
+Redes de Computadoras - Práctica 3
+
+Grilla uniforme en grados: cada celda guarda el conjunto de dispositivos
+cuya última posición cae en ella. Actualizar una posición cuesta O(1) (solo
+se mueve de conjunto si cambió de celda) y las consultas revisan solo las
+celdas que pueden contener resultados:
+
+- en_rectangulo: dispositivos dentro de un rectángulo lat/lon
+- en_radio: dispositivos a menos de radio_m metros de un punto
+- cercanos: los k dispositivos más cercanos a un punto
+
+Las distancias son de gran círculo (haversine), en metros. Los rectángulos
+que cruzan el antimeridiano (±180°) no están soportados.
+"""
+
+import heapq
+import math
+
+RADIO_TIERRA_M = 6_371_000.0
+METROS_POR_GRADO = math.pi * RADIO_TIERRA_M / 180.0
+TAM_CELDA_GRADOS = 0.01  # ~1.1 km de latitud
+_MEDIO_RADIAN = math.pi / 360.0  # Grados -> radianes / 2
+
+
+def _haversine(lat1, lon1, cos1, lat2, lon2, cos2):
+    """distancia_m con los cosenos de las latitudes ya calculados"""
+    s_lat = math.sin((lat2 - lat1) * _MEDIO_RADIAN)
+    s_lon = math.sin((lon2 - lon1) * _MEDIO_RADIAN)
+    a = s_lat * s_lat + cos1 * cos2 * s_lon * s_lon
+    return 2 * RADIO_TIERRA_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distancia_m(lat1, lon1, lat2, lon2):
+    """Distancia de gran círculo entre dos puntos (grados) en metros"""
+    return _haversine(
+        lat1,
+        lon1,
+        math.cos(math.radians(lat1)),
+        lat2,
+        lon2,
+        math.cos(math.radians(lat2)),
+    )
+
+
+class IndiceEspacial:
+    """Grilla de celdas {(fila, columna): {id_dispositivo, ...}}"""
+
+    def __init__(self, tam_celda=TAM_CELDA_GRADOS):
+        self.tam_celda = tam_celda
+        self._celdas = {}
+        self._posiciones = {}  # {id_dispositivo: (lat, lon, celda, cos(lat))}
+
+    def __len__(self):
+        return len(self._posiciones)
+
+    def _celda(self, lat, lon):
+        t = self.tam_celda
+        return (math.floor(lat / t), math.floor(lon / t))
+
+    def actualizar(self, id_dispositivo, lat, lon):
+        """Registra la última posición del dispositivo"""
+        celda = self._celda(lat, lon)
+        anterior = self._posiciones.get(id_dispositivo)
+        if anterior is None or anterior[2] != celda:
+            if anterior is not None:
+                self._quitar_de_celda(id_dispositivo, anterior[2])
+            miembros = self._celdas.get(celda)
+            if miembros is None:
+                miembros = self._celdas[celda] = set()
+            miembros.add(id_dispositivo)
+        coseno = math.cos(math.radians(lat))
+        self._posiciones[id_dispositivo] = (lat, lon, celda, coseno)
+
+    def _quitar_de_celda(self, id_dispositivo, celda):
+        miembros = self._celdas[celda]
+        miembros.discard(id_dispositivo)
+        if not miembros:
+            del self._celdas[celda]
+
+    def eliminar(self, id_dispositivo):
+        """Quita un dispositivo del índice (si estaba)"""
+        anterior = self._posiciones.pop(id_dispositivo, None)
+        if anterior is not None:
+            self._quitar_de_celda(id_dispositivo, anterior[2])
+
+    def posicion(self, id_dispositivo):
+        """(lat, lon) del dispositivo o None"""
+        anterior = self._posiciones.get(id_dispositivo)
+        return None if anterior is None else anterior[:2]
+
+    def _candidatos(self, lat_min, lon_min, lat_max, lon_max):
+        """Dispositivos de las celdas que tocan el rectángulo"""
+        fila_min, col_min = self._celda(lat_min, lon_min)
+        fila_max, col_max = self._celda(lat_max, lon_max)
+        celdas = self._celdas
+        if (fila_max - fila_min + 1) * (col_max - col_min + 1) > len(celdas):
+            # Rectángulo grande frente a la grilla ocupada: recorrer lo ocupado
+            for (fila, col), miembros in celdas.items():
+                if fila_min <= fila <= fila_max and col_min <= col <= col_max:
+                    yield from miembros
+            return
+        for fila in range(fila_min, fila_max + 1):
+            for col in range(col_min, col_max + 1):
+                miembros = celdas.get((fila, col))
+                if miembros:
+                    yield from miembros
+
+    def en_rectangulo(self, lat_min, lon_min, lat_max, lon_max):
+        """IDs de los dispositivos dentro del rectángulo (bordes incluidos)"""
+        posiciones = self._posiciones
+        resultado = []
+        for id_disp in self._candidatos(lat_min, lon_min, lat_max, lon_max):
+            lat, lon, _, _ = posiciones[id_disp]
+            if lat_min <= lat <= lat_max and lon_min <= lon <= lon_max:
+                resultado.append(id_disp)
+        return resultado
+
+    def _rectangulo_de_radio(self, lat, lon, radio_m):
+        d_lat = radio_m / METROS_POR_GRADO
+        lat_min = max(-90.0, lat - d_lat)
+        lat_max = min(90.0, lat + d_lat)
+        coseno = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+        if coseno < 1e-9:
+            return lat_min, -180.0, lat_max, 180.0
+        d_lon = min(180.0, d_lat / coseno)
+        return lat_min, lon - d_lon, lat_max, lon + d_lon
+
+    def en_radio(self, lat, lon, radio_m):
+        """[(distancia_m, id)] de los dispositivos a <= radio_m, ordenados"""
+        posiciones = self._posiciones
+        coseno = math.cos(math.radians(lat))
+        lat_min, lon_min, lat_max, lon_max = self._rectangulo_de_radio(lat, lon, radio_m)
+        resultado = []
+        for id_disp in self._candidatos(lat_min, lon_min, lat_max, lon_max):
+            lat_d, lon_d, _, cos_d = posiciones[id_disp]
+            # El rectángulo contiene al círculo: descarte barato antes de haversine
+            if not (lat_min <= lat_d <= lat_max and lon_min <= lon_d <= lon_max):
+                continue
+            distancia = _haversine(lat, lon, coseno, lat_d, lon_d, cos_d)
+            if distancia <= radio_m:
+                resultado.append((distancia, id_disp))
+        resultado.sort()
+        return resultado
+
+    def cercanos(self, lat, lon, k):
+        """
+        [(distancia_m, id)] de los k dispositivos más cercanos, ordenados
+
+        Recorre anillos de celdas alrededor del punto hasta que el anillo
+        siguiente ya no puede contener algo más cercano que el k-ésimo.
+        """
+        if k <= 0 or not self._posiciones:
+            return []
+        posiciones = self._posiciones
+        celdas = self._celdas
+        if k >= len(posiciones):
+            return sorted(
+                (distancia_m(lat, lon, p[0], p[1]), id_disp)
+                for id_disp, p in posiciones.items()
+            )
+
+        coseno = math.cos(math.radians(lat))
+        fila0, col0 = self._celda(lat, lon)
+        mejores = []  # Heap de (-distancia, id) con los k mejores
+        anillo = 0
+        while True:
+            if 8 * anillo > len(celdas):
+                # Grilla dispersa: más barato revisar todo lo que queda
+                for id_disp, (lat_d, lon_d, celda, cos_d) in posiciones.items():
+                    if max(abs(celda[0] - fila0), abs(celda[1] - col0)) >= anillo:
+                        distancia = _haversine(lat, lon, coseno, lat_d, lon_d, cos_d)
+                        self._considerar(mejores, k, distancia, id_disp)
+                break
+            for fila, col in self._anillo(fila0, col0, anillo):
+                miembros = celdas.get((fila, col))
+                if miembros:
+                    for id_disp in miembros:
+                        lat_d, lon_d, _, cos_d = posiciones[id_disp]
+                        distancia = _haversine(lat, lon, coseno, lat_d, lon_d, cos_d)
+                        self._considerar(mejores, k, distancia, id_disp)
+            if len(mejores) == k and self._cota_anillo(lat, anillo + 1) > -mejores[0][0]:
+                break
+            anillo += 1
+        return sorted((-distancia, id_disp) for distancia, id_disp in mejores)
+
+    @staticmethod
+    def _considerar(mejores, k, distancia, id_disp):
+        if len(mejores) < k:
+            heapq.heappush(mejores, (-distancia, id_disp))
+        elif distancia < -mejores[0][0]:
+            heapq.heapreplace(mejores, (-distancia, id_disp))
+
+    @staticmethod
+    def _anillo(fila0, col0, r):
+        """Celdas a distancia de Chebyshev exactamente r de (fila0, col0)"""
+        if r == 0:
+            yield (fila0, col0)
+            return
+        for col in range(col0 - r, col0 + r + 1):
+            yield (fila0 - r, col)
+            yield (fila0 + r, col)
+        for fila in range(fila0 - r + 1, fila0 + r):
+            yield (fila, col0 - r)
+            yield (fila, col0 + r)
+
+    def _cota_anillo(self, lat, r):
+        """Distancia mínima posible (m) a cualquier celda del anillo r"""
+        if r <= 1:
+            return 0.0
+        grados = (r - 1) * self.tam_celda
+        # Hacia los polos un grado de longitud mide menos: usar el peor caso
+        lat_lejana = min(90.0, abs(lat) + r * self.tam_celda)
+        return grados * METROS_POR_GRADO * math.cos(math.radians(lat_lejana))
@@ -0,0 +1,163 @@
+"""
+Expiración de dispositivos inactivos y alertas por falta de reportes
+Redes de Computadoras - Práctica 3
+
+RuedaTemporal es una rueda de tiempo con ranuras de `resolucion` segundos:
+programar un vencimiento cuesta O(1) y cada revisión solo mira las ranuras
+cuyo tiempo ya pasó, así que el costo por tick no depende del tamaño de la
+flota sino de cuántos vencimientos caen en ese tick.
+
+VigilanciaInactividad mantiene una sola entrada por dispositivo en la
+rueda. Los paquetes no la tocan (solo actualizan ultima_conexion): cuando la
+entrada vence se compara con ultima_conexion y, si el dispositivo reportó
+mientras tanto, se reprograma para su nuevo vencimiento. Así se detecta:
+
+- alerta: sin reportes (datos ni heartbeats) durante alerta_seg; una vez
+  por período de silencio
+- expiración: sin reportes durante expirar_seg; el dispositivo se quita de
+  la tabla
+"""
+
+import math
+
+RESOLUCION_RUEDA = 1.0  # Segundos por ranura
+RANURAS_RUEDA = 1024
+
+
+class RuedaTemporal:
+    """Rueda de tiempo: programar(vence, clave) y vencidos(ahora)"""
+
+    def __init__(self, resolucion=RESOLUCION_RUEDA, ranuras=RANURAS_RUEDA):
+        self.resolucion = resolucion
+        self._ranuras = [[] for _ in range(ranuras)]
+        self._tick = None  # Último tick revisado
+        self._cantidad = 0
+
+    def __len__(self):
+        return self._cantidad
+
+    def programar(self, vence, clave):
+        """Agrega clave para que salga en vencidos() desde el instante vence"""
+        tick = math.ceil(vence / self.resolucion)
+        if self._tick is not None and tick <= self._tick:
+            tick = self._tick + 1
+        self._ranuras[tick % len(self._ranuras)].append((tick, clave))
+        self._cantidad += 1
+        return tick
+
+    def vencidos(self, ahora):
+        """Lista de (tick, clave) vencidos hasta ahora, quitados de la rueda"""
+        actual = math.floor(ahora / self.resolucion)
+        if self._tick is None:
+            # Primera revisión: todo lo programado hasta ahora sigue pendiente
+            self._tick = min(
+                (tick for ranura in self._ranuras for tick, _ in ranura),
+                default=actual + 1,
+            ) - 1
+        if actual <= self._tick:
+            return []
+        n = len(self._ranuras)
+        if actual - self._tick >= n:
+            indices = range(n)  # Pasó una vuelta completa: revisar todas
+        else:
+            indices = (t % n for t in range(self._tick + 1, actual + 1))
+        resultado = []
+        for indice in indices:
+            ranura = self._ranuras[indice]
+            if not ranura:
+                continue
+            pendientes = []
+            for entrada in ranura:
+                if entrada[0] <= actual:
+                    resultado.append(entrada)
+                else:
+                    pendientes.append(entrada)  # Vuelta siguiente
+            self._ranuras[indice] = pendientes
+        self._tick = actual
+        self._cantidad -= len(resultado)
+        return resultado
+
+
+class VigilanciaInactividad:
+    """Alertas y expiración por ultima_conexion de una TablaDispositivos"""
+
+    def __init__(
+        self,
+        tabla,
+        expirar_seg=None,
+        alerta_seg=None,
+        resolucion=RESOLUCION_RUEDA,
+    ):
+        if not expirar_seg and not alerta_seg:
+            raise ValueError("Indicar expirar_seg y/o alerta_seg")
+        if expirar_seg and alerta_seg and alerta_seg >= expirar_seg:
+            alerta_seg = None  # Expiraría antes de alertar
+        self.tabla = tabla
+        self.expirar_seg = expirar_seg or None
+        self.alerta_seg = alerta_seg or None
+        self.rueda = RuedaTemporal(resolucion)
+        self._programado = {}  # {id_dispositivo: tick de su entrada en la rueda}
+        self._alertado = {}  # {id_dispositivo: ultima_conexion al alertar}
+
+    def vigilar(self, id_dispositivo, ultima_conexion):
+        """Empieza a vigilar un dispositivo recién registrado"""
+        if id_dispositivo not in self._programado:
+            self._programar(id_dispositivo, ultima_conexion)
+
+    def olvidar(self, id_dispositivo):
+        """Deja de vigilar (su entrada en la rueda se ignora al vencer)"""
+        self._programado.pop(id_dispositivo, None)
+        self._alertado.pop(id_dispositivo, None)
+
+    def alertas_activas(self):
+        """IDs alertados que no volvieron a reportar"""
+        return list(self._alertado)
+
+    def _programar(self, id_dispositivo, ultima_conexion, ahora=None):
+        vence = math.inf
+        if self.expirar_seg:
+            vence = ultima_conexion + self.expirar_seg
+        if self.alerta_seg:
+            if id_dispositivo in self._alertado:
+                # Ya alertado: volver a mirar si reportó dentro de alerta_seg
+                vence = min(vence, ahora + self.alerta_seg)
+            else:
+                vence = min(vence, ultima_conexion + self.alerta_seg)
+        self._programado[id_dispositivo] = self.rueda.programar(vence, id_dispositivo)
+
+    def revisar(self, ahora):
+        """
+        Procesa los vencimientos hasta ahora
+
+        Retorna (alertas, expirados): listas de (id_dispositivo, silencio_seg).
+        Los expirados ya no se vigilan; quitarlos de la tabla queda a cargo
+        de quien llama.
+        """
+        alertas = []
+        expirados = []
+        for tick, id_disp in self.rueda.vencidos(ahora):
+            if self._programado.get(id_disp) != tick:
+                continue  # Entrada de un dispositivo olvidado
+            estado = self.tabla.get(id_disp)
+            if estado is None:
+                self.olvidar(id_disp)
+                continue
+            ultima = estado.ultima_conexion
+            silencio = ahora - ultima
+            alertado = self._alertado.get(id_disp)
+            if alertado is not None and ultima > alertado:
+                # Volvió a reportar después de la alerta
+                del self._alertado[id_disp]
+            if self.expirar_seg and silencio >= self.expirar_seg:
+                self.olvidar(id_disp)
+                expirados.append((id_disp, silencio))
+                continue
+            if (
+                self.alerta_seg
+                and silencio >= self.alerta_seg
+                and id_disp not in self._alertado
+            ):
+                self._alertado[id_disp] = ultima
+                alertas.append((id_disp, silencio))
+            self._programar(id_disp, ultima, ahora)
+        return alertas, expirados
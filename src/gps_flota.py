@@ -0,0 +1,299 @@
+"""
+Generador de carga - Flota de dispositivos GPS simulados
+Redes de Computadoras - Práctica 3
+
+Un solo proceso maneja N dispositivos virtuales (10.000 o más), cada uno
+con su propio estado de DispositivoGPS (posición, rumbo, batería y
+secuencia), sobre un bucle asyncio y un grupo pequeño de sockets UDP. Los
+envíos se reparten en ronda entre los dispositivos a la tasa objetivo; los
+ACK se asocian por (id, secuencia) sin esperar a ninguno, y al final se
+informa la tasa lograda, los percentiles de RTT del ACK y la pérdida.
+
+El RTT se mide desde el envío hasta que el bucle procesa el ACK, así que
+incluye la demora del propio generador si no da abasto.
+
+Ejemplo:
+    python src/gps_flota.py --dispositivos 10000 --tasa 20000 --duracion 30
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import sys
+import time
+from collections import deque
+
+from gps_cliente import DispositivoGPS
+from gps_metricas import HistogramaLatencia
+from gps_protocolo import PUERTO_SERVIDOR, TAM_MENSAJE_GPS, TIPO_ACK, desempaquetar_registro
+
+MAX_ID_DISPOSITIVO = 0xFFFF  # id_dispositivo es de 16 bits
+SOCKETS_FLOTA = 4
+TIMEOUT_ACK = 3.0
+PASO_ENVIO = 0.001  # Pausa del bucle de envío cuando va al día
+MAX_RAFAGA = 256  # Envíos seguidos antes de ceder el bucle a los ACK
+BUFFER_SOCKET = 4 * 1024 * 1024
+_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class _ProtocoloFlota(asyncio.DatagramProtocol):
+    """Recibe los ACK de uno de los sockets de la flota"""
+
+    def __init__(self, flota):
+        self.flota = flota
+
+    def datagram_received(self, data, addr):
+        self.flota._recibir(data)
+
+    def error_received(self, exc):
+        # p. ej. ICMP "puerto inaccesible" si el servidor no está escuchando
+        self.flota.errores_socket += 1
+
+
+class SimuladorFlota:
+    """N dispositivos virtuales que envían a la tasa objetivo y miden los ACK"""
+
+    def __init__(
+        self,
+        n_dispositivos,
+        servidor_ip="127.0.0.1",
+        servidor_puerto=PUERTO_SERVIDOR,
+        tasa=1000.0,
+        sockets=SOCKETS_FLOTA,
+        id_base=1,
+        timeout_ack=TIMEOUT_ACK,
+        azar=None,
+    ):
+        """
+        Parámetros:
+        - n_dispositivos: dispositivos virtuales (IDs id_base..id_base+n-1)
+        - tasa: mensajes por segundo de toda la flota
+        - sockets: sockets UDP compartidos (el dispositivo i usa el i % sockets)
+        - timeout_ack: un mensaje sin ACK pasado este tiempo cuenta como perdido
+        """
+        if n_dispositivos < 1 or id_base + n_dispositivos - 1 > MAX_ID_DISPOSITIVO:
+            raise ValueError(
+                f"los IDs de la flota deben estar entre 0 y {MAX_ID_DISPOSITIVO}"
+            )
+        if tasa <= 0:
+            raise ValueError("tasa debe ser mayor a 0")
+        self.servidor = (servidor_ip, servidor_puerto)
+        self.tasa = float(tasa)
+        self.n_sockets = max(1, min(int(sockets), n_dispositivos))
+        self.timeout_ack = timeout_ack
+        azar = azar or random.Random()
+        self.dispositivos = [
+            _dispositivo_inicial(id_base + i, servidor_ip, servidor_puerto, azar)
+            for i in range(n_dispositivos)
+        ]
+
+        self.enviados = 0
+        self.acks = 0
+        self.acks_tardios = 0  # Llegaron después del timeout o repetidos
+        self.perdidos = 0
+        self.errores_socket = 0
+        self.rtt = HistogramaLatencia()  # ns
+        self.duracion = 0.0
+        # (id, seq) -> instante de envío; la cola mantiene el orden de envío
+        self._pendientes = {}
+        self._orden_envio = deque()
+
+    def _recibir(self, data):
+        datos, _ = desempaquetar_registro(data)
+        if not datos or datos.tipo != TIPO_ACK:
+            return
+        enviado = self._pendientes.pop((datos.id_dispositivo, datos.secuencia), None)
+        if enviado is None:
+            self.acks_tardios += 1
+            return
+        self.acks += 1
+        self.rtt.registrar(time.perf_counter_ns() - enviado)
+
+    def _expirar(self, limite):
+        """Da por perdidos los mensajes enviados antes de limite (ns) sin ACK"""
+        orden = self._orden_envio
+        pendientes = self._pendientes
+        while orden and orden[0][0] < limite:
+            enviado, clave = orden.popleft()
+            if pendientes.get(clave) == enviado:
+                del pendientes[clave]
+                self.perdidos += 1
+
+    async def _abrir_sockets(self):
+        loop = asyncio.get_running_loop()
+        transportes = []
+        for _ in range(self.n_sockets):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUFFER_SOCKET)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, BUFFER_SOCKET)
+            except OSError:
+                pass  # El sistema puede limitar el tamaño; no es imprescindible
+            sock.bind(("0.0.0.0", 0))
+            transporte, _ = await loop.create_datagram_endpoint(
+                lambda: _ProtocoloFlota(self), sock=sock
+            )
+            transportes.append(transporte)
+        return transportes
+
+    async def ejecutar(self, duracion, informar_cada=None):
+        """
+        Envía durante duracion segundos y espera los ACK pendientes
+
+        Parámetros:
+        - informar_cada: segundos entre líneas de progreso (None = sin progreso)
+        """
+        transportes = await self._abrir_sockets()
+        dispositivos = self.dispositivos
+        n = len(dispositivos)
+        k = self.n_sockets
+        destino = self.servidor
+        pendientes = self._pendientes
+        orden = self._orden_envio
+        reloj_ns = time.perf_counter_ns
+        timeout_ns = int(self.timeout_ack * 1e9)
+        # Un solo buffer para todos los envíos: sendto lo copia si debe encolarlo
+        mensaje = bytearray(TAM_MENSAJE_GPS)
+
+        inicio = time.perf_counter()
+        fin = inicio + duracion
+        proximo_informe = inicio + informar_cada if informar_cada else None
+        siguiente = 0  # Próximo dispositivo de la ronda
+        try:
+            while True:
+                ahora = time.perf_counter()
+                if ahora >= fin:
+                    break
+                objetivo = int((ahora - inicio) * self.tasa)
+                rafaga = min(objetivo - self.enviados, MAX_RAFAGA)
+                for _ in range(rafaga):
+                    dispositivo = dispositivos[siguiente]
+                    dispositivo.simular_movimiento()
+                    dispositivo.construir_mensaje_en(mensaje)
+                    enviado = reloj_ns()
+                    clave = (dispositivo.id_dispositivo, dispositivo.secuencia)
+                    pendientes[clave] = enviado
+                    orden.append((enviado, clave))
+                    transportes[siguiente % k].sendto(mensaje, destino)
+                    siguiente = siguiente + 1 if siguiente + 1 < n else 0
+                self.enviados += max(rafaga, 0)
+                self._expirar(reloj_ns() - timeout_ns)
+
+                if proximo_informe is not None and ahora >= proximo_informe:
+                    proximo_informe += informar_cada
+                    self._informar_progreso(ahora - inicio)
+                # Atrasados: solo ceder el turno a los ACK; al día: esperar
+                await asyncio.sleep(0 if rafaga == MAX_RAFAGA else PASO_ENVIO)
+            self.duracion = time.perf_counter() - inicio
+
+            # Esperar los ACK en vuelo
+            limite_espera = time.perf_counter() + self.timeout_ack
+            while pendientes and time.perf_counter() < limite_espera:
+                await asyncio.sleep(0.01)
+            self._expirar(float("inf"))
+        finally:
+            for transporte in transportes:
+                transporte.close()
+        return self
+
+    def _informar_progreso(self, transcurrido):
+        print(
+            f"[i] {transcurrido:5.1f}s  enviados {self.enviados}  ACK {self.acks}  "
+            f"en vuelo {len(self._pendientes)}  perdidos {self.perdidos}"
+        )
+
+    def resumen(self):
+        """Texto con tasa lograda, pérdida y percentiles de RTT"""
+        tasa_lograda = self.enviados / self.duracion if self.duracion else 0.0
+        perdida = 100.0 * self.perdidos / self.enviados if self.enviados else 0.0
+        lineas = [
+            "=" * 60,
+            "  RESULTADO DE LA FLOTA",
+            "=" * 60,
+            f"  Dispositivos: {len(self.dispositivos)} en {self.n_sockets} socket(s)",
+            f"  Tasa objetivo: {self.tasa:,.0f} msg/s  lograda: {tasa_lograda:,.0f} msg/s",
+            f"  Enviados: {self.enviados}  ACK: {self.acks}  "
+            f"perdidos: {self.perdidos} ({perdida:.2f}%)",
+        ]
+        if self.acks_tardios:
+            lineas.append(f"  ACK tardíos o repetidos: {self.acks_tardios}")
+        if self.errores_socket:
+            lineas.append(f"  Errores de socket: {self.errores_socket}")
+        if self.rtt.cuenta:
+            valores = "  ".join(
+                f"p{p:g} {self.rtt.percentil(p) / 1e6:.2f}" for p in _PERCENTILES
+            )
+            lineas.append(f"  RTT ACK (ms): {valores}")
+        lineas.append("=" * 60)
+        return "\n".join(lineas)
+
+
+def _dispositivo_inicial(id_dispositivo, servidor_ip, servidor_puerto, azar):
+    """DispositivoGPS con posición y movimiento al azar alrededor de Cochabamba"""
+    # La flota solo mide ACK simples (uno por mensaje)
+    dispositivo = DispositivoGPS(
+        id_dispositivo,
+        servidor_ip,
+        servidor_puerto,
+        mostrar_cabecera=False,
+        ack_selectivo=False,
+    )
+    dispositivo.latitud += azar.uniform(-0.05, 0.05)
+    dispositivo.longitud += azar.uniform(-0.05, 0.05)
+    dispositivo.bateria = azar.uniform(30, 100)
+    dispositivo.rumbo = azar.uniform(0, 360)
+    if azar.random() < 0.7:  # La mayoría circulando
+        dispositivo.velocidad = azar.uniform(20, 90)
+        dispositivo.en_movimiento = True
+        dispositivo.ignicion = True
+    return dispositivo
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(
+        description="Simula una flota de dispositivos GPS desde un solo proceso"
+    )
+    parser.add_argument("--ip", dest="servidor_ip", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=PUERTO_SERVIDOR)
+    parser.add_argument("--dispositivos", type=int, default=10_000)
+    parser.add_argument("--tasa", type=float, default=10_000, help="mensajes/s de toda la flota")
+    parser.add_argument("--duracion", type=float, default=10.0, help="segundos de envío")
+    parser.add_argument("--sockets", type=int, default=SOCKETS_FLOTA)
+    parser.add_argument("--id-base", dest="id_base", type=int, default=1)
+    parser.add_argument("--timeout-ack", dest="timeout_ack", type=float, default=TIMEOUT_ACK)
+    parser.add_argument("--semilla", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.semilla is not None:
+        random.seed(args.semilla)  # simular_movimiento usa el módulo random
+    try:
+        flota = SimuladorFlota(
+            args.dispositivos,
+            servidor_ip=args.servidor_ip,
+            servidor_puerto=args.puerto,
+            tasa=args.tasa,
+            sockets=args.sockets,
+            id_base=args.id_base,
+            timeout_ack=args.timeout_ack,
+            azar=random.Random(args.semilla),
+        )
+    except ValueError as e:
+        print(f"[✗] {e}")
+        sys.exit(1)
+
+    print(
+        f"[▶] {args.dispositivos} dispositivos -> {args.servidor_ip}:{args.puerto} "
+        f"a {args.tasa:,.0f} msg/s durante {args.duracion:g}s (Ctrl+C para detener)\n"
+    )
+    try:
+        asyncio.run(flota.ejecutar(args.duracion, informar_cada=1.0))
+    except KeyboardInterrupt:
+        print("\n[■] Detenido por el usuario")
+        flota.duracion = flota.duracion or args.duracion
+    print("\n" + flota.resumen() + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Escritor de log del servidor GPS con buffer y rotación
+Redes de Computadoras - Práctica 3
+
+Mantiene el archivo abierto y el tamaño en memoria: los registros se
+acumulan y se escriben en bloque cuando el buffer supera tam_buffer bytes o
+cuando el servidor llama a vaciar() desde una tarea periódica. La rotación
+no consulta el sistema de archivos (salvo al crear el escritor) y conserva hasta
+`generaciones` archivos anteriores: log.1 (el más reciente) ... log.N.
+"""
+
+import os
+from datetime import datetime
+
+from gps_protocolo import convertir_coordenadas
+
+# Política de fsync
+FSYNC_NUNCA = "nunca"  # El sistema operativo decide cuándo bajar a disco
+FSYNC_VACIADO = "vaciado"  # fsync después de cada escritura en bloque
+FSYNC_ROTACION = "rotacion"  # fsync solo al rotar y al cerrar
+POLITICAS_FSYNC = (FSYNC_NUNCA, FSYNC_VACIADO, FSYNC_ROTACION)
+
+TAM_BUFFER_LOG = 64 * 1024
+INTERVALO_VACIADO_LOG = 1.0
+
+
+FORMATO_FECHA_LOG = "%Y-%m-%d %H:%M:%S"
+
+
+def formatear_fecha_log(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime(FORMATO_FECHA_LOG)
+
+
+def formatear_linea_log(datos, fecha):
+    """
+    Línea del log de texto (con salto de línea final):
+    fecha|GPSid|SEQn|lat|lon|altitud|velocidad|rumbo|bateria|0xFLAGS
+
+    datos: cualquier registro con los campos de MensajeGPS (por atributo)
+    fecha: datos.timestamp ya formateado con formatear_fecha_log
+    """
+    lat, lon = convertir_coordenadas(datos.latitud, datos.longitud)
+    return (
+        f"{fecha}|GPS{datos.id_dispositivo}|SEQ{datos.secuencia}|"
+        f"{lat:.7f}|{lon:.7f}|{datos.altitud}|"
+        f"{datos.velocidad / 10.0:.1f}|{datos.rumbo / 10.0:.1f}|"
+        f"{datos.bateria}|0x{datos.flags:02X}\n"
+    )
+
+
+def leer_linea_log(linea):
+    """
+    Inversa de formatear_linea_log: diccionario con los valores en el
+    formato del protocolo (coordenadas en 1e-7 grados, velocidad y rumbo en
+    décimas). Lanza ValueError si la línea no tiene el formato esperado.
+    """
+    campos = linea.rstrip("\r\n").split("|")
+    if len(campos) != 10 or not campos[1].startswith("GPS"):
+        raise ValueError(f"Línea de log inválida: {linea!r}")
+    fecha, disp, seq, lat, lon, alt, vel, rumbo, bateria, flags = campos
+    return {
+        "timestamp": int(datetime.strptime(fecha, FORMATO_FECHA_LOG).timestamp()),
+        "id_dispositivo": int(disp[3:]),
+        "secuencia": int(seq[3:]),
+        "latitud": round(float(lat) * 10000000),
+        "longitud": round(float(lon) * 10000000),
+        "altitud": int(alt),
+        "velocidad": round(float(vel) * 10),
+        "rumbo": round(float(rumbo) * 10),
+        "bateria": int(bateria),
+        "flags": int(flags, 16),
+    }
+
+
+class EscritorLog:
+    """Log de texto por líneas con escritura en bloque y N generaciones"""
+
+    def __init__(
+        self,
+        ruta,
+        max_bytes=1_000_000,
+        generaciones=1,
+        tam_buffer=TAM_BUFFER_LOG,
+        fsync=FSYNC_NUNCA,
+    ):
+        if fsync not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync inválida: {fsync}")
+        if generaciones < 1:
+            raise ValueError("generaciones debe ser mayor o igual a 1")
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self.generaciones = generaciones
+        self.tam_buffer = tam_buffer
+        self.fsync = fsync
+
+        self._pendientes = []
+        self._bytes_pendientes = 0
+        self._archivo = None
+        # Bytes del archivo actual: se consulta una vez y luego se lleva en memoria
+        self.tam_archivo = os.path.getsize(ruta) if os.path.exists(ruta) else 0
+        self.registros = 0
+        self.escrituras = 0
+        self.rotaciones = 0
+
+    def _abrir(self):
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._archivo = open(self.ruta, "ab")
+
+    def escribir(self, linea):
+        """
+        Agrega una línea (ASCII, con su salto de línea) al buffer
+
+        Escribe en disco si el buffer se llenó y rota si el archivo alcanzó
+        max_bytes. Puede lanzar OSError.
+        """
+        self._pendientes.append(linea)
+        self._bytes_pendientes += len(linea)
+        self.registros += 1
+        if self.tam_archivo + self._bytes_pendientes >= self.max_bytes:
+            self.vaciar()
+            self.rotar()
+        elif self._bytes_pendientes >= self.tam_buffer:
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribe en el archivo todo lo acumulado (una sola llamada a write)"""
+        if not self._pendientes:
+            return
+        if self._archivo is None:
+            self._abrir()
+        datos = "".join(self._pendientes).encode()
+        self._archivo.write(datos)
+        self._archivo.flush()
+        # Solo se descarta lo pendiente si llegó al archivo: ante un OSError
+        # los registros siguen en el buffer para el próximo intento
+        self._pendientes.clear()
+        self._bytes_pendientes = 0
+        self.tam_archivo += len(datos)
+        self.escrituras += 1
+        if self.fsync == FSYNC_VACIADO:
+            os.fsync(self._archivo.fileno())
+
+    def rotar(self):
+        """log -> log.1 -> log.2 ... descartando la generación más antigua"""
+        self._cerrar_archivo()
+        for n in range(self.generaciones - 1, 0, -1):
+            anterior = f"{self.ruta}.{n}"
+            if os.path.exists(anterior):
+                os.replace(anterior, f"{self.ruta}.{n + 1}")
+        if os.path.exists(self.ruta):
+            os.replace(self.ruta, f"{self.ruta}.1")
+        self.tam_archivo = 0
+        self.rotaciones += 1
+
+    def _cerrar_archivo(self):
+        if self._archivo is None:
+            return
+        if self.fsync != FSYNC_NUNCA:
+            os.fsync(self._archivo.fileno())
+        self._archivo.close()
+        self._archivo = None
+
+    def cerrar(self):
+        """Escribe lo pendiente y cierra el archivo"""
+        try:
+            self.vaciar()
+        finally:
+            self._cerrar_archivo()
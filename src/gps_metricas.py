@@ -0,0 +1,331 @@
+"""
+Métricas en vivo del servidor GPS (formato de texto de Prometheus)
+Redes de Computadoras - Práctica 3
+
+ServidorMetricas atiende GET /metrics por HTTP (por defecto solo en
+127.0.0.1) desde un hilo propio; el texto se arma en cada consulta leyendo
+los contadores del servidor, así que la recepción no hace nada extra salvo
+contar datagramas y, en 1 de cada `muestreo`, medir la latencia de
+decodificación y de procesamiento en histogramas de memoria fija.
+
+HistogramaLatencia es log-lineal al estilo HDR: 16 cubetas por potencia de
+2 (error relativo <= 6,25 %), 656 enteros en total, registrar es O(1).
+En modo multiproceso cada trabajador copia sus histogramas a un arreglo
+compartido (publicar) y el proceso padre los suma (combinar) para /metrics.
+
+Ejemplo:
+    python src/gps_servidor.py 9999 --metricas-puerto 9108
+    curl -s http://127.0.0.1:9108/metrics
+"""
+
+import heapq
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOST_METRICAS = "127.0.0.1"
+PUERTO_METRICAS = 9108
+# Series de pérdida por dispositivo: solo los N con mayor fracción perdida
+MAX_DISPOSITIVOS_PERDIDA = 20
+
+_BITS_SUB = 4
+_SUB = 1 << _BITS_SUB  # Cubetas por potencia de 2
+_MAX_EXPONENTE = 40  # Hasta 2^40 ns (~18 minutos)
+_ULTIMA_CUBETA = (_MAX_EXPONENTE + 1) * _SUB - 1
+MUESTREO_LATENCIA = 16  # Se mide 1 de cada N datagramas
+_TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# Límites (le) exportados de los histogramas: potencias de 2 entre ~1 µs y ~1 s
+_LIMITES_EXPORTADOS = tuple(range(10, 31))
+_CUANTILES = (0.5, 0.9, 0.99, 0.999)
+# Enteros de un histograma en un arreglo compartido: cuenta, suma y cubetas
+_RANURAS_HISTOGRAMA = _ULTIMA_CUBETA + 3
+# Enteros de MetricasRecepcion.publicar: datagramas y los dos histogramas
+RANURAS_METRICAS = 1 + 2 * _RANURAS_HISTOGRAMA
+
+
+class HistogramaLatencia:
+    """Histograma de enteros (ns) con cubetas log-lineales de tamaño fijo"""
+
+    def __init__(self):
+        self.cubetas = [0] * (_ULTIMA_CUBETA + 1)
+        self.cuenta = 0
+        self.suma = 0
+
+    @staticmethod
+    def _indice(valor):
+        if valor < _SUB:
+            return max(valor, 0)
+        exponente = valor.bit_length() - _BITS_SUB - 1
+        indice = ((exponente + 1) << _BITS_SUB) + (valor >> exponente) - _SUB
+        return min(indice, _ULTIMA_CUBETA)
+
+    @staticmethod
+    def _limite_superior(indice):
+        """Mayor valor que cae en la cubeta indice"""
+        if indice < _SUB:
+            return indice
+        exponente = (indice >> _BITS_SUB) - 1
+        mantisa = (indice & (_SUB - 1)) + _SUB
+        return ((mantisa + 1) << exponente) - 1
+
+    def registrar(self, valor):
+        # Mismo cálculo que _indice, en línea: se llama desde la recepción
+        if valor < _SUB:
+            indice = valor if valor > 0 else 0
+        else:
+            exponente = valor.bit_length() - 5  # _BITS_SUB + 1
+            indice = ((exponente + 1) << 4) + (valor >> exponente) - _SUB
+            if indice > _ULTIMA_CUBETA:
+                indice = _ULTIMA_CUBETA
+        self.cubetas[indice] += 1
+        self.cuenta += 1
+        self.suma += valor
+
+    def percentil(self, p):
+        """Valor (cota superior de su cubeta) bajo el que cae el p% de las muestras"""
+        if not self.cuenta:
+            return 0
+        objetivo = max(1, round(self.cuenta * p / 100.0))
+        acumulado = 0
+        for indice, cantidad in enumerate(self.cubetas):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return self._limite_superior(indice)
+        return self._limite_superior(len(self.cubetas) - 1)
+
+    def acumulado_hasta(self, exponente):
+        """Muestras con valor < 2^exponente"""
+        return sum(self.cubetas[: self._indice(1 << exponente)])
+
+    def publicar(self, destino, base):
+        """Copia cuenta, suma y cubetas a destino[base:] (arreglo compartido)"""
+        destino[base] = self.cuenta
+        destino[base + 1] = self.suma
+        destino[base + 2 : base + _RANURAS_HISTOGRAMA] = self.cubetas
+
+    def sumar(self, origen, base):
+        """Acumula un histograma copiado con publicar"""
+        self.cuenta += origen[base]
+        self.suma += origen[base + 1]
+        cubetas = origen[base + 2 : base + _RANURAS_HISTOGRAMA]
+        self.cubetas = [a + b for a, b in zip(self.cubetas, cubetas)]
+
+
+class MetricasRecepcion:
+    """Histogramas de latencia y tasa de paquetes de un ServidorGPS"""
+
+    def __init__(self, muestreo=MUESTREO_LATENCIA):
+        self.muestreo = max(1, int(muestreo))
+        self.datagramas = 0
+        self.decodificacion = HistogramaLatencia()
+        self.procesamiento = HistogramaLatencia()
+        self.paquetes_por_segundo = 0.0
+        self._anterior = None  # (monotonic, mensajes recibidos)
+
+    def actualizar_tasa(self, recibidos, ahora=None):
+        """Tarea periódica: tasa desde la llamada anterior"""
+        if ahora is None:
+            ahora = time.monotonic()
+        if self._anterior is not None:
+            instante, cantidad = self._anterior
+            if ahora > instante:
+                self.paquetes_por_segundo = (recibidos - cantidad) / (ahora - instante)
+        self._anterior = (ahora, recibidos)
+
+    def publicar(self, destino, base):
+        """Copia datagramas e histogramas a destino[base:base + RANURAS_METRICAS]"""
+        destino[base] = self.datagramas
+        self.decodificacion.publicar(destino, base + 1)
+        self.procesamiento.publicar(destino, base + 1 + _RANURAS_HISTOGRAMA)
+
+    def combinar(self, origen, bases):
+        """Reemplaza datagramas e histogramas por la suma de los publicados"""
+        datagramas = 0
+        decodificacion = HistogramaLatencia()
+        procesamiento = HistogramaLatencia()
+        for base in bases:
+            datagramas += origen[base]
+            decodificacion.sumar(origen, base + 1)
+            procesamiento.sumar(origen, base + 1 + _RANURAS_HISTOGRAMA)
+        # Histogramas nuevos en vez de ponerlos a cero: /metrics los lee desde
+        # otro hilo y nunca ve uno a medio sumar
+        self.decodificacion = decodificacion
+        self.procesamiento = procesamiento
+        self.datagramas = datagramas
+
+
+def _linea(lineas, nombre, tipo, ayuda, valor, etiquetas=""):
+    lineas.append(f"# HELP {nombre} {ayuda}")
+    lineas.append(f"# TYPE {nombre} {tipo}")
+    lineas.append(f"{nombre}{etiquetas} {valor}")
+
+
+def _histograma(lineas, nombre, ayuda, histograma):
+    lineas.append(f"# HELP {nombre} {ayuda}")
+    lineas.append(f"# TYPE {nombre} histogram")
+    for exponente in _LIMITES_EXPORTADOS:
+        limite = (1 << exponente) / 1e9
+        cantidad = histograma.acumulado_hasta(exponente)
+        lineas.append(f'{nombre}_bucket{{le="{limite:.9g}"}} {cantidad}')
+    lineas.append(f'{nombre}_bucket{{le="+Inf"}} {histograma.cuenta}')
+    lineas.append(f"{nombre}_sum {histograma.suma / 1e9:.9f}")
+    lineas.append(f"{nombre}_count {histograma.cuenta}")
+
+
+def _peores_dispositivos(dispositivos, cantidad):
+    """(id, fracción perdida) de los `cantidad` dispositivos que más pierden"""
+    ratios = []
+    for id_disp, info in list(dispositivos.items()):
+        perdidos = info["perdidos"]
+        if perdidos:
+            ratios.append((perdidos / (info["mensajes_recibidos"] + perdidos), id_disp))
+    return [(id_disp, ratio) for ratio, id_disp in heapq.nlargest(cantidad, ratios)]
+
+
+def formatear_metricas(
+    servidor, dispositivos_activos=None, max_dispositivos=MAX_DISPOSITIVOS_PERDIDA
+):
+    """
+    Texto de exposición de Prometheus con el estado actual del servidor
+
+    La pérdida por dispositivo se limita a los max_dispositivos peores (0 la
+    omite): con miles de dispositivos, una serie por cada uno en cada
+    consulta haría crecer la respuesta y la cardinalidad sin límite.
+    """
+    if dispositivos_activos is None:
+        dispositivos_activos = len(servidor.dispositivos)
+    lineas = []
+    contadores = (
+        ("gps_mensajes_recibidos_total", "Mensajes aceptados", servidor.mensajes_recibidos),
+        ("gps_mensajes_duplicados_total", "Mensajes duplicados descartados",
+         servidor.mensajes_duplicados),
+        ("gps_mensajes_reordenados_total", "Mensajes atrasados aceptados",
+         servidor.mensajes_reordenados),
+        ("gps_errores_total", "Datagramas inválidos o fuera de ventana", servidor.errores),
+        ("gps_acks_enviados_total", "Datagramas de ACK enviados", servidor.acks_enviados),
+        ("gps_acks_selectivos_total", "ACK selectivos enviados (agrupados)",
+         servidor.acks_selectivos),
+        ("gps_lotes_fixes_total", "Datagramas con varias posiciones (TIPO_LOTE_GPS)",
+         servidor.lotes_fixes),
+        ("gps_deltas_recibidos_total", "Posiciones TIPO_DELTA_GPS reconstruidas",
+         servidor.deltas_recibidos),
+        ("gps_deltas_sin_referencia_total", "Deltas descartados por falta de keyframe",
+         servidor.deltas_sin_referencia),
+        ("gps_rechazados_autenticacion_total", "Datagramas sin TAG o con TAG inválido",
+         servidor.rechazados_autenticacion),
+        ("gps_acks_fallidos_total", "ACK que no se pudieron enviar", servidor.acks_fallidos),
+        ("gps_lotes_recibidos_total", "Despertares del bucle de recepción en lotes",
+         servidor.lotes_recibidos),
+        ("gps_salida_descartados_total", "Eventos de consola descartados",
+         servidor.salida.descartados),
+    )
+    for nombre, ayuda, valor in contadores:
+        _linea(lineas, nombre, "counter", ayuda, valor)
+    # Los perdidos bajan cuando un paquete atrasado llena el hueco
+    _linea(lineas, "gps_mensajes_perdidos", "gauge", "Secuencias que no llegaron",
+           servidor.mensajes_perdidos)
+    _linea(lineas, "gps_dispositivos_activos", "gauge", "Dispositivos registrados",
+           dispositivos_activos)
+    _linea(lineas, "gps_cola_salida", "gauge", "Eventos de consola pendientes",
+           servidor.salida.pendientes())
+    if servidor.sqlite is not None:
+        _linea(lineas, "gps_cola_sqlite", "gauge", "Filas pendientes hacia SQLite",
+               servidor.sqlite.pendientes())
+        _linea(lineas, "gps_sqlite_descartadas_total", "counter",
+               "Filas descartadas por cola SQLite llena", servidor.sqlite.descartadas)
+
+    metricas = servidor.metricas
+    if metricas is not None:
+        _linea(lineas, "gps_datagramas_total", "counter", "Datagramas recibidos",
+               metricas.datagramas)
+        _linea(lineas, "gps_paquetes_por_segundo", "gauge",
+               "Mensajes aceptados por segundo (último intervalo)",
+               f"{metricas.paquetes_por_segundo:.1f}")
+        etapas = (
+            ("decodificacion", metricas.decodificacion),
+            ("procesamiento", metricas.procesamiento),
+        )
+        for etapa, histograma in etapas:
+            _histograma(
+                lineas,
+                f"gps_{etapa}_segundos",
+                f"Latencia de {etapa} por datagrama (1 de cada {metricas.muestreo})",
+                histograma,
+            )
+        lineas.append("# HELP gps_latencia_cuantil_segundos Cuantiles de latencia por etapa")
+        lineas.append("# TYPE gps_latencia_cuantil_segundos gauge")
+        for etapa, histograma in etapas:
+            for cuantil in _CUANTILES:
+                valor = histograma.percentil(cuantil * 100) / 1e9
+                lineas.append(
+                    f'gps_latencia_cuantil_segundos{{etapa="{etapa}",'
+                    f'cuantil="{cuantil}"}} {valor:.9f}'
+                )
+
+    if max_dispositivos > 0:
+        lineas.append(
+            "# HELP gps_dispositivo_perdida_ratio Fracción de secuencias perdidas "
+            f"(los {max_dispositivos} dispositivos que más pierden)"
+        )
+        lineas.append("# TYPE gps_dispositivo_perdida_ratio gauge")
+        for id_disp, ratio in _peores_dispositivos(servidor.dispositivos, max_dispositivos):
+            lineas.append(
+                f'gps_dispositivo_perdida_ratio{{dispositivo="{id_disp}"}} {ratio:.6f}'
+            )
+    return "\n".join(lineas) + "\n"
+
+
+class ServidorMetricas:
+    """Endpoint HTTP /metrics en un hilo aparte"""
+
+    def __init__(
+        self,
+        servidor,
+        puerto=PUERTO_METRICAS,
+        host=HOST_METRICAS,
+        max_dispositivos=MAX_DISPOSITIVOS_PERDIDA,
+    ):
+        self.servidor = servidor
+        self.max_dispositivos = max_dispositivos
+        # Permite a la vista multiproceso informar su propio total
+        self.dispositivos_activos = None
+        self._http = ThreadingHTTPServer((host, puerto), self._manejador())
+        self._http.daemon_threads = True
+        self._hilo = threading.Thread(
+            target=self._http.serve_forever, name="gps-metricas", daemon=True
+        )
+        self._hilo.start()
+
+    @property
+    def direccion(self):
+        return self._http.server_address[:2]
+
+    def _manejador(self):
+        metricas = self
+
+        class _Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                activos = metricas.dispositivos_activos
+                cuerpo = formatear_metricas(
+                    metricas.servidor,
+                    activos() if activos else None,
+                    metricas.max_dispositivos,
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", _TIPO_CONTENIDO)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                pass  # Sin una línea de consola por consulta
+
+        return _Manejador
+
+    def detener(self):
+        self._http.shutdown()
+        self._http.server_close()
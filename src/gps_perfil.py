@@ -0,0 +1,182 @@
+"""
+Perfilado del servidor GPS en ejecución
+Redes de Computadoras - Práctica 3
+
+- PerfilEtapas (opcional, --perfil-etapas): tiempo en ns de cada etapa del
+  procesamiento de un datagrama (recvfrom, verificar_checksum,
+  desempaquetar, procesar_mensaje, guardar_log, enviar_ack) en anillos de
+  tamaño fijo con las últimas muestras.
+- Señales (POSIX): SIGUSR2 muestra p50/p99 por etapa y SIGUSR1 enciende o
+  apaga cProfile; al apagarlo guarda un .prof y muestra las funciones más
+  costosas. Los manejadores solo anotan el pedido y una tarea periódica del
+  servidor lo atiende, así nunca interrumpen a la salida ni al log.
+
+Uso desde otra terminal:
+    python src/gps_perfil.py volcar <pid>
+    python src/gps_perfil.py cprofile <pid>
+
+recvfrom se mide en los dos bucles de recepción sin incluir la espera de
+paquetes (con --lote 1 se espera con select antes de cada recvfrom);
+procesar_mensaje incluye a guardar_log.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import signal
+import sys
+import time
+from array import array
+
+ETAPAS = (
+    "recvfrom",
+    "verificar_checksum",
+    "desempaquetar",
+    "procesar_mensaje",
+    "guardar_log",
+    "enviar_ack",
+)
+MUESTRAS_POR_ETAPA = 8192
+INTERVALO_PEDIDOS = 0.5  # Cada cuánto se atienden los pedidos por señal
+FUNCIONES_CPROFILE = 20
+
+SENAL_VOLCAR = getattr(signal, "SIGUSR2", None)
+SENAL_CPROFILE = getattr(signal, "SIGUSR1", None)
+
+
+class AnilloTiempos:
+    """Últimas `capacidad` duraciones (ns) en un arreglo preasignado"""
+
+    def __init__(self, capacidad=MUESTRAS_POR_ETAPA):
+        self._valores = array("q", bytes(8 * capacidad))
+        self._capacidad = capacidad
+        self._siguiente = 0
+        self.total = 0  # Muestras registradas desde el inicio
+
+    def registrar(self, ns):
+        self._valores[self._siguiente] = ns
+        self._siguiente = (self._siguiente + 1) % self._capacidad
+        self.total += 1
+
+    def __len__(self):
+        return min(self.total, self._capacidad)
+
+    def percentiles(self, *ps):
+        """Percentiles (ns) de las muestras del anillo; 0 si está vacío"""
+        n = len(self)
+        if not n:
+            return tuple(0 for _ in ps)
+        ordenados = sorted(self._valores[:n])
+        return tuple(ordenados[min(n - 1, int(n * p / 100.0))] for p in ps)
+
+
+class PerfilEtapas:
+    """Un AnilloTiempos por etapa, accesibles como atributos"""
+
+    def __init__(self, capacidad=MUESTRAS_POR_ETAPA):
+        for etapa in ETAPAS:
+            setattr(self, etapa, AnilloTiempos(capacidad))
+
+    def informe(self):
+        """Tabla de texto con n, p50, p99 y máximo por etapa (µs)"""
+        lineas = [
+            "[i] Tiempos por etapa (últimas muestras, µs)",
+            f"  {'etapa':<20} {'total':>10} {'p50':>9} {'p99':>9} {'máx':>9}",
+        ]
+        for etapa in ETAPAS:
+            anillo = getattr(self, etapa)
+            if not anillo.total:
+                continue
+            p50, p99, maximo = anillo.percentiles(50, 99, 100)
+            lineas.append(
+                f"  {etapa:<20} {anillo.total:>10} {p50 / 1000:9.1f} "
+                f"{p99 / 1000:9.1f} {maximo / 1000:9.1f}"
+            )
+        if len(lineas) == 2:
+            lineas.append("  (sin muestras todavía)")
+        return "\n".join(lineas)
+
+
+class ControlPerfil:
+    """Pedidos por señal (volcar / cProfile) atendidos desde el servidor"""
+
+    def __init__(self, servidor, directorio="."):
+        self.servidor = servidor
+        self.directorio = directorio
+        self.perfilador = None
+        self._pedido_volcar = False
+        self._pedido_cprofile = False
+
+    def instalar(self):
+        """Registra los manejadores de señal y la tarea que los atiende"""
+        if SENAL_VOLCAR is None:
+            return False
+        signal.signal(SENAL_VOLCAR, self._senal_volcar)
+        signal.signal(SENAL_CPROFILE, self._senal_cprofile)
+        self.servidor.agregar_tarea_periodica(INTERVALO_PEDIDOS, self.atender)
+        return True
+
+    def _senal_volcar(self, signum, frame):
+        self._pedido_volcar = True
+
+    def _senal_cprofile(self, signum, frame):
+        self._pedido_cprofile = True
+
+    def atender(self):
+        if self._pedido_volcar:
+            self._pedido_volcar = False
+            self.volcar()
+        if self._pedido_cprofile:
+            self._pedido_cprofile = False
+            self.alternar_cprofile()
+
+    def _mostrar(self, texto):
+        self.servidor.salida.emitir(lambda t: t, texto)
+
+    def volcar(self):
+        perfil = self.servidor.perfil
+        if perfil is None:
+            self._mostrar("[!] Tiempos por etapa deshabilitados (usar --perfil-etapas)")
+        else:
+            self._mostrar(perfil.informe())
+
+    def alternar_cprofile(self):
+        """Enciende cProfile o lo apaga guardando y resumiendo el resultado"""
+        if self.perfilador is None:
+            self.perfilador = cProfile.Profile()
+            self.perfilador.enable()
+            self._mostrar("[i] cProfile activado (repetir la señal para detenerlo)")
+            return None
+        self.perfilador.disable()
+        fecha = time.strftime("%Y%m%d-%H%M%S")
+        ruta = os.path.join(self.directorio, f"gps_perfil_{os.getpid()}_{fecha}.prof")
+        self.perfilador.dump_stats(ruta)
+        texto = io.StringIO()
+        pstats.Stats(self.perfilador, stream=texto).sort_stats("cumulative").print_stats(
+            FUNCIONES_CPROFILE
+        )
+        self.perfilador = None
+        self._mostrar(f"[✓] cProfile guardado en {ruta}\n{texto.getvalue()}")
+        return ruta
+
+
+def main():
+    """Envía el pedido a un servidor en ejecución: volcar | cprofile <pid>"""
+    if len(sys.argv) != 3 or sys.argv[1] not in ("volcar", "cprofile"):
+        print("Uso: python src/gps_perfil.py volcar|cprofile <pid>")
+        sys.exit(1)
+    if SENAL_VOLCAR is None:
+        print("[✗] Las señales de perfilado no están disponibles en este sistema.")
+        sys.exit(1)
+    senal = SENAL_VOLCAR if sys.argv[1] == "volcar" else SENAL_CPROFILE
+    try:
+        os.kill(int(sys.argv[2]), senal)
+    except (ValueError, OSError) as e:
+        print(f"[✗] No se pudo enviar la señal: {e}")
+        sys.exit(1)
+    print("[✓] Pedido enviado; la respuesta aparece en la consola del servidor")
+
+
+if __name__ == "__main__":
+    main()
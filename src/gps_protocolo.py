@@ -11,10 +11,54 @@ FORMATO STRUCT: !BBHHHHiiHIHHBB
 - H = 2 bytes unsigned short
 - I = 4 bytes unsigned int
 - i = 4 bytes signed int
+
+ACK selectivo (20 bytes, TIPO_ACK_SELECTIVO):
+- Cabecera: 10 bytes; SEQ = ACK acumulado (confirma esa secuencia y las
+  anteriores)
+- Payload: 10 bytes (SEQ_MAS_ALTA, MAPA_SACK) con formato !HQ: bit i del
+  mapa = llegó la secuencia SEQ_MAS_ALTA - i
+Solo lo recibe un dispositivo que marca sus mensajes con FLAG_ACK_SELECTIVO;
+los demás siguen recibiendo un TIPO_ACK por mensaje.
+
+Lote de posiciones (TIPO_LOTE_GPS, 12 + N × 24 bytes):
+- Cabecera: 10 bytes; SEQ = secuencia de la primera posición, FLAGS del
+  dispositivo; el CHECKSUM cubre el datagrama completo
+- CANTIDAD: 2 bytes (!H), entre 1 y MAX_FIXES_LOTE
+- N posiciones de 24 bytes (!HHiiHIHHBB): SEQ, FLAGS y el mismo payload de
+  20 bytes de TIPO_DATOS_GPS
+El receptor lo expande en N mensajes TIPO_DATOS_GPS. MAX_FIXES_LOTE se
+elige para que el datagrama entre en un MTU Ethernet (1500) sin fragmentar.
+
+Posición compacta (TIPO_DELTA_GPS, 11 bytes o más):
+- Cabecera: 10 bytes, como en TIPO_DATOS_GPS
+- PRESENCIA: 1 byte; bit i = cambió el campo i del payload (LAT, LON, ALT,
+  TIME, VEL, RUMBO, BAT, ESTADO)
+- Por cada campo presente, la diferencia con la posición anterior en zigzag
+  + varint (7 bits por byte, el bit alto indica que sigue otro byte)
+Solo se decodifica sobre la posición SEQ - 1 del mismo dispositivo; tras
+una pérdida el emisor manda un TIPO_DATOS_GPS completo (keyframe).
+
+Autenticación (FLAG_AUTENTICADO, cualquier tipo de mensaje):
+- TAG: TAM_TAG bytes al final del datagrama, BLAKE2s con clave (o
+  HMAC-SHA256 truncado) del mensaje con el campo CHECKSUM en cero
+- La clave es la del dispositivo del campo ID; si no se registró una,
+  se deriva de la clave maestra (CLAVE_SECRETA por defecto) y del ID
+- Una clave "hex:..." se toma tal cual en bytes (la que exporta el
+  servidor con --exportar-clave, para no repartir la clave maestra)
+- El CHECKSUM se calcula después y cubre también el TAG
+Sin el flag el mensaje no lleva TAG y el formato no cambia.
 """
 
+import hashlib
+import hmac
 import struct
 import time
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: desempaquetar_lote usa Python puro
+    np = None
 
 # ============== CONSTANTES DEL PROTOCOLO ==============
 VERSION = 0x01
@@ -25,48 +69,355 @@ MAX_SEQ = 0x10000  # 65536, rango de 16 bits
 TIPO_DATOS_GPS = 0x01
 TIPO_ACK = 0x02
 TIPO_HEARTBEAT = 0x03
+TIPO_ACK_SELECTIVO = 0x04
+TIPO_LOTE_GPS = 0x05
+TIPO_DELTA_GPS = 0x06
 
 # Flags de estado
 FLAG_BATERIA_BAJA = 0x01
 FLAG_SOS = 0x02
 FLAG_EN_MOVIMIENTO = 0x04
 FLAG_IGNICION_ON = 0x08
+FLAG_AUTENTICADO = 0x40  # El datagrama termina en un TAG de TAM_TAG bytes
+FLAG_ACK_SELECTIVO = 0x80  # El dispositivo entiende TIPO_ACK_SELECTIVO
 
-# Clave secreta compartida
+# Clave secreta compartida (pública en el código: solo sirve para pruebas)
 CLAVE_SECRETA = "MiClaveSecretaGPS2024"
+PREFIJO_CLAVE_HEX = "hex:"  # Clave en bytes escrita en hexadecimal
+
+# Tamaños y formatos precompilados
+TAM_CABECERA = 10
+TAM_MENSAJE_GPS = 30
+TAM_ACK_SELECTIVO = 20
+BITS_SACK = 64  # Secuencias cubiertas por el mapa del ACK selectivo
+OFFSET_CHECKSUM = 6
+TAM_CABECERA_LOTE = 12  # Cabecera + CANTIDAD
+TAM_FIX_LOTE = 24
+MTU_DATAGRAMA = 1472  # 1500 de Ethernet - 20 de IPv4 - 8 de UDP
+MAX_FIXES_LOTE = (MTU_DATAGRAMA - TAM_CABECERA_LOTE) // TAM_FIX_LOTE  # 60
+TAM_CABECERA_DELTA = 11  # Cabecera + PRESENCIA
+MAX_BYTES_VARINT = 5  # Suficiente para diferencias de 32 bits en zigzag
+TAM_TAG = 8  # 64 bits de autenticación
+ALGORITMOS_TAG = ("blake2s", "hmac-sha256")
+ERROR_TAG_INVALIDO = "TAG de autenticación inválido"
+ERROR_SIN_AUTENTICAR = "Mensaje sin autenticar"
+
+_ESTRUCTURA_GPS = struct.Struct("!BBHHHHiiHIHHBB")
+_ESTRUCTURA_CABECERA = struct.Struct("!BBHHHH")
+_ESTRUCTURA_PAYLOAD = struct.Struct("!iiHIHHBB")
+_ESTRUCTURA_CHECKSUM = struct.Struct("!H")
+_ESTRUCTURA_SACK = struct.Struct("!HQ")
+_ESTRUCTURA_CANTIDAD = struct.Struct("!H")
+_ESTRUCTURA_FIX = struct.Struct("!HHiiHIHHBB")
 
 
 # ============== FUNCIONES DE CHECKSUM (CRC-16) ==============
-def calcular_checksum(datos):
-    """Calcula CRC-16 para detección de errores"""
+POLINOMIO_CRC = 0xA001
+
+
+def _construir_tabla_crc16():
+    """Tabla de 256 entradas: CRC-16 (0xA001) de cada byte posible"""
+    tabla = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ POLINOMIO_CRC
+            else:
+                crc >>= 1
+        tabla.append(crc)
+    return tabla
+
+
+def _construir_tabla_crc16_par(tabla):
+    """
+    Tabla de 65536 entradas para procesar 2 bytes por consulta.
+
+    Como el registro CRC mide 16 bits, al aplicar XOR con una palabra
+    little-endian (b0 | b1 << 8) todo el registro queda consumido y el
+    resultado depende solo de ese valor: crc = tabla_par[crc ^ palabra].
+    """
+    resultado = []
+    for valor in range(0x10000):
+        parcial = tabla[valor & 0xFF] ^ (valor >> 8)
+        resultado.append(tabla[parcial & 0xFF] ^ (parcial >> 8))
+    return resultado
+
+
+_TABLA_CRC16 = _construir_tabla_crc16()
+_TABLA_CRC16_PAR = _construir_tabla_crc16_par(_TABLA_CRC16)
+_PALABRAS_PREFIJO = struct.Struct("<3H")
+
+
+def _calcular_checksum_bit_a_bit(datos):
+    """Implementación de referencia (bit a bit) del CRC-16"""
     crc = 0xFFFF
     for byte in datos:
         crc ^= byte
         for _ in range(8):
             if crc & 0x0001:
-                crc = (crc >> 1) ^ 0xA001
+                crc = (crc >> 1) ^ POLINOMIO_CRC
             else:
                 crc >>= 1
     return crc & 0xFFFF
 
 
+def _crc16_palabras(palabras, crc=0xFFFF):
+    """Aplica el CRC-16 sobre una secuencia de palabras little-endian de 16 bits"""
+    tabla = _TABLA_CRC16_PAR
+    for palabra in palabras:
+        crc = tabla[crc ^ palabra]
+    return crc
+
+
+def calcular_checksum(datos):
+    """
+    Calcula CRC-16 para detección de errores
+
+    Usa una tabla precalculada que procesa 2 bytes por consulta; el
+    resultado es idéntico al de la versión bit a bit.
+    Acepta bytes, bytearray o memoryview.
+    """
+    total = len(datos)
+    pares = total >> 1
+    crc = _crc16_palabras(struct.unpack_from(f"<{pares}H", datos))
+    if total & 1:
+        crc = (crc >> 8) ^ _TABLA_CRC16[(crc ^ datos[-1]) & 0xFF]
+    return crc
+
+
+def calcular_checksums_lote(buffer, tam_trama=TAM_MENSAJE_GPS, omitir_checksum=False):
+    """
+    Calcula el CRC-16 de cada trama de un buffer contiguo en una sola llamada
+
+    Parámetros:
+    - buffer: bytes/bytearray/memoryview con N tramas de tam_trama bytes
+    - tam_trama: tamaño fijo de cada trama (30 por defecto)
+    - omitir_checksum: toma el campo checksum (bytes 6-8) de cada trama como
+      cero, es decir, calcula el valor que debería contener ese campo
+
+    Retorna una lista con N checksums. Los bytes sobrantes al final del
+    buffer (trama incompleta) se ignoran.
+    """
+    if tam_trama <= 0:
+        raise ValueError("tam_trama debe ser mayor que 0")
+    if omitir_checksum and tam_trama < TAM_CABECERA:
+        raise ValueError("tam_trama no contiene una cabecera completa")
+    total = len(buffer) - len(buffer) % tam_trama
+    if total == 0:
+        return []
+
+    vista = memoryview(buffer).cast("B")[:total]
+    if tam_trama & 1:
+        calcular = _crc16_sin_campo_checksum if omitir_checksum else calcular_checksum
+        return [
+            calcular(vista[inicio : inicio + tam_trama])
+            for inicio in range(0, total, tam_trama)
+        ]
+
+    tabla = _TABLA_CRC16_PAR
+    checksums = []
+    if omitir_checksum:
+        # 3 palabras de prefijo, se salta el campo checksum y sigue la cola
+        formato = f"<3H2x{(tam_trama - 8) >> 1}H"
+        for palabras in struct.iter_unpack(formato, vista):
+            crc = tabla[_crc16_palabras(palabras[:3])]
+            checksums.append(_crc16_palabras(palabras[3:], crc))
+        return checksums
+
+    for palabras in struct.iter_unpack(f"<{tam_trama >> 1}H", vista):
+        crc = 0xFFFF
+        for palabra in palabras:
+            crc = tabla[crc ^ palabra]
+        checksums.append(crc)
+    return checksums
+
+
+def _crc16_sin_campo_checksum(mensaje):
+    """
+    CRC-16 del mensaje con el campo checksum (bytes 6-8) tomado como cero
+
+    Recorre la cabecera y la cola directamente sobre el buffer original
+    (bytes, bytearray o memoryview) sin construir una copia del mensaje.
+    """
+    total = len(mensaje)
+    tabla = _TABLA_CRC16_PAR
+    crc = _crc16_palabras(_PALABRAS_PREFIJO.unpack_from(mensaje, 0))
+    crc = tabla[crc]  # Dos bytes en cero del campo checksum
+    cola = struct.unpack_from(f"<{(total - 8) >> 1}H", mensaje, 8)
+    crc = _crc16_palabras(cola, crc)
+    if total & 1:
+        crc = (crc >> 8) ^ _TABLA_CRC16[(crc ^ mensaje[total - 1]) & 0xFF]
+    return crc
+
+
 def verificar_checksum(mensaje):
-    """Verifica si el checksum del mensaje es correcto"""
+    """Verifica si el checksum del mensaje es correcto (sin copiar el mensaje)"""
     if len(mensaje) < 10:
         return False
 
-    # Extraer checksum del mensaje (bytes 6-8)
-    checksum_recibido = struct.unpack("!H", mensaje[6:8])[0]
+    # Checksum recibido: bytes 6-8 en orden de red
+    checksum_recibido = (mensaje[6] << 8) | mensaje[7]
+
+    return checksum_recibido == _crc16_sin_campo_checksum(mensaje)
+
+
+# ============== AUTENTICACIÓN ==============
+_CAMPO_CHECKSUM_CERO = bytes(2)
+_ESTRUCTURA_ID = struct.Struct("!H")
 
-    # Calcular checksum sin incluir el campo checksum
-    datos_sin_checksum = mensaje[:6] + b"\x00\x00" + mensaje[8:]
-    checksum_calculado = calcular_checksum(datos_sin_checksum)
 
-    return checksum_recibido == checksum_calculado
+def _clave_bytes(clave):
+    """Clave en bytes; las de más de 32 bytes se resumen (límite de BLAKE2s)"""
+    if isinstance(clave, str):
+        if clave.startswith(PREFIJO_CLAVE_HEX):
+            clave = bytes.fromhex(clave[len(PREFIJO_CLAVE_HEX):])
+        else:
+            clave = clave.encode("utf-8")
+    if len(clave) > hashlib.blake2s().digest_size:
+        clave = hashlib.blake2s(clave).digest()
+    return bytes(clave)
+
+
+class Autenticador:
+    """
+    Firma y verifica el TAG de los mensajes con FLAG_AUTENTICADO
+
+    Cada dispositivo tiene su propia clave: la registrada en claves
+    ({id: clave}) o, si no hay, una derivada de la clave maestra y el ID.
+    Una clave filtrada no sirve para otros dispositivos solo si cada uno
+    recibe su clave (exportar_clave) y no la maestra; con la CLAVE_SECRETA
+    por defecto, que está en el código fuente, no hay ningún secreto.
+
+    El contexto con la clave ya cargada (el estado interno/externo
+    precalculado en HMAC) se construye una vez por dispositivo y se copia
+    en cada mensaje.
+
+    Parámetros:
+    - clave_maestra: str o bytes (CLAVE_SECRETA por defecto)
+    - claves: claves explícitas por ID de dispositivo
+    - algoritmo: "blake2s" (por defecto) o "hmac-sha256"
+    - exigir: si es True, los mensajes sin FLAG_AUTENTICADO se rechazan
+    """
+
+    def __init__(self, clave_maestra=CLAVE_SECRETA, claves=None, algoritmo="blake2s", exigir=True):
+        if algoritmo not in ALGORITMOS_TAG:
+            raise ValueError(f"algoritmo debe ser uno de {ALGORITMOS_TAG}")
+        self.algoritmo = algoritmo
+        self.exigir = exigir
+        self._maestra = _clave_bytes(clave_maestra)
+        self._claves = {}
+        self._contextos = {}  # id -> contexto con la clave cargada
+        for id_dispositivo, clave in (claves or {}).items():
+            self.registrar_clave(id_dispositivo, clave)
+
+    def registrar_clave(self, id_dispositivo, clave):
+        """Asigna una clave propia a un dispositivo (reemplaza la derivada)"""
+        self._claves[int(id_dispositivo)] = _clave_bytes(clave)
+        self._contextos.pop(int(id_dispositivo), None)
+
+    def clave_dispositivo(self, id_dispositivo):
+        """Clave del dispositivo: la registrada o la derivada de la maestra"""
+        clave = self._claves.get(id_dispositivo)
+        if clave is None:
+            clave = hashlib.blake2s(
+                _ESTRUCTURA_ID.pack(id_dispositivo), key=self._maestra, person=b"gps-disp"
+            ).digest()
+        return clave
+
+    def exportar_clave(self, id_dispositivo):
+        """Clave del dispositivo como "hex:...", para configurarlo sin la maestra"""
+        return PREFIJO_CLAVE_HEX + self.clave_dispositivo(id_dispositivo).hex()
+
+    def _contexto(self, id_dispositivo):
+        contexto = self._contextos.get(id_dispositivo)
+        if contexto is None:
+            clave = self.clave_dispositivo(id_dispositivo)
+            if self.algoritmo == "blake2s":
+                contexto = hashlib.blake2s(key=clave, digest_size=TAM_TAG)
+            else:
+                contexto = hmac.new(clave, digestmod=hashlib.sha256)
+            self._contextos[id_dispositivo] = contexto
+        return contexto
+
+    def calcular_tag(self, mensaje, fin):
+        """TAG de mensaje[:fin] con el campo checksum tomado como cero"""
+        id_dispositivo = (mensaje[2] << 8) | mensaje[3]
+        contexto = self._contextos.get(id_dispositivo) or self._contexto(id_dispositivo)
+        contexto = contexto.copy()
+        # Porciones pequeñas: copiarlas cuesta menos que crear memoryviews
+        contexto.update(mensaje[:OFFSET_CHECKSUM])
+        contexto.update(_CAMPO_CHECKSUM_CERO)
+        contexto.update(mensaje[OFFSET_CHECKSUM + 2 : fin])
+        return contexto.digest()[:TAM_TAG]
+
+    def firmar_en(self, buffer, offset, tam):
+        """
+        Autentica el mensaje de tam bytes que está en buffer[offset:]
+
+        Marca FLAG_AUTENTICADO, escribe el TAG en buffer[offset+tam:] (debe
+        haber TAM_TAG bytes libres) y vuelve a sellar el CRC.
+        Retorna los bytes del mensaje firmado.
+        """
+        vista = memoryview(buffer)[offset : offset + tam + TAM_TAG]
+        vista[9] |= FLAG_AUTENTICADO  # Byte bajo de FLAGS
+        vista[OFFSET_CHECKSUM : OFFSET_CHECKSUM + 2] = _CAMPO_CHECKSUM_CERO
+        vista[tam:] = self.calcular_tag(vista, tam)
+        _sellar_checksum(buffer, offset, tam + TAM_TAG)
+        return tam + TAM_TAG
+
+    def firmar(self, mensaje):
+        """Retorna una copia autenticada de un mensaje ya empaquetado"""
+        buffer = bytearray(len(mensaje) + TAM_TAG)
+        buffer[: len(mensaje)] = mensaje
+        self.firmar_en(buffer, 0, len(mensaje))
+        return bytes(buffer)
+
+    def verificar(self, mensaje):
+        """Indica si el TAG final del mensaje es correcto (el CRC va aparte)"""
+        fin = len(mensaje) - TAM_TAG
+        if fin < TAM_CABECERA:
+            return False
+        return hmac.compare_digest(self.calcular_tag(mensaje, fin), mensaje[fin:])
+
+    def comprobar(self, mensaje):
+        """
+        Aplica la política del autenticador a un mensaje con CRC correcto
+
+        Retorna None si el mensaje se acepta o el motivo del rechazo.
+        """
+        if mensaje[9] & FLAG_AUTENTICADO:
+            if not self.verificar(mensaje):
+                return ERROR_TAG_INVALIDO
+        elif self.exigir:
+            return ERROR_SIN_AUTENTICAR
+        return None
+
+
+def quitar_tag(mensaje):
+    """El mensaje sin el TAG final si tiene FLAG_AUTENTICADO (sin copiar)"""
+    if len(mensaje) > TAM_CABECERA and mensaje[9] & FLAG_AUTENTICADO:
+        return memoryview(mensaje)[: len(mensaje) - TAM_TAG]
+    return mensaje
+
+
+def _autenticar(buffer, autenticador):
+    """bytes del mensaje recién empaquetado, firmado si hay autenticador"""
+    if autenticador is None:
+        return bytes(buffer)
+    return autenticador.firmar(buffer)
 
 
 # ============== EMPAQUETADO DE MENSAJES ==============
-def empaquetar_mensaje_gps(
+def _sellar_checksum(buffer, offset, tam):
+    """Calcula el CRC de buffer[offset:offset+tam] y lo escribe en el campo checksum"""
+    checksum = calcular_checksum(memoryview(buffer)[offset : offset + tam])
+    _ESTRUCTURA_CHECKSUM.pack_into(buffer, offset + OFFSET_CHECKSUM, checksum)
+
+
+def empaquetar_mensaje_gps_en(
+    buffer,
+    offset,
     id_dispositivo,
     secuencia,
     latitud,
@@ -77,31 +428,25 @@ def empaquetar_mensaje_gps(
     bateria,
     estado,
     flags=0,
+    timestamp=None,
 ):
     """
-    Empaqueta un mensaje GPS completo (30 bytes)
+    Empaqueta un mensaje GPS directamente en un buffer escribible
 
-    Formato: !BBHHHHiiHIHHBB = 30 bytes
-    - VERSION(1) TIPO(1) ID(2) SEQ(2) CHECKSUM(2) FLAGS(2) = 10 bytes cabecera
-    - LAT(4) LON(4) ALT(2) TIME(4) VEL(2) RUM(2) BAT(1) EST(1) = 20 bytes payload
-
-    Parámetros:
-    - latitud/longitud: Grados × 10^7 (ej: -17.3935 × 10^7 = -173935000)
-    - altitud: Metros sobre el nivel del mar
-    - velocidad: km/h × 10
-    - rumbo: Grados × 10 (0-3600)
-    - bateria: Porcentaje (0-100)
+    Escribe los 30 bytes en buffer[offset:offset+30] con una sola pasada de
+    pack_into y sella el checksum en su lugar. Retorna los bytes escritos.
     """
-    timestamp = int(time.time())
+    if timestamp is None:
+        timestamp = int(time.time())
 
-    # Construir mensaje sin checksum
-    mensaje_sin_checksum = struct.pack(
-        "!BBHHHHiiHIHHBB",
+    _ESTRUCTURA_GPS.pack_into(
+        buffer,
+        offset,
         VERSION,  # B: 1 byte
         TIPO_DATOS_GPS,  # B: 1 byte
         id_dispositivo,  # H: 2 bytes
         secuencia,  # H: 2 bytes
-        0,  # H: 2 bytes (checksum placeholder)
+        0,  # H: 2 bytes (checksum, se sella después)
         flags,  # H: 2 bytes
         latitud,  # i: 4 bytes (signed int)
         longitud,  # i: 4 bytes (signed int)
@@ -112,91 +457,263 @@ def empaquetar_mensaje_gps(
         bateria,  # B: 1 byte
         estado,  # B: 1 byte
     )
+    _sellar_checksum(buffer, offset, TAM_MENSAJE_GPS)
+    return TAM_MENSAJE_GPS
 
-    # Calcular checksum
-    checksum = calcular_checksum(mensaje_sin_checksum)
 
-    # Construir mensaje final con checksum
-    mensaje_final = struct.pack(
-        "!BBHHHHiiHIHHBB",
-        VERSION,
-        TIPO_DATOS_GPS,
+def empaquetar_mensaje_gps(
+    id_dispositivo,
+    secuencia,
+    latitud,
+    longitud,
+    altitud,
+    velocidad,
+    rumbo,
+    bateria,
+    estado,
+    flags=0,
+    autenticador=None,
+):
+    """
+    Empaqueta un mensaje GPS completo (30 bytes)
+
+    Formato: !BBHHHHiiHIHHBB = 30 bytes
+    - VERSION(1) TIPO(1) ID(2) SEQ(2) CHECKSUM(2) FLAGS(2) = 10 bytes cabecera
+    - LAT(4) LON(4) ALT(2) TIME(4) VEL(2) RUM(2) BAT(1) EST(1) = 20 bytes payload
+
+    Parámetros:
+    - latitud/longitud: Grados × 10^7 (ej: -17.3935 × 10^7 = -173935000)
+    - altitud: Metros sobre el nivel del mar
+    - velocidad: km/h × 10
+    - rumbo: Grados × 10 (0-3600)
+    - bateria: Porcentaje (0-100)
+    - autenticador: si se indica, agrega el TAG (30 + TAM_TAG bytes)
+    """
+    buffer = bytearray(TAM_MENSAJE_GPS)
+    empaquetar_mensaje_gps_en(
+        buffer,
+        0,
         id_dispositivo,
         secuencia,
-        checksum,  # Checksum real
-        flags,
         latitud,
         longitud,
         altitud,
-        timestamp,
         velocidad,
         rumbo,
         bateria,
         estado,
+        flags,
     )
+    return _autenticar(buffer, autenticador)
 
-    return mensaje_final
 
+def _empaquetar_cabecera_en(buffer, offset, tipo, id_dispositivo, secuencia, flags):
+    """Empaqueta una cabecera de 10 bytes con checksum en buffer[offset:]"""
+    _ESTRUCTURA_CABECERA.pack_into(
+        buffer, offset, VERSION, tipo, id_dispositivo, secuencia, 0, flags
+    )
+    _sellar_checksum(buffer, offset, TAM_CABECERA)
+    return TAM_CABECERA
 
-def empaquetar_ack(id_dispositivo, secuencia_ack):
-    """Empaqueta un mensaje ACK (10 bytes - cabecera completa)"""
-    mensaje_sin_checksum = struct.pack(
-        "!BBHHHH",
-        VERSION,
-        TIPO_ACK,
-        id_dispositivo,
-        secuencia_ack,
-        0,  # checksum placeholder
-        0,  # flags = 0
+
+def empaquetar_ack_en(buffer, offset, id_dispositivo, secuencia_ack):
+    """
+    Empaqueta un ACK (10 bytes) en buffer[offset:offset+10] sin crear objetos
+
+    Pensado para el servidor, que reutiliza el mismo buffer en cada ACK.
+    Retorna los bytes escritos.
+    """
+    return _empaquetar_cabecera_en(
+        buffer, offset, TIPO_ACK, id_dispositivo, secuencia_ack, 0
     )
 
-    checksum = calcular_checksum(mensaje_sin_checksum)
 
-    mensaje_final = struct.pack(
-        "!BBHHHH",
-        VERSION,
-        TIPO_ACK,
-        id_dispositivo,
-        secuencia_ack,
-        checksum,
-        0,  # flags = 0
+def empaquetar_ack_selectivo_en(
+    buffer, offset, id_dispositivo, acumulado, seq_mas_alta, mapa_sack
+):
+    """
+    Empaqueta un ACK selectivo (20 bytes) en buffer[offset:offset+20]
+
+    Parámetros:
+    - acumulado: confirma esa secuencia y todas las anteriores
+    - seq_mas_alta, mapa_sack: bit i del mapa confirma seq_mas_alta - i
+      (BITS_SACK bits)
+    Retorna los bytes escritos.
+    """
+    _ESTRUCTURA_CABECERA.pack_into(
+        buffer, offset, VERSION, TIPO_ACK_SELECTIVO, id_dispositivo, acumulado, 0, 0
     )
+    _ESTRUCTURA_SACK.pack_into(buffer, offset + TAM_CABECERA, seq_mas_alta, mapa_sack)
+    _sellar_checksum(buffer, offset, TAM_ACK_SELECTIVO)
+    return TAM_ACK_SELECTIVO
 
-    return mensaje_final
 
+def empaquetar_heartbeat_en(buffer, offset, id_dispositivo, secuencia, flags=0):
+    """Empaqueta un HEARTBEAT (10 bytes) en buffer[offset:offset+10]"""
+    return _empaquetar_cabecera_en(
+        buffer, offset, TIPO_HEARTBEAT, id_dispositivo, secuencia, flags
+    )
 
-def empaquetar_heartbeat(id_dispositivo, secuencia, flags=0):
-    """Empaqueta un mensaje HEARTBEAT (10 bytes - cabecera completa)"""
-    mensaje_sin_checksum = struct.pack(
-        "!BBHHHH",
-        VERSION,
-        TIPO_HEARTBEAT,
-        id_dispositivo,
-        secuencia,
-        0,  # checksum placeholder
-        flags,
+
+def empaquetar_lote_gps_en(buffer, offset, id_dispositivo, fixes, flags=0):
+    """
+    Empaqueta un lote de posiciones (TIPO_LOTE_GPS) en buffer[offset:]
+
+    Parámetros:
+    - fixes: tuplas (secuencia, flags, latitud, longitud, altitud,
+      timestamp, velocidad, rumbo, bateria, estado) con las mismas unidades
+      que empaquetar_mensaje_gps; entre 1 y MAX_FIXES_LOTE
+    - flags: flags de la cabecera (p. ej. FLAG_ACK_SELECTIVO)
+    Retorna los bytes escritos (12 + 24 por posición).
+    """
+    cantidad = len(fixes)
+    if not 1 <= cantidad <= MAX_FIXES_LOTE:
+        raise ValueError(f"un lote lleva entre 1 y {MAX_FIXES_LOTE} posiciones")
+    _ESTRUCTURA_CABECERA.pack_into(
+        buffer, offset, VERSION, TIPO_LOTE_GPS, id_dispositivo, fixes[0][0], 0, flags
     )
+    _ESTRUCTURA_CANTIDAD.pack_into(buffer, offset + TAM_CABECERA, cantidad)
+    posicion = offset + TAM_CABECERA_LOTE
+    for fix in fixes:
+        _ESTRUCTURA_FIX.pack_into(buffer, posicion, *fix)
+        posicion += TAM_FIX_LOTE
+    tam = posicion - offset
+    _sellar_checksum(buffer, offset, tam)
+    return tam
 
-    checksum = calcular_checksum(mensaje_sin_checksum)
 
-    mensaje_final = struct.pack(
-        "!BBHHHH",
-        VERSION,
-        TIPO_HEARTBEAT,
-        id_dispositivo,
+def empaquetar_lote_gps(id_dispositivo, fixes, flags=0, autenticador=None):
+    """Empaqueta un lote de posiciones (TIPO_LOTE_GPS, 12 + N × 24 bytes)"""
+    buffer = bytearray(TAM_CABECERA_LOTE + len(fixes) * TAM_FIX_LOTE)
+    empaquetar_lote_gps_en(buffer, 0, id_dispositivo, fixes, flags)
+    return _autenticar(buffer, autenticador)
+
+
+def agrupar_mensajes_gps(mensajes, flags=0, max_fixes=MAX_FIXES_LOTE, autenticador=None):
+    """
+    Reúne mensajes TIPO_DATOS_GPS ya empaquetados (de un mismo dispositivo)
+    en lotes TIPO_LOTE_GPS de hasta max_fixes posiciones
+
+    Copia SEQ, FLAGS y el payload de cada mensaje sin volver a empaquetar
+    los campos; el ID sale del primer mensaje. Retorna la lista de
+    datagramas.
+    """
+    if not 1 <= max_fixes <= MAX_FIXES_LOTE:
+        raise ValueError(f"max_fixes debe estar entre 1 y {MAX_FIXES_LOTE}")
+    lotes = []
+    for inicio in range(0, len(mensajes), max_fixes):
+        grupo = mensajes[inicio : inicio + max_fixes]
+        buffer = bytearray(TAM_CABECERA_LOTE + len(grupo) * TAM_FIX_LOTE)
+        posicion = TAM_CABECERA_LOTE
+        for mensaje in grupo:
+            if len(mensaje) != TAM_MENSAJE_GPS or mensaje[1] != TIPO_DATOS_GPS:
+                raise ValueError("solo se agrupan mensajes TIPO_DATOS_GPS de 30 bytes")
+            buffer[posicion : posicion + 2] = mensaje[4:6]  # SEQ
+            buffer[posicion + 2 : posicion + TAM_FIX_LOTE] = mensaje[8:TAM_MENSAJE_GPS]
+            posicion += TAM_FIX_LOTE
+        _, _, id_disp, secuencia, _, _ = _ESTRUCTURA_CABECERA.unpack_from(grupo[0], 0)
+        _ESTRUCTURA_CABECERA.pack_into(
+            buffer, 0, VERSION, TIPO_LOTE_GPS, id_disp, secuencia, 0, flags
+        )
+        _ESTRUCTURA_CANTIDAD.pack_into(buffer, TAM_CABECERA, len(grupo))
+        _sellar_checksum(buffer, 0, len(buffer))
+        lotes.append(_autenticar(buffer, autenticador))
+    return lotes
+
+
+def empaquetar_delta_gps(
+    id_dispositivo, secuencia, referencia, payload, flags=0, autenticador=None
+):
+    """
+    Empaqueta una posición como diferencias con la anterior (TIPO_DELTA_GPS)
+
+    Parámetros:
+    - referencia, payload: tuplas (latitud, longitud, altitud, timestamp,
+      velocidad, rumbo, bateria, estado) de la posición secuencia - 1 y de
+      la actual
+    Los campos que no cambiaron no ocupan bytes.
+    """
+    buffer = bytearray(TAM_CABECERA_DELTA)
+    presencia = 0
+    for bit, (anterior, actual) in enumerate(zip(referencia, payload)):
+        diferencia = actual - anterior
+        if not diferencia:
+            continue
+        presencia |= 1 << bit
+        valor = diferencia << 1 if diferencia >= 0 else (-diferencia << 1) - 1
+        while valor > 0x7F:
+            buffer.append(valor & 0x7F | 0x80)
+            valor >>= 7
+        buffer.append(valor)
+    _ESTRUCTURA_CABECERA.pack_into(
+        buffer, 0, VERSION, TIPO_DELTA_GPS, id_dispositivo, secuencia, 0, flags
+    )
+    buffer[TAM_CABECERA] = presencia
+    _sellar_checksum(buffer, 0, len(buffer))
+    return _autenticar(buffer, autenticador)
+
+
+def comprimir_mensaje_gps(referencia, mensaje):
+    """
+    Versión TIPO_DELTA_GPS de un mensaje TIPO_DATOS_GPS ya empaquetado
+
+    referencia es el mensaje (también de 30 bytes) de la secuencia anterior
+    del mismo dispositivo. Si no lo es, o si las diferencias no ahorran
+    bytes, retorna el mensaje completo sin cambios (un keyframe).
+    """
+    _, _, id_disp, secuencia, _, flags = _ESTRUCTURA_CABECERA.unpack_from(mensaje, 0)
+    _, _, id_ref, seq_ref, _, _ = _ESTRUCTURA_CABECERA.unpack_from(referencia, 0)
+    if id_ref != id_disp or (seq_ref + 1) % MAX_SEQ != secuencia:
+        return mensaje
+    delta = empaquetar_delta_gps(
+        id_disp,
         secuencia,
-        checksum,
+        _ESTRUCTURA_PAYLOAD.unpack_from(referencia, TAM_CABECERA),
+        _ESTRUCTURA_PAYLOAD.unpack_from(mensaje, TAM_CABECERA),
         flags,
     )
+    return delta if len(delta) < len(mensaje) else mensaje
+
+
+def empaquetar_ack(id_dispositivo, secuencia_ack, autenticador=None):
+    """Empaqueta un mensaje ACK (10 bytes - cabecera completa)"""
+    buffer = bytearray(TAM_CABECERA)
+    empaquetar_ack_en(buffer, 0, id_dispositivo, secuencia_ack)
+    return _autenticar(buffer, autenticador)
+
 
-    return mensaje_final
+def empaquetar_ack_selectivo(
+    id_dispositivo, acumulado, seq_mas_alta, mapa_sack, autenticador=None
+):
+    """Empaqueta un ACK selectivo (20 bytes)"""
+    buffer = bytearray(TAM_ACK_SELECTIVO)
+    empaquetar_ack_selectivo_en(buffer, 0, id_dispositivo, acumulado, seq_mas_alta, mapa_sack)
+    return _autenticar(buffer, autenticador)
+
+
+def secuencia_confirmada(seq, acumulado, seq_mas_alta, mapa_sack):
+    """Indica si un ACK selectivo confirma la secuencia seq (módulo 2^16)"""
+    atras = (seq_mas_alta - seq) % MAX_SEQ
+    if atras < BITS_SACK and (mapa_sack >> atras) & 1:
+        return True
+    return (acumulado - seq) % MAX_SEQ < MAX_SEQ // 2
+
+
+def empaquetar_heartbeat(id_dispositivo, secuencia, flags=0, autenticador=None):
+    """Empaqueta un mensaje HEARTBEAT (10 bytes - cabecera completa)"""
+    buffer = bytearray(TAM_CABECERA)
+    empaquetar_heartbeat_en(buffer, 0, id_dispositivo, secuencia, flags)
+    return _autenticar(buffer, autenticador)
 
 
 # ============== DESEMPAQUETADO DE MENSAJES ==============
-def desempaquetar_mensaje(mensaje):
+def desempaquetar_mensaje(mensaje, autenticador=None):
     """
     Desempaqueta un mensaje recibido
     Retorna un diccionario con los campos o None si hay error
+
+    Con un Autenticador se verifica el TAG (y, si exige, que lo haya); sin
+    él, el TAG de un mensaje con FLAG_AUTENTICADO se ignora.
     """
     if len(mensaje) < 10:
         return None, "Mensaje demasiado corto"
@@ -205,9 +722,15 @@ def desempaquetar_mensaje(mensaje):
     if not verificar_checksum(mensaje):
         return None, "Checksum inválido"
 
+    if autenticador is not None:
+        motivo = autenticador.comprobar(mensaje)
+        if motivo is not None:
+            return None, motivo
+    mensaje = quitar_tag(mensaje)
+
     # Desempaquetar cabecera (10 bytes)
     try:
-        campos = struct.unpack("!BBHHHH", mensaje[:10])
+        campos = _ESTRUCTURA_CABECERA.unpack_from(mensaje, 0)
         version, tipo, id_disp, secuencia, checksum, flags = campos
 
         if version != VERSION:
@@ -224,8 +747,8 @@ def desempaquetar_mensaje(mensaje):
 
         # Si es mensaje de datos GPS, desempaquetar payload
         # Payload empieza en byte 10, ocupa 20 bytes
-        if tipo == TIPO_DATOS_GPS and len(mensaje) >= 30:
-            payload = struct.unpack("!iiHIHHBB", mensaje[10:30])
+        if tipo == TIPO_DATOS_GPS and len(mensaje) >= TAM_MENSAJE_GPS:
+            payload = _ESTRUCTURA_PAYLOAD.unpack_from(mensaje, TAM_CABECERA)
             latitud, longitud, altitud, timestamp, velocidad, rumbo, bateria, estado = (
                 payload
             )
@@ -242,6 +765,18 @@ def desempaquetar_mensaje(mensaje):
                     "estado": estado,
                 }
             )
+        elif tipo == TIPO_ACK_SELECTIVO and len(mensaje) >= TAM_ACK_SELECTIVO:
+            seq_mas_alta, mapa_sack = _ESTRUCTURA_SACK.unpack_from(mensaje, TAM_CABECERA)
+            resultado["seq_mas_alta"] = seq_mas_alta
+            resultado["mapa_sack"] = mapa_sack
+        elif tipo == TIPO_LOTE_GPS:
+            fixes, error = desempaquetar_fixes(mensaje, verificar=False)
+            if fixes is None:
+                return None, error
+            resultado["fixes"] = [fix.a_dict() for fix in fixes]
+        elif tipo == TIPO_DELTA_GPS and len(mensaje) >= TAM_CABECERA_DELTA:
+            # Sin la posición anterior solo se puede informar qué cambió
+            resultado["presencia"] = mensaje[TAM_CABECERA]
 
         return resultado, "OK"
 
@@ -249,6 +784,305 @@ def desempaquetar_mensaje(mensaje):
         return None, f"Error al desempaquetar: {e}"
 
 
+_CAMPOS_CABECERA = (
+    "version",
+    "tipo",
+    "id_dispositivo",
+    "secuencia",
+    "checksum",
+    "flags",
+)
+_CAMPOS_PAYLOAD = (
+    "latitud",
+    "longitud",
+    "altitud",
+    "timestamp",
+    "velocidad",
+    "rumbo",
+    "bateria",
+    "estado",
+)
+_PAYLOAD_VACIO = (None,) * len(_CAMPOS_PAYLOAD)
+# Rango de cada campo del payload según su tipo en !iiHIHHBB
+_RANGOS_PAYLOAD = (
+    (-(1 << 31), (1 << 31) - 1),
+    (-(1 << 31), (1 << 31) - 1),
+    (0, 0xFFFF),
+    (0, 0xFFFFFFFF),
+    (0, 0xFFFF),
+    (0, 0xFFFF),
+    (0, 0xFF),
+    (0, 0xFF),
+)
+
+
+class MensajeGPS(namedtuple("MensajeGPS", _CAMPOS_CABECERA + _CAMPOS_PAYLOAD)):
+    """
+    Registro compacto de un mensaje decodificado (tupla con nombre, sin dict)
+
+    Tiene los mismos nombres de campo que el diccionario de
+    desempaquetar_mensaje. Los campos del payload valen None en mensajes
+    de solo cabecera (ACK, HEARTBEAT). Admite acceso por atributo
+    (datos.secuencia) y por clave (datos["secuencia"]) para compatibilidad.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, clave):
+        if isinstance(clave, str):
+            return getattr(self, clave)
+        return tuple.__getitem__(self, clave)
+
+    def a_dict(self):
+        """Retorna el diccionario equivalente al de desempaquetar_mensaje"""
+        resultado = dict(zip(_CAMPOS_CABECERA, self))
+        if self.latitud is not None:
+            resultado.update(zip(_CAMPOS_PAYLOAD, self[len(_CAMPOS_CABECERA) :]))
+        return resultado
+
+
+_nuevo_registro = tuple.__new__
+
+
+def desempaquetar_registro(mensaje, verificar=True, autenticador=None):
+    """
+    Desempaqueta un mensaje recibido en un MensajeGPS
+
+    Misma validación que desempaquetar_mensaje, pero decodifica el mensaje
+    completo con un solo unpack_from y no crea diccionarios.
+    verificar=False omite el CRC (quien llama ya usó verificar_checksum).
+    Con un Autenticador se comprueba además el TAG. Los registros de lotes
+    y deltas solo traen la cabecera: el cuerpo se lee con quitar_tag.
+    Retorna (registro, "OK") o (None, error).
+    """
+    if len(mensaje) < TAM_CABECERA:
+        return None, "Mensaje demasiado corto"
+
+    if verificar and not verificar_checksum(mensaje):
+        return None, "Checksum inválido"
+
+    if autenticador is not None:
+        motivo = autenticador.comprobar(mensaje)
+        if motivo is not None:
+            return None, motivo
+
+    try:
+        if mensaje[1] == TIPO_DATOS_GPS and len(mensaje) >= TAM_MENSAJE_GPS:
+            campos = _ESTRUCTURA_GPS.unpack_from(mensaje, 0)
+        else:
+            campos = _ESTRUCTURA_CABECERA.unpack_from(mensaje, 0) + _PAYLOAD_VACIO
+    except struct.error as e:
+        return None, f"Error al desempaquetar: {e}"
+
+    if campos[0] != VERSION:
+        return None, f"Versión incorrecta: {campos[0]}"
+
+    return _nuevo_registro(MensajeGPS, campos), "OK"
+
+
+def desempaquetar_fixes(mensaje, verificar=True):
+    """
+    Expande un TIPO_LOTE_GPS en una lista de MensajeGPS de tipo TIPO_DATOS_GPS
+
+    Cada registro lleva la versión, el ID y el checksum del lote con la SEQ
+    y los FLAGS de su posición, así que se procesa igual que un mensaje
+    suelto. verificar=False omite el CRC (quien llama ya lo verificó).
+    Retorna (lista, "OK") o (None, error).
+    """
+    if len(mensaje) < TAM_CABECERA_LOTE:
+        return None, "Lote demasiado corto"
+
+    if verificar and not verificar_checksum(mensaje):
+        return None, "Checksum inválido"
+
+    version, tipo, id_disp, _, checksum, _ = _ESTRUCTURA_CABECERA.unpack_from(mensaje, 0)
+    if version != VERSION:
+        return None, f"Versión incorrecta: {version}"
+    if tipo != TIPO_LOTE_GPS:
+        return None, f"Tipo incorrecto para un lote: {tipo}"
+
+    (cantidad,) = _ESTRUCTURA_CANTIDAD.unpack_from(mensaje, TAM_CABECERA)
+    if not 1 <= cantidad <= MAX_FIXES_LOTE:
+        return None, f"Cantidad de posiciones inválida: {cantidad}"
+    if len(mensaje) != TAM_CABECERA_LOTE + cantidad * TAM_FIX_LOTE:
+        return None, f"Tamaño de lote incorrecto para {cantidad} posiciones"
+
+    prefijo = (version, TIPO_DATOS_GPS, id_disp)
+    fixes = [
+        _nuevo_registro(MensajeGPS, prefijo + (fix[0], checksum) + fix[1:])
+        for fix in _ESTRUCTURA_FIX.iter_unpack(memoryview(mensaje)[TAM_CABECERA_LOTE:])
+    ]
+    return fixes, "OK"
+
+
+def desempaquetar_delta(mensaje, referencia, verificar=True):
+    """
+    Reconstruye un TIPO_DELTA_GPS sobre la posición anterior del dispositivo
+
+    referencia es el MensajeGPS (TIPO_DATOS_GPS) de la secuencia anterior;
+    si falta o no es esa secuencia hace falta un keyframe. verificar=False
+    omite el CRC (quien llama ya lo verificó).
+    Retorna (MensajeGPS de tipo TIPO_DATOS_GPS, "OK") o (None, error).
+    """
+    fin = len(mensaje)
+    if fin < TAM_CABECERA_DELTA:
+        return None, "Delta demasiado corto"
+
+    if verificar and not verificar_checksum(mensaje):
+        return None, "Checksum inválido"
+
+    version, tipo, id_disp, secuencia, checksum, flags = _ESTRUCTURA_CABECERA.unpack_from(
+        mensaje, 0
+    )
+    if version != VERSION:
+        return None, f"Versión incorrecta: {version}"
+    if tipo != TIPO_DELTA_GPS:
+        return None, f"Tipo incorrecto para un delta: {tipo}"
+    if (
+        referencia is None
+        or referencia.id_dispositivo != id_disp
+        or (referencia.secuencia + 1) % MAX_SEQ != secuencia
+    ):
+        return None, "Delta sin referencia: se espera un keyframe"
+
+    presencia = mensaje[TAM_CABECERA]
+    valores = list(referencia[len(_CAMPOS_CABECERA) :])
+    posicion = TAM_CABECERA_DELTA
+    for bit in range(len(valores)):
+        if not presencia >> bit & 1:
+            continue
+        valor = 0
+        for desplazamiento in range(0, 7 * MAX_BYTES_VARINT, 7):
+            if posicion >= fin:
+                return None, "Delta truncado"
+            byte = mensaje[posicion]
+            posicion += 1
+            valor |= (byte & 0x7F) << desplazamiento
+            if byte < 0x80:
+                break
+        else:
+            return None, "Varint demasiado largo"
+        valores[bit] += (valor >> 1) ^ -(valor & 1)
+        minimo, maximo = _RANGOS_PAYLOAD[bit]
+        if not minimo <= valores[bit] <= maximo:
+            return None, f"Delta fuera de rango en {_CAMPOS_PAYLOAD[bit]}"
+    if posicion != fin:
+        return None, "Delta con bytes sobrantes"
+
+    campos = (version, TIPO_DATOS_GPS, id_disp, secuencia, checksum, flags, *valores)
+    return _nuevo_registro(MensajeGPS, campos), "OK"
+
+
+# ============== DESEMPAQUETADO EN LOTE ==============
+LoteGPS = namedtuple("LoteGPS", _CAMPOS_CABECERA + _CAMPOS_PAYLOAD + ("validos",))
+LoteGPS.__doc__ = """
+Columnas de N mensajes GPS decodificados en lote
+
+Cada campo es una columna con N valores (arreglo NumPy o lista).
+validos[i] es verdadero si la trama i tiene versión, tipo y CRC correctos.
+"""
+
+_DTYPE_GPS = None
+_TABLA_CRC16_PAR_NP = None
+
+
+def _preparar_numpy():
+    """Construye (una vez) el dtype estructurado y la tabla CRC para NumPy"""
+    global _DTYPE_GPS, _TABLA_CRC16_PAR_NP
+    if _DTYPE_GPS is None:
+        # Mismo orden y tamaños que !BBHHHHiiHIHHBB, sin relleno (30 bytes)
+        _DTYPE_GPS = np.dtype(
+            [
+                ("version", "u1"),
+                ("tipo", "u1"),
+                ("id_dispositivo", ">u2"),
+                ("secuencia", ">u2"),
+                ("checksum", ">u2"),
+                ("flags", ">u2"),
+                ("latitud", ">i4"),
+                ("longitud", ">i4"),
+                ("altitud", ">u2"),
+                ("timestamp", ">u4"),
+                ("velocidad", ">u2"),
+                ("rumbo", ">u2"),
+                ("bateria", "u1"),
+                ("estado", "u1"),
+            ]
+        )
+        _TABLA_CRC16_PAR_NP = np.array(_TABLA_CRC16_PAR, dtype=np.uint16)
+    return _DTYPE_GPS, _TABLA_CRC16_PAR_NP
+
+
+def _desempaquetar_lote_numpy(vista, n):
+    dtype, tabla = _preparar_numpy()
+    registros = np.frombuffer(vista, dtype=dtype, count=n)
+
+    # CRC vectorizado: 15 palabras little-endian por trama, procesadas en
+    # columna para todas las tramas a la vez; la palabra 3 (checksum) es 0.
+    palabras = np.frombuffer(vista, dtype="<u2", count=n * (TAM_MENSAJE_GPS >> 1))
+    palabras = palabras.reshape(n, TAM_MENSAJE_GPS >> 1)
+    crc = np.full(n, 0xFFFF, dtype=np.uint16)
+    for columna in range(TAM_MENSAJE_GPS >> 1):
+        if columna == OFFSET_CHECKSUM >> 1:
+            crc = tabla[crc]
+        else:
+            crc = tabla[crc ^ palabras[:, columna]]
+
+    validos = (
+        (registros["version"] == VERSION)
+        & (registros["tipo"] == TIPO_DATOS_GPS)
+        & (registros["checksum"] == crc)
+    )
+    columnas = [
+        registros[campo].astype(registros.dtype[campo].newbyteorder("="))
+        for campo in _CAMPOS_CABECERA + _CAMPOS_PAYLOAD
+    ]
+    return LoteGPS(*columnas, validos)
+
+
+def _desempaquetar_lote_python(vista):
+    filas = list(_ESTRUCTURA_GPS.iter_unpack(vista))
+    if not filas:
+        return LoteGPS(*([] for _ in LoteGPS._fields))
+
+    checksums = calcular_checksums_lote(vista, omitir_checksum=True)
+    validos = [
+        fila[0] == VERSION and fila[1] == TIPO_DATOS_GPS and fila[4] == crc
+        for fila, crc in zip(filas, checksums)
+    ]
+    return LoteGPS(*(list(columna) for columna in zip(*filas)), validos)
+
+
+def desempaquetar_lote(buffer, usar_numpy=None):
+    """
+    Decodifica en bloque un buffer contiguo de N mensajes GPS de 30 bytes
+
+    Con NumPy disponible, el buffer se ve como un arreglo estructurado con
+    el formato exacto !BBHHHHiiHIHHBB (sin copias) y la versión, el tipo y
+    el CRC se validan de forma vectorizada. Sin NumPy se usa una versión en
+    Python puro con la misma salida (listas en lugar de arreglos).
+
+    Parámetros:
+    - buffer: bytes/bytearray/memoryview con N × 30 bytes; una trama
+      incompleta al final se ignora
+    - usar_numpy: None = automático, False = forzar Python puro
+
+    Retorna un LoteGPS con una columna por campo y la máscara 'validos'.
+    """
+    vista = memoryview(buffer).cast("B")
+    n = len(vista) // TAM_MENSAJE_GPS
+    vista = vista[: n * TAM_MENSAJE_GPS]
+
+    if usar_numpy is None:
+        usar_numpy = np is not None
+    elif usar_numpy and np is None:
+        raise ImportError("desempaquetar_lote con usar_numpy=True requiere NumPy")
+
+    if usar_numpy:
+        return _desempaquetar_lote_numpy(vista, n)
+    return _desempaquetar_lote_python(vista)
+
+
 # ============== FUNCIONES DE UTILIDAD ==============
 def convertir_coordenadas(lat_raw, lon_raw):
     """Convierte coordenadas de formato int a float (grados)"""
@@ -298,6 +1132,26 @@ def mostrar_mensaje(datos):
     elif datos["tipo"] == TIPO_ACK:
         print(f"[ACK] Dispositivo {datos['id_dispositivo']}, SEQ={datos['secuencia']}")
 
+    elif datos["tipo"] == TIPO_ACK_SELECTIVO:
+        print(
+            f"[ACK SELECTIVO] Dispositivo {datos['id_dispositivo']}, "
+            f"hasta SEQ={datos['secuencia']}, más alta={datos.get('seq_mas_alta')}, "
+            f"mapa=0x{datos.get('mapa_sack', 0):016X}"
+        )
+
+    elif datos["tipo"] == TIPO_LOTE_GPS:
+        fixes = datos.get("fixes", [])
+        print(
+            f"[LOTE GPS] Dispositivo {datos['id_dispositivo']}, {len(fixes)} posiciones "
+            f"desde SEQ={datos['secuencia']}"
+        )
+
+    elif datos["tipo"] == TIPO_DELTA_GPS:
+        print(
+            f"[DELTA GPS] Dispositivo {datos['id_dispositivo']}, SEQ={datos['secuencia']}, "
+            f"campos cambiados=0x{datos.get('presencia', 0):02X}"
+        )
+
     elif datos["tipo"] == TIPO_HEARTBEAT:
         print(f"[HEARTBEAT] Dispositivo {datos['id_dispositivo']}")
 
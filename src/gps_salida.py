@@ -0,0 +1,101 @@
+"""
+Salida por consola del servidor GPS fuera del hilo de recepción
+Redes de Computadoras - Práctica 3
+
+El servidor no imprime directamente en el camino de cada paquete: encola
+(funcion_formato, argumentos) en una cola acotada y un hilo aparte formatea
+y escribe en bloque. Si la terminal es lenta y la cola se llena, los
+eventos nuevos se descartan (y se cuentan) en lugar de frenar el socket.
+"""
+
+import queue
+import sys
+import threading
+
+# Modos de salida del servidor
+SALIDA_DETALLADA = "detallado"  # Todo evento, en texto (comportamiento clásico)
+SALIDA_MUESTREO = "muestreo"  # 1 de cada N paquetes por dispositivo + avisos
+SALIDA_RESUMEN = "resumen"  # Solo resúmenes periódicos y estadísticas finales
+SALIDA_JSON = "json"  # Un objeto JSON por línea y por evento
+SALIDA_SILENCIOSA = "silencioso"  # Nada por paquete
+MODOS_SALIDA = (
+    SALIDA_DETALLADA,
+    SALIDA_MUESTREO,
+    SALIDA_RESUMEN,
+    SALIDA_JSON,
+    SALIDA_SILENCIOSA,
+)
+
+CAPACIDAD_COLA = 10_000
+MAX_EVENTOS_POR_ESCRITURA = 1000
+
+
+class SalidaAsincrona:
+    """Escribe eventos desde un hilo propio a través de una cola acotada"""
+
+    def __init__(self, capacidad=CAPACIDAD_COLA, flujo=None):
+        self._cola = queue.Queue(capacidad)
+        self._flujo = flujo  # None = sys.stdout en el momento de escribir
+        self.descartados = 0
+        self._hilo = threading.Thread(
+            target=self._consumir, name="gps-salida", daemon=True
+        )
+        self._hilo.start()
+
+    def emitir(self, funcion, *args):
+        """
+        Encola un evento sin bloquear
+
+        funcion(*args) se evalúa en el hilo de salida y debe retornar el
+        texto a escribir (sin salto de línea final) o None.
+        """
+        try:
+            self._cola.put_nowait((funcion, args))
+        except queue.Full:
+            self.descartados += 1
+
+    def pendientes(self):
+        """Cantidad aproximada de eventos en cola"""
+        return self._cola.qsize()
+
+    def vaciar(self, timeout=2.0):
+        """Espera (como máximo timeout) a que se escriba todo lo encolado"""
+        listo = threading.Event()
+        try:
+            self._cola.put((None, listo), timeout=timeout)
+        except queue.Full:
+            return False
+        return listo.wait(timeout)
+
+    def _consumir(self):
+        cola = self._cola
+        while True:
+            eventos = [cola.get()]
+            try:
+                while len(eventos) < MAX_EVENTOS_POR_ESCRITURA:
+                    eventos.append(cola.get_nowait())
+            except queue.Empty:
+                pass
+
+            lineas = []
+            avisos = []
+            for funcion, args in eventos:
+                if funcion is None:
+                    avisos.append(args)  # Marca de vaciar(): avisar tras escribir
+                    continue
+                try:
+                    texto = funcion(*args)
+                except Exception as e:
+                    texto = f"[!] Error al formatear evento: {e}"
+                if texto is not None:
+                    lineas.append(texto)
+
+            if lineas:
+                flujo = self._flujo or sys.stdout
+                try:
+                    flujo.write("\n".join(lineas) + "\n")
+                    flujo.flush()
+                except (OSError, ValueError):
+                    pass
+            for listo in avisos:
+                listo.set()
@@ -6,24 +6,272 @@ Este programa recibe datos de múltiples dispositivos GPS
 y los procesa/almacena usando el protocolo UDP.
 """
 
-import socket
 import os
+import socket
+import select
+import struct
 import time
 import sys
+import argparse
+import json
 from datetime import datetime
 from gps_protocolo import (
+    ALGORITMOS_TAG,
+    CLAVE_SECRETA,
+    ERROR_SIN_AUTENTICAR,
+    ERROR_TAG_INVALIDO,
+    FLAG_ACK_SELECTIVO,
     FLAG_BATERIA_BAJA,
     FLAG_EN_MOVIMIENTO,
     FLAG_IGNICION_ON,
     FLAG_SOS,
     PUERTO_SERVIDOR,
     TIPO_DATOS_GPS,
+    TIPO_DELTA_GPS,
     TIPO_HEARTBEAT,
+    TIPO_LOTE_GPS,
+    Autenticador,
     convertir_coordenadas,
-    desempaquetar_mensaje,
-    empaquetar_ack,
+    desempaquetar_delta,
+    desempaquetar_fixes,
+    desempaquetar_registro,
+    empaquetar_ack_en,
+    empaquetar_ack_selectivo_en,
+    quitar_tag,
+    secuencia_confirmada,
+    verificar_checksum,
+    BITS_SACK,
     MAX_SEQ,
+    TAM_ACK_SELECTIVO,
+    TAM_CABECERA,
+    TAM_TAG,
+)
+from gps_salida import (
+    MODOS_SALIDA,
+    SALIDA_DETALLADA,
+    SALIDA_JSON,
+    SALIDA_MUESTREO,
+    SALIDA_RESUMEN,
+    SALIDA_SILENCIOSA,
+    SalidaAsincrona,
+)
+from gps_log import (
+    FSYNC_NUNCA,
+    INTERVALO_VACIADO_LOG,
+    POLITICAS_FSYNC,
+    EscritorLog,
+    formatear_fecha_log,
+    formatear_linea_log,
 )
+from gps_almacen import AlmacenTrayectos
+from gps_dispositivos import (
+    MAX_VENTANA_SEQ,
+    MIN_VENTANA_SEQ,
+    SEQ_DUPLICADA,
+    SEQ_NUEVA,
+    SEQ_TARDIA,
+    TAM_VENTANA_SEQ,
+    TablaDispositivos,
+)
+from gps_espacial import IndiceEspacial
+from gps_expiracion import VigilanciaInactividad
+from gps_metricas import MAX_DISPOSITIVOS_PERDIDA, MetricasRecepcion, ServidorMetricas
+from gps_perfil import ControlPerfil, PerfilEtapas
+from gps_sqlite import (
+    CAPACIDAD_COLA_SQLITE,
+    FILAS_POR_LOTE,
+    INTERVALO_MS,
+    POLITICA_DESCARTAR,
+    POLITICAS_COLA,
+    DestinoSQLite,
+)
+
+TAM_MAX_DATAGRAMA = 2048  # Cabe un TIPO_LOTE_GPS completo (MTU_DATAGRAMA)
+# Mensajes de un dispositivo que fuerzan su ACK selectivo antes de la tarea
+# periódica, para que el mapa de BITS_SACK secuencias siga cubriéndolos
+MAX_ACKS_AGRUPADOS = BITS_SACK // 2
+# Antigüedad máxima de las posiciones de un TIPO_LOTE_GPS (atraso tras
+# perder cobertura); las del futuro se siguen limitando a ventana_tiempo_seg
+ANTIGUEDAD_MAX_LOTE = 7 * 24 * 3600
+
+
+# ============== FORMATO DE EVENTOS DE CONSOLA ==============
+# Se evalúan en el hilo de SalidaAsincrona, no en el de recepción.
+def formatear_datos_gps(datos, direccion):
+    """Texto legible (varias líneas) de un mensaje GPS recibido"""
+    lat, lon = convertir_coordenadas(datos.latitud, datos.longitud)
+    vel = datos.velocidad / 10.0
+    rumbo = datos.rumbo / 10.0
+    fecha = datetime.fromtimestamp(datos.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+    lineas = [
+        f"\n{'─'*60}",
+        "[←] DATOS GPS RECIBIDOS",
+        f"{'─'*60}",
+        f"  Origen:       {direccion[0]}:{direccion[1]}",
+        f"  Dispositivo:  GPS #{datos.id_dispositivo}",
+        f"  Secuencia:    #{datos.secuencia}",
+        f"  Coordenadas:  {lat:.7f}°, {lon:.7f}°",
+        f"  Altitud:      {datos.altitud} m",
+        f"  Velocidad:    {vel:.1f} km/h",
+        f"  Rumbo:        {rumbo:.1f}°",
+        f"  Batería:      {datos.bateria}%",
+        f"  Timestamp:    {fecha}",
+    ]
+
+    # Mostrar flags activos
+    flags_activos = []
+    if datos.flags & FLAG_BATERIA_BAJA:
+        flags_activos.append("⚠ BATERÍA BAJA")
+    if datos.flags & FLAG_SOS:
+        flags_activos.append("🆘 SOS")
+    if datos.flags & FLAG_EN_MOVIMIENTO:
+        flags_activos.append("🚗 EN MOVIMIENTO")
+    if datos.flags & FLAG_IGNICION_ON:
+        flags_activos.append("🔑 IGNICIÓN ON")
+
+    if flags_activos:
+        lineas.append(f"  Estado:       {', '.join(flags_activos)}")
+
+    lineas.append(f"{'─'*60}\n")
+    return "\n".join(lineas)
+
+
+def formatear_heartbeat(datos, direccion):
+    """Texto legible (varias líneas) de un heartbeat recibido"""
+    fecha = datetime.fromtimestamp(time.time()).strftime("%Y-%m-%d %H:%M:%S")
+    return "\n".join(
+        [
+            f"\n{'─'*60}",
+            "[←] HEARTBEAT RECIBIDO",
+            f"{'─'*60}",
+            f"  Origen:       {direccion[0]}:{direccion[1]}",
+            f"  Dispositivo:  GPS #{datos.id_dispositivo}",
+            f"  Secuencia:    #{datos.secuencia}",
+            f"  Timestamp:    {fecha}",
+            f"  Flags:        0x{datos.flags:02X}",
+            f"{'─'*60}\n",
+        ]
+    )
+
+
+_TEXTO_EVENTOS = {
+    "gps": formatear_datos_gps,
+    "heartbeat": formatear_heartbeat,
+    "nuevo": lambda id_disp: f"\n[+] Nuevo dispositivo registrado: GPS #{id_disp}",
+    "duplicado": lambda id_disp, seq, ultima: (
+        f"[!] Mensaje duplicado/antiguo: GPS #{id_disp}, SEQ={seq} (esperaba >{ultima})"
+    ),
+    "perdida": lambda id_disp, perdidos, ultima, seq: (
+        f"[!] Se perdieron {perdidos} mensaje(s): GPS #{id_disp}, "
+        f"salto de SEQ {ultima} a {seq}"
+    ),
+    "reordenado": lambda id_disp, seq, ultima: (
+        f"[i] Mensaje atrasado aceptado: GPS #{id_disp}, SEQ={seq} (última {ultima})"
+    ),
+    "fuera_ventana": lambda id_disp, ts: (
+        f"[!] Timestamp fuera de ventana: GPS #{id_disp}, TS={ts}"
+    ),
+    "ack": lambda id_disp, seq: f"[→] ACK enviado a GPS #{id_disp} (SEQ={seq})",
+    "ack_selectivo": lambda id_disp, acumulado, mas_alta, n: (
+        f"[→] ACK selectivo a GPS #{id_disp} (hasta SEQ={acumulado}, "
+        f"más alta {mas_alta}, {n} mensaje(s))"
+    ),
+    "error": lambda direccion, error: (
+        f"[✗] Error al procesar mensaje de {direccion}: {error}"
+    ),
+    "sin_reporte": lambda id_disp, silencio: (
+        f"[!] GPS #{id_disp} sin reportes hace {silencio:.0f}s"
+    ),
+    "desconectado": lambda id_disp, silencio: (
+        f"[-] GPS #{id_disp} desconectado (sin reportes hace {silencio:.0f}s)"
+    ),
+    "aviso": lambda texto: texto,
+    "resumen": lambda campos: (
+        f"[i] Recibidos: {campos['recibidos']} ({campos['tasa']:.1f} msg/s) | "
+        f"Perdidos: {campos['perdidos']} | "
+        f"Duplicados: {campos['duplicados']} | "
+        f"Errores: {campos['errores']} | "
+        f"Dispositivos: {campos['dispositivos']}"
+    ),
+}
+
+
+def _campos_gps(datos, direccion):
+    lat, lon = convertir_coordenadas(datos.latitud, datos.longitud)
+    return {
+        "id_dispositivo": datos.id_dispositivo,
+        "secuencia": datos.secuencia,
+        "latitud": lat,
+        "longitud": lon,
+        "altitud": datos.altitud,
+        "timestamp": datos.timestamp,
+        "velocidad": datos.velocidad / 10.0,
+        "rumbo": datos.rumbo / 10.0,
+        "bateria": datos.bateria,
+        "flags": datos.flags,
+        "origen": f"{direccion[0]}:{direccion[1]}",
+    }
+
+
+_CAMPOS_EVENTOS = {
+    "gps": _campos_gps,
+    "heartbeat": lambda datos, direccion: {
+        "id_dispositivo": datos.id_dispositivo,
+        "secuencia": datos.secuencia,
+        "flags": datos.flags,
+        "origen": f"{direccion[0]}:{direccion[1]}",
+    },
+    "nuevo": lambda id_disp: {"id_dispositivo": id_disp},
+    "duplicado": lambda id_disp, seq, ultima: {
+        "id_dispositivo": id_disp,
+        "secuencia": seq,
+        "ultima_seq": ultima,
+    },
+    "perdida": lambda id_disp, perdidos, ultima, seq: {
+        "id_dispositivo": id_disp,
+        "perdidos": perdidos,
+        "ultima_seq": ultima,
+        "secuencia": seq,
+    },
+    "reordenado": lambda id_disp, seq, ultima: {
+        "id_dispositivo": id_disp,
+        "secuencia": seq,
+        "ultima_seq": ultima,
+    },
+    "fuera_ventana": lambda id_disp, ts: {"id_dispositivo": id_disp, "timestamp": ts},
+    "ack": lambda id_disp, seq: {"id_dispositivo": id_disp, "secuencia": seq},
+    "ack_selectivo": lambda id_disp, acumulado, mas_alta, n: {
+        "id_dispositivo": id_disp,
+        "acumulado": acumulado,
+        "seq_mas_alta": mas_alta,
+        "mensajes": n,
+    },
+    "error": lambda direccion, error: {
+        "origen": f"{direccion[0]}:{direccion[1]}",
+        "error": error,
+    },
+    "sin_reporte": lambda id_disp, silencio: {
+        "id_dispositivo": id_disp,
+        "silencio_seg": round(silencio, 1),
+    },
+    "desconectado": lambda id_disp, silencio: {
+        "id_dispositivo": id_disp,
+        "silencio_seg": round(silencio, 1),
+    },
+    "aviso": lambda texto: {"mensaje": texto.strip()},
+    "resumen": lambda campos: campos,
+}
+
+
+def formatear_json(tipo, args):
+    """Una línea JSON para el evento tipo"""
+    campos = _CAMPOS_EVENTOS[tipo](*args)
+    return json.dumps({"evento": tipo, **campos}, ensure_ascii=False)
+
+
+# Eventos por paquete sujetos a muestreo; los avisos se muestran siempre
+_EVENTOS_MUESTREADOS = frozenset(("gps", "heartbeat", "ack", "ack_selectivo"))
 
 
 class ServidorGPS:
@@ -34,38 +282,206 @@ class ServidorGPS:
         log_path="gps_log.txt",
         max_log_bytes=1_000_000,
         ventana_tiempo_seg=300,
+        antiguedad_max_lote_seg=ANTIGUEDAD_MAX_LOTE,
+        lote_recepcion=1,
+        reusar_puerto=False,
+        modo_salida=SALIDA_DETALLADA,
+        muestreo=100,
+        generaciones_log=1,
+        fsync_log=FSYNC_NUNCA,
+        intervalo_vaciado_log=INTERVALO_VACIADO_LOG,
+        almacen_path=None,
+        sqlite_path=None,
+        sqlite_filas_por_lote=FILAS_POR_LOTE,
+        sqlite_intervalo_ms=INTERVALO_MS,
+        sqlite_politica=POLITICA_DESCARTAR,
+        expirar_inactivos_seg=None,
+        alerta_sin_reporte_seg=None,
+        archivo_expirados=None,
+        tam_ventana_seq=TAM_VENTANA_SEQ,
+        puerto_metricas=None,
+        metricas_dispositivos=MAX_DISPOSITIVOS_PERDIDA,
+        perfil_etapas=False,
+        coalescer_acks_ms=None,
+        autenticar=False,
+        clave_autenticacion=CLAVE_SECRETA,
+        claves_dispositivos=None,
+        algoritmo_tag="blake2s",
     ):
         self.puerto = puerto
         self.enviar_ack = enviar_ack
         self.socket = None
-        self.dispositivos = (
-            {}
-        )  # {id_dispositivo: {'ultima_seq': n, 'ultima_pos': (lat,lon), ...}}
+        # Se lee como {id_dispositivo: {'ultima_seq': n, 'ultima_pos': (lat,lon), ...}}
+        self.dispositivos = TablaDispositivos(tam_ventana=tam_ventana_seq)
         self.mensajes_recibidos = 0
         self.mensajes_perdidos = 0
         self.mensajes_duplicados = 0
+        self.mensajes_reordenados = 0
+        self.acks_fallidos = 0
+        self.acks_enviados = 0  # Datagramas de ACK (simples y selectivos)
+        self.acks_selectivos = 0
+        self.lotes_fixes = 0  # Datagramas TIPO_LOTE_GPS expandidos
+        self.deltas_recibidos = 0  # TIPO_DELTA_GPS reconstruidos
+        self.deltas_sin_referencia = 0  # Descartados: faltaba la posición anterior
+        self.rechazados_autenticacion = 0  # Sin TAG o con TAG inválido
         self.errores = 0
         self.ventana_tiempo_seg = ventana_tiempo_seg
+        self.antiguedad_max_lote_seg = antiguedad_max_lote_seg
         self.log_path = log_path
         self.max_log_bytes = max_log_bytes
         self._client_proc = None
+        # Datagramas drenados por despertar (1 = un recvfrom por paquete)
+        self.lote_recepcion = max(1, int(lote_recepcion))
+        self.lotes_recibidos = 0
+        self._detenido = False
+        self._inicio = None
+        self._resumen_anterior = (0, None)
+        # Transporte asyncio por el que llegó el datagrama en curso (motor asyncio)
+        self.transporte = None
+        # SO_REUSEPORT: varios procesos comparten el puerto (modo multiproceso)
+        self.reusar_puerto = reusar_puerto
+        # Tareas periódicas [intervalo, funcion, proxima_ejecucion]
+        self.tareas_periodicas = []
+        self._proxima_tarea = float("inf")
+        # Autenticación: exige FLAG_AUTENTICADO con TAG válido y firma los ACK
+        self.autenticador = None
+        if autenticar:
+            self.autenticador = Autenticador(
+                clave_autenticacion, claves_dispositivos, algoritmo=algoritmo_tag
+            )
+        # Buffer reutilizable para construir ACKs sin crear objetos por paquete
+        tam_tag = TAM_TAG if self.autenticador is not None else 0
+        self._buffer_ack = bytearray(TAM_CABECERA + tam_tag)
+        self._buffer_ack_selectivo = bytearray(TAM_ACK_SELECTIVO + tam_tag)
+        # ACK agrupados por dispositivo (solo dispositivos con FLAG_ACK_SELECTIVO):
+        # {id_dispositivo: [direccion, secuencias]} hasta la próxima tarea
+        self.coalescer_acks = coalescer_acks_ms / 1000.0 if coalescer_acks_ms else None
+        self._acks_pendientes = {}
+        if self.coalescer_acks:
+            self.agregar_tarea_periodica(self.coalescer_acks, self.enviar_acks_pendientes)
+        # Mientras se expande un TIPO_LOTE_GPS, secuencias a confirmar al final
+        self._acks_lote = None
+        # Últimas posiciones indexadas para consultas por zona
+        self.indice_espacial = IndiceEspacial()
+        # Salida por consola: modo y escritura en un hilo aparte
+        if modo_salida not in MODOS_SALIDA:
+            raise ValueError(f"modo_salida inválido: {modo_salida}")
+        self.modo_salida = modo_salida
+        self.muestreo = max(1, int(muestreo))
+        self._muestras = {}  # {id_dispositivo: paquetes vistos} (modo muestreo)
+        self.salida = SalidaAsincrona()
+        # Log con archivo abierto y escritura en bloque (vaciado por tiempo
+        # como tarea periódica, por tamaño en cada escritura)
+        self.log = None
+        self._fecha_log = (None, "")  # (timestamp, texto) del último registro
+        if log_path:
+            self.log = EscritorLog(
+                log_path,
+                max_bytes=max_log_bytes,
+                generaciones=generaciones_log,
+                fsync=fsync_log,
+            )
+        # Almacén binario de trayectos (registros de 32 bytes, ver gps_almacen)
+        self.almacen_path = almacen_path
+        # La holgura de sus consultas es el adelanto máximo aceptado del reloj
+        # del dispositivo; los lotes atrasados no la agrandan
+        self.almacen = None
+        if almacen_path:
+            self.almacen = AlmacenTrayectos(almacen_path, holgura=ventana_tiempo_seg)
+        if self.log is not None or self.almacen is not None:
+            self.agregar_tarea_periodica(intervalo_vaciado_log, self.vaciar_log)
+        # Base SQLite para reportes (escrita desde su propio hilo)
+        self.sqlite_path = sqlite_path
+        self.sqlite = None
+        if sqlite_path:
+            self.sqlite = DestinoSQLite(
+                sqlite_path,
+                filas_por_lote=sqlite_filas_por_lote,
+                intervalo_ms=sqlite_intervalo_ms,
+                capacidad=CAPACIDAD_COLA_SQLITE,
+                politica=sqlite_politica,
+            )
+        # Alertas y expiración por inactividad (rueda de tiempo, ver gps_expiracion)
+        self.vigilancia = None
+        self.archivo_expirados = archivo_expirados
+        self.dispositivos_expirados = 0
+        self.alertas_sin_reporte = 0
+        if expirar_inactivos_seg or alerta_sin_reporte_seg:
+            self.vigilancia = VigilanciaInactividad(
+                self.dispositivos,
+                expirar_seg=expirar_inactivos_seg,
+                alerta_seg=alerta_sin_reporte_seg,
+            )
+            self.agregar_tarea_periodica(
+                self.vigilancia.rueda.resolucion, self.revisar_inactivos
+            )
+        # Tiempos por etapa de cada datagrama (opcional, ver gps_perfil)
+        self.perfil = PerfilEtapas() if perfil_etapas else None
+        # Métricas en vivo por HTTP (histogramas solo si están habilitadas)
+        self.metricas = None
+        self.servidor_metricas = None
+        if puerto_metricas is not None:
+            try:
+                self.servidor_metricas = ServidorMetricas(
+                    self, puerto_metricas, max_dispositivos=metricas_dispositivos
+                )
+            except OSError as e:
+                print(f"[✗] No se pudo abrir el puerto de métricas {puerto_metricas}: {e}")
+            else:
+                self.metricas = MetricasRecepcion()
+                self.agregar_tarea_periodica(1.0, self._actualizar_tasa)
 
         print("\n" + "=" * 60)
         print("  SERVIDOR GPS CENTRAL")
         print("=" * 60)
         print(f"  Puerto: {self.puerto}")
         print(f"  ACK automático: {'Sí' if self.enviar_ack else 'No'}")
-        print(f"  Ventana tiempo: {self.ventana_tiempo_seg}s")
+        if self.enviar_ack and self.coalescer_acks:
+            print(f"  ACK selectivos agrupados cada {self.coalescer_acks * 1000:g} ms")
+        print(
+            f"  Ventana tiempo: {self.ventana_tiempo_seg}s "
+            f"(lotes atrasados: hasta {self.antiguedad_max_lote_seg}s)"
+        )
+        if self.lote_recepcion > 1:
+            print(f"  Recepción en lotes: hasta {self.lote_recepcion} datagramas")
+        if self.modo_salida == SALIDA_MUESTREO:
+            print(f"  Salida: {self.modo_salida} (1 de cada {self.muestreo})")
+        else:
+            print(f"  Salida: {self.modo_salida}")
         if self.log_path:
-            print(f"  Log: {self.log_path} (max {self.max_log_bytes} bytes)")
+            print(
+                f"  Log: {self.log_path} (max {self.max_log_bytes} bytes, "
+                f"{self.log.generaciones} generación(es), fsync: {self.log.fsync})"
+            )
         else:
             print("  Log: deshabilitado")
+        if self.almacen_path:
+            print(f"  Almacén binario: {self.almacen_path}")
+        if self.sqlite_path:
+            print(
+                f"  SQLite: {self.sqlite_path} (lotes de {self.sqlite.filas_por_lote} "
+                f"filas o {self.sqlite.intervalo * 1000:.0f} ms, "
+                f"cola llena: {self.sqlite.politica})"
+            )
+        if self.vigilancia is not None:
+            if self.vigilancia.alerta_seg:
+                print(f"  Alerta sin reportes: {self.vigilancia.alerta_seg}s")
+            if self.vigilancia.expirar_seg:
+                destino = f" -> {archivo_expirados}" if archivo_expirados else ""
+                print(f"  Expirar inactivos: {self.vigilancia.expirar_seg}s{destino}")
+        if self.servidor_metricas is not None:
+            host, puerto = self.servidor_metricas.direccion
+            print(f"  Métricas: http://{host}:{puerto}/metrics")
+        if self.perfil is not None:
+            print("  Tiempos por etapa: habilitados")
         print("=" * 60 + "\n")
 
     def iniciar(self):
         """Inicia el servidor UDP"""
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if self.reusar_puerto:
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             self.socket.bind(("0.0.0.0", self.puerto))
             # Agregar timeout para que Ctrl+C funcione en Windows
             self.socket.settimeout(1.0)
@@ -77,221 +493,424 @@ class ServidorGPS:
             return False
 
     def registrar_dispositivo(self, id_dispositivo):
-        """Registra un nuevo dispositivo o actualiza su información"""
-        if id_dispositivo not in self.dispositivos:
-            self.dispositivos[id_dispositivo] = {
-                "primera_conexion": time.time(),
-                "ultima_conexion": time.time(),
-                "ultima_seq": 0,
-                "mensajes_recibidos": 0,
-                "ultima_pos": None,
-                "ultima_velocidad": 0,
-                "ultimo_rumbo": 0,
-                "bateria": 100,
-                "flags": 0,
-            }
-            print(f"\n[+] Nuevo dispositivo registrado: GPS #{id_dispositivo}")
-        else:
-            self.dispositivos[id_dispositivo]["ultima_conexion"] = time.time()
+        """Registra un nuevo dispositivo o actualiza su conexión; retorna su estado"""
+        ahora = time.time()
+        estado, nuevo = self.dispositivos.registrar(id_dispositivo, ahora)
+        if nuevo:
+            self._evento("nuevo", id_dispositivo, id_dispositivo)
+            if self.vigilancia is not None:
+                self.vigilancia.vigilar(id_dispositivo, ahora)
+        return estado
 
 
-    def _es_seq_mas_reciente(self, seq_nueva, seq_ultima):
-        """
-        Compara secuencias con wrap-around (16 bits).
-        Retorna True si seq_nueva es mas reciente que seq_ultima.
+    def _evento(self, tipo, id_disp, *args):
         """
-        if seq_nueva == seq_ultima:
-            return False
-        # Distancia hacia adelante en modulo 65536
-        adelante = (seq_nueva - seq_ultima) % MAX_SEQ
-        # Considerar "reciente" si esta en la mitad superior del anillo
-        return 0 < adelante < (MAX_SEQ // 2)
+        Entrega un evento a la salida según el modo configurado
 
-    def procesar_mensaje(self, datos, direccion_cliente):
-        """Procesa un mensaje GPS recibido"""
-        id_disp = datos["id_dispositivo"]
-        seq = datos["secuencia"]
+        Solo encola (tipo, argumentos): el formateo y la escritura ocurren
+        en el hilo de SalidaAsincrona.
+        """
+        modo = self.modo_salida
+        if modo == SALIDA_DETALLADA:
+            self.salida.emitir(_TEXTO_EVENTOS[tipo], *args)
+        elif modo == SALIDA_JSON:
+            self.salida.emitir(formatear_json, tipo, args)
+        elif modo == SALIDA_MUESTREO:
+            if tipo in _EVENTOS_MUESTREADOS and not self._toca_muestra(tipo, id_disp):
+                return
+            self.salida.emitir(_TEXTO_EVENTOS[tipo], *args)
+        # SALIDA_RESUMEN / SALIDA_SILENCIOSA: nada por paquete
 
-        # Registrar dispositivo
-        self.registrar_dispositivo(id_disp)
+    def _toca_muestra(self, tipo, id_disp):
+        """1 de cada N paquetes por dispositivo; el ACK sigue a su paquete"""
+        cuenta = self._muestras.get(id_disp, 0)
+        if tipo != "ack":
+            cuenta += 1
+            self._muestras[id_disp] = cuenta
+        return (cuenta - 1) % self.muestreo == 0
 
-        # Verificar secuencia
-        ultima_seq = self.dispositivos[id_disp]["ultima_seq"]
+    def _aviso(self, texto):
+        """Avisos y errores poco frecuentes (no se muestrean)"""
+        self._evento("aviso", None, texto)
 
-        if not self._es_seq_mas_reciente(seq, ultima_seq):
-            # Mensaje duplicado o fuera de orden (incluye wrap-around)
-            self.mensajes_duplicados += 1
-            print(
-                f"[!] Mensaje duplicado/antiguo: GPS #{id_disp}, SEQ={seq} (esperaba >{ultima_seq})"
-            )
-            return False
+    def procesar_mensaje(self, datos, direccion_cliente, antiguedad_max=None):
+        """
+        Procesa un mensaje GPS recibido (MensajeGPS de desempaquetar_registro)
 
-        # Calcular perdidas considerando wrap-around
-        salto = (seq - ultima_seq) % MAX_SEQ
-        if salto > 1:
-            # Se perdieron mensajes
-            perdidos = salto - 1
-            self.mensajes_perdidos += perdidos
-            print(
-                f"[!] Se perdieron {perdidos} mensaje(s): GPS #{id_disp}, salto de SEQ {ultima_seq} a {seq}"
-            )
+        antiguedad_max: segundos que puede tener de atraso el timestamp (por
+        defecto ventana_tiempo_seg); hacia el futuro el límite es siempre
+        ventana_tiempo_seg. Las repeticiones las rechaza la ventana de
+        secuencias.
+        """
+        id_disp = datos.id_dispositivo
+        seq = datos.secuencia
 
-        # Actualizar información del dispositivo
-        self.dispositivos[id_disp]["ultima_seq"] = seq
-        self.dispositivos[id_disp]["mensajes_recibidos"] += 1
+        # Registrar dispositivo
+        estado = self.registrar_dispositivo(id_disp)
 
-        if datos["tipo"] == TIPO_DATOS_GPS:
-            # Validar ventana temporal (anti-replay básico)
-            ahora = time.time()
-            if abs(datos["timestamp"] - ahora) > self.ventana_tiempo_seg:
+        if datos.tipo == TIPO_DATOS_GPS:
+            # Validar ventana temporal (anti-replay básico) antes de marcar la
+            # secuencia: un rechazado no cuenta como recibido ni se confirma
+            # si el dispositivo lo retransmite
+            if antiguedad_max is None:
+                antiguedad_max = self.ventana_tiempo_seg
+            atraso = time.time() - datos.timestamp
+            if atraso > antiguedad_max or -atraso > self.ventana_tiempo_seg:
                 self.errores += 1
-                print(
-                    f"[!] Timestamp fuera de ventana: GPS #{id_disp}, TS={datos['timestamp']}"
-                )
+                self._evento("fuera_ventana", id_disp, id_disp, datos.timestamp)
                 return False
 
-            lat, lon = convertir_coordenadas(datos["latitud"], datos["longitud"])
-            vel = datos["velocidad"] / 10.0
-            rumbo = datos["rumbo"] / 10.0
+        # Verificar secuencia contra la ventana de recepción (con wrap-around)
+        ultima_seq = estado.ultima_seq
+        resultado, perdidos = self.dispositivos.registrar_secuencia(estado, seq)
+
+        if resultado == SEQ_NUEVA:
+            if perdidos:
+                self.mensajes_perdidos += perdidos
+                self._evento("perdida", id_disp, id_disp, perdidos, ultima_seq, seq)
+        elif resultado == SEQ_TARDIA:
+            # Llegó tarde pero llena un hueco: no estaba perdido
+            self.mensajes_perdidos -= 1
+            self.mensajes_reordenados += 1
+            self._evento("reordenado", id_disp, id_disp, seq, ultima_seq)
+        else:
+            # Duplicado exacto o más viejo que la ventana
+            self.mensajes_duplicados += 1
+            self._evento("duplicado", id_disp, id_disp, seq, ultima_seq)
+            if resultado == SEQ_DUPLICADA and datos.tipo in (TIPO_DATOS_GPS, TIPO_HEARTBEAT):
+                # Se perdió el ACK y el dispositivo retransmite: repetirlo
+                self.responder_ack(datos, direccion_cliente)
+            return False
+
+        estado.mensajes_recibidos += 1
 
-            self.dispositivos[id_disp]["ultima_pos"] = (lat, lon)
-            self.dispositivos[id_disp]["ultima_velocidad"] = vel
-            self.dispositivos[id_disp]["ultimo_rumbo"] = rumbo
-            self.dispositivos[id_disp]["bateria"] = datos["bateria"]
-            self.dispositivos[id_disp]["flags"] = datos["flags"]
+        if datos.tipo == TIPO_DATOS_GPS:
+            # Un paquete atrasado se registra pero no pisa el último estado
+            if resultado == SEQ_NUEVA:
+                estado.referencia = datos  # Base del próximo TIPO_DELTA_GPS
+                lat, lon = convertir_coordenadas(datos.latitud, datos.longitud)
+                estado.ultima_pos = (lat, lon)
+                self.indice_espacial.actualizar(id_disp, lat, lon)
+                estado.ultima_velocidad = datos.velocidad / 10.0
+                estado.ultimo_rumbo = datos.rumbo / 10.0
+                estado.bateria = datos.bateria
+                estado.flags = datos.flags
 
             # Mostrar datos recibidos
-            self.mostrar_datos_gps(datos, direccion_cliente)
+            self._evento("gps", id_disp, datos, direccion_cliente)
 
             # Guardar en log (opcional)
-            self.guardar_log(datos)
-        elif datos["tipo"] == TIPO_HEARTBEAT:
-            self.dispositivos[id_disp]["flags"] = datos["flags"]
-            self.mostrar_heartbeat(datos, direccion_cliente)
+            if self.perfil is None:
+                self.guardar_log(datos)
+            else:
+                inicio = time.perf_counter_ns()
+                self.guardar_log(datos)
+                self.perfil.guardar_log.registrar(time.perf_counter_ns() - inicio)
+        elif datos.tipo == TIPO_HEARTBEAT:
+            if resultado == SEQ_NUEVA:
+                estado.flags = datos.flags
+            self._evento("heartbeat", id_disp, datos, direccion_cliente)
+            if self.sqlite is not None:
+                self.sqlite.agregar_heartbeat(datos)
 
         self.mensajes_recibidos += 1
         return True
 
-    def mostrar_datos_gps(self, datos, direccion):
-        """Muestra los datos GPS recibidos en formato legible"""
-        lat, lon = convertir_coordenadas(datos["latitud"], datos["longitud"])
-        vel = datos["velocidad"] / 10.0
-        rumbo = datos["rumbo"] / 10.0
-
-        print(f"\n{'─'*60}")
-        print("[←] DATOS GPS RECIBIDOS")
-        print(f"{'─'*60}")
-        print(f"  Origen:       {direccion[0]}:{direccion[1]}")
-        print(f"  Dispositivo:  GPS #{datos['id_dispositivo']}")
-        print(f"  Secuencia:    #{datos['secuencia']}")
-        print(f"  Coordenadas:  {lat:.7f}°, {lon:.7f}°")
-        print(f"  Altitud:      {datos['altitud']} m")
-        print(f"  Velocidad:    {vel:.1f} km/h")
-        print(f"  Rumbo:        {rumbo:.1f}°")
-        print(f"  Batería:      {datos['bateria']}%")
-        print(
-            f"  Timestamp:    {datetime.fromtimestamp(datos['timestamp']).strftime('%Y-%m-%d %H:%M:%S')}"
-        )
+    def revisar_inactivos(self, ahora=None):
+        """
+        Tarea periódica: alerta por dispositivos sin reportes y expira los
+        inactivos (los quita de la tabla y, si se pidió, archiva su estado)
+        """
+        if ahora is None:
+            ahora = time.time()
+        alertas, expirados = self.vigilancia.revisar(ahora)
+        for id_disp, silencio in alertas:
+            self.alertas_sin_reporte += 1
+            self._evento("sin_reporte", id_disp, id_disp, silencio)
+        if not expirados:
+            return
+        archivados = []
+        for id_disp, silencio in expirados:
+            estado = self.dispositivos.eliminar(id_disp)
+            self.indice_espacial.eliminar(id_disp)
+            self._muestras.pop(id_disp, None)
+            self.dispositivos_expirados += 1
+            self._evento("desconectado", id_disp, id_disp, silencio)
+            if estado is not None and self.archivo_expirados:
+                archivados.append(
+                    {"id_dispositivo": id_disp, "expirado": ahora, **estado.como_dict()}
+                )
+        if archivados:
+            self._archivar_expirados(archivados)
+
+    def _archivar_expirados(self, archivados):
+        """Agrega el estado final de los expirados (una línea JSON c/u)"""
+        try:
+            with open(self.archivo_expirados, "a", encoding="utf-8") as f:
+                for estado in archivados:
+                    f.write(json.dumps(estado, ensure_ascii=False) + "\n")
+        except OSError as e:
+            self._aviso(f"[!] No se pudo archivar dispositivos expirados: {e}")
 
-        # Mostrar flags activos
-        flags_activos = []
-        if datos["flags"] & FLAG_BATERIA_BAJA:
-            flags_activos.append("⚠ BATERÍA BAJA")
-        if datos["flags"] & FLAG_SOS:
-            flags_activos.append("🆘 SOS")
-        if datos["flags"] & FLAG_EN_MOVIMIENTO:
-            flags_activos.append("🚗 EN MOVIMIENTO")
-        if datos["flags"] & FLAG_IGNICION_ON:
-            flags_activos.append("🔑 IGNICIÓN ON")
+    def dispositivos_cercanos(self, lat, lon, radio_m=None, k=None):
+        """
+        Dispositivos cerca de un punto: [(distancia_m, id_dispositivo)]
 
-        if flags_activos:
-            print(f"  Estado:       {', '.join(flags_activos)}")
+        Con radio_m, todos los que estén a esa distancia o menos; con k, los
+        k más cercanos (si se indican ambos, los k más cercanos dentro del
+        radio). Lanza ValueError si no se indica ninguno.
+        """
+        if radio_m is None and k is None:
+            raise ValueError("dispositivos_cercanos requiere radio_m o k")
+        if k is None:
+            return self.indice_espacial.en_radio(lat, lon, radio_m)
+        cercanos = self.indice_espacial.cercanos(lat, lon, k)
+        if radio_m is not None:
+            cercanos = [(d, id_disp) for d, id_disp in cercanos if d <= radio_m]
+        return cercanos
 
-        print(f"{'─'*60}\n")
+    def mostrar_datos_gps(self, datos, direccion):
+        """Muestra los datos GPS recibidos en formato legible"""
+        print(formatear_datos_gps(datos, direccion))
 
     def enviar_ack_mensaje(self, id_dispositivo, secuencia, direccion):
         """Envía un ACK al dispositivo"""
         if not self.enviar_ack:
             return
 
-        if self.socket is None:
-            print("[✗] Error: socket no inicializado")
+        if self.socket is None and self.transporte is None:
+            self._aviso("[✗] Error: socket no inicializado")
             return
 
         try:
-            ack = empaquetar_ack(id_dispositivo, secuencia)
-            self.socket.sendto(ack, direccion)
-            print(f"[→] ACK enviado a GPS #{id_dispositivo} (SEQ={secuencia})")
+            empaquetar_ack_en(self._buffer_ack, 0, id_dispositivo, secuencia)
+            if self.autenticador is not None:
+                self.autenticador.firmar_en(self._buffer_ack, 0, TAM_CABECERA)
+            self._enviar_datagrama(self._buffer_ack, direccion)
+            self.acks_enviados += 1
+            self._evento("ack", id_dispositivo, id_dispositivo, secuencia)
         except socket.error as e:
-            print(f"[✗] Error al enviar ACK: {e}")
+            self.acks_fallidos += 1
+            self._aviso(f"[✗] Error al enviar ACK: {e}")
 
-    def _rotar_log_si_es_necesario(self):
-        """Rotación simple: renombra log a .1 si supera el tamaño máximo"""
-        if not self.log_path:
+    def responder_ack(self, datos, direccion):
+        """
+        Confirma un mensaje: ACK inmediato o, si el dispositivo anunció
+        FLAG_ACK_SELECTIVO y hay agrupamiento, lo deja para el próximo ACK
+        selectivo de ese dispositivo
+        """
+        if self._acks_lote is not None:
+            self._acks_lote.append(datos.secuencia)
+            return
+        if self.coalescer_acks is None or not datos.flags & FLAG_ACK_SELECTIVO:
+            self.enviar_ack_mensaje(datos.id_dispositivo, datos.secuencia, direccion)
             return
+        if not self.enviar_ack:
+            return
+        # Con el motor asyncio el ACK debe salir por el transporte (puerto)
+        # por el que llegó el último mensaje, no por el del último datagrama
+        pendiente = self._acks_pendientes.get(datos.id_dispositivo)
+        if pendiente is None:
+            self._acks_pendientes[datos.id_dispositivo] = [
+                direccion, [datos.secuencia], self.transporte
+            ]
+            return
+        pendiente[0] = direccion
+        pendiente[1].append(datos.secuencia)
+        pendiente[2] = self.transporte
+        if len(pendiente[1]) >= MAX_ACKS_AGRUPADOS:
+            # Ráfaga: confirmar ya, antes de que el mapa deje de cubrirla
+            del self._acks_pendientes[datos.id_dispositivo]
+            self._enviar_ack_selectivo(datos.id_dispositivo, direccion, pendiente[1])
+
+    def enviar_acks_pendientes(self):
+        """
+        Tarea periódica: un ACK selectivo por dispositivo con mensajes sin
+        confirmar desde la vez anterior
+
+        Las secuencias que el ACK selectivo no llega a cubrir (una
+        retransmisión muy atrasada) se confirman con un ACK simple.
+        """
+        pendientes, self._acks_pendientes = self._acks_pendientes, {}
+        actual = self.transporte
         try:
-            log_dir = os.path.dirname(self.log_path)
-            if log_dir and not os.path.exists(log_dir):
-                os.makedirs(log_dir, exist_ok=True)
-            if os.path.exists(self.log_path):
-                tam = os.path.getsize(self.log_path)
-                if tam >= self.max_log_bytes:
-                    destino = f"{self.log_path}.1"
-                    if os.path.exists(destino):
-                        os.remove(destino)
-                    os.rename(self.log_path, destino)
-        except OSError as e:
-            print(f"[!] Error al rotar log: {e}")
+            for id_disp, (direccion, secuencias, transporte) in pendientes.items():
+                if self.socket is None and transporte is None:
+                    continue
+                self.transporte = transporte
+                self._enviar_ack_selectivo(id_disp, direccion, secuencias)
+        finally:
+            self.transporte = actual
+
+    def _enviar_ack_selectivo(self, id_disp, direccion, secuencias):
+        estado = self.dispositivos.get(id_disp)
+        if estado is None:  # Expiró mientras esperaba
+            return
+        acumulado, mas_alta, mapa = self.dispositivos.resumen_ack(estado)
+        buffer = self._buffer_ack_selectivo
+        try:
+            empaquetar_ack_selectivo_en(buffer, 0, id_disp, acumulado, mas_alta, mapa)
+            if self.autenticador is not None:
+                self.autenticador.firmar_en(buffer, 0, TAM_ACK_SELECTIVO)
+            self._enviar_datagrama(buffer, direccion)
+        except socket.error as e:
+            self.acks_fallidos += 1
+            self._aviso(f"[✗] Error al enviar ACK selectivo: {e}")
+            return
+        self.acks_enviados += 1
+        self.acks_selectivos += 1
+        self._evento("ack_selectivo", id_disp, id_disp, acumulado, mas_alta, len(secuencias))
+        for seq in secuencias:
+            if not secuencia_confirmada(seq, acumulado, mas_alta, mapa):
+                self.enviar_ack_mensaje(id_disp, seq, direccion)
+
+    def _enviar_datagrama(self, datos, direccion):
+        """Envía por el transporte asyncio activo o, si no hay, por el socket"""
+        if self.transporte is not None:
+            self.transporte.sendto(datos, direccion)
+        else:
+            self.socket.sendto(datos, direccion)  # type: ignore
 
     def mostrar_heartbeat(self, datos, direccion):
         """Muestra un heartbeat recibido"""
-        print(f"\n{'─'*60}")
-        print("[←] HEARTBEAT RECIBIDO")
-        print(f"{'─'*60}")
-        print(f"  Origen:       {direccion[0]}:{direccion[1]}")
-        print(f"  Dispositivo:  GPS #{datos['id_dispositivo']}")
-        print(f"  Secuencia:    #{datos['secuencia']}")
-        print(
-            f"  Timestamp:    {datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d %H:%M:%S')}"
-        )
-        print(f"  Flags:        0x{datos['flags']:02X}")
-        print(f"{'─'*60}\n")
+        print(formatear_heartbeat(datos, direccion))
 
     def guardar_log(self, datos):
-        """Guarda los datos en un archivo de log"""
-        if not self.log_path:
+        """Agrega los datos al log (se escriben en bloque, ver EscritorLog)"""
+        if self.sqlite is not None:
+            self.sqlite.agregar_posicion(datos)
+        if self.almacen is not None:
+            # Un error del almacén no debe cortar la recepción
+            try:
+                self.almacen.agregar(datos)
+            except (OSError, ValueError, struct.error) as e:
+                self._aviso(f"[!] Error al guardar en almacén: {e}")
+        if self.log is None:
             return
+        # Los mensajes de un mismo segundo comparten la fecha formateada
+        ts_anterior, fecha = self._fecha_log
+        if datos.timestamp != ts_anterior:
+            fecha = formatear_fecha_log(datos.timestamp)
+            self._fecha_log = (datos.timestamp, fecha)
         try:
-            self._rotar_log_si_es_necesario()
-            lat, lon = convertir_coordenadas(datos["latitud"], datos["longitud"])
-            vel = datos["velocidad"] / 10.0
-            rumbo = datos["rumbo"] / 10.0
-            timestamp_str = datetime.fromtimestamp(datos["timestamp"]).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
+            self.log.escribir(formatear_linea_log(datos, fecha))
+        except OSError as e:
+            self._aviso(f"[!] Error al guardar log: {e}")
 
-            with open(self.log_path, "a") as f:
-                f.write(
-                    f"{timestamp_str}|GPS{datos['id_dispositivo']}|SEQ{datos['secuencia']}|"
-                )
-                f.write(f"{lat:.7f}|{lon:.7f}|{datos['altitud']}|")
-                f.write(
-                    f"{vel:.1f}|{rumbo:.1f}|{datos['bateria']}|0x{datos['flags']:02X}\n"
-                )
+    def vaciar_log(self):
+        """Escribe en disco los registros acumulados (log y almacén)"""
+        for destino in (self.log, self.almacen):
+            if destino is None:
+                continue
+            try:
+                destino.vaciar()
+            except OSError as e:
+                self._aviso(f"[!] Error al guardar log: {e}")
+
+    def _actualizar_tasa(self):
+        self.metricas.actualizar_tasa(self.mensajes_recibidos)
 
-        except IOError as e:
-            print(f"[!] Error al guardar log: {e}")
+    def cerrar_log(self):
+        """Vacía y cierra el log, el almacén y la base SQLite (al detener)"""
+        if self.servidor_metricas is not None:
+            self.servidor_metricas.detener()
+            self.servidor_metricas = None
+        if self.sqlite is not None:
+            self.sqlite.cerrar()
+        for destino in (self.log, self.almacen):
+            if destino is None:
+                continue
+            try:
+                destino.cerrar()
+            except OSError as e:
+                self._aviso(f"[!] Error al cerrar log: {e}")
+
+    def mostrar_resumen(self, dispositivos=None):
+        """
+        Imprime una línea con los contadores y la tasa desde el resumen anterior
+
+        dispositivos: cantidad a mostrar si la tabla local no es la completa
+        (vista global del modo multiproceso)
+        """
+        if dispositivos is None:
+            dispositivos = len(self.dispositivos)
+        ahora = time.monotonic()
+        recibidos_antes, instante_antes = self._resumen_anterior
+        if instante_antes is None:
+            instante_antes = self._inicio if self._inicio is not None else ahora
+        tasa = (self.mensajes_recibidos - recibidos_antes) / max(
+            ahora - instante_antes, 1e-9
+        )
+        self._resumen_anterior = (self.mensajes_recibidos, ahora)
+        campos = {
+            "recibidos": self.mensajes_recibidos,
+            "tasa": round(tasa, 1),
+            "perdidos": self.mensajes_perdidos,
+            "duplicados": self.mensajes_duplicados,
+            "errores": self.errores,
+            "dispositivos": dispositivos,
+        }
+        # El resumen se muestra en todos los modos salvo el silencioso
+        if self.modo_salida == SALIDA_JSON:
+            self.salida.emitir(formatear_json, "resumen", (campos,))
+        elif self.modo_salida != SALIDA_SILENCIOSA:
+            self.salida.emitir(_TEXTO_EVENTOS["resumen"], campos)
 
     def mostrar_estadisticas(self):
         """Muestra estadísticas del servidor"""
+        # Terminar de escribir los eventos pendientes antes del bloque final
+        self.salida.vaciar()
         print("\n" + "=" * 60)
         print("  ESTADÍSTICAS DEL SERVIDOR")
         print("=" * 60)
         print(f"  Mensajes recibidos:  {self.mensajes_recibidos}")
         print(f"  Mensajes perdidos:   {self.mensajes_perdidos}")
         print(f"  Mensajes duplicados: {self.mensajes_duplicados}")
+        if self.mensajes_reordenados:
+            print(f"  Mensajes atrasados:  {self.mensajes_reordenados} (aceptados)")
         print(f"  Errores detectados:  {self.errores}")
+        if self.acks_selectivos:
+            print(
+                f"  ACK enviados:        {self.acks_enviados} "
+                f"({self.acks_selectivos} selectivos)"
+            )
+        if self.lotes_fixes:
+            print(f"  Lotes de posiciones: {self.lotes_fixes}")
+        if self.deltas_recibidos or self.deltas_sin_referencia:
+            print(
+                f"  Posiciones delta:    {self.deltas_recibidos} "
+                f"({self.deltas_sin_referencia} sin referencia)"
+            )
+        if self.autenticador is not None:
+            print(
+                f"  Autenticación:       {self.autenticador.algoritmo}, "
+                f"{self.rechazados_autenticacion} rechazados"
+            )
         print(f"  Dispositivos activos: {len(self.dispositivos)}")
+        if self.vigilancia is not None:
+            print(
+                f"  Dispositivos expirados: {self.dispositivos_expirados} | "
+                f"Alertas sin reportes: {self.alertas_sin_reporte}"
+            )
+        if self._inicio is not None:
+            duracion = max(time.monotonic() - self._inicio, 1e-9)
+            print(f"  Tasa promedio:       {self.mensajes_recibidos / duracion:.1f} msg/s")
+        if self.lotes_recibidos:
+            promedio = self.mensajes_recibidos / self.lotes_recibidos
+            print(f"  Lotes recibidos:     {self.lotes_recibidos} (~{promedio:.1f} msg/lote)")
+        if self.salida.descartados:
+            print(f"  Eventos de consola descartados: {self.salida.descartados}")
+        if self.sqlite is not None:
+            print(
+                f"  SQLite: {self.sqlite.escritas} filas en "
+                f"{self.sqlite.transacciones} transacciones, "
+                f"{self.sqlite.descartadas} descartadas"
+            )
+            if self.sqlite.errores:
+                print(
+                    f"  SQLite: {self.sqlite.errores} lotes con error "
+                    f"({self.sqlite.filas_con_error} filas): {self.sqlite.ultimo_error}"
+                )
         print("=" * 60)
 
         if self.dispositivos:
@@ -312,9 +931,284 @@ class ServidorGPS:
                         f"Vel: {info['ultima_velocidad']:.1f} km/h | "
                         f"Bat: {info['bateria']}%"
                     )
+                if info["perdidos"] or info["reordenados"] or info["duplicados"]:
+                    print(
+                        f"           | Perdidos: {info['perdidos']} | "
+                        f"Atrasados: {info['reordenados']} | "
+                        f"Duplicados: {info['duplicados']}"
+                    )
             print("  " + "-" * 58)
+        if self.perfil is not None:
+            print("\n" + self.perfil.informe())
         print()
 
+    def procesar_datagrama(self, mensaje, direccion):
+        """Decodifica y procesa un datagrama recibido, enviando ACK si aplica"""
+        if self.perfil is not None:
+            self._procesar_datagrama_por_etapas(mensaje, direccion, self.perfil)
+            return
+        # Latencias: solo 1 de cada metricas.muestreo datagramas
+        metricas = self.metricas
+        medir = False
+        if metricas is not None:
+            metricas.datagramas += 1
+            if metricas.datagramas % metricas.muestreo == 0:
+                medir = True
+                inicio = time.perf_counter_ns()
+        datos, error = desempaquetar_registro(mensaje, autenticador=self.autenticador)
+        if datos and datos.tipo == TIPO_DELTA_GPS:
+            datos, error = self.expandir_delta(mensaje, datos)
+        if medir:
+            decodificado = time.perf_counter_ns()
+            metricas.decodificacion.registrar(decodificado - inicio)
+
+        if datos and datos.tipo == TIPO_LOTE_GPS:
+            self.procesar_lote_fixes(mensaje, datos, direccion)
+            if medir:
+                metricas.procesamiento.registrar(time.perf_counter_ns() - decodificado)
+        elif datos:
+            # Procesar mensaje válido
+            exito = self.procesar_mensaje(datos, direccion)
+            if medir:
+                metricas.procesamiento.registrar(time.perf_counter_ns() - decodificado)
+
+            # Enviar ACK si está habilitado y el mensaje fue procesado
+            if exito and datos.tipo in (TIPO_DATOS_GPS, TIPO_HEARTBEAT):
+                self.responder_ack(datos, direccion)
+        else:
+            # Error en el mensaje
+            self._rechazar(error, direccion)
+
+    def _rechazar(self, error, direccion):
+        """Cuenta un datagrama inválido (y aparte los que fallan la autenticación)"""
+        self.errores += 1
+        if error in (ERROR_TAG_INVALIDO, ERROR_SIN_AUTENTICAR):
+            self.rechazados_autenticacion += 1
+        self._evento("error", None, direccion, error)
+
+    def expandir_delta(self, mensaje, cabecera):
+        """
+        Reconstruye un TIPO_DELTA_GPS sobre la última posición del dispositivo
+
+        Si esa posición no es la secuencia anterior (se perdió o llegó
+        desordenada) el delta se descarta sin ACK: el dispositivo lo
+        retransmite como mensaje completo. Retorna (MensajeGPS, "OK") o
+        (None, error).
+        """
+        estado = self.dispositivos.get(cabecera.id_dispositivo)
+        referencia = estado.referencia if estado is not None else None
+        if referencia is None or referencia.secuencia != (cabecera.secuencia - 1) % MAX_SEQ:
+            self.deltas_sin_referencia += 1
+            return None, "Delta sin referencia: se espera un keyframe"
+        datos, error = desempaquetar_delta(quitar_tag(mensaje), referencia, verificar=False)
+        if datos is not None:
+            self.deltas_recibidos += 1
+        return datos, error
+
+    def procesar_lote_fixes(self, mensaje, cabecera, direccion):
+        """
+        Expande un TIPO_LOTE_GPS y procesa cada posición como un mensaje
+        TIPO_DATOS_GPS suelto
+
+        Las confirmaciones del lote salen juntas al final: un ACK selectivo
+        si el dispositivo anunció FLAG_ACK_SELECTIVO, o un ACK por posición.
+        """
+        fixes, error = desempaquetar_fixes(quitar_tag(mensaje), verificar=False)
+        if fixes is None:
+            self.errores += 1
+            self._evento("error", None, direccion, error)
+            return
+        self.lotes_fixes += 1
+
+        secuencias = self._acks_lote = []
+        try:
+            for datos in fixes:
+                # Un lote suele ser el atraso de un corte de cobertura
+                if self.procesar_mensaje(datos, direccion, self.antiguedad_max_lote_seg):
+                    self.responder_ack(datos, direccion)
+        finally:
+            self._acks_lote = None
+
+        if not secuencias or not self.enviar_ack:
+            return
+        id_disp = cabecera.id_dispositivo
+        if cabecera.flags & FLAG_ACK_SELECTIVO:
+            self._enviar_ack_selectivo(id_disp, direccion, secuencias)
+        else:
+            for seq in secuencias:
+                self.enviar_ack_mensaje(id_disp, seq, direccion)
+
+    def _procesar_datagrama_por_etapas(self, mensaje, direccion, perfil):
+        """procesar_datagrama midiendo cada etapa (modo --perfil-etapas)"""
+        reloj = time.perf_counter_ns
+        t0 = reloj()
+        valido = len(mensaje) >= TAM_CABECERA and verificar_checksum(mensaje)
+        t1 = reloj()
+        perfil.verificar_checksum.registrar(t1 - t0)
+        if valido:
+            datos, error = desempaquetar_registro(
+                mensaje, verificar=False, autenticador=self.autenticador
+            )
+            if datos and datos.tipo == TIPO_DELTA_GPS:
+                datos, error = self.expandir_delta(mensaje, datos)
+            t2 = reloj()
+            perfil.desempaquetar.registrar(t2 - t1)
+        else:
+            datos, error = desempaquetar_registro(mensaje)  # Solo por el error
+            t2 = t1
+
+        metricas = self.metricas
+        if metricas is not None:
+            metricas.datagramas += 1
+            metricas.decodificacion.registrar(t2 - t0)
+
+        if not datos:
+            self._rechazar(error, direccion)
+            return
+
+        if datos.tipo == TIPO_LOTE_GPS:
+            # guardar_log se mide por posición dentro de procesar_mensaje
+            self.procesar_lote_fixes(mensaje, datos, direccion)
+            t3 = reloj()
+            perfil.procesar_mensaje.registrar(t3 - t2)
+            if metricas is not None:
+                metricas.procesamiento.registrar(t3 - t2)
+            return
+
+        exito = self.procesar_mensaje(datos, direccion)
+        t3 = reloj()
+        perfil.procesar_mensaje.registrar(t3 - t2)
+        if metricas is not None:
+            metricas.procesamiento.registrar(t3 - t2)
+
+        if exito and datos.tipo in (TIPO_DATOS_GPS, TIPO_HEARTBEAT):
+            self.responder_ack(datos, direccion)
+            perfil.enviar_ack.registrar(reloj() - t3)
+
+    def detener(self):
+        """Solicita la detención del bucle de recepción (efectiva en <= 1s)"""
+        self._detenido = True
+
+    def agregar_tarea_periodica(self, intervalo, funcion):
+        """
+        Registra funcion() para ejecutarse cada intervalo segundos
+
+        En el motor bloqueante se ejecuta entre datagramas (o en cada timeout
+        de 1s si no hay tráfico); en el motor asyncio, como tarea de fondo.
+        """
+        proxima = time.monotonic() + intervalo
+        self.tareas_periodicas.append([intervalo, funcion, proxima])
+        self._proxima_tarea = min(self._proxima_tarea, proxima)
+
+    def _ejecutar_tareas_vencidas(self):
+        """Ejecuta las tareas periódicas cuyo plazo ya se cumplió"""
+        ahora = time.monotonic()
+        if ahora < self._proxima_tarea:
+            return
+        proxima = float("inf")
+        for tarea in self.tareas_periodicas:
+            intervalo, funcion, vence = tarea
+            if ahora >= vence:
+                try:
+                    funcion()
+                except Exception as e:
+                    self._aviso(f"[!] Error en tarea periódica {funcion.__name__}: {e}")
+                vence = tarea[2] = ahora + intervalo
+            proxima = min(proxima, vence)
+        self._proxima_tarea = proxima
+
+    def _espera_maxima(self):
+        """Segundos que puede bloquear la recepción sin atrasar una tarea (máx. 1)"""
+        return min(1.0, max(0.001, self._proxima_tarea - time.monotonic()))
+
+    def _bucle_simple(self):
+        """Un recvfrom por datagrama, con timeout de 1s (o hasta la próxima tarea)"""
+        sock = self.socket
+        timeout = sock.gettimeout()  # type: ignore
+        # Con --perfil-etapas se espera con select y se mide solo el recvfrom,
+        # igual que en el bucle en lotes (el tiempo sin paquetes no cuenta)
+        anillo_recvfrom = self.perfil.recvfrom if self.perfil is not None else None
+        reloj = time.perf_counter_ns
+        while not self._detenido:
+            self._ejecutar_tareas_vencidas()
+            # Recibir mensaje con timeout; settimeout es una llamada al sistema,
+            # así que solo se repite cuando cambia (redondeado al milisegundo)
+            espera = round(self._espera_maxima(), 3)
+            if espera != timeout:
+                timeout = espera
+                sock.settimeout(timeout)  # type: ignore
+            try:
+                if anillo_recvfrom is not None:
+                    if not select.select([sock], [], [], timeout)[0]:
+                        continue
+                    inicio = reloj()
+                    mensaje, direccion = sock.recvfrom(TAM_MAX_DATAGRAMA)  # type: ignore
+                    anillo_recvfrom.registrar(reloj() - inicio)
+                else:
+                    mensaje, direccion = sock.recvfrom(TAM_MAX_DATAGRAMA)  # type: ignore
+                self.procesar_datagrama(mensaje, direccion)
+            except socket.timeout:
+                # Timeout normal, continuar esperando
+                continue
+            except socket.error as e:
+                self._aviso(f"[✗] Error de socket: {e}")
+
+    def _bucle_lotes(self):
+        """
+        Recepción en lotes: un select por despertar y luego se drenan hasta
+        lote_recepcion datagramas con recvfrom_into sobre buffers
+        preasignados, sin crear un objeto bytes por paquete.
+
+        Los mensajes se entregan como memoryview sobre el buffer del pool,
+        válidas solo hasta el siguiente lote.
+        """
+        sock = self.socket
+        sock.setblocking(False)  # type: ignore
+        buffers = [bytearray(TAM_MAX_DATAGRAMA) for _ in range(self.lote_recepcion)]
+        vistas = [memoryview(buffer) for buffer in buffers]
+        recibidos = []
+        # Con --perfil-etapas se mide cada recvfrom_into (sin la espera del select)
+        anillo_recvfrom = self.perfil.recvfrom if self.perfil is not None else None
+        reloj = time.perf_counter_ns
+
+        while not self._detenido:
+            self._ejecutar_tareas_vencidas()
+            listos, _, _ = select.select([sock], [], [], self._espera_maxima())
+            if not listos:
+                continue
+
+            # Drenar la cola del socket hasta vaciarla o llenar el lote
+            del recibidos[:]
+            for buffer in buffers:
+                if anillo_recvfrom is not None:
+                    inicio = reloj()
+                try:
+                    n, direccion = sock.recvfrom_into(buffer)  # type: ignore
+                except (BlockingIOError, InterruptedError):
+                    break
+                except ConnectionResetError:
+                    # Windows: ICMP "puerto inalcanzable" de un ACK anterior
+                    continue
+                except socket.error as e:
+                    self._aviso(f"[✗] Error de socket: {e}")
+                    break
+                if anillo_recvfrom is not None:
+                    anillo_recvfrom.registrar(reloj() - inicio)
+                recibidos.append((n, direccion))
+
+            self.lotes_recibidos += 1
+            for indice, (n, direccion) in enumerate(recibidos):
+                self.procesar_datagrama(vistas[indice][:n], direccion)
+
+    def escuchar(self):
+        """Bucle de recepción sobre el socket ya iniciado, hasta detener()"""
+        self._detenido = False
+        self._inicio = time.monotonic()
+        if self.lote_recepcion > 1:
+            self._bucle_lotes()
+        else:
+            self._bucle_simple()
+
     def ejecutar(self):
         """Ejecuta el servidor en modo escucha"""
         if not self.iniciar():
@@ -324,39 +1218,11 @@ class ServidorGPS:
         print("[▶] Servidor en ejecución (Ctrl+C para detener)\n")
 
         try:
-            while True:
-                # Recibir mensaje con timeout
-                try:
-                    mensaje, direccion = self.socket.recvfrom(1024)  # type: ignore
-
-                    # Desempaquetar mensaje
-                    datos, error = desempaquetar_mensaje(mensaje)
-
-                    if datos:
-                        # Procesar mensaje válido
-                        exito = self.procesar_mensaje(datos, direccion)
-
-                        # Enviar ACK si está habilitado y el mensaje fue procesado
-                        if exito and datos["tipo"] in (TIPO_DATOS_GPS, TIPO_HEARTBEAT):
-                            self.enviar_ack_mensaje(
-                                datos["id_dispositivo"], datos["secuencia"], direccion
-                            )
-                    else:
-                        # Error en el mensaje
-                        self.errores += 1
-                        print(
-                            f"[✗] Error al procesar mensaje de {direccion}: {error}"
-                        )
-
-                except socket.timeout:
-                    # Timeout normal, continuar esperando
-                    continue
-                except socket.error as e:
-                    print(f"[✗] Error de socket: {e}")
-
+            self.escuchar()
         except KeyboardInterrupt:
             print("\n\n[■] Servidor detenido por el usuario")
         finally:
+            self.cerrar_log()
             self.mostrar_estadisticas()
             if self.socket is not None:
                 self.socket.close()
@@ -368,62 +1234,388 @@ class ServidorGPS:
 def main():
     """Función principal"""
 
+    parser = argparse.ArgumentParser(add_help=True)
+    parser.add_argument(
+        "--lote",
+        dest="lote_recepcion",
+        type=int,
+        default=1,
+        help="datagramas drenados por despertar (1 = un recvfrom por paquete)",
+    )
+    parser.add_argument(
+        "--motor",
+        choices=["bloqueante", "asyncio"],
+        default="bloqueante",
+        help="bucle de recepción: bloqueante (por defecto) o asyncio",
+    )
+    parser.add_argument(
+        "--uvloop", action="store_true", help="con --motor asyncio, usar uvloop"
+    )
+    parser.add_argument(
+        "--puerto-extra",
+        dest="puertos_extra",
+        type=int,
+        action="append",
+        default=[],
+        help="con --motor asyncio, puerto adicional de escucha (repetible)",
+    )
+    parser.add_argument(
+        "--estadisticas-cada",
+        dest="intervalo_estadisticas",
+        type=float,
+        default=0,
+        help="segundos entre resúmenes periódicos (0 = desactivado)",
+    )
+    parser.add_argument(
+        "--procesos",
+        type=int,
+        default=1,
+        help="procesos trabajadores con SO_REUSEPORT (1 = un solo proceso)",
+    )
+    parser.add_argument(
+        "--log-generaciones",
+        dest="generaciones_log",
+        type=int,
+        default=1,
+        help="archivos de log anteriores a conservar al rotar (log.1 ... log.N)",
+    )
+    parser.add_argument(
+        "--log-fsync",
+        dest="fsync_log",
+        choices=POLITICAS_FSYNC,
+        default=FSYNC_NUNCA,
+        help="cuándo forzar el log a disco: nunca, en cada vaciado o al rotar",
+    )
+    parser.add_argument(
+        "--log-vaciar-cada",
+        dest="intervalo_vaciado_log",
+        type=float,
+        default=INTERVALO_VACIADO_LOG,
+        help="segundos máximos que un registro espera en el buffer del log",
+    )
+    parser.add_argument(
+        "--almacen",
+        dest="almacen_path",
+        default=None,
+        help="directorio del almacén binario de trayectos (reemplaza el log de texto)",
+    )
+    parser.add_argument(
+        "--sqlite",
+        dest="sqlite_path",
+        default=None,
+        help="base SQLite (modo WAL) donde guardar posiciones y heartbeats",
+    )
+    parser.add_argument(
+        "--sqlite-lote",
+        dest="sqlite_filas_por_lote",
+        type=int,
+        default=FILAS_POR_LOTE,
+        help="filas por transacción SQLite",
+    )
+    parser.add_argument(
+        "--sqlite-cada-ms",
+        dest="sqlite_intervalo_ms",
+        type=int,
+        default=INTERVALO_MS,
+        help="milisegundos máximos antes de confirmar un lote incompleto",
+    )
+    parser.add_argument(
+        "--sqlite-politica",
+        dest="sqlite_politica",
+        choices=POLITICAS_COLA,
+        default=POLITICA_DESCARTAR,
+        help="qué hacer si la cola hacia SQLite está llena",
+    )
+    parser.add_argument(
+        "--salida",
+        dest="modo_salida",
+        choices=MODOS_SALIDA,
+        default=SALIDA_DETALLADA,
+        help="qué se muestra por cada paquete (por defecto detallado)",
+    )
+    parser.add_argument(
+        "--muestreo",
+        type=int,
+        default=100,
+        help="con --salida muestreo, mostrar 1 de cada N paquetes por dispositivo",
+    )
+    parser.add_argument(
+        "--expirar-inactivos",
+        dest="expirar_inactivos_seg",
+        type=float,
+        default=0,
+        help="segundos sin reportes para dar de baja un dispositivo (0 = nunca)",
+    )
+    parser.add_argument(
+        "--alerta-sin-reporte",
+        dest="alerta_sin_reporte_seg",
+        type=float,
+        default=0,
+        help="segundos sin datos ni heartbeats para avisar (0 = sin alertas)",
+    )
+    parser.add_argument(
+        "--archivo-expirados",
+        dest="archivo_expirados",
+        default=None,
+        help="archivo JSONL donde guardar el último estado de los expirados",
+    )
+    parser.add_argument(
+        "--antiguedad-lote",
+        dest="antiguedad_max_lote_seg",
+        type=int,
+        default=ANTIGUEDAD_MAX_LOTE,
+        metavar="SEG",
+        help="atraso máximo aceptado en las posiciones de un lote (por defecto: 7 días)",
+    )
+    parser.add_argument(
+        "--ventana-seq",
+        dest="tam_ventana_seq",
+        type=int,
+        default=TAM_VENTANA_SEQ,
+        help=(
+            f"secuencias recordadas por dispositivo para aceptar paquetes atrasados "
+            f"({MIN_VENTANA_SEQ}-{MAX_VENTANA_SEQ})"
+        ),
+    )
+    parser.add_argument(
+        "--metricas-puerto",
+        dest="puerto_metricas",
+        type=int,
+        default=None,
+        help="servir métricas Prometheus en http://127.0.0.1:PUERTO/metrics",
+    )
+    parser.add_argument(
+        "--metricas-dispositivos",
+        dest="metricas_dispositivos",
+        type=int,
+        default=MAX_DISPOSITIVOS_PERDIDA,
+        metavar="N",
+        help=(
+            "exportar la pérdida por dispositivo solo de los N que más pierden "
+            f"(0 = ninguno, por defecto {MAX_DISPOSITIVOS_PERDIDA})"
+        ),
+    )
+    parser.add_argument(
+        "--coalescer-acks",
+        dest="coalescer_acks_ms",
+        type=float,
+        default=None,
+        metavar="MS",
+        help="agrupar los ACK de dispositivos con ACK selectivo cada MS milisegundos",
+    )
+    parser.add_argument(
+        "--perfil-etapas",
+        dest="perfil_etapas",
+        action="store_true",
+        help=(
+            "medir cada etapa por datagrama, incluido recvfrom sin la espera de paquetes "
+            "(ver python src/gps_perfil.py)"
+        ),
+    )
+    parser.add_argument(
+        "--autenticar",
+        action="store_true",
+        help="exigir mensajes con TAG de autenticación (FLAG_AUTENTICADO) y firmar los ACK",
+    )
+    parser.add_argument(
+        "--clave",
+        dest="clave_autenticacion",
+        default=CLAVE_SECRETA,
+        help="clave maestra de la que se derivan las claves por dispositivo",
+    )
+    parser.add_argument(
+        "--claves-dispositivos",
+        dest="archivo_claves",
+        default=None,
+        metavar="ARCHIVO",
+        help='JSON {"id": "clave"} con claves propias de algunos dispositivos',
+    )
+    parser.add_argument(
+        "--exportar-clave",
+        dest="exportar_clave",
+        type=int,
+        default=None,
+        metavar="ID",
+        help="mostrar la clave del dispositivo ID (para su --clave-dispositivo) y salir",
+    )
+    parser.add_argument(
+        "--algoritmo-tag",
+        dest="algoritmo_tag",
+        choices=ALGORITMOS_TAG,
+        default="blake2s",
+        help="función del TAG de autenticación (por defecto: blake2s)",
+    )
+    args, posicionales = parser.parse_known_args()
+    argv = [sys.argv[0]] + posicionales
+
+    if args.lote_recepcion < 1:
+        print("[✗] --lote debe ser mayor o igual a 1.")
+        return
+    if args.procesos < 1:
+        print("[✗] --procesos debe ser mayor o igual a 1.")
+        return
+    if args.muestreo < 1:
+        print("[✗] --muestreo debe ser mayor o igual a 1.")
+        return
+    if args.generaciones_log < 1:
+        print("[✗] --log-generaciones debe ser mayor o igual a 1.")
+        return
+    if args.intervalo_vaciado_log <= 0:
+        print("[✗] --log-vaciar-cada debe ser mayor que 0.")
+        return
+    if args.sqlite_filas_por_lote < 1 or args.sqlite_intervalo_ms < 1:
+        print("[✗] --sqlite-lote y --sqlite-cada-ms deben ser mayores que 0.")
+        return
+    if args.expirar_inactivos_seg < 0 or args.alerta_sin_reporte_seg < 0:
+        print("[✗] --expirar-inactivos y --alerta-sin-reporte no pueden ser negativos.")
+        return
+    if args.antiguedad_max_lote_seg < 0:
+        print("[✗] --antiguedad-lote no puede ser negativo.")
+        return
+    if not MIN_VENTANA_SEQ <= args.tam_ventana_seq <= MAX_VENTANA_SEQ:
+        print(f"[✗] --ventana-seq debe estar entre {MIN_VENTANA_SEQ} y {MAX_VENTANA_SEQ}.")
+        return
+    claves_dispositivos = None
+    if args.archivo_claves:
+        try:
+            with open(args.archivo_claves, encoding="utf-8") as archivo:
+                claves_dispositivos = {int(k): v for k, v in json.load(archivo).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"[✗] No se pudo leer {args.archivo_claves}: {e}")
+            return
+    if args.autenticar or args.exportar_clave is not None:
+        # CLAVE_SECRETA está en el código fuente: con ella cualquiera firma
+        if args.clave_autenticacion == CLAVE_SECRETA:
+            print("[✗] La clave maestra por defecto es pública; indique otra con --clave.")
+            return
+    if args.exportar_clave is not None:
+        if not 0 <= args.exportar_clave <= 65535:
+            print("[✗] ID fuera de rango (0-65535).")
+            return
+        autenticador = Autenticador(
+            args.clave_autenticacion, claves_dispositivos, algoritmo=args.algoritmo_tag
+        )
+        print(autenticador.exportar_clave(args.exportar_clave))
+        return
+    if args.modo_salida == SALIDA_RESUMEN and args.intervalo_estadisticas <= 0:
+        args.intervalo_estadisticas = 10
+
     # Configuración por defecto
     puerto = PUERTO_SERVIDOR
     enviar_ack = True
 
     # Argumentos de línea de comandos
-    if len(sys.argv) >= 2:
+    uso = (
+        "Uso: python src/gps_servidor.py "
+        "[puerto] [ack=true|false] [log_path] [max_kb] [ventana_seg]"
+    )
+    if len(argv) >= 2:
         try:
-            puerto = int(sys.argv[1])
+            puerto = int(argv[1])
         except ValueError:
-            print(
-                "[✗] Puerto inválido. Uso: python src/gps_servidor.py [puerto] [ack=true|false] [log_path] [max_kb] [ventana_seg]"
-            )
+            print(f"[✗] Puerto inválido. {uso}")
             return
         if not (0 <= puerto <= 65535):
             print("[✗] Puerto fuera de rango (0-65535).")
             return
-    if len(sys.argv) >= 3:
-        enviar_ack = sys.argv[2].lower() in ["true", "1", "si", "yes"]
+    if len(argv) >= 3:
+        enviar_ack = argv[2].lower() in ["true", "1", "si", "yes"]
     log_path = "gps_log.txt"
     max_log_bytes = 1_000_000
-    if len(sys.argv) >= 4:
-        log_path = sys.argv[3]
-    if len(sys.argv) >= 5:
+    if len(argv) >= 4:
+        log_path = argv[3]
+    if len(argv) >= 5:
         try:
-            max_log_bytes = int(sys.argv[4]) * 1024
+            max_log_bytes = int(argv[4]) * 1024
         except ValueError:
-            print(
-                "[✗] max_kb inválido. Uso: python src/gps_servidor.py [puerto] [ack=true|false] [log_path] [max_kb] [ventana_seg]"
-            )
+            print(f"[✗] max_kb inválido. {uso}")
             return
         if max_log_bytes <= 0:
             print("[✗] max_kb debe ser mayor que 0.")
             return
     ventana_tiempo_seg = 300
-    if len(sys.argv) >= 6:
+    if len(argv) >= 6:
         try:
-            ventana_tiempo_seg = int(sys.argv[5])
+            ventana_tiempo_seg = int(argv[5])
         except ValueError:
-            print(
-                "[✗] ventana_seg inválido. Uso: python src/gps_servidor.py [puerto] [ack=true|false] [log_path] [max_kb] [ventana_seg]"
-            )
+            print(f"[✗] ventana_seg inválido. {uso}")
             return
         if ventana_tiempo_seg <= 0:
             print("[✗] ventana_seg debe ser mayor que 0.")
             return
 
+    # El almacén binario reemplaza al log de texto (exportable con gps_almacen.py)
+    if args.almacen_path:
+        log_path = None
+
     # Crear y ejecutar servidor
-    servidor = ServidorGPS(
+    opciones = dict(
         puerto=puerto,
         enviar_ack=enviar_ack,
         log_path=log_path,
         max_log_bytes=max_log_bytes,
         ventana_tiempo_seg=ventana_tiempo_seg,
+        antiguedad_max_lote_seg=args.antiguedad_max_lote_seg,
+        lote_recepcion=args.lote_recepcion,
+        modo_salida=args.modo_salida,
+        muestreo=args.muestreo,
+        generaciones_log=args.generaciones_log,
+        fsync_log=args.fsync_log,
+        intervalo_vaciado_log=args.intervalo_vaciado_log,
+        almacen_path=args.almacen_path,
+        sqlite_path=args.sqlite_path,
+        sqlite_filas_por_lote=args.sqlite_filas_por_lote,
+        sqlite_intervalo_ms=args.sqlite_intervalo_ms,
+        sqlite_politica=args.sqlite_politica,
+        expirar_inactivos_seg=args.expirar_inactivos_seg,
+        alerta_sin_reporte_seg=args.alerta_sin_reporte_seg,
+        archivo_expirados=args.archivo_expirados,
+        tam_ventana_seq=args.tam_ventana_seq,
+        puerto_metricas=args.puerto_metricas,
+        metricas_dispositivos=args.metricas_dispositivos,
+        perfil_etapas=args.perfil_etapas,
+        coalescer_acks_ms=args.coalescer_acks_ms,
+        autenticar=args.autenticar,
+        clave_autenticacion=args.clave_autenticacion,
+        claves_dispositivos=claves_dispositivos,
+        algoritmo_tag=args.algoritmo_tag,
     )
 
-    servidor.ejecutar()
+    if args.procesos > 1:
+        from gps_servidor_multiproceso import ServidorMultiproceso
+
+        if args.motor != "bloqueante":
+            print("[!] --procesos usa el motor bloqueante en cada trabajador")
+        ServidorMultiproceso(
+            args.procesos,
+            intervalo_estadisticas=args.intervalo_estadisticas,
+            **opciones,
+        ).ejecutar()
+        return
+
+    servidor = ServidorGPS(**opciones)
+    if ControlPerfil(servidor).instalar():
+        pid = os.getpid()
+        print(
+            f"[i] Perfilado (PID {pid}): python src/gps_perfil.py volcar {pid} | "
+            f"cprofile {pid}\n"
+        )
+
+    if args.intervalo_estadisticas > 0:
+        servidor.agregar_tarea_periodica(
+            args.intervalo_estadisticas, servidor.mostrar_resumen
+        )
+
+    if args.motor == "asyncio":
+        from gps_servidor_async import ejecutar_asyncio
+
+        ejecutar_asyncio(
+            servidor,
+            puertos=[puerto] + args.puertos_extra,
+            usar_uvloop=args.uvloop,
+        )
+    else:
+        servidor.ejecutar()
 
 
 if __name__ == "__main__":
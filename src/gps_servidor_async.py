@@ -0,0 +1,128 @@
+"""
+Servidor GPS - Motor asyncio
+Redes de Computadoras - Práctica 3
+
+Ejecuta un ServidorGPS sobre un bucle de eventos asyncio en lugar del bucle
+bloqueante con timeout. Cada puerto de escucha es un DatagramProtocol que
+reutiliza ServidorGPS.procesar_datagrama, y el mismo bucle atiende tareas
+periódicas (estadísticas, vaciado de logs) sin detener la recepción.
+
+Uso: python src/gps_servidor.py [puerto] --motor asyncio [--uvloop]
+"""
+
+import asyncio
+import time
+
+try:
+    import uvloop
+except ImportError:  # uvloop es opcional
+    uvloop = None
+
+
+class ProtocoloGPS(asyncio.DatagramProtocol):
+    """Recibe datagramas de un puerto y los entrega al ServidorGPS"""
+
+    def __init__(self, servidor):
+        self.servidor = servidor
+        self.transporte = None
+
+    def connection_made(self, transport):
+        self.transporte = transport
+
+    def datagram_received(self, data, addr):
+        # Los ACK salen por el mismo transporte que recibió el mensaje (los
+        # agrupados guardan el suyo junto a la dirección)
+        self.servidor.transporte = self.transporte
+        self.servidor.procesar_datagrama(data, addr)
+
+    def error_received(self, exc):
+        self.servidor._aviso(f"[✗] Error de socket: {exc}")
+
+    def connection_lost(self, exc):
+        if self.servidor.transporte is self.transporte:
+            self.servidor.transporte = None
+
+
+async def _tarea_periodica(servidor, intervalo, funcion):
+    """Llama a funcion() cada intervalo segundos hasta ser cancelada"""
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            funcion()
+        except Exception as e:
+            # Por la salida del servidor: un print bloquearía el bucle de eventos
+            servidor._aviso(f"[!] Error en tarea periódica {funcion.__name__}: {e}")
+
+
+async def servir(servidor, host="0.0.0.0", puertos=None, tareas_periodicas=()):
+    """
+    Atiende los puertos indicados hasta que se llame a servidor.detener()
+
+    Parámetros:
+    - puertos: lista de puertos de escucha (por defecto servidor.puerto)
+    - tareas_periodicas: pares (intervalo_seg, funcion) ejecutados en segundo
+      plano, además de los registrados con servidor.agregar_tarea_periodica
+    """
+    loop = asyncio.get_running_loop()
+    transportes = []
+    tareas = []
+    try:
+        for puerto in puertos or [servidor.puerto]:
+            transporte, _ = await loop.create_datagram_endpoint(
+                lambda: ProtocoloGPS(servidor),
+                local_addr=(host, puerto),
+                reuse_port=servidor.reusar_puerto or None,
+            )
+            transportes.append(transporte)
+            puerto_real = transporte.get_extra_info("sockname")[1]
+            print(f"[✓] Servidor escuchando en puerto {puerto_real} (asyncio)")
+        print("[✓] Esperando dispositivos GPS...\n")
+
+        for intervalo, funcion, _ in servidor.tareas_periodicas:
+            tareas.append(
+                asyncio.create_task(_tarea_periodica(servidor, intervalo, funcion))
+            )
+        for intervalo, funcion in tareas_periodicas:
+            tareas.append(
+                asyncio.create_task(_tarea_periodica(servidor, intervalo, funcion))
+            )
+
+        while not servidor._detenido:
+            await asyncio.sleep(0.25)
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        for transporte in transportes:
+            transporte.close()
+        servidor.transporte = None
+
+
+def ejecutar_asyncio(servidor, puertos=None, usar_uvloop=False):
+    """
+    Equivalente a ServidorGPS.ejecutar() usando el motor asyncio
+
+    Parámetros:
+    - puertos: puertos de escucha (por defecto solo servidor.puerto)
+    - usar_uvloop: usar uvloop si está instalado
+    """
+    if usar_uvloop and uvloop is None:
+        print("[!] uvloop no está instalado, se usa el bucle asyncio estándar")
+        usar_uvloop = False
+    if usar_uvloop:
+        uvloop.install()
+
+    print("[▶] Servidor en ejecución (Ctrl+C para detener)\n")
+
+    servidor._detenido = False
+    servidor._inicio = time.monotonic()
+    try:
+        asyncio.run(servir(servidor, puertos=puertos))
+    except KeyboardInterrupt:
+        print("\n\n[■] Servidor detenido por el usuario")
+    except OSError as e:
+        print(f"[✗] Error al iniciar servidor: {e}")
+    finally:
+        servidor.cerrar_log()
+        servidor.mostrar_estadisticas()
+        print("[✓] Sockets cerrados\n")
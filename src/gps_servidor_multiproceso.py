@@ -0,0 +1,280 @@
+"""
+Servidor GPS - Modo multiproceso (SO_REUSEPORT)
+Redes de Computadoras - Práctica 3
+
+N procesos trabajadores abren el mismo puerto UDP con SO_REUSEPORT y el
+kernel reparte los datagramas según la dirección de origen, de modo que
+cada dispositivo queda asignado siempre al mismo trabajador.
+
+Cada trabajador publica sus contadores en un arreglo de memoria compartida
+y, al terminar, envía su tabla de dispositivos al proceso padre, que
+combina todo en una vista global para mostrar_estadisticas. Con
+--metricas-puerto los trabajadores también copian sus histogramas de
+latencia a un segundo arreglo y /metrics (servido por el padre) los suma.
+
+Requiere SO_REUSEPORT (Linux, BSD, macOS).
+Uso: python src/gps_servidor.py [puerto] --procesos 4
+"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import time
+
+from gps_metricas import RANURAS_METRICAS, MetricasRecepcion
+from gps_perfil import SENAL_CPROFILE, SENAL_VOLCAR, ControlPerfil
+from gps_servidor import ServidorGPS
+
+# Contadores publicados por cada trabajador (mismo nombre que en ServidorGPS)
+CONTADORES = (
+    "mensajes_recibidos",
+    "mensajes_perdidos",
+    "mensajes_duplicados",
+    "mensajes_reordenados",
+    "acks_fallidos",
+    "acks_enviados",
+    "acks_selectivos",
+    "lotes_fixes",
+    "deltas_recibidos",
+    "deltas_sin_referencia",
+    "rechazados_autenticacion",
+    "errores",
+    "lotes_recibidos",
+    "dispositivos_expirados",
+    "alertas_sin_reporte",
+)
+# Cantidad de ranuras por trabajador: contadores + número de dispositivos
+_RANURAS = len(CONTADORES) + 1
+INTERVALO_PUBLICACION = 0.5
+
+
+def _log_por_trabajador(log_path, indice):
+    """gps_log.txt -> gps_log.w0.txt: cada trabajador rota su propio archivo"""
+    if not log_path:
+        return log_path
+    raiz, extension = os.path.splitext(log_path)
+    return f"{raiz}.w{indice}{extension}"
+
+
+def _publicar_contadores(servidor, contadores, base):
+    for desplazamiento, campo in enumerate(CONTADORES):
+        contadores[base + desplazamiento] = getattr(servidor, campo)
+    contadores[base + len(CONTADORES)] = len(servidor.dispositivos)
+
+
+def _publicar(servidor, contadores, histogramas, indice):
+    _publicar_contadores(servidor, contadores, indice * _RANURAS)
+    if histogramas is not None:
+        servidor.metricas.publicar(histogramas, indice * RANURAS_METRICAS)
+
+
+def _trabajador(indice, opciones, contadores, histogramas, resultados, parada):
+    """Proceso trabajador: un ServidorGPS con SO_REUSEPORT hasta que se pida parar"""
+    # El padre coordina la detención (Ctrl+C llega a todo el grupo de procesos)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    opciones = dict(opciones)
+    opciones["log_path"] = _log_por_trabajador(opciones.get("log_path"), indice)
+    opciones["almacen_path"] = _log_por_trabajador(opciones.get("almacen_path"), indice)
+    opciones["sqlite_path"] = _log_por_trabajador(opciones.get("sqlite_path"), indice)
+    opciones["archivo_expirados"] = _log_por_trabajador(
+        opciones.get("archivo_expirados"), indice
+    )
+    # Las métricas las sirve el proceso padre con los totales combinados
+    opciones["puerto_metricas"] = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        servidor = ServidorGPS(reusar_puerto=True, **opciones)
+    if histogramas is not None:
+        # Mide como un servidor con /metrics, sin abrir el puerto HTTP
+        servidor.metricas = MetricasRecepcion()
+    # Cada trabajador atiende sus propias señales de perfilado (kill -USR2 <pid>)
+    ControlPerfil(servidor).instalar()
+
+    def publicar():
+        _publicar(servidor, contadores, histogramas, indice)
+        if parada.is_set():
+            servidor.detener()
+
+    servidor.agregar_tarea_periodica(INTERVALO_PUBLICACION, publicar)
+    if not servidor.iniciar():
+        resultados.put((indice, None))
+        return
+    try:
+        servidor.escuchar()
+    finally:
+        servidor.socket.close()  # type: ignore
+        servidor.cerrar_log()
+        servidor.salida.vaciar()
+        _publicar(servidor, contadores, histogramas, indice)
+        resultados.put((indice, servidor.dispositivos))
+
+
+# Campos por dispositivo que se suman al combinar trabajadores
+_CAMPOS_SUMADOS = ("mensajes_recibidos", "perdidos", "reordenados", "duplicados")
+
+
+def combinar_dispositivos(tablas):
+    """
+    Combina las tablas de dispositivos de varios trabajadores
+
+    Si un dispositivo pasó por más de un trabajador (cambió su puerto de
+    origen), se conserva el estado más reciente y se suman sus mensajes.
+    """
+    combinado = {}
+    for tabla in tablas:
+        for id_disp, info in tabla.items():
+            actual = combinado.get(id_disp)
+            if actual is None:
+                combinado[id_disp] = dict(info)
+                continue
+            totales = {
+                campo: actual.get(campo, 0) + info.get(campo, 0)
+                for campo in _CAMPOS_SUMADOS
+            }
+            primera = min(actual["primera_conexion"], info["primera_conexion"])
+            if info["ultima_conexion"] > actual["ultima_conexion"]:
+                actual = combinado[id_disp] = dict(info)
+            actual.update(totales)
+            actual["primera_conexion"] = primera
+    return combinado
+
+
+class ServidorMultiproceso:
+    """Coordina N trabajadores ServidorGPS y mantiene la vista global"""
+
+    def __init__(self, procesos, intervalo_estadisticas=0, **opciones):
+        self.procesos = procesos
+        self.intervalo_estadisticas = intervalo_estadisticas
+        self.opciones = opciones
+        # Vista global: un ServidorGPS sin socket con los totales combinados
+        self.vista = ServidorGPS(**dict(opciones, sqlite_path=None))
+        self._dispositivos_activos = 0
+        if self.vista.servidor_metricas is not None:
+            self.vista.servidor_metricas.dispositivos_activos = (
+                lambda: self._dispositivos_activos
+            )
+
+    def _leer_contadores(self, contadores, histogramas=None):
+        """Suma los contadores (y histogramas) publicados por todos los trabajadores"""
+        for desplazamiento, campo in enumerate(CONTADORES):
+            total = sum(
+                contadores[indice * _RANURAS + desplazamiento]
+                for indice in range(self.procesos)
+            )
+            setattr(self.vista, campo, total)
+        self._dispositivos_activos = sum(
+            contadores[indice * _RANURAS + len(CONTADORES)]
+            for indice in range(self.procesos)
+        )
+        if histogramas is not None and self.vista.metricas is not None:
+            self.vista.metricas.combinar(
+                histogramas,
+                [indice * RANURAS_METRICAS for indice in range(self.procesos)],
+            )
+
+    def _mostrar_resumen(self):
+        self.vista.mostrar_resumen(dispositivos=self._dispositivos_activos)
+
+    def ejecutar(self):
+        """Lanza los trabajadores y espera hasta Ctrl+C (o SIGTERM)"""
+        if not hasattr(socket, "SO_REUSEPORT"):
+            print("[✗] SO_REUSEPORT no está disponible en este sistema.")
+            return
+
+        contexto = multiprocessing.get_context()
+        contadores = contexto.Array("q", self.procesos * _RANURAS, lock=False)
+        histogramas = None
+        if self.vista.metricas is not None:
+            histogramas = contexto.Array(
+                "q", self.procesos * RANURAS_METRICAS, lock=False
+            )
+        resultados = contexto.Queue()
+        parada = contexto.Event()
+        trabajadores = [
+            contexto.Process(
+                target=_trabajador,
+                args=(indice, self.opciones, contadores, histogramas, resultados, parada),
+                name=f"gps-trabajador-{indice}",
+                daemon=True,
+            )
+            for indice in range(self.procesos)
+        ]
+
+        def _terminar(signum, frame):
+            raise KeyboardInterrupt
+
+        anterior_sigterm = signal.signal(signal.SIGTERM, _terminar)
+        if self.intervalo_estadisticas > 0:
+            self.vista.agregar_tarea_periodica(
+                self.intervalo_estadisticas, self._mostrar_resumen
+            )
+
+        for trabajador in trabajadores:
+            trabajador.start()
+
+        # Las señales de perfilado al padre se reenvían a cada trabajador, que
+        # es quien tiene los tiempos (sin esto la acción por defecto lo mata)
+        def _reenviar(signum, frame):
+            for trabajador in trabajadores:
+                if trabajador.is_alive():
+                    os.kill(trabajador.pid, signum)
+
+        anteriores_perfil = {}
+        if SENAL_VOLCAR is not None:
+            for senal in (SENAL_VOLCAR, SENAL_CPROFILE):
+                anteriores_perfil[senal] = signal.signal(senal, _reenviar)
+        puerto = self.opciones.get("puerto")
+        print(f"[▶] {self.procesos} procesos escuchando en puerto {puerto} (SO_REUSEPORT)")
+        if anteriores_perfil:
+            pid = os.getpid()
+            print(
+                f"[i] Perfilado de todos los trabajadores: python src/gps_perfil.py "
+                f"volcar {pid} | cprofile {pid}"
+            )
+        print("[▶] Servidor en ejecución (Ctrl+C para detener)\n")
+
+        self.vista._inicio = time.monotonic()
+        tablas = []
+        try:
+            while any(trabajador.is_alive() for trabajador in trabajadores):
+                time.sleep(0.25)
+                self._leer_contadores(contadores, histogramas)
+                self.vista._ejecutar_tareas_vencidas()
+        except KeyboardInterrupt:
+            print("\n\n[■] Servidor detenido por el usuario")
+        finally:
+            parada.set()
+            # Un plazo común a todos: si un trabajador no responde, las tablas
+            # de los demás se siguen combinando sin esperar de más por cada uno
+            plazo = time.monotonic() + INTERVALO_PUBLICACION + 5
+            for _ in trabajadores:
+                try:
+                    indice, tabla = resultados.get(
+                        timeout=max(0.0, plazo - time.monotonic())
+                    )
+                except queue.Empty:
+                    print("[!] Un trabajador no entregó su tabla de dispositivos")
+                    continue
+                if tabla is None:
+                    print(f"[✗] El trabajador {indice} no pudo abrir el puerto")
+                else:
+                    tablas.append(tabla)
+            for trabajador in trabajadores:
+                trabajador.join(timeout=2)
+                if trabajador.is_alive():
+                    trabajador.terminate()
+            signal.signal(signal.SIGTERM, anterior_sigterm)
+            for senal, anterior in anteriores_perfil.items():
+                signal.signal(senal, anterior)
+
+            self._leer_contadores(contadores, histogramas)
+            self.vista.dispositivos = combinar_dispositivos(tablas)
+            for id_disp, info in self.vista.dispositivos.items():
+                if info["ultima_pos"]:
+                    self.vista.indice_espacial.actualizar(id_disp, *info["ultima_pos"])
+            self.vista.mostrar_estadisticas()
+            print(f"[✓] {self.procesos} trabajadores detenidos\n")
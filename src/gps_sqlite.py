@@ -0,0 +1,230 @@
+"""
+Destino SQLite del servidor GPS
+Redes de Computadoras - Práctica 3
+
+Guarda posiciones y heartbeats en una base SQLite (modo WAL) para
+reportes. El hilo de recepción solo encola (tipo, registro, llegada) en una
+cola acotada; un hilo escritor agrupa las filas y las inserta con
+executemany en una transacción cada filas_por_lote filas o cada
+intervalo_ms milisegundos, lo que ocurra primero.
+
+Si la cola se llena (disco lento), la política decide:
+- "descartar": la fila se descarta y se cuenta (nunca bloquea la recepción)
+- "esperar": espera hasta espera_max_seg a que haya lugar y luego descarta
+
+Consulta de ejemplo:
+    SELECT * FROM posiciones
+    WHERE id_dispositivo = 1234 AND timestamp BETWEEN ? AND ?
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+
+POLITICA_DESCARTAR = "descartar"
+POLITICA_ESPERAR = "esperar"
+POLITICAS_COLA = (POLITICA_DESCARTAR, POLITICA_ESPERAR)
+
+FILAS_POR_LOTE = 1000
+INTERVALO_MS = 200
+CAPACIDAD_COLA_SQLITE = 50_000
+
+_ESQUEMA = (
+    """CREATE TABLE IF NOT EXISTS posiciones (
+        id_dispositivo INTEGER NOT NULL,
+        secuencia INTEGER NOT NULL,
+        timestamp INTEGER NOT NULL,
+        llegada REAL NOT NULL,
+        latitud REAL NOT NULL,
+        longitud REAL NOT NULL,
+        altitud INTEGER NOT NULL,
+        velocidad REAL NOT NULL,
+        rumbo REAL NOT NULL,
+        bateria INTEGER NOT NULL,
+        estado INTEGER NOT NULL,
+        flags INTEGER NOT NULL
+    )""",
+    """CREATE INDEX IF NOT EXISTS idx_posiciones_dispositivo_timestamp
+        ON posiciones (id_dispositivo, timestamp)""",
+    """CREATE TABLE IF NOT EXISTS heartbeats (
+        id_dispositivo INTEGER NOT NULL,
+        secuencia INTEGER NOT NULL,
+        timestamp INTEGER NOT NULL,
+        llegada REAL NOT NULL,
+        flags INTEGER NOT NULL
+    )""",
+    """CREATE INDEX IF NOT EXISTS idx_heartbeats_dispositivo_timestamp
+        ON heartbeats (id_dispositivo, timestamp)""",
+)
+_INSERTAR_POSICION = "INSERT INTO posiciones VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERTAR_HEARTBEAT = "INSERT INTO heartbeats VALUES (?, ?, ?, ?, ?)"
+
+_POSICION = 0
+_HEARTBEAT = 1
+
+
+def _fila_posicion(datos, llegada):
+    return (
+        datos.id_dispositivo,
+        datos.secuencia,
+        datos.timestamp,
+        llegada,
+        datos.latitud / 10000000.0,
+        datos.longitud / 10000000.0,
+        datos.altitud,
+        datos.velocidad / 10.0,
+        datos.rumbo / 10.0,
+        datos.bateria,
+        datos.estado,
+        datos.flags,
+    )
+
+
+def _fila_heartbeat(datos, llegada):
+    return (datos.id_dispositivo, datos.secuencia, int(llegada), llegada, datos.flags)
+
+
+class DestinoSQLite:
+    """Escritor SQLite en un hilo propio alimentado por una cola acotada"""
+
+    def __init__(
+        self,
+        ruta,
+        filas_por_lote=FILAS_POR_LOTE,
+        intervalo_ms=INTERVALO_MS,
+        capacidad=CAPACIDAD_COLA_SQLITE,
+        politica=POLITICA_DESCARTAR,
+        espera_max_seg=0.05,
+    ):
+        if politica not in POLITICAS_COLA:
+            raise ValueError(f"Política de cola inválida: {politica}")
+        self.ruta = ruta
+        self.filas_por_lote = max(1, int(filas_por_lote))
+        self.intervalo = intervalo_ms / 1000.0
+        self.politica = politica
+        self.espera_max_seg = espera_max_seg
+        self._cola = queue.Queue(capacidad)
+
+        # Contadores: encoladas/descartadas los modifica el hilo de recepción,
+        # el resto el hilo escritor
+        self.encoladas = 0
+        self.descartadas = 0
+        self.escritas = 0
+        self.transacciones = 0
+        self.errores = 0
+        self.filas_con_error = 0
+        self.ultimo_error = None
+
+        # Crear el esquema aquí para que los errores de ruta salgan enseguida
+        conexion = self._conectar()
+        conexion.close()
+        self._hilo = threading.Thread(
+            target=self._escribir, name="gps-sqlite", daemon=True
+        )
+        self._hilo.start()
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        with conexion:
+            for sentencia in _ESQUEMA:
+                conexion.execute(sentencia)
+        return conexion
+
+    def _encolar(self, elemento):
+        try:
+            if self.politica == POLITICA_ESPERAR:
+                self._cola.put(elemento, timeout=self.espera_max_seg)
+            else:
+                self._cola.put_nowait(elemento)
+        except queue.Full:
+            self.descartadas += 1
+            return False
+        self.encoladas += 1
+        return True
+
+    def agregar_posicion(self, datos, llegada=None):
+        """Encola un MensajeGPS de datos; retorna False si se descartó"""
+        if llegada is None:
+            llegada = time.time()
+        return self._encolar((_POSICION, datos, llegada))
+
+    def agregar_heartbeat(self, datos, llegada=None):
+        """Encola un heartbeat; retorna False si se descartó"""
+        if llegada is None:
+            llegada = time.time()
+        return self._encolar((_HEARTBEAT, datos, llegada))
+
+    def pendientes(self):
+        return self._cola.qsize()
+
+    def _escribir(self):
+        conexion = self._conectar()
+        cola = self._cola
+        posiciones = []
+        heartbeats = []
+        terminar = False
+        try:
+            while not terminar:
+                limite = time.monotonic() + self.intervalo
+                filas = 0
+                # Juntar filas hasta completar el lote o vencer el intervalo
+                while filas < self.filas_por_lote:
+                    restante = limite - time.monotonic()
+                    try:
+                        if restante > 0:
+                            elemento = cola.get(timeout=restante)
+                        else:
+                            elemento = cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if elemento is None:
+                        terminar = True
+                        break
+                    tipo, datos, llegada = elemento
+                    if tipo == _POSICION:
+                        posiciones.append(_fila_posicion(datos, llegada))
+                    else:
+                        heartbeats.append(_fila_heartbeat(datos, llegada))
+                    filas += 1
+                if filas:
+                    self._confirmar(conexion, posiciones, heartbeats)
+                    posiciones.clear()
+                    heartbeats.clear()
+        finally:
+            conexion.close()
+
+    def _confirmar(self, conexion, posiciones, heartbeats):
+        """Inserta el lote en una sola transacción"""
+        try:
+            with conexion:
+                if posiciones:
+                    conexion.executemany(_INSERTAR_POSICION, posiciones)
+                if heartbeats:
+                    conexion.executemany(_INSERTAR_HEARTBEAT, heartbeats)
+        except sqlite3.Error as e:
+            # El lote se pierde
+            self.errores += 1
+            self.filas_con_error += len(posiciones) + len(heartbeats)
+            self.ultimo_error = str(e)
+            return
+        self.escritas += len(posiciones) + len(heartbeats)
+        self.transacciones += 1
+
+    def cerrar(self, timeout=10.0):
+        """
+        Escribe lo que quede en la cola y detiene el hilo escritor
+
+        Espera a lo sumo timeout segundos en total: si el hilo está trabado
+        con la cola llena, lo encolado se abandona en lugar de colgar la salida.
+        """
+        if not self._hilo.is_alive():
+            return
+        limite = time.monotonic() + timeout
+        try:
+            self._cola.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._hilo.join(max(0.0, limite - time.monotonic()))
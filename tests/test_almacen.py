@@ -0,0 +1,245 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+import gps_almacen  # noqa: E402
+import gps_protocolo  # noqa: E402
+from gps_almacen import (  # noqa: E402
+    TAM_CABECERA_SEGMENTO,
+    TAM_REGISTRO,
+    AlmacenTrayectos,
+    LectorTrayectos,
+    convertir_log_texto,
+    exportar_texto,
+    reindexar,
+)
+from gps_log import formatear_fecha_log, formatear_linea_log  # noqa: E402
+
+T0 = 1_700_000_000
+
+
+def _registro(i):
+    trama = gps_protocolo.empaquetar_mensaje_gps(
+        id_dispositivo=i % 7,
+        secuencia=i,
+        latitud=-173935000 + i,
+        longitud=-661570000 - i,
+        altitud=2558,
+        velocidad=450 + i % 10,
+        rumbo=1350,
+        bateria=85,
+        estado=i % 3,
+        flags=i % 16,
+    )
+    return gps_protocolo.desempaquetar_registro(trama)[0]
+
+
+class TestAlmacen(unittest.TestCase):
+    def setUp(self):
+        self._directorio = tempfile.TemporaryDirectory()
+        self.directorio = os.path.join(self._directorio.name, "trayectos")
+
+    def tearDown(self):
+        self._directorio.cleanup()
+
+    def test_ida_y_vuelta(self):
+        almacen = AlmacenTrayectos(self.directorio, registros_por_bloque=16)
+        originales = [_registro(i) for i in range(100)]
+        for datos in originales:
+            almacen.agregar(datos, llegada=1_700_000_000.25)
+        almacen.cerrar()
+
+        with LectorTrayectos(self.directorio) as lector:
+            leidos = list(lector)
+            indice = lector.segmentos[0].leer_indice()
+        self.assertEqual(len(leidos), 100)
+        for original, leido in zip(originales, leidos):
+            for campo in ("id_dispositivo", "secuencia", "flags", "latitud",
+                          "longitud", "timestamp", "velocidad", "estado"):
+                self.assertEqual(getattr(original, campo), getattr(leido, campo))
+            self.assertEqual(leido.llegada, 1_700_000_000.25)
+        # 6 bloques completos de 16; el resto se recorre sin índice
+        self.assertEqual([entrada[0] for entrada in indice], [0, 16, 32, 48, 64, 80])
+
+    def test_flags_de_16_bits(self):
+        almacen = AlmacenTrayectos(self.directorio)
+        almacen.agregar(_registro(1)._replace(flags=0x8100), llegada=T0)
+        almacen.cerrar()
+        with LectorTrayectos(self.directorio) as lector:
+            (leido,) = list(lector)
+            (consultado,) = list(lector.consultar(1, T0 - 10**9, None))
+        self.assertEqual((leido.flags, consultado.flags), (0x8100, 0x8100))
+
+    def test_lee_segmentos_version_1(self):
+        # Formato anterior: flags en un byte seguido de uno de relleno
+        registro = _registro(3)
+        campos = (
+            registro.id_dispositivo, registro.secuencia, 0x0F, T0, 500,
+            registro.latitud, registro.longitud, registro.altitud, T0,
+            registro.velocidad, registro.rumbo, registro.bateria, registro.estado,
+        )
+        os.makedirs(self.directorio)
+        with open(os.path.join(self.directorio, "000001.seg"), "wb") as f:
+            f.write(gps_almacen._CABECERA_SEGMENTO.pack(
+                gps_almacen.MAGIA_SEGMENTO, 1, TAM_REGISTRO, 64, 0, 300
+            ))
+            f.write(gps_almacen._REGISTRO_V1.pack(*campos))
+        with LectorTrayectos(self.directorio) as lector:
+            (leido,) = list(lector)
+        self.assertEqual(tuple(leido), campos)
+
+    def test_rotacion_de_segmentos_y_registro_incompleto(self):
+        max_bytes = TAM_CABECERA_SEGMENTO + 2 * 16 * TAM_REGISTRO
+        almacen = AlmacenTrayectos(
+            self.directorio, max_bytes_segmento=max_bytes, registros_por_bloque=16
+        )
+        for i in range(70):
+            almacen.agregar(_registro(i))
+        almacen.cerrar()
+        # Un registro a medio escribir al final se ignora
+        with open(os.path.join(self.directorio, "000003.seg"), "ab") as f:
+            f.write(b"\x00" * (TAM_REGISTRO // 2))
+
+        with LectorTrayectos(self.directorio) as lector:
+            self.assertEqual([len(s) for s in lector.segmentos], [32, 32, 6])
+            self.assertEqual([r.secuencia for r in lector], list(range(70)))
+
+        # Reabrir el almacén empieza un segmento nuevo
+        almacen = AlmacenTrayectos(self.directorio)
+        almacen.agregar(_registro(70))
+        almacen.cerrar()
+        self.assertEqual(almacen.numero_segmento, 4)
+
+    def test_convertir_y_exportar_texto(self):
+        ruta_txt = os.path.join(self._directorio.name, "gps_log.txt")
+        with open(ruta_txt, "w") as f:
+            for i in range(20):
+                datos = _registro(i)
+                f.write(formatear_linea_log(datos, formatear_fecha_log(datos.timestamp)))
+            f.write("línea corrupta\n")
+
+        convertidas, omitidas = convertir_log_texto([ruta_txt], self.directorio)
+        self.assertEqual((convertidas, omitidas), (20, 1))
+
+        exportado = io.StringIO()
+        self.assertEqual(exportar_texto(self.directorio, exportado), 20)
+        with open(ruta_txt) as f:
+            original = f.read()
+        self.assertEqual(exportado.getvalue(), original.replace("línea corrupta\n", ""))
+
+    def _poblar_flota(self, n, max_bytes_segmento):
+        """n posiciones de 50 dispositivos, una por segundo desde T0"""
+        almacen = AlmacenTrayectos(
+            self.directorio, max_bytes_segmento=max_bytes_segmento, registros_por_bloque=16
+        )
+        registros = []
+        for i in range(n):
+            datos = _registro(i)._replace(id_dispositivo=i % 50, timestamp=T0 + i)
+            almacen.agregar(datos, llegada=T0 + i + 2)
+            registros.append(datos)
+        almacen.cerrar()
+        return registros
+
+    def test_consultar_por_dispositivo_y_tiempo(self):
+        registros = self._poblar_flota(3000, TAM_CABECERA_SEGMENTO + 40 * 16 * TAM_REGISTRO)
+        casos = [
+            (7, T0 + 100, T0 + 400),
+            (7, None, None),
+            (None, T0 + 2500, T0 + 2510),
+            (49, T0 + 2990, None),
+            (3, T0 + 5000, T0 + 6000),
+        ]
+        with LectorTrayectos(self.directorio) as lector:
+            self.assertGreater(len(lector.segmentos), 1)
+            for id_disp, desde, hasta in casos:
+                esperados = [
+                    (r.id_dispositivo, r.secuencia)
+                    for r in registros
+                    if (id_disp is None or r.id_dispositivo == id_disp)
+                    and (desde is None or r.timestamp >= desde)
+                    and (hasta is None or r.timestamp <= hasta)
+                ]
+                obtenidos = [
+                    (r.id_dispositivo, r.secuencia)
+                    for r in lector.consultar(id_disp, desde, hasta, holgura=5)
+                ]
+                self.assertEqual(obtenidos, esperados, (id_disp, desde, hasta))
+
+    def test_consultar_con_llegadas_desordenadas(self):
+        # Logs convertidos del más nuevo al más viejo: la llegada baja
+        rutas = []
+        for parte in range(2):
+            ruta = os.path.join(self._directorio.name, f"gps_log.txt.{parte}")
+            with open(ruta, "w") as f:
+                for i in range(300):
+                    ts = T0 + (1 - parte) * 1000 + i
+                    datos = _registro(i)._replace(id_dispositivo=7, timestamp=ts)
+                    f.write(formatear_linea_log(datos, formatear_fecha_log(ts)))
+            rutas.append(ruta)
+        convertir_log_texto(rutas, self.directorio)
+        with LectorTrayectos(self.directorio) as lector:
+            self.assertGreater(lector.segmentos[0].entradas, 0)
+            obtenidos = [r.timestamp for r in lector.consultar(7, T0 + 100, T0 + 200)]
+        self.assertEqual(sorted(obtenidos), list(range(T0 + 100, T0 + 201)))
+
+    def test_holgura_guardada_en_el_segmento(self):
+        almacen = AlmacenTrayectos(self.directorio, registros_por_bloque=16, holgura=3600)
+        # Reloj del dispositivo media hora adelantado, luego posiciones en hora
+        for i in range(64):
+            almacen.agregar(_registro(i)._replace(timestamp=T0 + 1800 + i), llegada=T0 + i)
+        for i in range(64):
+            almacen.agregar(_registro(i)._replace(timestamp=T0 + 2000 + i), llegada=T0 + 2000 + i)
+        almacen.cerrar()
+        with LectorTrayectos(self.directorio) as lector:
+            segmento = lector.segmentos[0]
+            self.assertEqual(segmento.holgura, 3600)
+            self.assertEqual(len(list(lector.consultar(None, T0 + 1800, T0 + 1863))), 64)
+            self.assertEqual(len(list(lector.consultar(None, T0 + 1800, T0 + 1863, 60))), 0)
+
+    def test_consulta_angosta_visita_pocos_bloques(self):
+        # Un día de posiciones (una por segundo) con un lote atrasado al final
+        almacen = AlmacenTrayectos(self.directorio, registros_por_bloque=64, holgura=300)
+        base = _registro(0)._replace(id_dispositivo=1)
+        for i in range(86400):
+            almacen.agregar(base._replace(timestamp=T0 + i), llegada=T0 + i)
+        for i in range(64):
+            almacen.agregar(
+                _registro(i)._replace(id_dispositivo=2, timestamp=T0 - 86400 + i),
+                llegada=T0 + 86400,
+            )
+        almacen.cerrar()
+        with LectorTrayectos(self.directorio) as lector:
+            segmento = lector.segmentos[0]
+            obtenidos = [r.timestamp for r in lector.consultar(1, T0 + 43200, T0 + 43263)]
+            visitados = segmento.bloques_visitados
+            atrasados = list(lector.consultar(2, T0 - 86400, T0 - 86400 + 63))
+        self.assertEqual(obtenidos, list(range(T0 + 43200, T0 + 43264)))
+        # La holgura de 300 s (5 bloques), el bloque de la ventana y el lote
+        # atrasado, no el resto del día
+        self.assertLessEqual(visitados, 300 // 64 + 4)
+        self.assertGreater(segmento.entradas, 1000)
+        self.assertEqual(len(atrasados), 64)
+
+    def test_reindexar(self):
+        self._poblar_flota(500, TAM_CABECERA_SEGMENTO + 20 * 16 * TAM_REGISTRO)
+        with open(os.path.join(self.directorio, "000001.idx"), "r+b") as f:
+            f.truncate(0)
+        with LectorTrayectos(self.directorio) as lector:
+            self.assertEqual(lector.segmentos[0].entradas, 0)
+            sin_indice = list(lector.consultar(5, T0 + 10, T0 + 200))
+        self.assertEqual(reindexar(self.directorio), 2)
+        with LectorTrayectos(self.directorio) as lector:
+            self.assertEqual(lector.segmentos[0].entradas, 20)
+            self.assertEqual(list(lector.consultar(5, T0 + 10, T0 + 200)), sin_indice)
+        self.assertEqual(len(sin_indice), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
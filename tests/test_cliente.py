@@ -0,0 +1,325 @@
+import contextlib
+import io
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+import gps_protocolo  # noqa: E402
+from gps_cliente import DispositivoGPS, VentanaEnvio  # noqa: E402
+from gps_servidor import ServidorGPS  # noqa: E402
+
+
+def _ventana(**opciones):
+    opciones.setdefault("timeout_inicial", 1.0)
+    opciones.setdefault("jitter", 0.0)
+    return VentanaEnvio(**opciones)
+
+
+class TestVentanaEnvio(unittest.TestCase):
+    def test_limite_de_ventana(self):
+        ventana = _ventana(tam=3)
+        for seq in range(1, 6):
+            ventana.encolar(seq, b"m%d" % seq)
+        envios, _ = ventana.a_transmitir(0.0)
+        self.assertEqual([seq for seq, _, _ in envios], [1, 2, 3])
+        self.assertEqual(ventana.a_transmitir(0.5), ([], []))
+        self.assertTrue(ventana.confirmar(2))
+        self.assertFalse(ventana.confirmar(2))
+        envios, _ = ventana.a_transmitir(0.5)
+        self.assertEqual(envios, [(4, b"m4", 1)])
+        self.assertEqual(ventana.pendientes(), 4)
+
+    def test_reintentos_con_espera_exponencial(self):
+        ventana = _ventana(tam=2, max_intentos=3)
+        ventana.encolar(1, b"a")
+        ventana.a_transmitir(0.0)
+        self.assertEqual(ventana.proximo_vencimiento(), 1.0)
+        self.assertEqual(ventana.a_transmitir(0.9), ([], []))
+        self.assertEqual(ventana.a_transmitir(1.0), ([(1, b"a", 2)], []))
+        self.assertEqual(ventana.proximo_vencimiento(), 3.0)
+        self.assertEqual(ventana.a_transmitir(3.0), ([(1, b"a", 3)], []))
+        self.assertEqual(ventana.proximo_vencimiento(), 7.0)
+        self.assertEqual(ventana.a_transmitir(7.0), ([], [1]))
+        self.assertEqual((ventana.retransmitidos, ventana.abandonados), (2, 1))
+        self.assertIsNone(ventana.proximo_vencimiento())
+
+    def test_jitter_acotado(self):
+        ventana = VentanaEnvio(timeout_inicial=1.0, jitter=0.5, azar=random.Random(5))
+        for seq in range(10):
+            ventana.encolar(seq, b"x")
+        ventana.a_transmitir(0.0)
+        vencimientos = [entrada[2] for entrada in ventana.en_vuelo.values()]
+        self.assertTrue(all(1.0 <= v <= 1.5 for v in vencimientos))
+        self.assertGreater(len(set(vencimientos)), 1)
+
+    def test_confirmar_selectivo(self):
+        ventana = _ventana(tam=8)
+        for seq in (65534, 65535, 0, 1, 2):
+            ventana.encolar(seq, b"x")
+        ventana.a_transmitir(0.0)
+        # Acumulado hasta 65535, el 0 perdido, el 1 y el 2 en el mapa
+        self.assertEqual(ventana.confirmar_selectivo(65535, 2, 0b011), [65534, 65535, 1, 2])
+        self.assertEqual(list(ventana.en_vuelo), [0])
+        self.assertEqual(ventana.confirmados, 4)
+
+    def test_bandeja_acotada(self):
+        ventana = _ventana(tam=1, capacidad_bandeja=3)
+        for seq in range(1, 6):
+            ventana.encolar(seq, b"x")
+        self.assertEqual(ventana.descartados, 2)
+        self.assertEqual([seq for seq, _ in ventana.bandeja], [3, 4, 5])
+
+
+def _dispositivo(puerto, **opciones):
+    with contextlib.redirect_stdout(io.StringIO()):
+        gps = DispositivoGPS(7, "127.0.0.1", puerto, **opciones)
+        gps.conectar()
+    return gps
+
+
+class TestEnvioConVentana(unittest.TestCase):
+    def test_retransmite_sin_ack(self):
+        # Servidor de prueba: ignora la primera llegada de cada secuencia par
+        servidor = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        servidor.bind(("127.0.0.1", 0))
+        servidor.settimeout(0.1)
+        vistos = set()
+        detener = threading.Event()
+
+        def atender():
+            while not detener.is_set():
+                try:
+                    mensaje, direccion = servidor.recvfrom(64)
+                except socket.timeout:
+                    continue
+                datos, _ = gps_protocolo.desempaquetar_mensaje(mensaje)
+                seq = datos["secuencia"]
+                if seq % 2 == 0 and seq not in vistos:
+                    vistos.add(seq)
+                    continue
+                servidor.sendto(gps_protocolo.empaquetar_ack(7, seq), direccion)
+
+        hilo = threading.Thread(target=atender, daemon=True)
+        hilo.start()
+        gps = _dispositivo(servidor.getsockname()[1], ventana=4)
+        gps.ventana.timeout_inicial = 0.2
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(10):
+                    gps.enviar_datos()
+                self.assertTrue(gps.vaciar_bandeja(timeout=3.0))
+        finally:
+            gps.socket.close()
+            detener.set()
+            hilo.join(timeout=1)
+            servidor.close()
+        self.assertEqual(gps.ventana.confirmados, 10)
+        self.assertGreaterEqual(gps.ventana.retransmitidos, 5)
+        self.assertEqual(gps.ventana.abandonados, 0)
+
+    def test_vaciar_atraso_tras_falta_de_cobertura(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            servidor = ServidorGPS(
+                puerto=0, enviar_ack=True, log_path=None, modo_salida="silencioso"
+            )
+            hilo = threading.Thread(target=servidor.ejecutar, daemon=True)
+            hilo.start()
+            while servidor.socket is None:
+                time.sleep(0.01)
+            gps = _dispositivo(servidor.socket.getsockname()[1], ventana=8)
+            try:
+                gps.sin_cobertura = True
+                for _ in range(200):
+                    gps.enviar_datos()
+                self.assertEqual(gps.ventana.pendientes(), 200)
+                self.assertEqual(servidor.mensajes_recibidos, 0)
+                gps.sin_cobertura = False
+                self.assertTrue(gps.vaciar_bandeja(timeout=5.0))
+            finally:
+                gps.socket.close()
+                servidor.detener()
+                hilo.join(timeout=3)
+        self.assertEqual(gps.ventana.confirmados, 200)
+        self.assertEqual(servidor.mensajes_recibidos, 200)
+        self.assertEqual(servidor.mensajes_perdidos, 0)
+
+    def test_ack_selectivo_agrupado(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            servidor = ServidorGPS(
+                puerto=0,
+                enviar_ack=True,
+                log_path=None,
+                modo_salida="silencioso",
+                lote_recepcion=32,
+                coalescer_acks_ms=10,
+            )
+            hilo = threading.Thread(target=servidor.ejecutar, daemon=True)
+            hilo.start()
+            while servidor.socket is None:
+                time.sleep(0.01)
+            gps = _dispositivo(servidor.socket.getsockname()[1], ventana=32)
+            try:
+                gps.sin_cobertura = True
+                for _ in range(300):
+                    gps.enviar_datos()
+                gps.sin_cobertura = False
+                self.assertTrue(gps.vaciar_bandeja(timeout=5.0))
+            finally:
+                gps.socket.close()
+                servidor.detener()
+                hilo.join(timeout=3)
+        self.assertEqual(gps.ventana.confirmados, 300)
+        self.assertEqual(servidor.mensajes_recibidos, 300)
+        self.assertGreater(servidor.acks_selectivos, 0)
+        self.assertLess(servidor.acks_enviados, 300)
+
+    def test_ack_selectivo_sin_ventana(self):
+        salida = io.StringIO()
+        with contextlib.redirect_stdout(salida):
+            servidor = ServidorGPS(
+                puerto=0,
+                enviar_ack=True,
+                log_path=None,
+                modo_salida="silencioso",
+                coalescer_acks_ms=10,
+            )
+            hilo = threading.Thread(target=servidor.ejecutar, daemon=True)
+            hilo.start()
+            while servidor.socket is None:
+                time.sleep(0.01)
+            gps = _dispositivo(servidor.socket.getsockname()[1])
+            try:
+                for _ in range(3):
+                    self.assertTrue(gps.enviar_datos())
+            finally:
+                gps.socket.close()
+                servidor.detener()
+                hilo.join(timeout=3)
+        for seq in (1, 2, 3):
+            self.assertIn(f"ACK selectivo recibido para mensaje #{seq}", salida.getvalue())
+        self.assertEqual(servidor.acks_selectivos, 3)
+        self.assertEqual(servidor.acks_enviados, 3)
+
+    def test_atraso_en_lotes_de_posiciones(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            servidor = ServidorGPS(
+                puerto=0, enviar_ack=True, log_path=None, modo_salida="silencioso"
+            )
+            hilo = threading.Thread(target=servidor.ejecutar, daemon=True)
+            hilo.start()
+            while servidor.socket is None:
+                time.sleep(0.01)
+            gps = _dispositivo(servidor.socket.getsockname()[1], ventana=60, agrupar=30)
+            try:
+                gps.sin_cobertura = True
+                for _ in range(300):
+                    gps.enviar_datos()
+                gps.sin_cobertura = False
+                self.assertTrue(gps.vaciar_bandeja(timeout=5.0))
+            finally:
+                gps.socket.close()
+                servidor.detener()
+                hilo.join(timeout=3)
+        self.assertEqual(gps.ventana.confirmados, 300)
+        self.assertEqual(servidor.mensajes_recibidos, 300)
+        # Un datagrama (y un ACK selectivo) cada varias posiciones
+        self.assertGreater(servidor.lotes_fixes, 0)
+        self.assertLess(servidor.acks_enviados, 100)
+
+    def test_envio_delta(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            servidor = ServidorGPS(
+                puerto=0, enviar_ack=True, log_path=None, modo_salida="silencioso"
+            )
+            hilo = threading.Thread(target=servidor.ejecutar, daemon=True)
+            hilo.start()
+            while servidor.socket is None:
+                time.sleep(0.01)
+            gps = _dispositivo(
+                servidor.socket.getsockname()[1], ventana=4, delta=True, intervalo_keyframe=10
+            )
+            gps.velocidad, gps.en_movimiento, gps.ignicion = 40.0, True, True
+            try:
+                for _ in range(25):
+                    gps.simular_movimiento()
+                    gps.enviar_datos()
+                self.assertTrue(gps.vaciar_bandeja(timeout=3.0))
+            finally:
+                gps.socket.close()
+                servidor.detener()
+                hilo.join(timeout=3)
+        self.assertEqual(gps.ventana.confirmados, 25)
+        self.assertEqual(servidor.mensajes_recibidos, 25)
+        # Completos: el primero y uno cada 10 (a menos que un salto no ahorre)
+        self.assertGreaterEqual(servidor.deltas_recibidos, 20)
+        self.assertEqual(servidor.deltas_sin_referencia, 0)
+        self.assertEqual(servidor.dispositivos[7].ultima_seq, 25)
+
+
+    def test_envio_autenticado(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            servidor = ServidorGPS(
+                puerto=0,
+                enviar_ack=True,
+                log_path=None,
+                modo_salida="silencioso",
+                autenticar=True,
+                claves_dispositivos={7: "clave propia"},
+            )
+            hilo = threading.Thread(target=servidor.ejecutar, daemon=True)
+            hilo.start()
+            while servidor.socket is None:
+                time.sleep(0.01)
+            puerto = servidor.socket.getsockname()[1]
+            gps = _dispositivo(
+                puerto, ventana=8, agrupar=4, autenticar=True, clave_dispositivo="clave propia"
+            )
+            intruso = _dispositivo(puerto, ventana=8, autenticar=True)  # Clave derivada
+            try:
+                gps.sin_cobertura = True
+                for _ in range(20):
+                    gps.enviar_datos()
+                gps.sin_cobertura = False
+                self.assertTrue(gps.vaciar_bandeja(timeout=5.0))
+                intruso.enviar_datos()
+                self.assertFalse(intruso.vaciar_bandeja(timeout=0.3))
+            finally:
+                gps.socket.close()
+                intruso.socket.close()
+                servidor.detener()
+                hilo.join(timeout=3)
+        self.assertEqual(gps.ventana.confirmados, 20)
+        self.assertEqual(servidor.mensajes_recibidos, 20)
+        self.assertGreaterEqual(servidor.rechazados_autenticacion, 1)
+
+class TestConstruirMensaje(unittest.TestCase):
+    def test_en_buffer_reutilizado(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            gps = DispositivoGPS(7, "127.0.0.1", 9)
+        buffer = bytearray(2 * gps_protocolo.TAM_MENSAJE_GPS)
+        escritos = gps.construir_mensaje_en(buffer, gps_protocolo.TAM_MENSAJE_GPS)
+        self.assertEqual(escritos, gps_protocolo.TAM_MENSAJE_GPS)
+        datos, error = gps_protocolo.desempaquetar_mensaje(bytes(buffer[escritos:]))
+        self.assertIsNotNone(datos, msg=error)
+        self.assertEqual((datos["id_dispositivo"], datos["secuencia"]), (7, 1))
+        self.assertEqual(buffer[:escritos], bytes(escritos))
+
+        # construir_mensaje usa el buffer propio pero entrega copias independientes
+        primero = gps.construir_mensaje()
+        segundo = gps.construir_mensaje()
+        self.assertIsInstance(primero, bytes)
+        self.assertEqual(gps_protocolo.desempaquetar_mensaje(primero)[0]["secuencia"], 2)
+        self.assertEqual(gps_protocolo.desempaquetar_mensaje(segundo)[0]["secuencia"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import os
+import pickle
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from gps_dispositivos import (  # noqa: E402
+    CAMPOS_DISPOSITIVO,
+    DISTANCIA_RESINCRONIZAR,
+    SEQ_ANTIGUA,
+    SEQ_DUPLICADA,
+    SEQ_NUEVA,
+    SEQ_TARDIA,
+    TablaDispositivos,
+)
+from gps_protocolo import secuencia_confirmada  # noqa: E402
+from gps_servidor_multiproceso import combinar_dispositivos  # noqa: E402
+
+
+class TestTablaDispositivos(unittest.TestCase):
+    def test_estado_inicial(self):
+        tabla = TablaDispositivos()
+        registro, nuevo = tabla.registrar(65535, 100.0)
+        self.assertTrue(nuevo)
+        self.assertEqual(tabla.registrar(65535, 105.0), (registro, False))
+        self.assertEqual(
+            dict(tabla[65535]),
+            {
+                "primera_conexion": 100.0,
+                "ultima_conexion": 105.0,
+                "ultima_seq": 0,
+                "mensajes_recibidos": 0,
+                "ultima_pos": None,
+                "ultima_velocidad": 0,
+                "ultimo_rumbo": 0,
+                "bateria": 100,
+                "flags": 0,
+                "perdidos": 0,
+                "reordenados": 0,
+                "duplicados": 0,
+            },
+        )
+        self.assertEqual(tuple(tabla[65535].keys()), CAMPOS_DISPOSITIVO)
+        self.assertEqual(registro.ultima_conexion, 105.0)
+
+    def test_interfaz_de_dict(self):
+        tabla = TablaDispositivos()
+        for id_disp in (42, 3, 1000):
+            tabla.registrar(id_disp, 1.0)
+        tabla[3]["ultima_pos"] = (-17.3935, -66.157)
+        tabla[3]["ultima_seq"] = 9
+
+        self.assertEqual(len(tabla), 3)
+        self.assertEqual(list(tabla), [3, 42, 1000])
+        self.assertIn(42, tabla)
+        self.assertNotIn(7, tabla)
+        self.assertNotIn(-1, tabla)
+        self.assertNotIn(70000, tabla)
+        self.assertIsNone(tabla.get(7))
+        with self.assertRaises(KeyError):
+            tabla[7]
+        with self.assertRaises(KeyError):
+            tabla[3]["altitud"]
+        self.assertEqual(tabla[3].ultima_pos, (-17.3935, -66.157))
+        self.assertEqual(tabla[3].ultima_seq, 9)
+
+        self.assertIsNotNone(tabla.eliminar(42))
+        self.assertIsNone(tabla.eliminar(42))
+        self.assertEqual(list(tabla), [3, 1000])
+        # Al volver se registra de nuevo con el estado inicial
+        self.assertFalse(tabla.registrar(3, 2.0)[1])
+        registro, nuevo = tabla.registrar(42, 2.0)
+        self.assertTrue(nuevo)
+        self.assertEqual(registro["mensajes_recibidos"], 0)
+
+    def test_ventana_de_secuencias(self):
+        tabla = TablaDispositivos(tam_ventana=64)
+        estado, _ = tabla.registrar(1, 1.0)
+        clasificar = lambda seq: tabla.registrar_secuencia(estado, seq)  # noqa: E731
+
+        self.assertEqual(clasificar(1), (SEQ_NUEVA, 0))
+        self.assertEqual(clasificar(5), (SEQ_NUEVA, 3))
+        self.assertEqual(clasificar(3), (SEQ_TARDIA, 0))
+        self.assertEqual(clasificar(3), (SEQ_DUPLICADA, 0))
+        self.assertEqual(clasificar(5), (SEQ_DUPLICADA, 0))
+        self.assertEqual(clasificar(2), (SEQ_TARDIA, 0))
+        self.assertEqual((estado.perdidos, estado.reordenados, estado.duplicados), (1, 2, 2))
+
+        # Vuelta de 65535 a 0: el 0 es más nuevo, el 65534 atrasado
+        estado.ultima_seq = 65533
+        estado.ventana = 1
+        self.assertEqual(clasificar(65535), (SEQ_NUEVA, 1))
+        self.assertEqual(clasificar(0), (SEQ_NUEVA, 0))
+        self.assertEqual(clasificar(65534), (SEQ_TARDIA, 0))
+        self.assertEqual(clasificar(65534), (SEQ_DUPLICADA, 0))
+        self.assertEqual(estado.ultima_seq, 0)
+
+        # Más atrás que la ventana: no se puede distinguir, se descarta
+        self.assertEqual(clasificar(100), (SEQ_NUEVA, 99))
+        self.assertEqual(clasificar(100 - 64), (SEQ_ANTIGUA, 0))
+        self.assertEqual(clasificar(100 - 63), (SEQ_TARDIA, 0))
+        # Un salto mayor que la ventana la reinicia
+        self.assertEqual(clasificar(1000), (SEQ_NUEVA, 899))
+        self.assertEqual(clasificar(999), (SEQ_TARDIA, 0))
+
+        with self.assertRaises(ValueError):
+            TablaDispositivos(tam_ventana=32)
+
+    def test_resumen_ack(self):
+        tabla = TablaDispositivos(tam_ventana=64)
+        estado, _ = tabla.registrar(1, 1.0)
+        for seq in range(1, 70):
+            if seq != 66:
+                tabla.registrar_secuencia(estado, seq)
+        # Hueco en 66: el acumulado llega hasta 65
+        self.assertEqual(tabla.resumen_ack(estado), (65, 69, (1 << 64) - 1 - (1 << 3)))
+        tabla.registrar_secuencia(estado, 66)
+        self.assertEqual(tabla.resumen_ack(estado), (69, 69, (1 << 64) - 1))
+
+    def test_resumen_ack_no_salta_huecos_fuera_de_ventana(self):
+        tabla = TablaDispositivos(tam_ventana=64)
+        estado, _ = tabla.registrar(1, 1.0)
+        tabla.registrar_secuencia(estado, 1)
+        for seq in range(3, 201):
+            tabla.registrar_secuencia(estado, seq)
+        # El 2 salió de la ventana sin llegar: no se confirma
+        self.assertEqual(tabla.registrar_secuencia(estado, 2), (SEQ_ANTIGUA, 0))
+        acumulado, mas_alta, mapa = tabla.resumen_ack(estado)
+        self.assertEqual((acumulado, mas_alta, mapa), (1, 200, (1 << 64) - 1))
+        self.assertFalse(secuencia_confirmada(2, acumulado, mas_alta, mapa))
+        self.assertTrue(secuencia_confirmada(150, acumulado, mas_alta, mapa))
+        # Un salto mayor que la ventana tampoco confirma lo salteado
+        estado, _ = tabla.registrar(2, 1.0)
+        for seq in (1, 2, 500, 501):
+            tabla.registrar_secuencia(estado, seq)
+        self.assertEqual(tabla.resumen_ack(estado)[0], 2)
+        # Mucho después se resincroniza con la ventana
+        for seq in range(502, 502 + DISTANCIA_RESINCRONIZAR):
+            tabla.registrar_secuencia(estado, seq)
+        self.assertEqual(tabla.resumen_ack(estado)[0], estado.ultima_seq)
+
+    def test_combinar_tablas_de_trabajadores(self):
+        tablas = []
+        for ultima_conexion, seq in ((10.0, 5), (20.0, 8)):
+            tabla = TablaDispositivos()
+            tabla.registrar(1, ultima_conexion)
+            tabla[1]["ultima_seq"] = seq
+            tabla[1]["mensajes_recibidos"] = 4
+            tabla[1]["perdidos"] = 1
+            # Viaja entre procesos por pickle
+            tablas.append(pickle.loads(pickle.dumps(tabla)))
+
+        combinado = combinar_dispositivos(tablas)
+        self.assertEqual(combinado[1]["ultima_seq"], 8)
+        self.assertEqual(combinado[1]["mensajes_recibidos"], 8)
+        self.assertEqual(combinado[1]["primera_conexion"], 10.0)
+        self.assertEqual(combinado[1]["perdidos"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from gps_espacial import IndiceEspacial, distancia_m  # noqa: E402
+
+
+class TestIndiceEspacial(unittest.TestCase):
+    def setUp(self):
+        azar = random.Random(14)
+        self.indice = IndiceEspacial(tam_celda=0.01)
+        self.posiciones = {}
+        for id_disp in range(3000):
+            lat = -17.39 + azar.uniform(-0.2, 0.2)
+            lon = -66.15 + azar.uniform(-0.2, 0.2)
+            self.indice.actualizar(id_disp, lat, lon)
+            self.posiciones[id_disp] = (lat, lon)
+        # Mover algunos dispositivos (cambian de celda) y quitar otros
+        for id_disp in range(0, 3000, 7):
+            lat, lon = self.posiciones[id_disp]
+            self.posiciones[id_disp] = (lat + 0.05, lon - 0.03)
+            self.indice.actualizar(id_disp, *self.posiciones[id_disp])
+        for id_disp in range(5, 3000, 50):
+            del self.posiciones[id_disp]
+            self.indice.eliminar(id_disp)
+        self.consultas = [
+            (-17.39 + azar.uniform(-0.25, 0.25), -66.15 + azar.uniform(-0.25, 0.25))
+            for _ in range(20)
+        ]
+
+    def _distancias(self, lat, lon):
+        return sorted(
+            (distancia_m(lat, lon, p[0], p[1]), id_disp)
+            for id_disp, p in self.posiciones.items()
+        )
+
+    def test_en_rectangulo(self):
+        self.assertEqual(len(self.indice), len(self.posiciones))
+        for lat, lon in self.consultas:
+            caja = (lat - 0.03, lon - 0.05, lat + 0.03, lon + 0.05)
+            esperados = sorted(
+                id_disp
+                for id_disp, (la, lo) in self.posiciones.items()
+                if caja[0] <= la <= caja[2] and caja[1] <= lo <= caja[3]
+            )
+            self.assertEqual(sorted(self.indice.en_rectangulo(*caja)), esperados)
+
+    def test_en_radio(self):
+        for lat, lon in self.consultas:
+            for radio in (300, 2500, 12000):
+                esperados = [r for r in self._distancias(lat, lon) if r[0] <= radio]
+                self.assertEqual(self.indice.en_radio(lat, lon, radio), esperados)
+
+    def test_cercanos(self):
+        for lat, lon in self.consultas:
+            for k in (1, 10, 100):
+                esperados = self._distancias(lat, lon)[:k]
+                self.assertEqual(self.indice.cercanos(lat, lon, k), esperados)
+        # Punto lejano de todo: la búsqueda por anillos pasa al recorrido completo
+        self.assertEqual(self.indice.cercanos(40.0, 3.0, 5), self._distancias(40.0, 3.0)[:5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from gps_dispositivos import TablaDispositivos  # noqa: E402
+from gps_expiracion import RuedaTemporal, VigilanciaInactividad  # noqa: E402
+
+T0 = 1_700_000_000.0
+
+
+class TestRuedaTemporal(unittest.TestCase):
+    def test_vencimientos_en_orden_y_vueltas(self):
+        rueda = RuedaTemporal(resolucion=1.0, ranuras=8)
+        rueda.programar(T0 + 3, "a")
+        rueda.programar(T0 + 3 + 8, "b")  # Misma ranura, vuelta siguiente
+        rueda.programar(T0 + 100, "c")  # Más de una vuelta
+        self.assertEqual(rueda.vencidos(T0), [])
+        self.assertEqual([c for _, c in rueda.vencidos(T0 + 5)], ["a"])
+        self.assertEqual([c for _, c in rueda.vencidos(T0 + 11.5)], ["b"])
+        self.assertEqual(len(rueda), 1)
+        # Salto de varias vueltas sin revisar
+        self.assertEqual([c for _, c in rueda.vencidos(T0 + 500)], ["c"])
+        # Lo programado en el pasado sale en la próxima revisión
+        rueda.programar(T0 + 1, "d")
+        self.assertEqual([c for _, c in rueda.vencidos(T0 + 501)], ["d"])
+
+
+class TestVigilanciaInactividad(unittest.TestCase):
+    def setUp(self):
+        self.tabla = TablaDispositivos()
+        self.vigilancia = VigilanciaInactividad(self.tabla, expirar_seg=60, alerta_seg=20)
+        for id_disp in (1, 2, 3):
+            self.tabla.registrar(id_disp, T0)
+            self.vigilancia.vigilar(id_disp, T0)
+
+    def test_alerta_una_vez_y_expira(self):
+        self.assertEqual(self.vigilancia.revisar(T0 + 10), ([], []))
+        # El 3 sigue reportando: nunca alerta ni expira
+        self.tabla.registrar(3, T0 + 15)
+        alertas, expirados = self.vigilancia.revisar(T0 + 21)
+        self.assertEqual(sorted(id_disp for id_disp, _ in alertas), [1, 2])
+        self.assertEqual(expirados, [])
+        self.tabla.registrar(3, T0 + 35)
+        self.assertEqual(self.vigilancia.revisar(T0 + 40), ([], []))
+
+        self.tabla.registrar(1, T0 + 45)
+        self.tabla.registrar(3, T0 + 50)
+        alertas, expirados = self.vigilancia.revisar(T0 + 61)
+        self.assertEqual(alertas, [])
+        self.assertEqual([id_disp for id_disp, _ in expirados], [2])
+        self.assertEqual(self.vigilancia.alertas_activas(), [])
+
+        # El 1 vuelve a callar: nueva alerta por el nuevo período de silencio
+        alertas, _ = self.vigilancia.revisar(T0 + 66)
+        self.assertEqual([id_disp for id_disp, _ in alertas], [1])
+
+    def test_olvidar_ignora_la_entrada_pendiente(self):
+        self.vigilancia.olvidar(1)
+        self.tabla.eliminar(2)
+        alertas, expirados = self.vigilancia.revisar(T0 + 100)
+        self.assertEqual([id_disp for id_disp, _ in expirados], [3])
+        self.assertEqual(alertas, [])
+
+    def test_solo_alertas(self):
+        vigilancia = VigilanciaInactividad(self.tabla, alerta_seg=20)
+        vigilancia.vigilar(1, T0)
+        self.assertEqual(len(vigilancia.revisar(T0 + 20)[0]), 1)
+        # Sigue callado: no repite la alerta, pero se revisa cada alerta_seg
+        self.assertEqual(vigilancia.revisar(T0 + 1000), ([], []))
+        self.assertEqual(len(vigilancia.rueda), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import contextlib
+import io
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from gps_flota import SimuladorFlota  # noqa: E402
+from gps_servidor import ServidorGPS  # noqa: E402
+
+
+def _puerto_libre():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    puerto = sock.getsockname()[1]
+    sock.close()
+    return puerto
+
+
+class TestSimuladorFlota(unittest.TestCase):
+    def test_flota_contra_servidor(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            servidor = ServidorGPS(
+                puerto=0,
+                enviar_ack=True,
+                log_path=None,
+                lote_recepcion=32,
+                modo_salida="silencioso",
+            )
+            hilo = threading.Thread(target=servidor.ejecutar, daemon=True)
+            hilo.start()
+            while servidor.socket is None:
+                time.sleep(0.01)
+            puerto = servidor.socket.getsockname()[1]
+
+            flota = SimuladorFlota(
+                2000,
+                servidor_puerto=puerto,
+                tasa=2000,
+                sockets=3,
+                timeout_ack=1.0,
+                azar=random.Random(1),
+            )
+            asyncio.run(flota.ejecutar(0.5))
+            servidor.detener()
+            hilo.join(timeout=3)
+
+        self.assertGreater(flota.enviados, 800)
+        self.assertEqual(flota.acks + flota.perdidos, flota.enviados)
+        self.assertGreaterEqual(flota.acks, flota.enviados * 0.95)
+        self.assertEqual(flota.rtt.cuenta, flota.acks)
+        self.assertEqual(servidor.mensajes_recibidos, flota.enviados - servidor.errores)
+        # Ronda: cada dispositivo envía a lo sumo una vez por vuelta
+        self.assertEqual(len(servidor.dispositivos), min(flota.enviados, 2000))
+        self.assertIn("RTT ACK", flota.resumen())
+
+    def test_sin_servidor_todo_perdido(self):
+        flota = SimuladorFlota(
+            50, servidor_puerto=_puerto_libre(), tasa=500, timeout_ack=0.1
+        )
+        asyncio.run(flota.ejecutar(0.1))
+        self.assertGreater(flota.enviados, 0)
+        self.assertEqual(flota.acks, 0)
+        self.assertEqual(flota.perdidos, flota.enviados)
+        self.assertNotIn("RTT ACK", flota.resumen())
+
+    def test_ids_fuera_de_rango(self):
+        with self.assertRaises(ValueError):
+            SimuladorFlota(100, id_base=65500)
+        with self.assertRaises(ValueError):
+            SimuladorFlota(10, tasa=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
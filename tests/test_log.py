@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from gps_log import EscritorLog  # noqa: E402
+
+
+class TestEscritorLog(unittest.TestCase):
+    def setUp(self):
+        self._directorio = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self._directorio.name, "gps_log.txt")
+
+    def tearDown(self):
+        self._directorio.cleanup()
+
+    def _leer(self, ruta):
+        with open(ruta) as f:
+            return f.read()
+
+    def test_escritura_en_bloque(self):
+        log = EscritorLog(self.ruta, tam_buffer=100)
+        for i in range(5):
+            log.escribir(f"registro {i:02d}\n")  # 12 bytes por línea
+        self.assertFalse(os.path.exists(self.ruta))
+        for i in range(5, 10):
+            log.escribir(f"registro {i:02d}\n")
+        # Se escribió al superar los 100 bytes, en una sola llamada
+        self.assertEqual(log.escrituras, 1)
+        self.assertEqual(log.tam_archivo, 108)
+        log.cerrar()
+        self.assertEqual(len(self._leer(self.ruta).splitlines()), 10)
+        self.assertEqual(log.tam_archivo, os.path.getsize(self.ruta))
+
+    def test_rotacion_por_generaciones(self):
+        log = EscritorLog(self.ruta, max_bytes=30, generaciones=2)
+        for i in range(10):
+            log.escribir(f"registro {i:02d}\n")
+        log.cerrar()
+        # 3 registros (36 bytes) por archivo; se descarta la generación más vieja
+        self.assertEqual(log.rotaciones, 3)
+        self.assertEqual(self._leer(self.ruta), "registro 09\n")
+        self.assertTrue(self._leer(self.ruta + ".1").startswith("registro 06"))
+        self.assertTrue(self._leer(self.ruta + ".2").startswith("registro 03"))
+        self.assertFalse(os.path.exists(self.ruta + ".3"))
+
+    def test_continua_archivo_existente(self):
+        with open(self.ruta, "w") as f:
+            f.write("x" * 20 + "\n")
+        log = EscritorLog(self.ruta, max_bytes=30)
+        log.escribir("registro 00\n")
+        log.cerrar()
+        self.assertEqual(log.rotaciones, 1)
+        self.assertEqual(os.path.getsize(self.ruta + ".1"), 33)
+
+    def test_error_de_escritura_conserva_pendientes(self):
+        class ArchivoLleno:
+            def write(self, datos):
+                raise OSError(28, "No space left on device")
+
+        log = EscritorLog(self.ruta)
+        log.escribir("registro 00\n")
+        log.escribir("registro 01\n")
+        log._archivo = ArchivoLleno()
+        with self.assertRaises(OSError):
+            log.vaciar()
+        self.assertEqual(log.escrituras, 0)
+        # Al volver a abrir el archivo se escribe lo que había quedado
+        log._archivo = None
+        log.cerrar()
+        self.assertEqual(self._leer(self.ruta), "registro 00\nregistro 01\n")
+
+    def test_fsync_invalido(self):
+        with self.assertRaises(ValueError):
+            EscritorLog(self.ruta, fsync="siempre")
+
+
+if __name__ == "__main__":
+    unittest.main()
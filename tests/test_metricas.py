@@ -0,0 +1,188 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import sys
+import unittest
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+import gps_protocolo  # noqa: E402
+from gps_metricas import (  # noqa: E402
+    RANURAS_METRICAS,
+    HistogramaLatencia,
+    MetricasRecepcion,
+    formatear_metricas,
+)
+from gps_servidor import ServidorGPS  # noqa: E402
+from gps_servidor_multiproceso import CONTADORES, ServidorMultiproceso  # noqa: E402
+
+
+class TestHistogramaLatencia(unittest.TestCase):
+    def test_percentiles_con_error_acotado(self):
+        azar = random.Random(3)
+        valores = [int(azar.lognormvariate(10, 1.5)) for _ in range(20000)]
+        histograma = HistogramaLatencia()
+        for valor in valores:
+            histograma.registrar(valor)
+        valores.sort()
+        for p in (50, 90, 99, 99.9):
+            exacto = valores[round(len(valores) * p / 100) - 1]
+            aproximado = histograma.percentil(p)
+            self.assertGreaterEqual(aproximado, exacto)
+            self.assertLessEqual(aproximado, exacto * 1.0625 + 1)
+        self.assertEqual(histograma.cuenta, 20000)
+        self.assertEqual(histograma.suma, sum(valores))
+        self.assertEqual(len(histograma.cubetas), 656)
+
+    def test_valores_extremos(self):
+        histograma = HistogramaLatencia()
+        for valor in (0, 1, 15, 16, 1 << 50):
+            histograma.registrar(valor)
+        self.assertEqual(histograma.percentil(20), 0)
+        self.assertEqual(histograma.percentil(60), 15)
+        self.assertEqual(histograma.acumulado_hasta(4), 3)
+        self.assertEqual(histograma.acumulado_hasta(30), 4)
+
+    def test_tasa(self):
+        metricas = MetricasRecepcion()
+        metricas.actualizar_tasa(100, ahora=10.0)
+        metricas.actualizar_tasa(600, ahora=12.0)
+        self.assertEqual(metricas.paquetes_por_segundo, 250.0)
+
+
+class TestServidorMetricas(unittest.TestCase):
+    def test_endpoint_prometheus(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            servidor = ServidorGPS(
+                puerto=0,
+                enviar_ack=False,
+                log_path=None,
+                modo_salida="silencioso",
+                puerto_metricas=0,
+            )
+        servidor.metricas.muestreo = 1  # Medir todos los datagramas
+        try:
+            for seq in (1, 2, 5):
+                servidor.procesar_datagrama(
+                    gps_protocolo.empaquetar_mensaje_gps(
+                        id_dispositivo=7,
+                        secuencia=seq,
+                        latitud=-173935000,
+                        longitud=-661570000,
+                        altitud=2558,
+                        velocidad=450,
+                        rumbo=1350,
+                        bateria=85,
+                        estado=0,
+                    ),
+                    ("127.0.0.1", 1),
+                )
+            servidor.procesar_datagrama(b"\x00" * 30, ("127.0.0.1", 1))
+            host, puerto = servidor.servidor_metricas.direccion
+            with urllib.request.urlopen(f"http://{host}:{puerto}/metrics", timeout=5) as r:
+                tipo = r.headers["Content-Type"]
+                texto = r.read().decode("utf-8")
+        finally:
+            servidor.cerrar_log()
+
+        self.assertTrue(tipo.startswith("text/plain"))
+        valores = {}
+        for linea in texto.splitlines():
+            if linea and not linea.startswith("#"):
+                nombre, valor = linea.rsplit(" ", 1)
+                valores[nombre] = float(valor)
+        self.assertEqual(valores["gps_mensajes_recibidos_total"], 3)
+        self.assertEqual(valores["gps_mensajes_perdidos"], 2)
+        self.assertEqual(valores["gps_errores_total"], 1)
+        self.assertEqual(valores["gps_datagramas_total"], 4)
+        self.assertEqual(valores["gps_decodificacion_segundos_count"], 4)
+        self.assertEqual(valores["gps_procesamiento_segundos_count"], 3)
+        self.assertEqual(valores['gps_procesamiento_segundos_bucket{le="+Inf"}'], 3)
+        self.assertAlmostEqual(valores['gps_dispositivo_perdida_ratio{dispositivo="7"}'], 0.4)
+        self.assertIn(
+            'gps_latencia_cuantil_segundos{etapa="decodificacion",cuantil="0.99"}', valores
+        )
+        self.assertIsNone(servidor.servidor_metricas)
+
+    def test_perdida_solo_de_los_peores(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            servidor = ServidorGPS(
+                puerto=0, enviar_ack=False, log_path=None, modo_salida="silencioso"
+            )
+        try:
+            # Cuanto mayor el id, mayor el salto de secuencia y la pérdida
+            for id_disp in range(1, 11):
+                for seq in (1, 10 + id_disp):
+                    servidor.procesar_datagrama(
+                        gps_protocolo.empaquetar_mensaje_gps(
+                            id_dispositivo=id_disp,
+                            secuencia=seq,
+                            latitud=0,
+                            longitud=0,
+                            altitud=0,
+                            velocidad=0,
+                            rumbo=0,
+                            bateria=85,
+                            estado=0,
+                        ),
+                        ("127.0.0.1", id_disp),
+                    )
+            texto = formatear_metricas(servidor, max_dispositivos=3)
+            sin_series = formatear_metricas(servidor, max_dispositivos=0)
+        finally:
+            servidor.cerrar_log()
+
+        series = [
+            linea
+            for linea in texto.splitlines()
+            if linea.startswith("gps_dispositivo_perdida_ratio{")
+        ]
+        self.assertEqual([linea.split('"')[1] for linea in series], ["10", "9", "8"])
+        self.assertNotIn("gps_dispositivo_perdida_ratio", sin_series)
+
+
+
+class TestMetricasMultiproceso(unittest.TestCase):
+    def test_histogramas_de_trabajadores(self):
+        azar = random.Random(5)
+        todos = HistogramaLatencia()
+        histogramas = multiprocessing.Array("q", 2 * RANURAS_METRICAS, lock=False)
+        for indice in range(2):
+            trabajador = MetricasRecepcion()
+            for _ in range(1000):
+                valor = int(azar.lognormvariate(9 + indice, 1))
+                trabajador.datagramas += 1
+                trabajador.decodificacion.registrar(valor)
+                trabajador.procesamiento.registrar(2 * valor)
+                todos.registrar(valor)
+            trabajador.publicar(histogramas, indice * RANURAS_METRICAS)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            servidor = ServidorMultiproceso(
+                2, puerto=0, log_path=None, modo_salida="silencioso", puerto_metricas=0
+            )
+        try:
+            contadores = [0] * (2 * (len(CONTADORES) + 1))
+            servidor._leer_contadores(contadores, histogramas)
+            metricas = servidor.vista.metricas
+            texto = formatear_metricas(servidor.vista, 0)
+        finally:
+            servidor.vista.cerrar_log()
+
+        self.assertEqual(metricas.datagramas, 2000)
+        self.assertEqual(metricas.decodificacion.cubetas, todos.cubetas)
+        self.assertEqual(metricas.decodificacion.suma, todos.suma)
+        self.assertEqual(metricas.procesamiento.cuenta, 2000)
+        self.assertEqual(metricas.decodificacion.percentil(99), todos.percentil(99))
+        self.assertIn("gps_decodificacion_segundos_count 2000", texto)
+        self.assertIn("gps_procesamiento_segundos_count 2000", texto)
+
+
+if __name__ == "__main__":
+    unittest.main()
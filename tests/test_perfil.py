@@ -0,0 +1,145 @@
+import contextlib
+import io
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+import gps_protocolo  # noqa: E402
+from gps_perfil import AnilloTiempos, ControlPerfil, ETAPAS  # noqa: E402
+from gps_salida import SalidaAsincrona  # noqa: E402
+from gps_servidor import ServidorGPS  # noqa: E402
+
+
+def _mensaje(seq):
+    return gps_protocolo.empaquetar_mensaje_gps(
+        id_dispositivo=4,
+        secuencia=seq,
+        latitud=-173935000,
+        longitud=-661570000,
+        altitud=2558,
+        velocidad=450,
+        rumbo=1350,
+        bateria=85,
+        estado=0,
+    )
+
+
+def _servidor(**opciones):
+    with contextlib.redirect_stdout(io.StringIO()):
+        servidor = ServidorGPS(
+            puerto=0, log_path=None, modo_salida="silencioso", **opciones
+        )
+    salida = io.StringIO()
+    servidor.salida = SalidaAsincrona(flujo=salida)
+    return servidor, salida
+
+
+class TestAnilloTiempos(unittest.TestCase):
+    def test_percentiles(self):
+        anillo = AnilloTiempos(capacidad=100)
+        for valor in range(1, 101):
+            anillo.registrar(valor)
+        self.assertEqual(anillo.percentiles(50, 99, 100), (51, 100, 100))
+
+    def test_vacio_y_vuelta(self):
+        anillo = AnilloTiempos(capacidad=4)
+        self.assertEqual(anillo.percentiles(50), (0,))
+        for valor in (1000, 1000, 1, 2, 3, 4):
+            anillo.registrar(valor)
+        self.assertEqual(len(anillo), 4)
+        self.assertEqual(anillo.total, 6)
+        self.assertEqual(anillo.percentiles(100), (4,))
+
+
+class TestPerfilServidor(unittest.TestCase):
+    def test_etapas_por_datagrama(self):
+        servidor, _ = _servidor(enviar_ack=True, perfil_etapas=True)
+        try:
+            for seq in (1, 2, 3):
+                servidor.procesar_datagrama(_mensaje(seq), ("127.0.0.1", 9))
+            servidor.procesar_datagrama(b"\x00" * 30, ("127.0.0.1", 9))
+        finally:
+            servidor.cerrar_log()
+
+        perfil = servidor.perfil
+        self.assertEqual(servidor.mensajes_recibidos, 3)
+        self.assertEqual(servidor.errores, 1)
+        self.assertEqual(perfil.verificar_checksum.total, 4)
+        self.assertEqual(perfil.desempaquetar.total, 3)
+        self.assertEqual(perfil.procesar_mensaje.total, 3)
+        self.assertEqual(perfil.guardar_log.total, 3)
+        self.assertEqual(perfil.enviar_ack.total, 3)
+        informe = perfil.informe()
+        for etapa in ETAPAS[1:]:
+            self.assertIn(etapa, informe)
+        self.assertNotIn("recvfrom", informe)
+
+    def test_recvfrom_en_bucle_simple(self):
+        servidor, _ = _servidor(enviar_ack=False, perfil_etapas=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            hilo = threading.Thread(target=servidor.ejecutar, daemon=True)
+            hilo.start()
+            while servidor.socket is None:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            destino = ("127.0.0.1", servidor.socket.getsockname()[1])
+            cliente = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            for seq in (1, 2, 3):
+                cliente.sendto(_mensaje(seq), destino)
+            limite = time.monotonic() + 2
+            while servidor.mensajes_recibidos < 3 and time.monotonic() < limite:
+                time.sleep(0.01)
+            # Sin tráfico el bucle sigue esperando, pero la espera no se mide
+            time.sleep(0.2)
+            cliente.close()
+            servidor.detener()
+            hilo.join(timeout=3)
+        self.assertFalse(hilo.is_alive())
+        perfil = servidor.perfil
+        self.assertEqual(perfil.recvfrom.total, 3)
+        self.assertLess(perfil.recvfrom.percentiles(100)[0], 100_000_000)
+        self.assertIn("recvfrom", perfil.informe())
+
+    def test_sin_perfil(self):
+        servidor, _ = _servidor(enviar_ack=False)
+        servidor.procesar_datagrama(_mensaje(1), ("127.0.0.1", 9))
+        self.assertIsNone(servidor.perfil)
+        self.assertEqual(servidor.mensajes_recibidos, 1)
+
+
+class TestControlPerfil(unittest.TestCase):
+    def test_volcar_por_pedido(self):
+        servidor, salida = _servidor(enviar_ack=False, perfil_etapas=True)
+        servidor.procesar_datagrama(_mensaje(1), ("127.0.0.1", 9))
+        control = ControlPerfil(servidor)
+        control._senal_volcar(None, None)
+        control.atender()
+        self.assertTrue(servidor.salida.vaciar())
+        self.assertIn("procesar_mensaje", salida.getvalue())
+
+    def test_alternar_cprofile(self):
+        servidor, salida = _servidor(enviar_ack=False)
+        with tempfile.TemporaryDirectory() as directorio:
+            control = ControlPerfil(servidor, directorio=directorio)
+            self.assertIsNone(control.alternar_cprofile())
+            for seq in range(1, 50):
+                servidor.procesar_datagrama(_mensaje(seq), ("127.0.0.1", 9))
+            ruta = control.alternar_cprofile()
+            self.assertTrue(os.path.getsize(ruta) > 0)
+            self.assertTrue(servidor.salida.vaciar())
+        texto = salida.getvalue()
+        self.assertIn("cProfile guardado", texto)
+        self.assertIn("procesar_mensaje", texto)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,8 @@ SRC = os.path.join(ROOT, "src")
 if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
+import random  # noqa: E402
+
 import gps_protocolo  # noqa: E402
 
 
@@ -73,6 +75,221 @@ class TestProtocolo(unittest.TestCase):
         self.assertEqual(datos["tipo"], gps_protocolo.TIPO_ACK)
         self.assertEqual(datos["secuencia"], 99)
 
+    def test_ack_selectivo(self):
+        ack = gps_protocolo.empaquetar_ack_selectivo(1234, 65530, 3, 0b1011)
+        self.assertEqual(len(ack), gps_protocolo.TAM_ACK_SELECTIVO)
+        datos, error = gps_protocolo.desempaquetar_mensaje(ack)
+        self.assertIsNotNone(datos, msg=error)
+        assert datos is not None
+        self.assertEqual(datos["tipo"], gps_protocolo.TIPO_ACK_SELECTIVO)
+        self.assertEqual(
+            (datos["secuencia"], datos["seq_mas_alta"], datos["mapa_sack"]),
+            (65530, 3, 0b1011),
+        )
+        registro, _ = gps_protocolo.desempaquetar_registro(ack)
+        self.assertEqual(registro.tipo, gps_protocolo.TIPO_ACK_SELECTIVO)
+
+        confirmada = lambda seq: gps_protocolo.secuencia_confirmada(  # noqa: E731
+            seq, 65530, 3, 0b1011
+        )
+        # Mapa (con vuelta de 16 bits): 3, 2 y 0 sí, 1 no
+        self.assertEqual([confirmada(seq) for seq in (3, 2, 1, 0)], [True, True, False, True])
+        # Acumulado: 65530 y anteriores; 65531..65535 solo si están en el mapa
+        self.assertTrue(confirmada(65530))
+        self.assertTrue(confirmada(40000))
+        self.assertFalse(confirmada(65533))
+        self.assertFalse(confirmada(4))
+
+    def test_lote_gps(self):
+        mensajes = [
+            gps_protocolo.empaquetar_mensaje_gps(
+                1234, seq % gps_protocolo.MAX_SEQ, -173935000 + seq, -661570000,
+                2558, 450, 1350, 85, 0, flags=gps_protocolo.FLAG_EN_MOVIMIENTO,
+            )
+            for seq in range(65500, 65500 + gps_protocolo.MAX_FIXES_LOTE)
+        ]
+        lote = gps_protocolo.agrupar_mensajes_gps(
+            mensajes, flags=gps_protocolo.FLAG_ACK_SELECTIVO
+        )
+        self.assertEqual(len(lote), 1)
+        lote = lote[0]
+        self.assertLessEqual(len(lote), gps_protocolo.MTU_DATAGRAMA)
+
+        registros, error = gps_protocolo.desempaquetar_fixes(lote)
+        self.assertIsNotNone(registros, msg=error)
+        assert registros is not None
+        # Cada posición queda igual que su mensaje suelto salvo el checksum
+        for registro, mensaje in zip(registros, mensajes):
+            suelto, _ = gps_protocolo.desempaquetar_registro(mensaje)
+            self.assertEqual(registro._replace(checksum=0), suelto._replace(checksum=0))
+        self.assertEqual(registros[40].secuencia, 4)
+
+        # Empaquetar desde tuplas da el mismo datagrama
+        fixes = [registro[3:4] + registro[5:] for registro in registros]
+        self.assertEqual(
+            gps_protocolo.empaquetar_lote_gps(1234, fixes, gps_protocolo.FLAG_ACK_SELECTIVO),
+            lote,
+        )
+
+        datos, error = gps_protocolo.desempaquetar_mensaje(lote)
+        self.assertIsNotNone(datos, msg=error)
+        assert datos is not None
+        self.assertEqual(datos["tipo"], gps_protocolo.TIPO_LOTE_GPS)
+        self.assertEqual(datos["secuencia"], 65500)
+        self.assertEqual(datos["fixes"][1], registros[1].a_dict())
+
+        # Varios lotes si no entran en uno
+        lotes = gps_protocolo.agrupar_mensajes_gps(mensajes, max_fixes=25)
+        self.assertEqual([len(lote) for lote in lotes], [12 + 25 * 24, 12 + 25 * 24, 12 + 10 * 24])
+
+    def test_lote_gps_invalido(self):
+        fix = (1, 0, -173935000, -661570000, 2558, 0, 450, 1350, 85, 0)
+        with self.assertRaises(ValueError):
+            gps_protocolo.empaquetar_lote_gps(1, [])
+        with self.assertRaises(ValueError):
+            gps_protocolo.empaquetar_lote_gps(1, [fix] * (gps_protocolo.MAX_FIXES_LOTE + 1))
+        with self.assertRaises(ValueError):
+            gps_protocolo.agrupar_mensajes_gps([gps_protocolo.empaquetar_ack(1, 1)])
+
+        lote = bytearray(gps_protocolo.empaquetar_lote_gps(1, [fix] * 3))
+        corrupto = bytearray(lote)
+        corrupto[-1] ^= 0xFF
+        self.assertEqual(
+            gps_protocolo.desempaquetar_mensaje(bytes(corrupto)), (None, "Checksum inválido")
+        )
+        # Cantidad que no coincide con el tamaño (con CRC correcto)
+        lote[11] = 4
+        lote[6:8] = b"\x00\x00"
+        gps_protocolo._sellar_checksum(lote, 0, len(lote))
+        datos, error = gps_protocolo.desempaquetar_mensaje(bytes(lote))
+        self.assertIsNone(datos)
+        self.assertIn("Tamaño de lote", error)
+
+    def test_delta_gps(self):
+        def mensaje(seq, **cambios):
+            campos = dict(
+                id_dispositivo=7, secuencia=seq, latitud=-173935000, longitud=-661570000,
+                altitud=2558, velocidad=450, rumbo=1350, bateria=85, estado=0, flags=0x0C,
+            )
+            campos.update(cambios)
+            return gps_protocolo.empaquetar_mensaje_gps(**campos)
+
+        anterior = mensaje(65535)
+        referencia, _ = gps_protocolo.desempaquetar_registro(anterior)
+        # Sin cambios: solo cabecera y mapa de presencia
+        delta = gps_protocolo.comprimir_mensaje_gps(anterior, mensaje(0))
+        self.assertEqual(len(delta), gps_protocolo.TAM_CABECERA_DELTA)
+
+        actual = mensaje(0, latitud=-173936260, longitud=-661569000, rumbo=3599, bateria=84)
+        delta = gps_protocolo.comprimir_mensaje_gps(anterior, actual)
+        self.assertLess(len(delta), 20)
+        datos, error = gps_protocolo.desempaquetar_delta(delta, referencia)
+        self.assertIsNotNone(datos, msg=error)
+        esperado, _ = gps_protocolo.desempaquetar_registro(actual)
+        self.assertEqual(datos._replace(checksum=0), esperado._replace(checksum=0))
+
+        resumen, _ = gps_protocolo.desempaquetar_mensaje(delta)
+        self.assertEqual(resumen["tipo"], gps_protocolo.TIPO_DELTA_GPS)
+        self.assertEqual(resumen["presencia"], 0b01100011)
+
+        # Sin la posición anterior no se puede reconstruir
+        self.assertIsNone(gps_protocolo.desempaquetar_delta(delta, None)[0])
+        otra, _ = gps_protocolo.desempaquetar_registro(mensaje(65534))
+        self.assertIn("keyframe", gps_protocolo.desempaquetar_delta(delta, otra)[1])
+        truncado = bytearray(delta[:-1])
+        truncado[6:8] = b"\x00\x00"
+        gps_protocolo._sellar_checksum(truncado, 0, len(truncado))
+        self.assertEqual(
+            gps_protocolo.desempaquetar_delta(bytes(truncado), referencia), (None, "Delta truncado")
+        )
+
+        # Un varint puede llevar un campo fuera de su tipo (i, I, H, B)
+        for campo, diferencia in ((0, 1 << 33), (6, -100), (3, 1 << 32)):
+            payload = list(referencia[6:])
+            payload[campo] += diferencia
+            enorme = gps_protocolo.empaquetar_delta_gps(
+                referencia.id_dispositivo, 0, referencia[6:], payload
+            )
+            self.assertEqual(
+                gps_protocolo.desempaquetar_delta(enorme, referencia),
+                (None, f"Delta fuera de rango en {gps_protocolo._CAMPOS_PAYLOAD[campo]}"),
+            )
+
+        # No consecutivo, o un salto que no ahorra bytes: mensaje completo
+        self.assertEqual(gps_protocolo.comprimir_mensaje_gps(anterior, mensaje(5)), mensaje(5))
+        salto = mensaje(0, latitud=900000000, longitud=1800000000, altitud=0, velocidad=0,
+                        rumbo=0, bateria=0, estado=255)
+        self.assertEqual(gps_protocolo.comprimir_mensaje_gps(anterior, salto), salto)
+
+    def test_mensajes_autenticados(self):
+        autenticador = gps_protocolo.Autenticador()
+        mensaje = gps_protocolo.empaquetar_mensaje_gps(
+            7, 3, -173935000, -661570000, 2558, 450, 1350, 85, 0,
+            flags=gps_protocolo.FLAG_EN_MOVIMIENTO, autenticador=autenticador,
+        )
+        self.assertEqual(len(mensaje), gps_protocolo.TAM_MENSAJE_GPS + gps_protocolo.TAM_TAG)
+        datos, error = gps_protocolo.desempaquetar_mensaje(mensaje, autenticador)
+        self.assertIsNotNone(datos, msg=error)
+        assert datos is not None
+        self.assertEqual(datos["latitud"], -173935000)
+        self.assertTrue(datos["flags"] & gps_protocolo.FLAG_AUTENTICADO)
+        registro, _ = gps_protocolo.desempaquetar_registro(mensaje, autenticador=autenticador)
+        self.assertEqual(registro.a_dict(), datos)
+        # Sin autenticador el TAG se ignora
+        self.assertEqual(gps_protocolo.desempaquetar_mensaje(mensaje)[0], datos)
+
+        # TAG alterado (con el CRC recalculado) o clave de otro dispositivo
+        alterado = bytearray(mensaje)
+        alterado[-1] ^= 0x01
+        alterado[6:8] = b"\x00\x00"
+        gps_protocolo._sellar_checksum(alterado, 0, len(alterado))
+        self.assertEqual(
+            gps_protocolo.desempaquetar_mensaje(bytes(alterado), autenticador),
+            (None, gps_protocolo.ERROR_TAG_INVALIDO),
+        )
+        ajeno = gps_protocolo.Autenticador(claves={7: "otra clave"})
+        self.assertEqual(
+            gps_protocolo.desempaquetar_registro(mensaje, autenticador=ajeno)[1],
+            gps_protocolo.ERROR_TAG_INVALIDO,
+        )
+        self.assertNotEqual(
+            autenticador.clave_dispositivo(7), autenticador.clave_dispositivo(8)
+        )
+        # La clave exportada basta para firmar sin conocer la maestra
+        maestra = gps_protocolo.Autenticador("otra maestra")
+        exportada = maestra.exportar_clave(7)
+        self.assertTrue(exportada.startswith(gps_protocolo.PREFIJO_CLAVE_HEX))
+        dispositivo = gps_protocolo.Autenticador(claves={7: exportada})
+        simple = gps_protocolo.empaquetar_mensaje_gps(7, 4, 0, 0, 0, 0, 0, 0, 0)
+        self.assertTrue(maestra.verificar(dispositivo.firmar(simple)))
+        self.assertFalse(maestra.verificar(autenticador.firmar(simple)))
+
+        # Sin TAG: rechazado solo si el autenticador lo exige
+        ack = gps_protocolo.empaquetar_ack(7, 3)
+        self.assertEqual(
+            gps_protocolo.desempaquetar_mensaje(ack, autenticador),
+            (None, gps_protocolo.ERROR_SIN_AUTENTICAR),
+        )
+        permisivo = gps_protocolo.Autenticador(exigir=False)
+        self.assertIsNotNone(gps_protocolo.desempaquetar_mensaje(ack, permisivo)[0])
+
+        # HMAC-SHA256 y lotes: el cuerpo se lee sin el TAG
+        hmac_sha256 = gps_protocolo.Autenticador(algoritmo="hmac-sha256")
+        simples = [
+            gps_protocolo.empaquetar_mensaje_gps(7, seq, 1, 2, 3, 4, 5, 6, 0) for seq in range(3)
+        ]
+        (lote,) = gps_protocolo.agrupar_mensajes_gps(simples, autenticador=hmac_sha256)
+        datos, error = gps_protocolo.desempaquetar_mensaje(lote, hmac_sha256)
+        self.assertIsNotNone(datos, msg=error)
+        assert datos is not None
+        self.assertEqual([fix["secuencia"] for fix in datos["fixes"]], [0, 1, 2])
+        self.assertEqual(
+            gps_protocolo.desempaquetar_mensaje(lote, autenticador)[1],
+            gps_protocolo.ERROR_TAG_INVALIDO,
+        )
+        with self.assertRaises(ValueError):
+            gps_protocolo.Autenticador(algoritmo="md5")
+
     def test_empaquetar_heartbeat(self):
         hb = gps_protocolo.empaquetar_heartbeat(1234, 7, flags=0x01)
         datos, error = gps_protocolo.desempaquetar_mensaje(hb)
@@ -82,6 +299,198 @@ class TestProtocolo(unittest.TestCase):
         self.assertEqual(datos["secuencia"], 7)
         self.assertEqual(datos["flags"], 0x01)
 
+    def test_checksum_tabla_igual_a_bit_a_bit(self):
+        rng = random.Random(1234)
+        for largo in (0, 1, 2, 9, 10, 29, 30, 31, 257):
+            datos = bytes(rng.randrange(256) for _ in range(largo))
+            self.assertEqual(
+                gps_protocolo.calcular_checksum(datos),
+                gps_protocolo._calcular_checksum_bit_a_bit(datos),
+                msg=f"largo={largo}",
+            )
+        self.assertEqual(gps_protocolo.calcular_checksum(b"123456789"), 0x4B37)
+
+    def test_checksums_lote(self):
+        rng = random.Random(99)
+        tramas = [bytes(rng.randrange(256) for _ in range(30)) for _ in range(20)]
+        buffer = bytearray(b"".join(tramas)) + b"\x01\x02"  # trama incompleta
+        esperado = [gps_protocolo._calcular_checksum_bit_a_bit(t) for t in tramas]
+        self.assertEqual(gps_protocolo.calcular_checksums_lote(buffer), esperado)
+        # Tamaño de trama impar
+        impares = gps_protocolo.calcular_checksums_lote(buffer[:27], tam_trama=9)
+        self.assertEqual(
+            impares,
+            [gps_protocolo.calcular_checksum(buffer[i : i + 9]) for i in (0, 9, 18)],
+        )
+        self.assertEqual(gps_protocolo.calcular_checksums_lote(b""), [])
+
+    def test_verificar_checksum_sin_copia(self):
+        msg = gps_protocolo.empaquetar_mensaje_gps(
+            id_dispositivo=77,
+            secuencia=3,
+            latitud=-173935000,
+            longitud=-661570000,
+            altitud=2558,
+            velocidad=450,
+            rumbo=1350,
+            bateria=85,
+            estado=0,
+        )
+        self.assertTrue(gps_protocolo.verificar_checksum(bytearray(msg)))
+        self.assertTrue(gps_protocolo.verificar_checksum(memoryview(msg)))
+        # Mensaje dentro de un buffer mayor, accedido por vista
+        buffer = bytearray(64)
+        buffer[5:35] = msg
+        self.assertTrue(gps_protocolo.verificar_checksum(memoryview(buffer)[5:35]))
+        # Longitud impar: el CRC debe cubrir también el último byte
+        impar = bytearray(msg + b"\x00")
+        esperado = gps_protocolo._calcular_checksum_bit_a_bit(
+            impar[:6] + b"\x00\x00" + impar[8:]
+        )
+        impar[6:8] = esperado.to_bytes(2, "big")
+        self.assertTrue(gps_protocolo.verificar_checksum(impar))
+        impar[-1] ^= 0x01
+        self.assertFalse(gps_protocolo.verificar_checksum(impar))
+
+    def test_empaquetar_en_buffer(self):
+        buffer = bytearray(64)
+        escritos = gps_protocolo.empaquetar_ack_en(buffer, 7, 1234, 99)
+        self.assertEqual(escritos, gps_protocolo.TAM_CABECERA)
+        self.assertEqual(bytes(buffer[7:17]), gps_protocolo.empaquetar_ack(1234, 99))
+        self.assertEqual(buffer[:7], bytearray(7))
+
+        escritos = gps_protocolo.empaquetar_mensaje_gps_en(
+            buffer,
+            20,
+            id_dispositivo=5,
+            secuencia=6,
+            latitud=-1,
+            longitud=2,
+            altitud=3,
+            velocidad=4,
+            rumbo=5,
+            bateria=6,
+            estado=7,
+            flags=8,
+            timestamp=1_700_000_000,
+        )
+        self.assertEqual(escritos, gps_protocolo.TAM_MENSAJE_GPS)
+        datos, error = gps_protocolo.desempaquetar_mensaje(memoryview(buffer)[20:50])
+        self.assertIsNotNone(datos, msg=error)
+        assert datos is not None
+        self.assertEqual(datos["timestamp"], 1_700_000_000)
+        self.assertEqual(datos["flags"], 8)
+        self.assertEqual(datos["estado"], 7)
+
+    def test_desempaquetar_registro(self):
+        msg = gps_protocolo.empaquetar_mensaje_gps(
+            id_dispositivo=4321,
+            secuencia=42,
+            latitud=-173935000,
+            longitud=-661570000,
+            altitud=2558,
+            velocidad=450,
+            rumbo=1350,
+            bateria=85,
+            estado=0,
+            flags=gps_protocolo.FLAG_EN_MOVIMIENTO,
+        )
+        registro, error = gps_protocolo.desempaquetar_registro(msg)
+        self.assertIsNotNone(registro, msg=error)
+        assert registro is not None
+        datos, _ = gps_protocolo.desempaquetar_mensaje(msg)
+        self.assertEqual(registro.a_dict(), datos)
+        self.assertEqual(registro.latitud, -173935000)
+        self.assertEqual(registro["secuencia"], 42)
+        self.assertEqual(registro[2], 4321)
+
+        hb = gps_protocolo.empaquetar_heartbeat(1234, 7, flags=0x01)
+        registro, _ = gps_protocolo.desempaquetar_registro(hb)
+        assert registro is not None
+        self.assertIsNone(registro.latitud)
+        self.assertEqual(registro.a_dict(), gps_protocolo.desempaquetar_mensaje(hb)[0])
+
+        corrupto = bytearray(msg)
+        corrupto[10] ^= 0xFF
+        self.assertEqual(
+            gps_protocolo.desempaquetar_registro(corrupto), (None, "Checksum inválido")
+        )
+
+    def _buffer_lote(self):
+        tramas = [
+            gps_protocolo.empaquetar_mensaje_gps(
+                id_dispositivo=i,
+                secuencia=i + 1,
+                latitud=-173935000 + i,
+                longitud=-661570000 - i,
+                altitud=2558,
+                velocidad=10 * i,
+                rumbo=1350,
+                bateria=90 - i,
+                estado=0,
+                flags=i,
+            )
+            for i in range(6)
+        ]
+        buffer = bytearray(b"".join(tramas))
+        buffer[2 * 30 + 12] ^= 0xFF  # CRC inválido en la trama 2
+        buffer[4 * 30] = 0x09  # Versión incorrecta en la trama 4
+        return buffer + b"\x00" * 7  # Trama incompleta al final
+
+    def test_desempaquetar_lote_python(self):
+        lote = gps_protocolo.desempaquetar_lote(self._buffer_lote(), usar_numpy=False)
+        self.assertEqual(lote.id_dispositivo, [0, 1, 2, 3, 4, 5])
+        self.assertEqual(lote.latitud[5], -173935000 + 5)
+        self.assertEqual(lote.bateria, [90, 89, 88, 87, 86, 85])
+        self.assertEqual(lote.validos, [True, True, False, True, False, True])
+        vacio = gps_protocolo.desempaquetar_lote(b"", usar_numpy=False)
+        self.assertEqual(vacio.validos, [])
+
+    @unittest.skipIf(gps_protocolo.np is None, "NumPy no instalado (requirements-test.txt)")
+    def test_desempaquetar_lote_numpy(self):
+        # Valores extremos de cada campo y CRC dañados al azar
+        azar = random.Random(11)
+        tramas = []
+        for i in range(200):
+            trama = bytearray(
+                gps_protocolo.empaquetar_mensaje_gps(
+                    id_dispositivo=azar.choice((0, i, 0xFFFF)),
+                    secuencia=azar.randrange(0x10000),
+                    latitud=azar.choice((-900000000, 900000000, -1, 0)),
+                    longitud=azar.randrange(-1800000000, 1800000001),
+                    altitud=azar.choice((0, 0xFFFF)),
+                    velocidad=azar.randrange(0x10000),
+                    rumbo=azar.randrange(3600),
+                    bateria=azar.choice((0, 100, 0xFF)),
+                    estado=azar.randrange(0x100),
+                    flags=azar.choice((0, 0x80, 0xFFFF)),
+                )
+            )
+            if i % 7 == 3:
+                trama[azar.randrange(len(trama))] ^= 1 << azar.randrange(8)
+            tramas.append(bytes(trama))
+        buffer = self._buffer_lote() + b"".join(tramas)
+        buffer = buffer[: len(buffer) - len(buffer) % 30]  # Sin la trama incompleta
+
+        lote = gps_protocolo.desempaquetar_lote(buffer, usar_numpy=True)
+        referencia = gps_protocolo.desempaquetar_lote(buffer, usar_numpy=False)
+        for campo in gps_protocolo.LoteGPS._fields:
+            self.assertEqual(
+                [int(v) for v in getattr(lote, campo)],
+                [int(v) for v in getattr(referencia, campo)],
+                msg=campo,
+            )
+        self.assertIn(False, referencia.validos)
+        # Cada fila válida coincide con el MensajeGPS de desempaquetar_registro
+        for i, valido in enumerate(lote.validos):
+            registro, _ = gps_protocolo.desempaquetar_registro(buffer[i * 30 : (i + 1) * 30])
+            self.assertEqual(bool(valido), registro is not None, msg=i)
+            if registro is not None:
+                fila = [int(getattr(lote, campo)[i]) for campo in registro._fields]
+                self.assertEqual(fila, list(registro), msg=i)
+
+        vacio = gps_protocolo.desempaquetar_lote(b"", usar_numpy=True)
+        self.assertEqual(len(vacio.validos), 0)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,545 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+import gps_protocolo  # noqa: E402
+from gps_almacen import LectorTrayectos  # noqa: E402
+from gps_salida import SalidaAsincrona  # noqa: E402
+from gps_servidor import ServidorGPS  # noqa: E402
+from gps_servidor_async import _tarea_periodica, ejecutar_asyncio  # noqa: E402
+from gps_servidor_multiproceso import combinar_dispositivos  # noqa: E402
+
+
+def _mensaje_gps(id_dispositivo, secuencia, **extra):
+    campos = dict(
+        id_dispositivo=id_dispositivo,
+        secuencia=secuencia,
+        latitud=-173935000,
+        longitud=-661570000,
+        altitud=2558,
+        velocidad=450,
+        rumbo=1350,
+        bateria=85,
+        estado=0,
+        flags=0,
+    )
+    campos.update(extra)
+    return gps_protocolo.empaquetar_mensaje_gps(**campos)
+
+
+def _mensaje_gps_en(id_dispositivo, secuencia, timestamp):
+    """Mensaje GPS con un timestamp dado (p. ej. una posición atrasada)"""
+    buffer = bytearray(gps_protocolo.TAM_MENSAJE_GPS)
+    gps_protocolo.empaquetar_mensaje_gps_en(
+        buffer, 0, id_dispositivo, secuencia, -173935000, -661570000, 2558, 450, 1350, 85, 0,
+        timestamp=timestamp,
+    )
+    return bytes(buffer)
+
+
+def _servidor(**opciones):
+    opciones.setdefault("puerto", 0)
+    opciones.setdefault("enviar_ack", False)
+    opciones.setdefault("log_path", None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ServidorGPS(**opciones)
+
+
+class TestServidor(unittest.TestCase):
+    def test_procesar_datagrama_secuencias(self):
+        servidor = _servidor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for seq in (1, 2, 4, 4):
+                servidor.procesar_datagrama(_mensaje_gps(7, seq), ("127.0.0.1", 1))
+            servidor.procesar_datagrama(b"\x00" * 30, ("127.0.0.1", 1))
+            servidor.salida.vaciar()
+        self.assertEqual(servidor.mensajes_recibidos, 3)
+        self.assertEqual(servidor.mensajes_perdidos, 1)
+        self.assertEqual(servidor.mensajes_duplicados, 1)
+        self.assertEqual(servidor.errores, 1)
+        self.assertEqual(servidor.dispositivos[7]["ultima_seq"], 4)
+
+    def test_paquete_atrasado_llena_hueco(self):
+        servidor = _servidor(modo_salida="silencioso")
+        for seq, latitud in ((1, 1), (2, 2), (4, 4), (3, 3), (3, 3)):
+            servidor.procesar_datagrama(
+                _mensaje_gps(7, seq, latitud=-173935000 + latitud), ("127.0.0.1", 1)
+            )
+        estado = servidor.dispositivos[7]
+        self.assertEqual(servidor.mensajes_recibidos, 4)
+        self.assertEqual(servidor.mensajes_perdidos, 0)
+        self.assertEqual(servidor.mensajes_reordenados, 1)
+        self.assertEqual(servidor.mensajes_duplicados, 1)
+        self.assertEqual((estado.perdidos, estado.reordenados, estado.duplicados), (0, 1, 1))
+        # El atrasado no pisa la última posición
+        self.assertEqual(estado.ultima_seq, 4)
+        self.assertAlmostEqual(estado.ultima_pos[0], -17.3934996)
+
+    def test_repite_ack_de_duplicado(self):
+        servidor = _servidor(enviar_ack=True, modo_salida="silencioso")
+        servidor.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        enviados = []
+        servidor._enviar_datagrama = lambda datos, direccion: enviados.append(bytes(datos))
+        try:
+            for seq in (1, 1, 2):
+                servidor.procesar_datagrama(_mensaje_gps(5, seq), ("127.0.0.1", 1))
+        finally:
+            servidor.socket.close()
+        self.assertEqual(servidor.mensajes_duplicados, 1)
+        secuencias = [gps_protocolo.desempaquetar_mensaje(ack)[0]["secuencia"] for ack in enviados]
+        self.assertEqual(secuencias, [1, 1, 2])
+
+    def test_fuera_de_ventana_temporal_sin_ack(self):
+        servidor = _servidor(enviar_ack=True, modo_salida="silencioso")
+        servidor.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        enviados = []
+        servidor._enviar_datagrama = lambda datos, direccion: enviados.append(bytes(datos))
+        viejo = _mensaje_gps_en(5, 1, timestamp=int(time.time()) - 1000)
+        try:
+            # La retransmisión tampoco se confirma: no cuenta como duplicado
+            servidor.procesar_datagrama(viejo, ("127.0.0.1", 1))
+            servidor.procesar_datagrama(viejo, ("127.0.0.1", 1))
+        finally:
+            servidor.socket.close()
+        self.assertEqual(enviados, [])
+        self.assertEqual((servidor.errores, servidor.mensajes_duplicados), (2, 0))
+        self.assertEqual(servidor.mensajes_recibidos, 0)
+
+    def test_ack_selectivo_agrupado(self):
+        servidor = _servidor(enviar_ack=True, modo_salida="silencioso", coalescer_acks_ms=20)
+        servidor.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        enviados = []
+        servidor._enviar_datagrama = lambda datos, direccion: enviados.append(bytes(datos))
+        selectivo = gps_protocolo.FLAG_ACK_SELECTIVO
+        try:
+            for seq in (1, 2, 4, 5):
+                servidor.procesar_datagrama(_mensaje_gps(5, seq, flags=selectivo), ("127.0.0.1", 1))
+            # Un dispositivo sin la marca sigue recibiendo un ACK por mensaje
+            servidor.procesar_datagrama(_mensaje_gps(6, 1), ("127.0.0.1", 2))
+            self.assertEqual(len(enviados), 1)
+
+            servidor.enviar_acks_pendientes()
+            self.assertEqual(len(enviados), 2)
+            datos, _ = gps_protocolo.desempaquetar_mensaje(enviados[1])
+            self.assertEqual(datos["tipo"], gps_protocolo.TIPO_ACK_SELECTIVO)
+            self.assertEqual(datos["seq_mas_alta"], 5)
+            self.assertEqual(datos["mapa_sack"] & 0b111111, 0b111011)
+            servidor.enviar_acks_pendientes()  # Nada nuevo: no se envía nada
+            self.assertEqual(len(enviados), 2)
+
+            # Ráfaga sin el 20: se confirma cada MAX_ACKS_AGRUPADOS mensajes
+            for seq in range(6, 106):
+                if seq != 20:
+                    servidor.procesar_datagrama(
+                        _mensaje_gps(5, seq, flags=selectivo), ("127.0.0.1", 1)
+                    )
+            self.assertEqual(servidor.acks_selectivos, 4)
+            # El 20 llega muy tarde: fuera del mapa y después del hueco en 3,
+            # así que además recibe un ACK simple
+            servidor.procesar_datagrama(_mensaje_gps(5, 20, flags=selectivo), ("127.0.0.1", 1))
+            del enviados[:]
+            servidor.enviar_acks_pendientes()
+        finally:
+            servidor.socket.close()
+        tipos = [gps_protocolo.desempaquetar_mensaje(ack)[0] for ack in enviados]
+        self.assertEqual(
+            [(datos["tipo"], datos["secuencia"]) for datos in tipos],
+            [(gps_protocolo.TIPO_ACK_SELECTIVO, 2), (gps_protocolo.TIPO_ACK, 20)],
+        )
+        self.assertEqual((servidor.acks_enviados, servidor.acks_selectivos), (7, 5))
+        self.assertEqual(servidor.mensajes_recibidos, 105)
+
+    def test_lote_de_posiciones(self):
+        servidor = _servidor(enviar_ack=True, modo_salida="silencioso")
+        servidor.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        enviados = []
+        servidor._enviar_datagrama = lambda datos, direccion: enviados.append(bytes(datos))
+        selectivo = gps_protocolo.FLAG_ACK_SELECTIVO
+        mensajes = [
+            _mensaje_gps(5, seq, latitud=-173935000 + seq, flags=selectivo)
+            for seq in range(1, 41)
+        ]
+        try:
+            servidor.procesar_datagrama(mensajes[0], ("127.0.0.1", 1))
+            # El 1 repetido dentro del lote se descarta como duplicado
+            (lote,) = gps_protocolo.agrupar_mensajes_gps(mensajes, flags=selectivo)
+            servidor.procesar_datagrama(lote, ("127.0.0.1", 1))
+            # Sin FLAG_ACK_SELECTIVO: un ACK por posición
+            (lote,) = gps_protocolo.agrupar_mensajes_gps([_mensaje_gps(6, s) for s in (1, 2, 3)])
+            servidor.procesar_datagrama(lote, ("127.0.0.1", 2))
+        finally:
+            servidor.socket.close()
+
+        self.assertEqual(servidor.lotes_fixes, 2)
+        self.assertEqual(servidor.mensajes_recibidos, 43)
+        self.assertEqual(servidor.mensajes_duplicados, 1)
+        self.assertEqual(servidor.dispositivos[5].ultima_seq, 40)
+        self.assertAlmostEqual(servidor.dispositivos[5].ultima_pos[0], -17.393496)
+        acks = [gps_protocolo.desempaquetar_mensaje(ack)[0] for ack in enviados]
+        self.assertEqual(
+            [(datos["tipo"], datos["secuencia"]) for datos in acks],
+            [
+                (gps_protocolo.TIPO_ACK, 1),
+                (gps_protocolo.TIPO_ACK_SELECTIVO, 40),
+                (gps_protocolo.TIPO_ACK, 1),
+                (gps_protocolo.TIPO_ACK, 2),
+                (gps_protocolo.TIPO_ACK, 3),
+            ],
+        )
+
+    def test_lote_atrasado_fuera_de_ventana_temporal(self):
+        servidor = _servidor(
+            enviar_ack=True, modo_salida="silencioso", antiguedad_max_lote_seg=3600
+        )
+        servidor.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        enviados = []
+        servidor._enviar_datagrama = lambda datos, direccion: enviados.append(bytes(datos))
+        ahora = int(time.time())
+        # Diez posiciones de hace 10 minutos (más que ventana_tiempo_seg)
+        atraso = [_mensaje_gps_en(5, seq, timestamp=ahora - 600 + seq) for seq in range(1, 11)]
+        futuro = [_mensaje_gps_en(5, 11, timestamp=ahora + 600)]
+        muy_viejo = [_mensaje_gps_en(5, 12, timestamp=ahora - 7200)]
+        try:
+            for mensajes in (atraso, atraso, futuro, muy_viejo):
+                (lote,) = gps_protocolo.agrupar_mensajes_gps(mensajes)
+                servidor.procesar_datagrama(lote, ("127.0.0.1", 1))
+        finally:
+            servidor.socket.close()
+
+        self.assertEqual(servidor.mensajes_recibidos, 10)
+        self.assertEqual(servidor.mensajes_duplicados, 10)
+        self.assertEqual(servidor.errores, 2)
+        self.assertEqual(servidor.dispositivos[5].ultima_seq, 10)
+        acks = [gps_protocolo.desempaquetar_mensaje(ack)[0]["secuencia"] for ack in enviados]
+        # Confirmadas al llegar y otra vez al retransmitirse el lote
+        self.assertEqual(acks, list(range(1, 11)) * 2)
+
+    def test_posiciones_delta(self):
+        servidor = _servidor(enviar_ack=True, modo_salida="silencioso")
+        servidor.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        enviados = []
+        servidor._enviar_datagrama = lambda datos, direccion: enviados.append(bytes(datos))
+        mensajes = [_mensaje_gps(5, seq, latitud=-173935000 - 100 * seq) for seq in range(7)]
+        comprimir = gps_protocolo.comprimir_mensaje_gps
+        try:
+            # Delta sin keyframe previo: se descarta sin ACK
+            servidor.procesar_datagrama(comprimir(mensajes[0], mensajes[1]), ("127.0.0.1", 1))
+            servidor.procesar_datagrama(mensajes[1], ("127.0.0.1", 1))
+            servidor.procesar_datagrama(comprimir(mensajes[1], mensajes[2]), ("127.0.0.1", 1))
+            servidor.procesar_datagrama(comprimir(mensajes[2], mensajes[3]), ("127.0.0.1", 1))
+            # Se pierde el 4: el delta del 5 no tiene referencia hasta el keyframe
+            servidor.procesar_datagrama(comprimir(mensajes[4], mensajes[5]), ("127.0.0.1", 1))
+            servidor.procesar_datagrama(mensajes[5], ("127.0.0.1", 1))
+            servidor.procesar_datagrama(comprimir(mensajes[5], mensajes[6]), ("127.0.0.1", 1))
+        finally:
+            servidor.socket.close()
+
+        self.assertEqual(servidor.mensajes_recibidos, 5)
+        self.assertEqual((servidor.deltas_recibidos, servidor.deltas_sin_referencia), (3, 2))
+        self.assertEqual(servidor.errores, 2)
+        estado = servidor.dispositivos[5]
+        self.assertEqual(estado.ultima_seq, 6)
+        self.assertAlmostEqual(estado.ultima_pos[0], -17.39356)
+        acks = [gps_protocolo.desempaquetar_mensaje(ack)[0]["secuencia"] for ack in enviados]
+        self.assertEqual(acks, [1, 2, 3, 5, 6])
+
+    def test_mensajes_autenticados(self):
+        servidor = _servidor(
+            enviar_ack=True,
+            modo_salida="silencioso",
+            autenticar=True,
+            claves_dispositivos={6: "clave propia"},
+        )
+        servidor.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        enviados = []
+        servidor._enviar_datagrama = lambda datos, direccion: enviados.append(bytes(datos))
+        derivada = gps_protocolo.Autenticador()
+        propia = gps_protocolo.Autenticador(claves={6: "clave propia"})
+        direccion = ("127.0.0.1", 1)
+        try:
+            servidor.procesar_datagrama(derivada.firmar(_mensaje_gps(5, 1)), direccion)
+            servidor.procesar_datagrama(propia.firmar(_mensaje_gps(6, 1)), direccion)
+            # Sin TAG, o firmado con la clave derivada en vez de la propia
+            servidor.procesar_datagrama(_mensaje_gps(5, 2), direccion)
+            servidor.procesar_datagrama(derivada.firmar(_mensaje_gps(6, 2)), direccion)
+            # Delta y lote firmados
+            delta = gps_protocolo.comprimir_mensaje_gps(
+                _mensaje_gps(5, 1), _mensaje_gps(5, 2, latitud=-173935100)
+            )
+            servidor.procesar_datagrama(derivada.firmar(delta), direccion)
+            lote = gps_protocolo.agrupar_mensajes_gps(
+                [_mensaje_gps(5, seq) for seq in (3, 4)], autenticador=derivada
+            )[0]
+            servidor.procesar_datagrama(lote, direccion)
+        finally:
+            servidor.socket.close()
+
+        self.assertEqual(servidor.mensajes_recibidos, 5)
+        self.assertEqual((servidor.errores, servidor.rechazados_autenticacion), (2, 2))
+        self.assertEqual(servidor.deltas_recibidos, 1)
+        # Los ACK salen firmados con la clave de cada dispositivo
+        acks = []
+        for ack in enviados:
+            datos, error = gps_protocolo.desempaquetar_mensaje(ack, propia)
+            self.assertIsNotNone(datos, msg=error)
+            acks.append((datos["id_dispositivo"], datos["secuencia"]))
+        self.assertEqual(acks, [(5, 1), (6, 1), (5, 2), (5, 3), (5, 4)])
+
+    def test_recepcion_en_lotes(self):
+        servidor = _servidor(lote_recepcion=16, enviar_ack=True)
+        salida = io.StringIO()
+        with contextlib.redirect_stdout(salida):
+            hilo = threading.Thread(target=servidor.ejecutar, daemon=True)
+            hilo.start()
+            while servidor.socket is None:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            destino = ("127.0.0.1", servidor.socket.getsockname()[1])
+
+            cliente = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            cliente.settimeout(2.0)
+            for seq in range(1, 41):
+                cliente.sendto(_mensaje_gps(9, seq), destino)
+            acks = set()
+            while len(acks) < 40:
+                respuesta, _ = cliente.recvfrom(64)
+                datos, _ = gps_protocolo.desempaquetar_mensaje(respuesta)
+                acks.add(datos["secuencia"])
+            cliente.close()
+
+            servidor.detener()
+            hilo.join(timeout=3)
+        self.assertFalse(hilo.is_alive())
+        self.assertEqual(acks, set(range(1, 41)))
+        self.assertEqual(servidor.mensajes_recibidos, 40)
+        self.assertGreaterEqual(servidor.lotes_recibidos, 1)
+
+    def test_acks_agrupados_salen_por_su_transporte(self):
+        class Transporte:
+            def __init__(self):
+                self.enviados = []
+
+            def sendto(self, datos, direccion):
+                self.enviados.append((bytes(datos), direccion))
+
+        servidor = _servidor(enviar_ack=True, modo_salida="silencioso", coalescer_acks_ms=20)
+        selectivo = gps_protocolo.FLAG_ACK_SELECTIVO
+        puerto_a, puerto_b = Transporte(), Transporte()
+        # Dos puertos de escucha (motor asyncio): el último datagrama llega por B
+        servidor.transporte = puerto_a
+        servidor.procesar_datagrama(_mensaje_gps(1, 1, flags=selectivo), ("10.0.0.1", 1))
+        servidor.transporte = puerto_b
+        servidor.procesar_datagrama(_mensaje_gps(2, 1, flags=selectivo), ("10.0.0.2", 2))
+        servidor.enviar_acks_pendientes()
+        self.assertEqual([d for _, d in puerto_a.enviados], [("10.0.0.1", 1)])
+        self.assertEqual([d for _, d in puerto_b.enviados], [("10.0.0.2", 2)])
+        self.assertIs(servidor.transporte, puerto_b)
+
+    def test_tarea_periodica_asyncio_avisa_errores(self):
+        servidor = _servidor(modo_salida="silencioso")
+        servidor._aviso = mock.Mock()
+
+        def fallar():
+            raise RuntimeError("sin disco")
+
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(asyncio.wait_for(_tarea_periodica(servidor, 0.01, fallar), 0.1))
+        self.assertIn("sin disco", servidor._aviso.call_args[0][0])
+
+    def test_motor_asyncio(self):
+        libre = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        libre.bind(("127.0.0.1", 0))
+        puerto = libre.getsockname()[1]
+        libre.close()
+
+        servidor = _servidor(enviar_ack=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            hilo = threading.Thread(
+                target=ejecutar_asyncio,
+                args=(servidor,),
+                kwargs={"puertos": [puerto]},
+                daemon=True,
+            )
+            hilo.start()
+            cliente = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            cliente.settimeout(0.2)
+            respuesta = None
+            for _ in range(20):  # Reintentar hasta que el endpoint esté listo
+                cliente.sendto(_mensaje_gps(3, 1), ("127.0.0.1", puerto))
+                try:
+                    respuesta, _ = cliente.recvfrom(64)
+                    break
+                except socket.timeout:
+                    continue
+            cliente.close()
+            servidor.detener()
+            hilo.join(timeout=3)
+        self.assertFalse(hilo.is_alive())
+        self.assertIsNotNone(respuesta)
+        datos, _ = gps_protocolo.desempaquetar_mensaje(respuesta)
+        self.assertEqual(datos["tipo"], gps_protocolo.TIPO_ACK)
+        self.assertEqual(servidor.mensajes_recibidos, 1)
+
+    def test_combinar_dispositivos(self):
+        def info(primera, ultima, mensajes, seq):
+            return {
+                "primera_conexion": primera,
+                "ultima_conexion": ultima,
+                "ultima_seq": seq,
+                "mensajes_recibidos": mensajes,
+            }
+
+        combinado = combinar_dispositivos(
+            [
+                {1: info(10, 20, 5, 5), 2: info(10, 11, 1, 1)},
+                {1: info(15, 30, 3, 8)},
+            ]
+        )
+        self.assertEqual(combinado[1]["ultima_seq"], 8)
+        self.assertEqual(combinado[1]["mensajes_recibidos"], 8)
+        self.assertEqual(combinado[1]["primera_conexion"], 10)
+        self.assertEqual(combinado[2]["mensajes_recibidos"], 1)
+
+    def test_tareas_periodicas(self):
+        servidor = _servidor()
+        llamadas = []
+        servidor.agregar_tarea_periodica(0.0, lambda: llamadas.append(1))
+        servidor._ejecutar_tareas_vencidas()
+        servidor._ejecutar_tareas_vencidas()
+        self.assertEqual(len(llamadas), 2)
+
+    def test_log_en_bloque(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "gps_log.txt")
+            servidor = _servidor(log_path=ruta, modo_salida="silencioso")
+            for seq in range(1, 6):
+                servidor.procesar_datagrama(_mensaje_gps(3, seq), ("127.0.0.1", 1))
+            self.assertFalse(os.path.exists(ruta))
+            servidor.vaciar_log()
+            servidor.cerrar_log()
+            with open(ruta) as f:
+                lineas = f.read().splitlines()
+        self.assertEqual(len(lineas), 5)
+        self.assertIn("|GPS3|SEQ5|-17.3935000|-66.1570000|2558|45.0|135.0|85|", lineas[-1])
+
+    def test_almacen_con_flags_altos(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            servidor = _servidor(modo_salida="silencioso", almacen_path=directorio)
+            servidor.procesar_datagrama(_mensaje_gps(4, 1, flags=0x0100), ("127.0.0.1", 1))
+            # Un error del almacén se informa sin cortar la recepción
+            servidor.almacen.agregar = mock.Mock(side_effect=struct.error("fallo"))
+            servidor.procesar_datagrama(_mensaje_gps(4, 2), ("127.0.0.1", 1))
+            servidor.cerrar_log()
+            with LectorTrayectos(directorio) as lector:
+                flags = [registro.flags for registro in lector]
+        self.assertEqual(flags, [0x0100])
+        self.assertEqual(servidor.mensajes_recibidos, 2)
+
+    def test_holgura_del_almacen_sin_antiguedad_de_lotes(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            servidor = _servidor(
+                modo_salida="silencioso",
+                almacen_path=directorio,
+                ventana_tiempo_seg=120,
+                antiguedad_max_lote_seg=7 * 24 * 3600,
+            )
+            servidor.procesar_datagrama(_mensaje_gps(4, 1), ("127.0.0.1", 1))
+            servidor.cerrar_log()
+            with LectorTrayectos(directorio) as lector:
+                self.assertEqual(lector.segmentos[0].holgura, 120)
+
+    def test_dispositivos_cercanos(self):
+        servidor = _servidor(modo_salida="silencioso")
+        for id_disp, desplazamiento in ((1, 0), (2, 5000), (3, 200000)):
+            servidor.procesar_datagrama(
+                _mensaje_gps(id_disp, 1, latitud=-173935000 + desplazamiento),
+                ("127.0.0.1", 1),
+            )
+        cercanos = servidor.dispositivos_cercanos(-17.3935, -66.157, radio_m=1000)
+        self.assertEqual([id_disp for _, id_disp in cercanos], [1, 2])
+        self.assertEqual(servidor.dispositivos_cercanos(-17.3935, -66.157, k=1)[0][1], 1)
+        with self.assertRaises(ValueError):
+            servidor.dispositivos_cercanos(-17.3935, -66.157)
+
+    def test_expirar_inactivos(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, "expirados.jsonl")
+            servidor = _servidor(
+                modo_salida="json",
+                expirar_inactivos_seg=60,
+                alerta_sin_reporte_seg=20,
+                archivo_expirados=archivo,
+            )
+            flujo = io.StringIO()
+            servidor.salida = SalidaAsincrona(flujo=flujo)
+            for id_disp in (1, 2):
+                servidor.procesar_datagrama(_mensaje_gps(id_disp, 1), ("127.0.0.1", 1))
+            inicio = servidor.dispositivos[1]["ultima_conexion"]
+            servidor.revisar_inactivos(inicio + 30)
+            servidor.dispositivos.registrar(1, inicio + 50)
+            servidor.revisar_inactivos(inicio + 65)
+            self.assertTrue(servidor.salida.vaciar())
+            with open(archivo, encoding="utf-8") as f:
+                archivados = [json.loads(linea) for linea in f]
+
+        eventos = [json.loads(linea) for linea in flujo.getvalue().splitlines()]
+        self.assertEqual(
+            [(e["evento"], e["id_dispositivo"]) for e in eventos if e["evento"] != "gps"],
+            [("nuevo", 1), ("nuevo", 2), ("sin_reporte", 1), ("sin_reporte", 2),
+             ("desconectado", 2)],
+        )
+        self.assertEqual(list(servidor.dispositivos), [1])
+        self.assertIsNone(servidor.indice_espacial.posicion(2))
+        self.assertEqual((servidor.dispositivos_expirados, servidor.alertas_sin_reporte), (1, 2))
+        self.assertEqual(len(archivados), 1)
+        self.assertEqual(archivados[0]["id_dispositivo"], 2)
+        self.assertEqual(archivados[0]["ultima_seq"], 1)
+        self.assertEqual(archivados[0]["ultima_pos"], [-17.3935, -66.157])
+
+    def test_salida_json(self):
+        servidor = _servidor(modo_salida="json")
+        flujo = io.StringIO()
+        servidor.salida = SalidaAsincrona(flujo=flujo)
+        servidor.procesar_datagrama(_mensaje_gps(5, 1), ("127.0.0.1", 1))
+        servidor.procesar_datagrama(_mensaje_gps(5, 3), ("127.0.0.1", 1))
+        self.assertTrue(servidor.salida.vaciar())
+        eventos = [json.loads(linea) for linea in flujo.getvalue().splitlines()]
+        self.assertEqual(
+            [e["evento"] for e in eventos], ["nuevo", "gps", "perdida", "gps"]
+        )
+        self.assertEqual(eventos[1]["secuencia"], 1)
+        self.assertEqual(eventos[2]["perdidos"], 1)
+
+    def test_salida_muestreo(self):
+        servidor = _servidor(modo_salida="muestreo", muestreo=10)
+        flujo = io.StringIO()
+        servidor.salida = SalidaAsincrona(flujo=flujo)
+        for seq in range(1, 26):
+            servidor.procesar_datagrama(_mensaje_gps(5, seq), ("127.0.0.1", 1))
+        self.assertTrue(servidor.salida.vaciar())
+        # Paquetes 1, 11 y 21 (más el aviso de dispositivo nuevo)
+        self.assertEqual(flujo.getvalue().count("DATOS GPS RECIBIDOS"), 3)
+        self.assertIn("Nuevo dispositivo", flujo.getvalue())
+
+    def test_modo_salida_invalido(self):
+        with self.assertRaises(ValueError):
+            _servidor(modo_salida="ruidoso")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+import gps_protocolo  # noqa: E402
+from gps_sqlite import DestinoSQLite  # noqa: E402
+
+
+def _posicion(id_dispositivo, secuencia):
+    trama = gps_protocolo.empaquetar_mensaje_gps(
+        id_dispositivo=id_dispositivo,
+        secuencia=secuencia,
+        latitud=-173935000,
+        longitud=-661570000,
+        altitud=2558,
+        velocidad=450,
+        rumbo=1350,
+        bateria=85,
+        estado=0,
+    )
+    return gps_protocolo.desempaquetar_registro(trama)[0]
+
+
+class TestDestinoSQLite(unittest.TestCase):
+    def setUp(self):
+        self._directorio = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self._directorio.name, "gps.db")
+
+    def tearDown(self):
+        self._directorio.cleanup()
+
+    def test_escritura_en_lotes(self):
+        destino = DestinoSQLite(self.ruta, filas_por_lote=100, intervalo_ms=50)
+        for seq in range(250):
+            destino.agregar_posicion(_posicion(seq % 5, seq), llegada=1000.0 + seq)
+        heartbeat = gps_protocolo.desempaquetar_registro(
+            gps_protocolo.empaquetar_heartbeat(3, 7, flags=1)
+        )[0]
+        destino.agregar_heartbeat(heartbeat, llegada=2000.5)
+        destino.cerrar()
+
+        self.assertEqual(destino.escritas, 251)
+        self.assertEqual(destino.descartadas, 0)
+        self.assertGreaterEqual(destino.transacciones, 3)
+        conexion = sqlite3.connect(self.ruta)
+        try:
+            modo = conexion.execute("PRAGMA journal_mode").fetchone()[0]
+            filas = conexion.execute(
+                "SELECT secuencia, latitud, velocidad FROM posiciones "
+                "WHERE id_dispositivo = 2 ORDER BY timestamp, secuencia"
+            ).fetchall()
+            plan = " ".join(
+                str(fila)
+                for fila in conexion.execute(
+                    "EXPLAIN QUERY PLAN SELECT * FROM posiciones "
+                    "WHERE id_dispositivo = 2 AND timestamp > 0"
+                )
+            )
+            heartbeats = conexion.execute("SELECT * FROM heartbeats").fetchall()
+        finally:
+            conexion.close()
+        self.assertEqual(modo, "wal")
+        self.assertEqual(len(filas), 50)
+        self.assertEqual(filas[0], (2, -17.3935, 45.0))
+        self.assertIn("idx_posiciones_dispositivo_timestamp", plan)
+        self.assertEqual(heartbeats, [(3, 7, 2000, 2000.5, 1)])
+
+    def test_cola_llena_descarta(self):
+        # Otra conexión bloquea la base: el escritor queda esperando y la
+        # cola (capacidad 10) se llena sin frenar a quien encola
+        DestinoSQLite(self.ruta).cerrar()
+        bloqueo = sqlite3.connect(self.ruta, isolation_level=None)
+        bloqueo.execute("BEGIN EXCLUSIVE")
+        destino = DestinoSQLite(self.ruta, filas_por_lote=5, intervalo_ms=10, capacidad=10)
+        aceptadas = sum(destino.agregar_posicion(_posicion(1, seq)) for seq in range(100))
+        bloqueo.execute("COMMIT")
+        bloqueo.close()
+        destino.cerrar()
+
+        self.assertGreater(destino.descartadas, 0)
+        self.assertEqual(aceptadas, destino.encoladas)
+        self.assertEqual(destino.encoladas + destino.descartadas, 100)
+        self.assertEqual(destino.escritas + destino.filas_con_error, destino.encoladas)
+
+    def test_cerrar_con_escritor_trabado_no_cuelga(self):
+        destino = DestinoSQLite(self.ruta, filas_por_lote=1, intervalo_ms=10, capacidad=5)
+        trabado = threading.Event()
+        liberar = threading.Event()
+
+        def confirmar(*lote):
+            trabado.set()
+            liberar.wait()
+
+        destino._confirmar = confirmar
+        destino.agregar_posicion(_posicion(1, 0))
+        self.assertTrue(trabado.wait(5))
+        for seq in range(1, 20):  # Con el escritor trabado la cola se llena
+            destino.agregar_posicion(_posicion(1, seq))
+        inicio = time.monotonic()
+        destino.cerrar(timeout=0.2)
+        self.assertLess(time.monotonic() - inicio, 1.0)
+        # Destrabado el escritor, un nuevo cerrar lo detiene normalmente
+        liberar.set()
+        destino.cerrar()
+        self.assertFalse(destino._hilo.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()